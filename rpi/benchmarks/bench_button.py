@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark przycisku START: stary polling (co 100ms + debounce 100ms)
+kontra obsługa na zboczach (gpio_input.Button) na backendzie programowym.
+Mierzy opóźnienie naciśnięcie → on_press oraz CPU w bezczynności.
+
+Uruchomienie: python3 benchmarks/bench_button.py [--presses 20] [--idle 5]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gpio_input import Button, FakeGPIOBackend, LEVEL_PRESSED  # noqa: E402
+
+PIN = 17
+POLL_INTERVAL = 0.1
+POLL_DEBOUNCE = 0.1
+
+
+def polling_loop(backend, on_press, stop):
+    """Pętla z dawnego bridge.main()"""
+    last = False
+    while not stop.is_set():
+        current = backend.read(PIN) == LEVEL_PRESSED
+        if current and not last:
+            time.sleep(POLL_DEBOUNCE)
+            if backend.read(PIN) == LEVEL_PRESSED:
+                on_press()
+                while backend.read(PIN) == LEVEL_PRESSED:
+                    time.sleep(0.05)
+        last = current
+        time.sleep(POLL_INTERVAL)
+
+
+def measure(mode, presses, idle):
+    backend = FakeGPIOBackend(threaded=True)
+    backend.setup(PIN)
+    latencies = []
+    fired = threading.Event()
+
+    def on_press():
+        latencies.append(time.perf_counter() - backend.last_edge_time[PIN])
+        fired.set()
+
+    stop = threading.Event()
+    if mode == "polling":
+        worker = threading.Thread(target=polling_loop, args=(backend, on_press, stop), daemon=True)
+        worker.start()
+    else:
+        Button(backend, PIN, on_press).start()
+
+    # CPU w bezczynności - nikt nie naciska przycisku
+    cpu_start = time.process_time()
+    time.sleep(idle)
+    idle_cpu = (time.process_time() - cpu_start) / idle * 100
+
+    for _ in range(presses):
+        fired.clear()
+        backend.bounce(PIN)
+        fired.wait(2.0)
+        time.sleep(0.2)
+        backend.release(PIN)
+        time.sleep(0.2)
+
+    stop.set()
+    latencies.sort()
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else float("nan")
+    return {"n": len(latencies), "p50": pick(0.5), "p95": pick(0.95), "max": pick(1.0), "idle_cpu": idle_cpu}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--presses", type=int, default=20)
+    parser.add_argument("--idle", type=float, default=5.0, help="Czas pomiaru CPU w bezczynności [s]")
+    args = parser.parse_args()
+
+    print(f"{'tryb':>8} {'naciśnięcia':>11} {'p50 [ms]':>9} {'p95 [ms]':>9} {'max [ms]':>9} {'CPU idle':>9}")
+    for mode in ("polling", "edge"):
+        r = measure(mode, args.presses, args.idle)
+        print(f"{mode:>8} {r['n']:>5}/{args.presses:<5} {r['p50']:>9.2f} {r['p95']:>9.2f} "
+              f"{r['max']:>9.2f} {r['idle_cpu']:>8.3f}%")
+
+
+if __name__ == "__main__":
+    main()
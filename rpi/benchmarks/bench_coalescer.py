@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Ruch UPDATE_FRAME do ESP32: dawny bridge (ramka na każdą wiadomość z chmury)
+kontra UpdateCoalescer. Strumień syntetyczny: czujnik temperatury/wilgotności
+i czujnik drzwi wysyłają co ``--interval`` s, wartości zmieniają się rzadko,
+drzwi otwierają się kilka razy. Mierzy liczbę ramek i opóźnienie otwarcia drzwi.
+
+Uruchomienie: python3 benchmarks/bench_coalescer.py [--duration 10] [--interval 0.05]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from frame_codec import decode_update_frame  # noqa: E402
+from update_coalescer import UpdateCoalescer  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=10.0, help="Czas strumienia [s]")
+    parser.add_argument("--interval", type=float, default=0.05, help="Odstęp wiadomości każdego czujnika [s]")
+    parser.add_argument("--window", type=float, default=0.5)
+    parser.add_argument("--heartbeat", type=float, default=30.0)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    door_latencies = []
+    door_opened_at = {}
+
+    def publish(frame, since):
+        if decode_update_frame(frame).door_status and "t" in door_opened_at:
+            door_latencies.append(time.perf_counter() - door_opened_at.pop("t"))
+
+    coalescer = UpdateCoalescer(publish, window=args.window, heartbeat=args.heartbeat)
+    coalescer.start()
+
+    legacy_frames = 0
+    humidity, temperature, door = 45, 230, 0
+    end = time.perf_counter() + args.duration
+    while time.perf_counter() < end:
+        # Wiadomość z czujnika temperatury/wilgotności (wartość zmienia się co ~10 wiadomości)
+        if rng.random() < 0.1:
+            temperature += rng.choice((-1, 1))
+        legacy_frames += 1
+        coalescer.submit(humidity, temperature, door)
+
+        # Wiadomość z czujnika drzwi
+        if rng.random() < 0.01:
+            door = 1 - door
+            if door:
+                door_opened_at["t"] = time.perf_counter()
+        legacy_frames += 1
+        coalescer.submit(humidity, temperature, door)
+
+        time.sleep(args.interval)
+
+    coalescer.stop()
+    stats = coalescer.stats()
+    print(f"Wiadomości z chmury:        {stats['received']}")
+    print(f"Ramki - dawny bridge:       {legacy_frames}")
+    print(f"Ramki - coalescer:          {stats['published']} "
+          f"({100 * (1 - stats['published'] / max(1, legacy_frames)):.1f}% mniej)")
+    print(f"  pominięte duplikaty:      {stats['suppressed']}")
+    print(f"  połączone w oknie:        {stats['coalesced']}")
+    print(f"  otwarcia drzwi od razu:   {stats['fast_path']}")
+    if door_latencies:
+        print(f"Opóźnienie otwarcia drzwi:  max {max(door_latencies) * 1e6:.0f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Przepustowość rdzenia emulatora ESP32 (esp_emulator.EspStateMachine) bez
+brokera: ``--devices`` emulatorów na jednym zegarze wirtualnym przechodzi
+pełne cykle START -> ... -> IDLE, zasilane ramkami UPDATE_FRAME.
+
+Pokazuje, ile ramek na sekundę jeden proces floty obsłuży po stronie
+emulacji (bez kosztu paho i sieci), a więc czy flota nie będzie
+wąskim gardłem przy testach obciążeniowych bridge.py.
+
+Uruchomienie: python3 benchmarks/bench_esp_emulator.py [--devices 500] [--cycles 3]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from esp_emulator import EspStateMachine  # noqa: E402
+from frame_codec import COMMAND_CONFIRM_TAKE_OUT, create_start_frame, create_update_frame  # noqa: E402
+from sim_clock import VirtualClock  # noqa: E402
+
+TARGET_TEMPERATURE = 650
+TARGET_HUMIDITY = 75
+COOKING_TIME = 3600
+
+
+def cycle_frames(steps):
+    """Ramki jednego cyklu: nagrzewanie, nawilżanie, utrzymanie, chłodzenie"""
+    heating = [create_update_frame(45, 450 + (TARGET_TEMPERATURE - 450) * i // steps, 0) for i in range(steps + 1)]
+    humidifying = [create_update_frame(45 + (TARGET_HUMIDITY - 45) * i // steps, TARGET_TEMPERATURE, 0)
+                   for i in range(steps + 1)]
+    holding = [create_update_frame(TARGET_HUMIDITY, TARGET_TEMPERATURE + (i % 5) - 2, 0) for i in range(steps)]
+    cooling = [create_update_frame(60, TARGET_TEMPERATURE - (TARGET_TEMPERATURE - 400) * i // steps, 0)
+               for i in range(steps + 1)]
+    return heating + humidifying, holding, cooling
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=500, help="Liczba emulatorów")
+    parser.add_argument("--cycles", type=int, default=3, help="Pełne cykle na emulator")
+    parser.add_argument("--steps", type=int, default=40, help="Ramek UPDATE na fazę")
+    args = parser.parse_args()
+
+    clock = VirtualClock(start=0, real_step=0)
+    published = [0]
+
+    def publish(name):
+        published[0] += 1
+
+    machines = [EspStateMachine(f"esp-{i:03d}", clock, publish) for i in range(args.devices)]
+    for machine in machines:
+        machine.start()
+
+    start_frame = create_start_frame(1, "Boczek", TARGET_HUMIDITY, TARGET_TEMPERATURE, 45, 450, 0, COOKING_TIME)
+    confirm = create_start_frame(COMMAND_CONFIRM_TAKE_OUT, "", TARGET_HUMIDITY, TARGET_TEMPERATURE, 60, 400, 0, 1)
+    warmup, holding, cooling = cycle_frames(args.steps)
+
+    frames = 0
+    started = time.perf_counter()
+    for _ in range(args.cycles):
+        for phase in ([start_frame], warmup, holding):
+            for payload in phase:
+                for machine in machines:
+                    machine.handle_frame(payload)
+                frames += len(machines)
+                clock.advance(COOKING_TIME / len(holding))
+        clock.advance(COOKING_TIME)
+        for phase in (cooling, [confirm]):
+            for payload in phase:
+                for machine in machines:
+                    machine.handle_frame(payload)
+                frames += len(machines)
+    elapsed = time.perf_counter() - started
+
+    cycles = sum(m.cycles for m in machines)
+    print(f"{args.devices} emulatorów, {args.cycles} cykli, {frames} ramek, {published[0]} publikacji stanu")
+    print(f"{'µs/ramkę':>10} {'ramek/s':>12} {'cykle':>8} {'czas symulowany':>17} {'przyspieszenie':>15}")
+    print(f"{elapsed / frames * 1e6:>10.2f} {frames / elapsed:>12,.0f} {cycles:>8} "
+          f"{clock.elapsed() / 3600:>15.1f} h {clock.elapsed() / elapsed:>14,.0f}x")
+    if cycles != args.devices * args.cycles:
+        print(f"UWAGA: ukończone cykle {cycles} zamiast {args.devices * args.cycles}")
+
+
+if __name__ == "__main__":
+    main()
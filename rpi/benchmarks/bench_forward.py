@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Przekazywanie odczytów przez HTTP: dawny wojfer.py (POST na wiadomość,
+nowe połączenie, w wątku MQTT) kontra HttpForwardSink (paczki, keep-alive,
+wątki w tle). Serwer testowy na localhost odpowiada po ``--latency`` ms,
+a ``--fail`` to odsetek odpowiedzi 503 (ponowienia).
+
+Mierzone: czas callbacku MQTT (blokowanie pętli paho) i czas, po którym
+wszystkie odczyty dotarły do serwera.
+
+Uruchomienie: python3 benchmarks/bench_forward.py [--n 2000] [--latency 5] [--fail 0.05]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cloud_ingest import HttpForwardSink, IngestHub  # noqa: E402
+
+
+class Server:
+    """Serwer HTTP/1.1 zliczający odebrane odczyty"""
+
+    def __init__(self, latency, fail, seed=1):
+        self.received = 0
+        self.posts = 0
+        self.connections = set()
+        self._lock = threading.Lock()
+        rng = random.Random(seed)
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                time.sleep(latency)
+                with server._lock:
+                    failed = rng.random() < fail
+                    if not failed:
+                        document = json.loads(body)
+                        server.received += len(document["readings"]) if "readings" in document else 1
+                        server.posts += 1
+                        server.connections.add(self.client_address)
+                reply = b'{"error": "503"}' if failed else b'{"accepted": 1, "rejected": []}'
+                self.send_response(503 if failed else 200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(reply)))
+                self.end_headers()
+                self.wfile.write(reply)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        self.url = "http://127.0.0.1:%d/api/ingest/" % self.httpd.server_address[1]
+
+    def wait_for(self, n, timeout=120):
+        deadline = time.monotonic() + timeout
+        while self.received < n and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def close(self):
+        self.httpd.shutdown()
+
+
+def payloads(n):
+    rng = random.Random(2)
+    return [json.dumps({"data": {"temperature": round(rng.uniform(18, 80), 2),
+                                 "humidity": round(rng.uniform(30, 90), 2),
+                                 "pressure": 1013.0, "gas_resistance_ohm": 120000}}).encode()
+            for _ in range(n)]
+
+
+def legacy(server, corpus):
+    """POST na wiadomość w callbacku (jak dawny wojfer.py, z ponowieniem do skutku)"""
+    callback = 0.0
+    start = time.perf_counter()
+    for payload in corpus:
+        started = time.perf_counter()
+        data = json.loads(payload)["data"]
+        body = json.dumps({"temperature": data["temperature"], "humidity": data["humidity"],
+                           "pressure": data["pressure"], "gas_resistance": data["gas_resistance_ohm"]}).encode()
+        while True:
+            request = urllib.request.Request(server.url, data=body, headers={"Content-Type": "application/json"})
+            try:
+                with urllib.request.urlopen(request, timeout=5) as response:
+                    response.read()
+                break
+            except urllib.error.HTTPError:
+                continue
+        callback += time.perf_counter() - started
+    server.wait_for(len(corpus))
+    return callback, time.perf_counter() - start
+
+
+def batched(server, corpus):
+    sink = HttpForwardSink(server.url, backoff=0.05, retries=20)
+    hub = IngestHub([sink])
+    hub.start()
+    callback = 0.0
+    start = time.perf_counter()
+    for payload in corpus:
+        started = time.perf_counter()
+        hub.dispatch("decoded/sensor-1", payload)
+        callback += time.perf_counter() - started
+    server.wait_for(len(corpus))
+    total = time.perf_counter() - start
+    hub.stop()
+    return callback, total, sink.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=2000, help="Liczba wiadomości")
+    parser.add_argument("--latency", type=float, default=5, help="Czas odpowiedzi serwera (ms)")
+    parser.add_argument("--fail", type=float, default=0.05, help="Odsetek odpowiedzi 503")
+    args = parser.parse_args()
+
+    corpus = payloads(args.n)
+    print(f"{args.n} wiadomości, serwer {args.latency:.0f} ms, {args.fail:.0%} odpowiedzi 503\n")
+    print(f"{'wariant':<26} {'callback µs/wiad.':>18} {'całość s':>10} {'POST-y':>8} {'połączenia':>11}")
+
+    server = Server(args.latency / 1000, args.fail)
+    callback, total = legacy(server, corpus)
+    print(f"{'POST na wiadomość':<26} {callback / args.n * 1e6:>18.1f} {total:>10.2f} "
+          f"{server.posts:>8} {len(server.connections):>11}")
+    server.close()
+
+    server = Server(args.latency / 1000, args.fail)
+    callback, total, stats = batched(server, corpus)
+    print(f"{'HttpForwardSink':<26} {callback / args.n * 1e6:>18.1f} {total:>10.2f} "
+          f"{server.posts:>8} {len(server.connections):>11}")
+    server.close()
+    print(f"\nHttpForwardSink: {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Mikrobenchmark kodeka ramek: dawne create_*_frame (bytearray + pętla po
+bajtach + struct.pack na pole) kontra frame_codec (prekompilowane
+struct.Struct, pack/pack_into) oraz dekodowanie obu typów ramek.
+
+Uruchomienie: python3 benchmarks/bench_frame_codec.py [--number 200000]
+"""
+
+import argparse
+import os
+import struct
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import frame_codec  # noqa: E402
+from frame_codec import (  # noqa: E402
+    START_STRUCT, UPDATE_STRUCT, FrameBuffer, FrameType, MEAT_NAME_LENGTH,
+    create_start_frame, create_update_frame, decode_frame, decode_start_frame, decode_update_frame,
+    pack_start_into, pack_update_into,
+)
+
+START_ARGS = (1, "Boczek", 75, 650, 45, 230, 0, 1200)
+UPDATE_ARGS = (45, 231, 0)
+
+
+def legacy_start_frame(command, meat_name, target_humidity, target_temperature,
+                       current_humidity, current_temperature, door_status, time_of_smoking):
+    """Dawna implementacja z bridge.py (punkt odniesienia)"""
+    payload = bytearray(frame_codec.START_FRAME_TIME_OF_SMOKING_PLACE + 2)
+    payload[0] = FrameType.START_FRAME
+    payload[frame_codec.START_FRAME_COMMAND_VALUE_PLACE] = command & 0xFF
+    meat_bytes = meat_name.encode('utf-8')[:MEAT_NAME_LENGTH]
+    for i in range(min(len(meat_bytes), MEAT_NAME_LENGTH)):
+        payload[frame_codec.START_FRAME_MEAT_NAME_PLACE + i] = meat_bytes[i]
+    payload[frame_codec.START_FRAME_TARGET_HUMIDITY_PLACE] = target_humidity & 0xFF
+    p = frame_codec.START_FRAME_TARGET_TEMPERATURE_PLACE
+    payload[p:p + 2] = struct.pack('<h', target_temperature)
+    payload[frame_codec.START_FRAME_CURRENT_HUMIDITY_PLACE] = current_humidity & 0xFF
+    p = frame_codec.START_FRAME_CURRENT_TEMPERATURE_PLACE
+    payload[p:p + 2] = struct.pack('<h', current_temperature)
+    payload[frame_codec.START_FRAME_DOOR_STATUS_PLACE] = door_status & 0xFF
+    p = frame_codec.START_FRAME_TIME_OF_SMOKING_PLACE
+    payload[p:p + 2] = struct.pack('<H', time_of_smoking)
+    return payload
+
+
+def legacy_update_frame(current_humidity, current_temperature, door_status):
+    """Dawna implementacja z bridge.py (punkt odniesienia)"""
+    payload = bytearray(frame_codec.UPDATE_FRAME_DOOR_STATUS_PLACE + 1)
+    payload[0] = FrameType.UPDATE_FRAME
+    payload[frame_codec.UPDATE_FRAME_CURRENT_HUMIDITY_PLACE] = current_humidity & 0xFF
+    p = frame_codec.UPDATE_FRAME_CURRENT_TEMPERATURE_PLACE
+    payload[p:p + 2] = struct.pack('<h', current_temperature)
+    payload[frame_codec.UPDATE_FRAME_DOOR_STATUS_PLACE] = door_status & 0xFF
+    return payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=200000, help="Liczba operacji na pomiar")
+    parser.add_argument("--repeat", type=int, default=5, help="Powtórzenia (brany najlepszy wynik)")
+    args = parser.parse_args()
+
+    # Nowy kodek musi dawać bajt w bajt to samo co stara implementacja
+    assert create_start_frame(*START_ARGS) == legacy_start_frame(*START_ARGS)
+    assert create_update_frame(*UPDATE_ARGS) == legacy_update_frame(*UPDATE_ARGS)
+
+    start_buf = bytearray(START_STRUCT.size)
+    update_buf = bytearray(UPDATE_STRUCT.size)
+    start_frame = create_start_frame(*START_ARGS)
+    update_frame = create_update_frame(*UPDATE_ARGS)
+    batch = FrameBuffer(UPDATE_STRUCT, 1000)
+
+    def fill_batch():
+        batch.clear()
+        for _ in range(1000):
+            batch.append_update(*UPDATE_ARGS)
+
+    cases = [
+        ("START  legacy", lambda: legacy_start_frame(*START_ARGS), 1),
+        ("START  pack", lambda: create_start_frame(*START_ARGS), 1),
+        ("START  pack_into", lambda: pack_start_into(start_buf, 0, *START_ARGS), 1),
+        ("START  decode", lambda: decode_start_frame(start_frame), 1),
+        ("UPDATE legacy", lambda: legacy_update_frame(*UPDATE_ARGS), 1),
+        ("UPDATE pack", lambda: create_update_frame(*UPDATE_ARGS), 1),
+        ("UPDATE pack_into", lambda: pack_update_into(update_buf, 0, *UPDATE_ARGS), 1),
+        ("UPDATE FrameBuffer", fill_batch, 1000),
+        ("UPDATE decode", lambda: decode_update_frame(update_frame), 1),
+        ("ANY    decode_frame", lambda: decode_frame(update_frame), 1),
+    ]
+
+    print(f"{'operacja':<22} {'ramek/s':>14} {'ns/ramkę':>10}")
+    for name, func, frames in cases:
+        number = max(1, args.number // frames)
+        best = min(timeit.repeat(func, number=number, repeat=args.repeat))
+        per_frame = best / (number * frames)
+        print(f"{name:<22} {1 / per_frame:>14,.0f} {per_frame * 1e9:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
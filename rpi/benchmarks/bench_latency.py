@@ -0,0 +1,467 @@
+#!/usr/bin/env python3
+"""
+Opóźnienia end-to-end mostu (bridge.py) na lokalnym brokerze:
+  odczyt decoded/# -> UPDATE_FRAME na robot/frame/
+  otwarcie drzwi   -> UPDATE_FRAME z drzwiami (szybka ścieżka coalescera)
+  przycisk (FAKE_GPIO) -> START_FRAME na robot/frame/start -> robot/state != IDLE
+
+Benchmark uruchamia testowany most jako osobny proces (``--bridge-cmd``,
+domyślnie bridge.py z tego katalogu), kierując go zmiennymi środowiskowymi
+na lokalny broker bez TLS (SMOKEHOUSE_IOT_*, SMOKEHOUSE_LOCAL_MQTT*), a
+przycisk naciska przez stdin programowego GPIO (FAKE_GPIO=1). Rolę ESP32
+pełni emulator (esp_emulator.EspStateMachine) w procesie benchmarku.
+
+Każda wiadomość z chmury ma znacznik ``sent_at`` i niepowtarzalną parę
+temperatura/wilgotność, więc odebraną UPDATE_FRAME (binarną, bez miejsca na
+znacznik) da się przypisać do wiadomości, z której pochodzi. Raportowane:
+  update       - od wysłania wiadomości, której wartości są w ramce
+  first_change - od najstarszej wiadomości, która weszła do ramki (z oknem coalescera)
+  door         - od wiadomości z otwarciem drzwi
+  button       - od naciśnięcia do START_FRAME i do wyjścia ESP32 z IDLE
+Scenariusze: rosnące częstotliwości (``--rates``), harmonogram otwarty
+(cloud_loadgen). Wynik jako JSON (``--json``) do porównania wersji mostu
+(``--compare poprzedni.json``).
+
+Uruchomienie (wymaga brokera, np. mosquitto na 127.0.0.1:1883):
+    python3 benchmarks/bench_latency.py --rates 10,100,1000 --json nowy.json
+    python3 benchmarks/bench_latency.py --bridge-cmd "python3 /opt/stary/rpi/bridge.py" --json stary.json
+    python3 benchmarks/bench_latency.py --json nowy.json --compare stary.json
+"""
+
+import argparse
+import json
+import os
+import shlex
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cloud_loadgen import LoadGenerator, create_schedule  # noqa: E402
+from esp_emulator import LEGACY_TOPIC_START, LEGACY_TOPIC_STATE, LEGACY_TOPIC_UPDATE, EspStateMachine  # noqa: E402
+from frame_codec import FrameType, decode_update_frame  # noqa: E402
+from sim_clock import RealClock  # noqa: E402
+
+BRIDGE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bridge.py")
+SENSOR = "bench-latency"
+CLIENT_ID = "bench-latency-probe"
+
+# Klucze wiadomości: temperatura 40.0-119.9°C (zakres ESP32) x wilgotność 0-99%
+KEY_TEMPERATURES = 800
+KEY_HUMIDITIES = 100
+# Odczyt przed przyciskiem - START_FRAME musi przejść walidację ESP32 (>= 40°C)
+BUTTON_READING = (60.0, 50)
+
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+READY_TIMEOUT = 30.0
+STATE_TIMEOUT = 5.0
+
+
+def summarize(latencies):
+    """Percentyle i histogram (ms) z listy opóźnień w sekundach"""
+    values = sorted(latency * 1000 for latency in latencies)
+    if not values:
+        return {"n": 0}
+
+    def pick(q):
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    histogram = {}
+    start = 0
+    for bound in BUCKETS_MS:
+        end = start
+        while end < len(values) and values[end] <= bound:
+            end += 1
+        histogram[f"<={bound}"] = end - start
+        start = end
+    histogram[f">{BUCKETS_MS[-1]}"] = len(values) - start
+    return {"n": len(values), "mean": sum(values) / len(values), "p50": pick(0.50), "p95": pick(0.95),
+            "p99": pick(0.99), "max": values[-1], "histogram_ms": histogram}
+
+
+# ============================================================================
+# Wiadomości ze znacznikami
+# ============================================================================
+
+class TimestampedReadings:
+    """
+    Fabryka wiadomości dla cloud_loadgen.LoadGenerator: każdy odczyt ma
+    ``sent_at`` i niepowtarzalny klucz (temperatura*10, wilgotność) - taki,
+    jaki most wpisze do UPDATE_FRAME. Co ``door_interval`` s zamiast
+    odczytu idzie zmiana stanu drzwi (otwarcie/zamknięcie na zmianę).
+    """
+
+    def __init__(self, sensor=SENSOR, door_interval=None):
+        self.topic = f"decoded/{sensor}"
+        self.door_interval = door_interval
+        self.counter = 0
+        self.begin()
+
+    def begin(self):
+        """Nowy scenariusz; licznik kluczy biegnie dalej, żeby ramki się nie powtarzały"""
+        self.keys = {}
+        self.times = []
+        self.door_opens = []
+        self.door_open = False
+        self._door_at = time.time()
+
+    def reading(self, temperature, humidity):
+        now = time.time()
+        key = (int(temperature * 10), int(humidity))
+        self.keys[key] = len(self.times)
+        self.times.append(now)
+        return self.topic, self._encode({"marker": 1, "temperature": temperature, "humidity": humidity,
+                                         "sent_at": now})
+
+    def create(self, index):
+        now = time.time()
+        if self.door_interval and now - self._door_at >= self.door_interval:
+            self._door_at = now
+            self.door_open = not self.door_open
+            if self.door_open:
+                self.door_opens.append(now)
+            return self.topic, self._encode({"door_open_status": self.door_open, "sent_at": now})
+
+        i = self.counter
+        self.counter += 1
+        temperature10 = 400 + i % KEY_TEMPERATURES
+        humidity = (i // KEY_TEMPERATURES) % KEY_HUMIDITIES
+        # Przesunięcia chronią przed int(x * 10) zaokrąglającym w dół (np. 2.3 * 10 = 22.999...)
+        return self.reading(temperature10 / 10 + 0.01, humidity + 0.2)
+
+    @staticmethod
+    def _encode(data):
+        return json.dumps({"data": data}, separators=(",", ":")).encode("utf-8")
+
+
+# ============================================================================
+# Sonda: chmura + ESP32 po stronie benchmarku
+# ============================================================================
+
+class Probe:
+    """
+    Jedno połączenie z brokerem: publikuje wiadomości "z chmury", odbiera
+    ramki mostu, przekazuje je emulatorowi ESP32 i mierzy opóźnienia.
+    """
+
+    def __init__(self, host, port):
+        from paho.mqtt import client as mqtt
+
+        self.host = host
+        self.port = port
+        self.readings = None
+        self._success = mqtt.MQTT_ERR_SUCCESS
+        self._subscribed = threading.Event()
+        self.client = mqtt.Client(client_id=CLIENT_ID)
+        self.client.on_connect = self._on_connect
+        self.client.on_subscribe = lambda client, userdata, mid, qos: self._subscribed.set()
+        self.client.on_message = self._on_message
+        self.client.max_inflight_messages_set(0)
+        self.client.max_queued_messages_set(0)
+        self.esp = EspStateMachine("esp32", RealClock(),
+                                   lambda name: self.client.publish(LEGACY_TOPIC_STATE, name, qos=0))
+        self.frame_received = threading.Event()
+        self.left_idle = threading.Event()
+        self.reset(None)
+
+    def reset(self, readings):
+        self.readings = readings
+        self.update_latencies = []
+        self.first_latencies = []
+        self.door_latencies = []
+        self.frames = 0
+        self.unmatched = 0
+        self._last_index = -1
+        self._last_door = 0
+        self.start_frame_at = None
+        self.left_idle_at = None
+
+    def connect(self):
+        self.client.connect(self.host, self.port, keepalive=60)
+        self.client.loop_start()
+        if not self._subscribed.wait(10):
+            raise RuntimeError(f"Brak subskrypcji na brokerze {self.host}:{self.port}")
+        self.esp.start()
+
+    def disconnect(self):
+        self.client.disconnect()
+        self.client.loop_stop()
+
+    def publish(self, topic, payload):
+        return self.client.publish(topic, payload, qos=0).rc == self._success
+
+    def _on_connect(self, client, userdata, flags, rc):
+        client.subscribe([(LEGACY_TOPIC_UPDATE + "#", 0), (LEGACY_TOPIC_STATE, 0)])
+
+    def _on_message(self, client, userdata, msg):
+        received = time.time()
+        if msg.topic == LEGACY_TOPIC_STATE:
+            state = msg.payload.decode("utf-8", "replace")
+            if state != "IDLE" and self.left_idle_at is None:
+                self.left_idle_at = received
+                self.left_idle.set()
+            return
+        if msg.topic == LEGACY_TOPIC_START:
+            if self.start_frame_at is None:
+                self.start_frame_at = received
+        elif msg.payload[:1] == bytes((FrameType.UPDATE_FRAME,)):
+            self._on_update_frame(msg.payload, received)
+        self.esp.handle_frame(msg.payload)
+
+    def _on_update_frame(self, payload, received):
+        frame = decode_update_frame(payload)
+        self.frames += 1
+        readings = self.readings
+        if readings is not None:
+            if frame.door_status and not self._last_door and readings.door_opens:
+                self.door_latencies.append(received - readings.door_opens[-1])
+            index = readings.keys.get((frame.current_temperature, frame.current_humidity))
+            if index is None:
+                self.unmatched += 1
+            elif index > self._last_index:
+                self.update_latencies.append(received - readings.times[index])
+                self.first_latencies.append(received - readings.times[self._last_index + 1])
+                self._last_index = index
+        self._last_door = frame.door_status
+        self.frame_received.set()
+
+    def wait_frame(self, topic, payload, timeout):
+        self.frame_received.clear()
+        self.publish(topic, payload)
+        return self.frame_received.wait(timeout)
+
+
+# ============================================================================
+# Testowany most
+# ============================================================================
+
+class BridgeProcess:
+    """bridge.py (dowolna wersja) jako proces potomny na lokalnym brokerze"""
+
+    def __init__(self, command, host, port):
+        self.command = command
+        self.host = host
+        self.port = port
+        self.process = None
+        self.workdir = tempfile.mkdtemp(prefix="bench-latency-")
+        self.log_path = os.path.join(self.workdir, "bridge.log")
+
+    def start(self):
+        env = dict(os.environ,
+                   SMOKEHOUSE_IOT_ENDPOINT=self.host, SMOKEHOUSE_IOT_PORT=str(self.port), SMOKEHOUSE_IOT_TLS="0",
+                   SMOKEHOUSE_LOCAL_MQTT=self.host, SMOKEHOUSE_LOCAL_MQTT_PORT=str(self.port),
+                   SMOKEHOUSE_SPOOL=os.path.join(self.workdir, "bridge.spool"),
+                   FAKE_GPIO="1", PYTHONUNBUFFERED="1")
+        with open(self.log_path, "w", encoding="utf-8") as log_file:
+            self.process = subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=log_file,
+                                            stderr=subprocess.STDOUT, env=env, text=True)
+
+    def running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def press(self):
+        """Enter na stdin = naciśnięcie przycisku (FakeGPIOBackend.attach_stdin)"""
+        self.process.stdin.write("\n")
+        self.process.stdin.flush()
+
+    def stop(self):
+        if not self.running():
+            return
+        self.process.send_signal(signal.SIGINT)
+        try:
+            self.process.wait(10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+    def version(self):
+        directory = os.path.dirname(os.path.abspath(self.command[-1]))
+        try:
+            return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=directory, capture_output=True,
+                                  text=True, timeout=5).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+
+
+def wait_ready(probe, readings, bridge, timeout=READY_TIMEOUT):
+    """Wysyła odczyty, aż most odpowie UPDATE_FRAME (most czeka ~2 s na lokalny broker)"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if bridge is not None and not bridge.running():
+            raise RuntimeError(f"Most zakończył działanie - log: {bridge.log_path}")
+        if probe.wait_frame(*readings.create(0), timeout=1.0):
+            return
+    raise RuntimeError(f"Most nie wysłał UPDATE_FRAME w {timeout:.0f} s")
+
+
+# ============================================================================
+# Scenariusze
+# ============================================================================
+
+def run_rate(probe, readings, rate, duration, settle):
+    readings.begin()
+    probe.reset(readings)
+    generator = LoadGenerator(probe.publish, readings)
+    report = generator.run(create_schedule("constant", rate, duration), duration)
+    # Ostatnie okno coalescera i ramki w drodze
+    time.sleep(settle)
+    return {
+        "rate": rate,
+        "sent": report["sent"],
+        "achieved_rate": report["achieved_rate"],
+        "schedule_lag_p99_ms": report["lag_p99"] * 1000,
+        "frames": probe.frames,
+        "unmatched_frames": probe.unmatched,
+        "update": summarize(probe.update_latencies),
+        "first_change": summarize(probe.first_latencies),
+        "door": summarize(probe.door_latencies),
+    }
+
+
+def run_button(probe, readings, bridge, presses, pause):
+    readings.begin()
+    probe.reset(readings)
+    if not probe.wait_frame(*readings.reading(*BUTTON_READING), timeout=STATE_TIMEOUT):
+        raise RuntimeError("Most nie przekazał odczytu przed testem przycisku")
+    to_start, to_state, missed = [], [], 0
+    for _ in range(presses):
+        probe.esp.start()
+        time.sleep(pause)
+        probe.start_frame_at = probe.left_idle_at = None
+        probe.left_idle.clear()
+        pressed = time.time()
+        bridge.press()
+        if probe.left_idle.wait(STATE_TIMEOUT):
+            to_state.append(probe.left_idle_at - pressed)
+            if probe.start_frame_at is not None:
+                to_start.append(probe.start_frame_at - pressed)
+        else:
+            missed += 1
+        # Fake GPIO puszcza przycisk po 0.1 s, potem debounce
+        time.sleep(pause)
+    probe.esp.start()
+    return {"presses": presses, "missed": missed, "start_frame": summarize(to_start),
+            "state_change": summarize(to_state)}
+
+
+# ============================================================================
+# Raport
+# ============================================================================
+
+def format_summary(summary):
+    if not summary.get("n"):
+        return f"{'-':>8} {'-':>8} {'-':>8} {'-':>8}"
+    return f"{summary['p50']:>8.1f} {summary['p95']:>8.1f} {summary['p99']:>8.1f} {summary['max']:>8.1f}"
+
+
+def print_results(results):
+    print(f"Most: {' '.join(results['bridge'])} ({results['version'] or 'brak wersji'})")
+    print(f"{'zadane/s':>9} {'osiągn./s':>10} {'ramki':>6} {'pomiar':>13} {'n':>6} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for scenario in results["scenarios"]:
+        for i, metric in enumerate(("update", "first_change", "door")):
+            prefix = (f"{scenario['rate']:>9,.0f} {scenario['achieved_rate']:>10,.0f} {scenario['frames']:>6}"
+                      if i == 0 else " " * 27)
+            summary = scenario[metric]
+            print(f"{prefix} {metric:>13} {summary.get('n', 0):>6} {format_summary(summary)}")
+    button = results.get("button")
+    if button:
+        print(f"Przycisk ({button['presses']} naciśnięć, bez odpowiedzi: {button['missed']}):")
+        for metric in ("start_frame", "state_change"):
+            summary = button[metric]
+            print(f"{'':>27} {metric:>13} {summary.get('n', 0):>6} {format_summary(summary)}")
+
+
+def compare(results, baseline):
+    """p50/p99 względem poprzedniego wyniku (ten sam zestaw częstotliwości)"""
+    print(f"Porównanie z {baseline.get('version') or ' '.join(baseline.get('bridge', []))}:")
+    print(f"{'zadane/s':>9} {'pomiar':>13} {'p50 było':>9} {'p50 jest':>9} {'zmiana':>8} "
+          f"{'p99 było':>9} {'p99 jest':>9} {'zmiana':>8}")
+    old_by_rate = {scenario["rate"]: scenario for scenario in baseline.get("scenarios", [])}
+    rows = [(scenario["rate"], metric, scenario[metric], old_by_rate[scenario["rate"]][metric])
+            for scenario in results["scenarios"] if scenario["rate"] in old_by_rate
+            for metric in ("update", "first_change", "door")]
+    if results.get("button") and baseline.get("button"):
+        rows += [("przycisk", metric, results["button"][metric], baseline["button"][metric])
+                 for metric in ("start_frame", "state_change")]
+    for rate, metric, new, old in rows:
+        if not new.get("n") or not old.get("n"):
+            continue
+        cells = []
+        for q in ("p50", "p99"):
+            change = (new[q] - old[q]) / old[q] * 100 if old[q] else 0.0
+            cells.append(f"{old[q]:>9.1f} {new[q]:>9.1f} {change:>+7.0f}%")
+        label = f"{rate:>9,.0f}" if isinstance(rate, (int, float)) else f"{rate:>9}"
+        print(f"{label} {metric:>13} {cells[0]} {cells[1]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--broker", default="127.0.0.1", help="Lokalny broker MQTT (wspólny dla chmury i ESP32)")
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--bridge-cmd", default=f"{shlex.quote(sys.executable)} {shlex.quote(BRIDGE)}",
+                        help="Polecenie uruchamiające testowany most")
+    parser.add_argument("--attach", action="store_true",
+                        help="Most już działa na tym brokerze - bez uruchamiania i bez testu przycisku")
+    parser.add_argument("--rates", default="10,50,200,1000", help="Częstotliwości wiadomości/s, po przecinku")
+    parser.add_argument("--duration", type=float, default=10.0, help="Czas scenariusza w sekundach")
+    parser.add_argument("--settle", type=float, default=1.5, help="Oczekiwanie na ostatnie ramki po scenariuszu")
+    parser.add_argument("--door-interval", type=float, default=2.0,
+                        help="Co ile sekund zmiana stanu drzwi (0 = bez drzwi)")
+    parser.add_argument("--presses", type=int, default=20, help="Naciśnięcia przycisku (0 = bez testu)")
+    parser.add_argument("--json", metavar="PLIK", help="Zapisz wyniki jako JSON")
+    parser.add_argument("--compare", metavar="PLIK", help="Porównaj z wcześniejszym wynikiem JSON")
+    args = parser.parse_args()
+
+    try:
+        rates = [float(rate) for rate in args.rates.split(",") if rate.strip()]
+    except ValueError:
+        parser.error(f"Niepoprawne --rates: {args.rates}")
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    command = shlex.split(args.bridge_cmd)
+    bridge = None if args.attach else BridgeProcess(command, args.broker, args.port)
+    probe = Probe(args.broker, args.port)
+    readings = TimestampedReadings(door_interval=args.door_interval or None)
+    results = {"bridge": command, "version": bridge.version() if bridge else "", "broker": f"{args.broker}:{args.port}",
+               "duration": args.duration, "created": time.time(), "scenarios": [], "button": None}
+
+    probe.connect()
+    if bridge is not None:
+        bridge.start()
+    try:
+        wait_ready(probe, readings, bridge)
+        for rate in rates:
+            print(f"Scenariusz {rate:,.0f} wiadomości/s...", file=sys.stderr)
+            results["scenarios"].append(run_rate(probe, readings, rate, args.duration, args.settle))
+        if bridge is not None and args.presses:
+            print("Scenariusz przycisku...", file=sys.stderr)
+            results["button"] = run_button(probe, readings, bridge, args.presses, pause=0.3)
+    except RuntimeError as e:
+        print(f"BŁĄD: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if bridge is not None:
+            bridge.stop()
+        probe.disconnect()
+
+    print_results(results)
+    if baseline is not None:
+        compare(results, baseline)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if bridge is not None:
+        print(f"Log mostu: {bridge.log_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Koszt instrumentacji w gorącej ścieżce: metryki wyłączone (obiekt no-op)
+kontra włączone (licznik z etykietą topicu, histogram czasu parsowania)
+oraz koszt jednego scrapu /metrics przy ``--topics`` różnych topicach.
+
+Uruchomienie: python3 benchmarks/bench_metrics.py [--n 1000000] [--topics 100]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from smokehouse_metrics import NOOP, Counter, Histogram, Registry  # noqa: E402
+
+
+def per_call_ns(fn, n):
+    start = time.perf_counter()
+    fn(n)
+    return (time.perf_counter() - start) / n * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=1_000_000, help="Liczba wywołań")
+    parser.add_argument("--topics", type=int, default=100, help="Liczba różnych topiców (etykiet)")
+    args = parser.parse_args()
+
+    registry = Registry()
+    messages = registry.register(Counter("bench_messages_total", "Wiadomości", ["topic"]))
+    parse = registry.register(Histogram("bench_parse_seconds", "Parsowanie"))
+    topics = [f"decoded/sensor-{i}" for i in range(args.topics)]
+
+    def message_path(counter, histogram):
+        def run(n):
+            for i in range(n):
+                counter.labels(topics[i % len(topics)]).inc()
+                histogram.observe(0.0003)
+        return run
+
+    def baseline(n):
+        for i in range(n):
+            topics[i % len(topics)]
+
+    base = per_call_ns(baseline, args.n)
+    disabled = per_call_ns(message_path(NOOP, NOOP), args.n) - base
+    enabled = per_call_ns(message_path(messages, parse), args.n) - base
+
+    start = time.perf_counter()
+    body = registry.expose()
+    scrape = (time.perf_counter() - start) * 1000
+
+    print(f"{'wariant':<28} {'ns/wiadomość':>14}")
+    print(f"{'wyłączone (no-op)':<28} {disabled:>14.0f}")
+    print(f"{'włączone':<28} {enabled:>14.0f}")
+    print(f"\nScrape /metrics: {scrape:.2f} ms, {len(body)} B, {body.count(chr(10))} linii")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test obciążenia routingu wielu wędzarni (device_router.DeviceRouter) bez
+brokera: K wątków (jak wątki sieciowe paho) wrzuca wiadomości czujników
+setek wędzarni, publikacja tylko zlicza ramki. Raportuje przepustowość,
+czas obsługi wiadomości i liczbę ramek na topic.
+
+Uruchomienie: python3 benchmarks/bench_multi_bridge.py [--devices 300] [--rate 2]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from device_router import DeviceRouter, parse_registry  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=300)
+    parser.add_argument("--rate", type=float, default=2.0,
+                        help="Wiadomości na sekundę na czujnik (2 czujniki na wędzarnię)")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--threads", type=int, default=2, help="Wątki wrzucające wiadomości")
+    args = parser.parse_args()
+
+    registry = {"devices": [
+        {"id": f"w{i}", "sensors": [f"w{i}-klimat", f"w{i}-drzwi"]} for i in range(args.devices)
+    ]}
+    frames = Counter()
+    frames_lock = threading.Lock()
+
+    def publish(topic, payload):
+        with frames_lock:
+            frames[topic] += 1
+
+    router = DeviceRouter(parse_registry(registry), publish)
+    router.start()
+
+    sensors = [s for d in registry["devices"] for s in d["sensors"]]
+    target = len(sensors) * args.rate
+    per_thread = target / args.threads
+    latencies = []
+    sent = [0] * args.threads
+
+    def producer(index):
+        rng = random.Random(index)
+        local = []
+        interval = 1.0 / per_thread
+        next_at = time.perf_counter()
+        end = next_at + args.duration
+        while next_at < end:
+            now = time.perf_counter()
+            if now < next_at:
+                time.sleep(next_at - now)
+            sensor = rng.choice(sensors)
+            if sensor.endswith("drzwi"):
+                body = {"data": {"door_open_status": int(rng.random() < 0.05)}}
+            else:
+                body = {"data": {"temperature": 60 + rng.random(), "humidity": 70 + rng.randint(0, 2)}}
+            payload = json.dumps(body).encode()
+            started = time.perf_counter()
+            router.handle_cloud(f"decoded/{sensor}", payload)
+            local.append(time.perf_counter() - started)
+            sent[index] += 1
+            next_at += interval
+        latencies.extend(local)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=producer, args=(i,)) for i in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    router.stop()
+
+    latencies.sort()
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1e6
+    stats = router.stats()
+    total = sum(sent)
+    print(f"Wędzarnie: {args.devices}, czujniki: {len(sensors)}, cel: {target:.0f} wiad./s")
+    print(f"Obsłużone: {total} w {elapsed:.1f}s = {total / elapsed:.0f} wiad./s")
+    print(f"Czas handle_cloud: p50={pick(0.5):.0f}µs p99={pick(0.99):.0f}µs max={latencies[-1] * 1e6:.0f}µs")
+    print(f"UPDATE_FRAME: {stats['published']} (pominięte {stats['suppressed']}, "
+          f"drzwi natychmiast {stats['fast_path']}), topiców z ramkami: {len(frames)}")
+
+
+if __name__ == "__main__":
+    main()
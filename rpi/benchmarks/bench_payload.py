@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Dekodowanie wiadomości decoded/#: dawny kod (json.loads + łańcuch ``in``
+jak w mqtt_worker) kontra cloud_payload.decode z modułem json i z orjson.
+
+Korpus: plik JSONL z nagranymi wiadomościami (``--corpus``; w każdej linii
+obiekt ``{"topic": ..., "payload": ...}`` albo sama wiadomość), a bez niego
+korpus syntetyczny: czujniki środowiska i drzwi w proporcji ~10:1, część
+wartości drzwi jako napisy "true"/"false".
+
+Uruchomienie: python3 benchmarks/bench_payload.py [--corpus nagranie.jsonl] [--n 200000]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cloud_payload  # noqa: E402
+
+
+def synthetic_corpus(n, seed=1):
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(n):
+        device = f"sensor-{rng.randrange(20)}"
+        if rng.random() < 0.9:
+            data = {
+                "marker": 1,
+                "temperature": round(rng.uniform(18, 80), 2),
+                "humidity": round(rng.uniform(30, 90), 2),
+                "pressure": round(rng.uniform(990, 1030), 2),
+                "gas_resistance_ohm": rng.randrange(50000, 200000),
+            }
+        else:
+            opened = rng.random() < 0.5
+            data = {
+                "door_open_status": rng.choice((opened, "true" if opened else "false")),
+                "alarm": int(opened and rng.random() < 0.2),
+            }
+        message = {"device_id": device, "received_at": 1700000000 + i, "data": data}
+        corpus.append(json.dumps(message).encode("utf-8"))
+    return corpus
+
+
+def load_corpus(path):
+    corpus = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if isinstance(record, dict) and "payload" in record and "data" not in record:
+                payload = record["payload"]
+                record = payload if isinstance(payload, str) else json.dumps(payload)
+                corpus.append(record.encode("utf-8"))
+            else:
+                corpus.append(line.encode("utf-8"))
+    return corpus
+
+
+def legacy(payload):
+    """Ścieżka sprzed cloud_payload (mqtt_worker.on_message)"""
+    data = json.loads(payload.decode()).get("data")
+    if "temperature" in data:
+        return ("environment", data.get("marker", 1), data.get("temperature", 0.0), data.get("humidity", 0.0),
+                data.get("pressure", 0.0), data.get("gas_resistance_ohm", 0.0))
+    elif "open_status" in data or "alarm" in data:
+        is_open = data.get("door_open_status")
+        if isinstance(is_open, str):
+            is_open = is_open.lower() == "true"
+        return ("door", bool(is_open), int(data.get("alarm", 0)))
+    return None
+
+
+def run(label, fn, corpus):
+    start = time.perf_counter()
+    kinds = {}
+    errors = 0
+    for payload in corpus:
+        try:
+            result = fn(payload)
+        except ValueError:
+            errors += 1
+            continue
+        kind = None if result is None else result[0]
+        kinds[kind] = kinds.get(kind, 0) + 1
+    elapsed = time.perf_counter() - start
+    summary = ", ".join(f"{k}={v}" for k, v in sorted(kinds.items(), key=lambda kv: str(kv[0])))
+    print(f"{label:<26} {elapsed / len(corpus) * 1e6:>8.2f} {len(corpus) / elapsed:>12,.0f}   {summary}, błędy={errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="Plik JSONL z nagranymi wiadomościami")
+    parser.add_argument("--n", type=int, default=200_000, help="Rozmiar korpusu syntetycznego")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus(args.n)
+    print(f"Korpus: {len(corpus)} wiadomości ({'plik ' + args.corpus if args.corpus else 'syntetyczny'})\n")
+    print(f"{'wariant':<26} {'µs/wiad.':>8} {'wiad./s':>12}   rodzaje")
+
+    run("dawny (json + in)", legacy, corpus)
+    orjson_available = cloud_payload.ORJSON_AVAILABLE
+    cloud_payload.ORJSON_AVAILABLE = False
+    run("cloud_payload + json", cloud_payload.decode, corpus)
+    cloud_payload.ORJSON_AVAILABLE = orjson_available
+    if orjson_available:
+        run("cloud_payload + orjson", cloud_payload.decode, corpus)
+    else:
+        print("(orjson niezainstalowany - pip install orjson)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark spoola store-and-forward (spool.py): zapis ramek (bez i z msync),
+odtwarzanie bez limitu szybkości, czas odzyskiwania pełnego pliku oraz
+test awarii - proces zabity SIGKILL w trakcie zapisu, potem ponowne
+otwarcie i sprawdzenie, że odzyskane rekordy są kompletne i w kolejności.
+
+Uruchomienie: python3 benchmarks/bench_spool.py [--records 100000]
+"""
+
+import argparse
+import os
+import signal
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from frame_codec import create_update_frame, decode_update_frame  # noqa: E402
+from spool import Spool, SpooledPublisher  # noqa: E402
+
+TOPIC = "robot/frame/"
+
+
+def frame(i):
+    # Temperatura niesie numer sekwencyjny - pozwala sprawdzić kolejność
+    return create_update_frame(i % 100, i % 30000, 0)
+
+
+def bench_append(path, records, sync):
+    spool = Spool(path, capacity=max(1 << 20, records * 40), sync=sync)
+    started = time.perf_counter()
+    for i in range(records):
+        spool.append(TOPIC, frame(i))
+    elapsed = time.perf_counter() - started
+    spool.close()
+    return records / elapsed
+
+
+def bench_replay(path):
+    spool = Spool(path)
+    pending = len(spool)
+    received = []
+    # Bez łączenia po topicu - mierzymy odtworzenie wszystkich rekordów
+    publisher = SpooledPublisher(spool, lambda topic, payload: received.append(payload) or True, rate=0,
+                                 coalesce=False)
+    started = time.perf_counter()
+    publisher.set_connected(True)
+    publisher.wait_replayed()
+    elapsed = time.perf_counter() - started
+    in_order = all(decode_update_frame(p).current_temperature == i % 30000 for i, p in enumerate(received))
+    spool.close()
+    return pending / elapsed, len(received) == pending and in_order
+
+
+def bench_recovery(path):
+    started = time.perf_counter()
+    spool = Spool(path)
+    elapsed = time.perf_counter() - started
+    count = len(spool)
+    spool.close()
+    return count, elapsed
+
+
+def crash_test(path, records):
+    pid = os.fork()
+    if pid == 0:
+        spool = Spool(path, capacity=records * 40)
+        i = 0
+        while True:
+            spool.append(TOPIC, frame(i))
+            i += 1
+    time.sleep(0.5)
+    os.kill(pid, signal.SIGKILL)
+    os.waitpid(pid, 0)
+
+    spool = Spool(path)
+    count = len(spool)
+    ok = True
+    expected = None
+    while True:
+        record = spool.peek()
+        if record is None:
+            break
+        value = decode_update_frame(record[1]).current_temperature
+        ok = ok and (expected is None or value == expected)
+        expected = (value + 1) % 30000
+        spool.pop()
+    spool.close()
+    return count, ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--sync-records", type=int, default=2000, help="Rekordy dla wariantu z msync")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.spool")
+        rate = bench_append(path, args.records, sync=False)
+        print(f"Zapis (bez msync):     {rate:>12,.0f} ramek/s")
+        count, elapsed = bench_recovery(path)
+        print(f"Odzyskiwanie:          {count} rekordów w {elapsed * 1000:.1f} ms")
+        rate, ok = bench_replay(path)
+        print(f"Odtwarzanie:           {rate:>12,.0f} ramek/s, kolejność {'OK' if ok else 'BŁĄD'}")
+
+        sync_path = os.path.join(tmp, "sync.spool")
+        rate = bench_append(sync_path, args.sync_records, sync=True)
+        print(f"Zapis (msync):         {rate:>12,.0f} ramek/s")
+
+        crash_path = os.path.join(tmp, "crash.spool")
+        count, ok = crash_test(crash_path, args.records)
+        print(f"SIGKILL w trakcie:     odzyskano {count} rekordów, ciągłość {'OK' if ok else 'BŁĄD'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Rywalizacja o stan wędzarni: dawny SmokehouseState (zwykły obiekt, każdy
+odczyt i zapis pod jedną threading.Lock) kontra migawki smokehouse_state
+(zapis pod blokadą zapisu, odczyt bez blokady). Wątki "ingest" zapisują
+odczyty z chmury, wątki "publish" budują z aktualnego stanu START_FRAME.
+
+Uruchomienie: python3 benchmarks/bench_state_contention.py [--writers 2] [--readers 4]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from frame_codec import create_start_frame, decode_start_frame  # noqa: E402
+from smokehouse_state import SmokehouseState, start_frame  # noqa: E402
+
+
+class LegacyState:
+    """Dawny SmokehouseState z bridge.py"""
+
+    def __init__(self):
+        self.temperature = 230
+        self.humidity = 45
+        self.door_status = 0
+        self.last_update = time.time()
+        self.esp_state = "UNKNOWN"
+        self.target_temperature = 650
+        self.target_humidity = 75
+        self.smoking_duration = 20
+        self.meat_name = "Boczek"
+        self.lock = threading.Lock()
+
+
+def legacy_write(state, i):
+    with state.lock:
+        state.temperature = 400 + i % 800
+        state.humidity = i % 100
+        state.last_update = time.time()
+
+
+def legacy_read(state):
+    with state.lock:
+        return create_start_frame(1, state.meat_name, state.target_humidity, state.target_temperature,
+                                  state.humidity, state.temperature, state.door_status, state.smoking_duration)
+
+
+def snapshot_write(state, i):
+    state.update(temperature=400 + i % 800, humidity=i % 100, last_update=time.time())
+
+
+def snapshot_read(state):
+    return start_frame(state.snapshot)
+
+
+def run(state, write, read, writers, readers, duration):
+    stop = threading.Event()
+    counts = {"writes": 0, "reads": 0, "torn": 0}
+    read_latencies = []
+    lock = threading.Lock()
+
+    def writer():
+        i = 0
+        while not stop.is_set():
+            write(state, i)
+            i += 1
+        with lock:
+            counts["writes"] += i
+
+    def reader():
+        local = []
+        torn = 0
+        while not stop.is_set():
+            started = time.perf_counter()
+            frame = read(state)
+            local.append(time.perf_counter() - started)
+            decoded = decode_start_frame(frame)
+            # Pisarze ustawiają temperaturę i wilgotność z tego samego i
+            if (decoded.current_temperature - 400) % 100 != decoded.current_humidity:
+                torn += 1
+        with lock:
+            counts["reads"] += len(local)
+            counts["torn"] += torn
+            read_latencies.extend(local)
+
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    read_latencies.sort()
+    pick = lambda q: read_latencies[min(len(read_latencies) - 1, int(q * len(read_latencies)))] * 1e6
+    return counts, pick(0.5), pick(0.99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+
+    legacy = LegacyState()
+    snap = SmokehouseState()
+    print(f"Rozmiar obiektu stanu: dawny {sys.getsizeof(legacy) + sys.getsizeof(legacy.__dict__)} B, "
+          f"migawki {sys.getsizeof(snap) + sys.getsizeof(snap.snapshot)} B")
+    print(f"{'wariant':>9} {'zapisy/s':>10} {'odczyty/s':>10} {'p50 [µs]':>9} {'p99 [µs]':>9} {'niespójne':>9}")
+    for name, state, write, read in (("lock", legacy, legacy_write, legacy_read),
+                                     ("snapshot", snap, snapshot_write, snapshot_read)):
+        counts, p50, p99 = run(state, write, read, args.writers, args.readers, args.duration)
+        print(f"{name:>9} {counts['writes'] / args.duration:>10.0f} {counts['reads'] / args.duration:>10.0f} "
+              f"{p50:>9.1f} {p99:>9.1f} {counts['torn']:>9}")
+
+
+if __name__ == "__main__":
+    main()
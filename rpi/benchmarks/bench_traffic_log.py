@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark zapisu ruchu (traffic_log.py) kontra archiwum CSV: zapis
+wiadomości decoded/# paczkami (jak odbiorniki record/csv), rozmiar pliku,
+odczyt całości przez mmap, skok do chwili z końca zapisu po indeksie
+oraz odtwarzanie z prędkością max (cloud_replay.replay bez brokera).
+
+Uruchomienie: python3 benchmarks/bench_traffic_log.py [--records 200000]
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cloud_replay import replay  # noqa: E402
+from traffic_log import TrafficLog, TrafficWriter  # noqa: E402
+
+BATCH = 500
+START = 1_700_000_000.0
+
+
+def messages(records):
+    for i in range(records):
+        data = {"marker": 1, "temperature": 20 + i % 600 / 10, "humidity": 40 + i % 50,
+                "pressure": 1013.25, "gas_resistance_ohm": 120000 + i % 1000}
+        yield f"decoded/sensor-{i % 20}", json.dumps({"data": data}).encode("utf-8"), START + i * 0.05
+
+
+def bench_record(path, corpus):
+    writer = TrafficWriter(path)
+    started = time.perf_counter()
+    for i, (topic, payload, timestamp) in enumerate(corpus, 1):
+        writer.append(topic, payload, timestamp)
+        if i % BATCH == 0:
+            writer.flush()
+    writer.close()
+    return time.perf_counter() - started
+
+
+def bench_csv(path, corpus):
+    started = time.perf_counter()
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        for i, (topic, payload, timestamp) in enumerate(corpus, 1):
+            ts = datetime.fromtimestamp(timestamp).isoformat(sep=" ", timespec="milliseconds")
+            writer.writerow((ts, topic, payload.decode("utf-8", errors="replace")))
+            if i % BATCH == 0:
+                f.flush()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=200000)
+    args = parser.parse_args()
+
+    corpus = list(messages(args.records))
+    with tempfile.TemporaryDirectory() as directory:
+        trace_path = os.path.join(directory, "ruch.trace")
+        csv_path = os.path.join(directory, "ruch.csv")
+        record_time = bench_record(trace_path, corpus)
+        csv_time = bench_csv(csv_path, corpus)
+
+        with TrafficLog(trace_path) as traffic:
+            started = time.perf_counter()
+            count = sum(1 for _ in traffic.records())
+            scan_time = time.perf_counter() - started
+
+            last = corpus[-1][2]
+            started = time.perf_counter()
+            tail = sum(1 for _ in traffic.records(last - 10))
+            seek_time = time.perf_counter() - started
+
+            stats = replay(traffic.records(), lambda topic, payload, timestamp: None, speed=None)
+        index_size = os.path.getsize(trace_path + ".idx")
+
+        print(f"{args.records} wiadomości (odczytane: {count}), paczki po {BATCH}")
+        print(f"{'format':>8} {'zapis/s':>12} {'rozmiar':>10}")
+        print(f"{'trace':>8} {args.records / record_time:>12,.0f} {os.path.getsize(trace_path) / 1024:>7,.0f} KiB "
+              f"(+ indeks {index_size / 1024:,.1f} KiB)")
+        print(f"{'csv':>8} {args.records / csv_time:>12,.0f} {os.path.getsize(csv_path) / 1024:>7,.0f} KiB")
+        print(f"Odczyt mmap: {count / scan_time:,.0f} rekordów/s, ostatnie 10 s po indeksie: {tail} rekordów "
+              f"w {seek_time * 1000:.2f} ms")
+        print(f"Odtwarzanie --speed max (bez brokera): {stats['records'] / stats['elapsed']:,.0f}/s, "
+              f"{stats['recorded'] / stats['elapsed']:,.0f}x czasu zapisu")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,148 +5,93 @@ Odbiera dane z AWS IoT Cloud i przekazuje do ESP32 via local MQTT
 Obsługuje przycisk GPIO do startowania procesu wędzenia
 """
 
-import ssl
-import json
+import logging
 import time
 import os
-import struct
-import threading
-from enum import IntEnum
 from paho.mqtt import client as mqtt
 
-try:
-    import RPi.GPIO as GPIO
-    GPIO_AVAILABLE = True
-except ImportError:
-    print("⚠️  RPi.GPIO not available - button functionality disabled")
-    GPIO_AVAILABLE = False
+from cloud_ingest import IngestHub, Sink, run as run_ingest
+from frame_codec import decode_update_frame  # układ ramek zgodny z ESP32
+from gpio_input import GPIO_AVAILABLE, Button, FakeGPIOBackend, create_backend
+from smokehouse_log import setup_logging
+from smokehouse_metrics import counter, gauge, histogram, start_http_server
+from smokehouse_state import SmokehouseState, cloud_changes, start_frame, update_values
+from spool import Spool, SpooledPublisher
+from update_coalescer import UpdateCoalescer
+
+log = logging.getLogger("bridge")
+cloud_log = logging.getLogger("bridge.cloud")
+local_log = logging.getLogger("bridge.local")
+gpio_log = logging.getLogger("bridge.gpio")
 
 # ============================================================================
 # AWS IoT Configuration (Cloud Input)
 # ============================================================================
-IOT_ENDPOINT = "apc4udnp426oi-ats.iot.eu-central-1.amazonaws.com"
-IOT_PORT = 8883
-IOT_TOPIC = "decoded/#"
+# Endpoint, topic i certyfikaty wspólne dla wszystkich odbiorców (cloud_ingest.py);
+# bridge łączy się własnym identyfikatorem klienta
 IOT_CLIENT_ID = "raspberrypi-smokehouse-bridge"
 
-CERT_ROOT = os.path.expanduser("~/iot/certs/AmazonRootCA1.pem")
-CERT_FILE = os.path.expanduser("~/iot/certs/f397c6ef30d1506986fcfb78b23d519599e830bf5e15f66132f5f5cb678cd99c-certificate.pem.crt")
-KEY_FILE = os.path.expanduser("~/iot/certs/f397c6ef30d1506986fcfb78b23d519599e830bf5e15f66132f5f5cb678cd99c-private.pem.key")
-
 # ============================================================================
 # Local MQTT Configuration (ESP32 Output)
 # ============================================================================
-LOCAL_MQTT_SERVER = "192.168.0.106"
-LOCAL_MQTT_PORT = 1883
+# SMOKEHOUSE_LOCAL_MQTT/SMOKEHOUSE_LOCAL_MQTT_PORT - inny broker (testy, benchmarks/bench_latency.py)
+LOCAL_MQTT_SERVER = os.environ.get("SMOKEHOUSE_LOCAL_MQTT", "192.168.0.106")
+LOCAL_MQTT_PORT = int(os.environ.get("SMOKEHOUSE_LOCAL_MQTT_PORT", "1883"))
 LOCAL_TOPIC_START = "robot/frame/start"
 LOCAL_TOPIC_UPDATE = "robot/frame/"
 LOCAL_TOPIC_STATE = "robot/state"
 
+# UPDATE_FRAME: zmiany w oknie łączone w jedną ramkę, duplikaty pomijane
+# do upływu heartbeatu; otwarcie drzwi wysyłane natychmiast
+UPDATE_COALESCE_WINDOW = 0.5   # sekundy
+UPDATE_HEARTBEAT = 30.0        # sekundy
+
+# Spool: UPDATE_FRAME z czasu braku połączenia z lokalnym brokerem trafiają
+# do pliku i są odtwarzane po ponownym połączeniu
+SPOOL_PATH = os.environ.get("SMOKEHOUSE_SPOOL", os.path.expanduser("~/.smokehouse/bridge.spool"))
+SPOOL_SIZE = 8 * 1024 * 1024   # bajty
+SPOOL_REPLAY_RATE = 50         # wiadomości na sekundę
+
+# Metryki Prometheusa na http://127.0.0.1:METRICS_PORT/metrics (SMOKEHOUSE_METRICS=1)
+METRICS_PORT = int(os.environ.get("SMOKEHOUSE_METRICS_PORT", "9108"))
+
 # ============================================================================
 # GPIO Configuration (Button)
 # ============================================================================
 BUTTON_PIN = 17  # GPIO17 (Pin 11 na Raspberry Pi)
+BUTTON_DEBOUNCE = 0.05  # sekundy
+# FAKE_GPIO=1 - programowy przycisk (Enter na stdin), np. na zwykłym Linuksie
+FAKE_GPIO = os.environ.get("FAKE_GPIO") == "1"
 # Podłączenie przycisku:
 # - Jeden koniec przycisku → GPIO17 (Pin 11)
 # - Drugi koniec → GND (Pin 9, 14, 20, 25, 30, 34, lub 39)
 # - GPIO17 będzie miał wewnętrzny pull-up, więc przycisk zwiera do GND
 
-# ============================================================================
-# Frame Configuration (matching ESP32)
-# ============================================================================
-class FrameType(IntEnum):
-    NO_NEW_FRAME = 0
-    START_FRAME = 1
-    UPDATE_FRAME = 2
-
-MEAT_NAME_LENGTH = 30
-
-# START_FRAME positions
-START_FRAME_COMMAND_VALUE_PLACE = 1
-START_FRAME_MEAT_NAME_PLACE = START_FRAME_COMMAND_VALUE_PLACE + 1
-START_FRAME_TARGET_HUMIDITY_PLACE = START_FRAME_MEAT_NAME_PLACE + MEAT_NAME_LENGTH
-START_FRAME_TARGET_TEMPERATURE_PLACE = START_FRAME_TARGET_HUMIDITY_PLACE + 1
-START_FRAME_CURRENT_HUMIDITY_PLACE = START_FRAME_TARGET_TEMPERATURE_PLACE + 2
-START_FRAME_CURRENT_TEMPERATURE_PLACE = START_FRAME_CURRENT_HUMIDITY_PLACE + 1
-START_FRAME_DOOR_STATUS_PLACE = START_FRAME_CURRENT_TEMPERATURE_PLACE + 2
-START_FRAME_TIME_OF_SMOKING_PLACE = START_FRAME_DOOR_STATUS_PLACE + 1
-
-# UPDATE_FRAME positions
-UPDATE_FRAME_CURRENT_HUMIDITY_PLACE = 1
-UPDATE_FRAME_CURRENT_TEMPERATURE_PLACE = UPDATE_FRAME_CURRENT_HUMIDITY_PLACE + 1
-UPDATE_FRAME_DOOR_STATUS_PLACE = UPDATE_FRAME_CURRENT_TEMPERATURE_PLACE + 2
-
 # ============================================================================
 # Global State
 # ============================================================================
-class SmokehouseState:
-    """Przechowuje aktualny stan wędzarni"""
-    def __init__(self):
-        self.temperature = 230  # 23.0°C (format: °C * 10)
-        self.humidity = 45      # 45%
-        self.door_status = 0    # 0=closed, 1=open
-        self.last_update = time.time()
-        self.esp_state = "UNKNOWN"
-        
-        # Parametry procesu wędzenia (ustawiane przyciskiem)
-        self.target_temperature = 650   # 65.0°C
-        self.target_humidity = 75       # 75%
-        self.smoking_duration = 20      # 20 sekund
-        self.meat_name = "Boczek"
-        
-        self.lock = threading.Lock()
-
+# Migawki stanu (smokehouse_state.py): odczyt bez blokady, zapis przez state.update()
 state = SmokehouseState()
 
 # ============================================================================
-# MQTT Frame Creation Functions
+# Metrics (no-op bez SMOKEHOUSE_METRICS=1)
 # ============================================================================
+# Wiadomości z chmury, dekodowanie i ponowne połączenia z AWS IoT: ingest_* (cloud_ingest.py)
+FRAME_PUBLISH_SECONDS = histogram("bridge_frame_publish_seconds",
+                                  "Czas wysłania ramki do brokera/spoola", ["frame"])
+UPDATE_DELAY_SECONDS = histogram("bridge_update_frame_delay_seconds",
+                                 "Od pierwszej zmiany stanu do wysłania UPDATE_FRAME")
+SPOOL_PENDING = gauge("bridge_spool_pending", "Ramki czekające w spoolu na wysłanie")
+RECONNECTS = counter("bridge_reconnects_total", "Ponowne połączenia z brokerem", ["broker"])
 
-def create_start_frame(command, meat_name, target_humidity, target_temperature,
-                       current_humidity, current_temperature, door_status, time_of_smoking):
-    """Tworzy START_FRAME dla ESP32"""
-    total_size = START_FRAME_TIME_OF_SMOKING_PLACE + 2
-    payload = bytearray(total_size)
-    
-    payload[0] = FrameType.START_FRAME
-    payload[START_FRAME_COMMAND_VALUE_PLACE] = command & 0xFF
-    
-    # Meat name
-    meat_bytes = meat_name.encode('utf-8')[:MEAT_NAME_LENGTH]
-    for i in range(min(len(meat_bytes), MEAT_NAME_LENGTH)):
-        payload[START_FRAME_MEAT_NAME_PLACE + i] = meat_bytes[i]
-    
-    # Target values
-    payload[START_FRAME_TARGET_HUMIDITY_PLACE] = target_humidity & 0xFF
-    temp_bytes = struct.pack('<h', target_temperature)
-    payload[START_FRAME_TARGET_TEMPERATURE_PLACE:START_FRAME_TARGET_TEMPERATURE_PLACE+2] = temp_bytes
-    
-    # Current values
-    payload[START_FRAME_CURRENT_HUMIDITY_PLACE] = current_humidity & 0xFF
-    curr_temp_bytes = struct.pack('<h', current_temperature)
-    payload[START_FRAME_CURRENT_TEMPERATURE_PLACE:START_FRAME_CURRENT_TEMPERATURE_PLACE+2] = curr_temp_bytes
-    
-    # Door and time
-    payload[START_FRAME_DOOR_STATUS_PLACE] = door_status & 0xFF
-    time_bytes = struct.pack('<H', time_of_smoking)
-    payload[START_FRAME_TIME_OF_SMOKING_PLACE:START_FRAME_TIME_OF_SMOKING_PLACE+2] = time_bytes
-    
-    return payload
+_connected_once = set()
 
-def create_update_frame(current_humidity, current_temperature, door_status):
-    """Tworzy UPDATE_FRAME dla ESP32"""
-    total_size = UPDATE_FRAME_DOOR_STATUS_PLACE + 1
-    payload = bytearray(total_size)
-    
-    payload[0] = FrameType.UPDATE_FRAME
-    payload[UPDATE_FRAME_CURRENT_HUMIDITY_PLACE] = current_humidity & 0xFF
-    
-    temp_bytes = struct.pack('<h', current_temperature)
-    payload[UPDATE_FRAME_CURRENT_TEMPERATURE_PLACE:UPDATE_FRAME_CURRENT_TEMPERATURE_PLACE+2] = temp_bytes
-    
-    payload[UPDATE_FRAME_DOOR_STATUS_PLACE] = door_status & 0xFF
-    
-    return payload
+
+def count_connect(broker):
+    """Każde połączenie po pierwszym liczy się jako ponowne"""
+    if broker in _connected_once:
+        RECONNECTS.labels(broker).inc()
+    _connected_once.add(broker)
 
 # ============================================================================
 # Local MQTT Client (ESP32)
@@ -159,78 +104,124 @@ class LocalMQTTClient:
         self.client = mqtt.Client(client_id="rpi-bridge-local")
         self.client.on_connect = self.on_connect
         self.client.on_message = self.on_message
+        self.client.on_disconnect = self.on_disconnect
         self.connected = False
+        self.outbox = None
+        self.coalescer = UpdateCoalescer(self._send_update_frame,
+                                         window=UPDATE_COALESCE_WINDOW,
+                                         heartbeat=UPDATE_HEARTBEAT)
         
     def on_connect(self, client, userdata, flags, rc):
         if rc == 0:
-            print(f"✓ Połączono z lokalnym MQTT brokerem ({LOCAL_MQTT_SERVER}:{LOCAL_MQTT_PORT})")
+            local_log.info("Połączono z lokalnym MQTT brokerem (%s:%s)", LOCAL_MQTT_SERVER, LOCAL_MQTT_PORT)
             client.subscribe(LOCAL_TOPIC_STATE)
-            print(f"✓ Subskrybowano '{LOCAL_TOPIC_STATE}' (stany ESP32)")
+            local_log.info("Subskrybowano '%s' (stany ESP32)", LOCAL_TOPIC_STATE)
+            count_connect("local")
             self.connected = True
+            if self.outbox is not None:
+                self.outbox.set_connected(True)
         else:
-            print(f"✗ Błąd połączenia z lokalnym brokerem, rc={rc}")
+            local_log.error("Błąd połączenia z lokalnym brokerem, rc=%s", rc)
+    
+    def on_disconnect(self, client, userdata, rc):
+        self.connected = False
+        if self.outbox is not None:
+            self.outbox.set_connected(False)
+        if rc != 0:
+            local_log.warning("Utracono połączenie z lokalnym brokerem (rc=%s) - ramki idą do spoola", rc)
     
     def on_message(self, client, userdata, msg):
         """Odbiera stany z ESP32"""
         if msg.topic == LOCAL_TOPIC_STATE:
             esp_state = msg.payload.decode('utf-8')
-            with state.lock:
-                old_state = state.esp_state
-                state.esp_state = esp_state
+            old, _ = state.update(esp_state=esp_state)
+            old_state = old.esp_state
             
             if esp_state != old_state:
-                print(f"\n{'='*70}")
-                print(f"📥 ESP32 STATE: {old_state} → {esp_state}")
-                print(f"{'='*70}\n")
+                local_log.info("ESP32 STATE: %s → %s", old_state, esp_state,
+                               extra={"old_state": old_state, "esp_state": esp_state})
+    
+    def open_spool(self):
+        try:
+            spool = Spool(SPOOL_PATH, capacity=SPOOL_SIZE)
+        except (OSError, ValueError) as e:
+            local_log.warning("Spool niedostępny (%s) - ramki z czasu rozłączenia będą tracone", e)
+            return
+        self.outbox = SpooledPublisher(spool, self._publish_raw, rate=SPOOL_REPLAY_RATE)
+        SPOOL_PENDING.set_function(spool.__len__)
+        if spool.truncated:
+            local_log.warning("Spool %s: odrzucono uszkodzone rekordy po awarii", SPOOL_PATH)
+        if len(spool):
+            local_log.info("Spool %s: %d ramek czeka na wysłanie", SPOOL_PATH, len(spool))
+
+    def _publish_raw(self, topic, payload):
+        return self.client.publish(topic, payload, qos=1).rc == mqtt.MQTT_ERR_SUCCESS
     
     def connect(self):
+        self.coalescer.start()
+        self.open_spool()
         try:
-            print(f"Łączenie z lokalnym MQTT brokerem {LOCAL_MQTT_SERVER}:{LOCAL_MQTT_PORT}...")
+            local_log.info("Łączenie z lokalnym MQTT brokerem %s:%s...", LOCAL_MQTT_SERVER, LOCAL_MQTT_PORT)
             self.client.connect(LOCAL_MQTT_SERVER, LOCAL_MQTT_PORT, 60)
             self.client.loop_start()
             time.sleep(2)
             return True
         except Exception as e:
-            print(f"✗ Błąd połączenia z lokalnym brokerem: {e}")
+            local_log.error("Błąd połączenia z lokalnym brokerem: %s", e)
             return False
     
     def publish_start_frame(self):
         """Wysyła START_FRAME do ESP32"""
-        with state.lock:
-            payload = create_start_frame(
-                command=1,
-                meat_name=state.meat_name,
-                target_humidity=state.target_humidity,
-                target_temperature=state.target_temperature,
-                current_humidity=state.humidity,
-                current_temperature=state.temperature,
-                door_status=state.door_status,
-                time_of_smoking=state.smoking_duration
-            )
+        # Ramka i log z tej samej migawki - zawsze spójne
+        snap = state.snapshot
+        payload = start_frame(snap)
         
-        print(f"\n📤 Wysyłanie START_FRAME do ESP32")
-        print(f"  Mięso: {state.meat_name}")
-        print(f"  Target - Temp: {state.target_temperature/10:.1f}°C, Wilgotność: {state.target_humidity}%")
-        print(f"  Current - Temp: {state.temperature/10:.1f}°C, Wilgotność: {state.humidity}%")
-        print(f"  Drzwi: {'OTWARTE' if state.door_status else 'ZAMKNIĘTE'}")
-        print(f"  Czas: {state.smoking_duration}s\n")
+        local_log.info("Wysyłanie START_FRAME do ESP32: %s, target %.1f°C/%d%%, current %.1f°C/%d%%, "
+                       "drzwi %s, czas %ds",
+                       snap.meat_name, snap.target_temperature / 10, snap.target_humidity,
+                       snap.temperature / 10, snap.humidity,
+                       'OTWARTE' if snap.door_status else 'ZAMKNIĘTE', snap.smoking_duration)
         
+        started = time.perf_counter()
         self.client.publish(LOCAL_TOPIC_START, payload, qos=1)
+        FRAME_PUBLISH_SECONDS.labels("start").observe(time.perf_counter() - started)
     
-    def publish_update_frame(self):
-        """Wysyła UPDATE_FRAME do ESP32"""
-        with state.lock:
-            payload = create_update_frame(
-                current_humidity=state.humidity,
-                current_temperature=state.temperature,
-                door_status=state.door_status
-            )
-        
-        print(f"📤 UPDATE: Temp={state.temperature/10:.1f}°C, Wilg={state.humidity}%, Drzwi={'OTWARTE' if state.door_status else 'ZAMKNIĘTE'}")
+    def publish_update_frame(self, snapshot=None):
+        """Zgłasza stan (domyślnie bieżącą migawkę) do wysłania jako UPDATE_FRAME (przez coalescer)"""
+        self.coalescer.submit(*update_values(snapshot or state.snapshot))
+
+    def _send_update_frame(self, payload, since):
+        """Wysyła UPDATE_FRAME do ESP32 (wywoływane przez coalescer); False - ramka nie poszła"""
+        if local_log.isEnabledFor(logging.DEBUG):
+            frame = decode_update_frame(payload)
+            local_log.debug("UPDATE: Temp=%.1f°C, Wilg=%d%%, Drzwi=%s",
+                            frame.current_temperature / 10, frame.current_humidity,
+                            'OTWARTE' if frame.door_status else 'ZAMKNIĘTE')
         
-        self.client.publish(LOCAL_TOPIC_UPDATE, payload, qos=1)
+        started = time.perf_counter()
+        if self.outbox is not None:
+            sent = self.outbox.publish(LOCAL_TOPIC_UPDATE, payload)
+        else:
+            sent = self.connected and self._publish_raw(LOCAL_TOPIC_UPDATE, payload)
+        now = time.perf_counter()
+        FRAME_PUBLISH_SECONDS.labels("update").observe(now - started)
+        UPDATE_DELAY_SECONDS.observe(now - since)
+        return sent
     
     def disconnect(self):
+        self.coalescer.stop()
+        stats = self.coalescer.stats()
+        local_log.info("UPDATE_FRAME: odebrane=%d, wysłane=%d, pominięte=%d, połączone=%d, "
+                       "drzwi natychmiast=%d, niewysłane=%d", stats['received'], stats['published'],
+                       stats['suppressed'], stats['coalesced'], stats['fast_path'], stats['failed'], extra=stats)
+        if self.outbox is not None:
+            stats = self.outbox.stats()
+            local_log.info("Spool: wysłane od razu=%d, do spoola=%d, odtworzone=%d, nieaktualne=%d, "
+                           "czeka=%d, utracone=%d", stats['sent'], stats['spooled'], stats['replayed'],
+                           stats['superseded'], stats['pending'], stats['dropped'], extra=stats)
+            self.outbox.set_connected(False)
+            self.outbox.wait_replayed()
+            self.outbox.spool.close()
         self.client.loop_stop()
         self.client.disconnect()
 
@@ -240,199 +231,117 @@ local_mqtt = LocalMQTTClient()
 # AWS IoT Client (Cloud)
 # ============================================================================
 
-def on_cloud_connect(client, userdata, flags, rc):
-    """Callback po połączeniu z AWS IoT"""
-    if rc == 0:
-        print(f"✓ Połączono z AWS IoT Cloud ({IOT_ENDPOINT})")
-        client.subscribe(IOT_TOPIC)
-        print(f"✓ Subskrybowano '{IOT_TOPIC}' (czujniki z chmury)")
-    else:
-        print(f"✗ Błąd połączenia z AWS IoT, rc={rc}")
+class EspFrameSink(Sink):
+    """Odbiornik cloud_ingest: odczyty z chmury -> stan -> UPDATE_FRAME do ESP32"""
 
-def on_cloud_message(client, userdata, msg):
-    """Odbiera dane z AWS IoT i aktualizuje stan"""
-    try:
-        payload_str = msg.payload.decode('utf-8')
-        data = json.loads(payload_str)
+    name = "esp"
+
+    def __init__(self, with_button=True):
+        self.with_button = with_button
+        self.button = None
+
+    def start(self):
+        if self.with_button:
+            self.button = setup_gpio()
+        if not local_mqtt.connect():
+            if self.button is not None:
+                self.button.stop()
+            raise RuntimeError("Nie można uruchomić bez połączenia z lokalnym brokerem!")
+        if self.button is not None:
+            gpio_log.info("Przycisk na GPIO%d gotowy - naciśnij aby rozpocząć wędzenie", BUTTON_PIN)
+
+    def handle(self, event):
+        """Aktualizuje stan i zgłasza UPDATE_FRAME (wątek sieciowy AWS IoT)"""
+        # Odczyt środowiska albo drzwi (cloud_payload.py); nieznany kształt pomijamy
+        message = event.message
+        if message.kind is None:
+            cloud_log.debug("Nieznany format danych: %s", message.fields, extra={"topic": event.topic})
+            return
+        sensor_data = message.fields
+        changes = cloud_changes(sensor_data)
         
-        # Sprawdź czy to czujnik temperatury/wilgotności
-        if "data" in data:
-            sensor_data = data["data"]
-            
-            # Czujnik temperatury/wilgotności
-            if "temperature" in sensor_data and "humidity" in sensor_data:
-                temp_celsius = sensor_data["temperature"]
-                humidity_percent = sensor_data["humidity"]
-                
-                # Konwertuj do formatu ESP32 (temperatura * 10)
-                temp_esp_format = int(temp_celsius * 10)
-                humidity_esp_format = int(humidity_percent)
-                
-                with state.lock:
-                    state.temperature = temp_esp_format
-                    state.humidity = humidity_esp_format
-                    state.last_update = time.time()
-                
-                print(f"☁️  Temp: {temp_celsius:.1f}°C, Wilg: {humidity_percent:.1f}% (z chmury)")
-                
-                # Wyślij UPDATE_FRAME do ESP32
-                if local_mqtt.connected:
-                    local_mqtt.publish_update_frame()
-            
-            # Czujnik drzwi
-            if "door_open_status" in sensor_data:
-                door_open = sensor_data["door_open_status"]
-                
-                with state.lock:
-                    state.door_status = door_open
-                    state.last_update = time.time()
-                
-                print(f"🚪 Drzwi: {'OTWARTE' if door_open else 'ZAMKNIĘTE'} (z chmury)")
-                
-                # Wyślij UPDATE_FRAME do ESP32
-                if local_mqtt.connected:
-                    local_mqtt.publish_update_frame()
+        if "temperature" in changes:
+            cloud_log.debug("Temp: %.1f°C, Wilg: %.1f%% (z chmury)",
+                            sensor_data['temperature'], sensor_data['humidity'])
+        if "door_status" in changes:
+            cloud_log.info("Drzwi: %s (z chmury)", 'OTWARTE' if changes['door_status'] else 'ZAMKNIĘTE')
         
-    except json.JSONDecodeError as e:
-        print(f"⚠️  Błąd parsowania JSON: {e}")
-    except Exception as e:
-        print(f"⚠️  Błąd przetwarzania wiadomości: {e}")
-
-def setup_cloud_client():
-    """Konfiguruje i łączy z AWS IoT"""
-    client = mqtt.Client(client_id=IOT_CLIENT_ID)
-    client.tls_set(ca_certs=CERT_ROOT,
-                   certfile=CERT_FILE,
-                   keyfile=KEY_FILE,
-                   tls_version=ssl.PROTOCOL_TLSv1_2)
-    client.on_connect = on_cloud_connect
-    client.on_message = on_cloud_message
-    
-    print(f"Łączenie z AWS IoT: {IOT_ENDPOINT}...")
-    client.connect(IOT_ENDPOINT, IOT_PORT, keepalive=60)
-    return client
+        # Jedno zgłoszenie na wiadomość - coalescer decyduje, kiedy wysłać UPDATE_FRAME
+        if changes:
+            _, snap = state.update(**changes)
+            # Bez połączenia ramka trafi do spoola
+            local_mqtt.publish_update_frame(snap)
+
+    def stop(self):
+        local_mqtt.disconnect()
+        if self.button is not None:
+            self.button.stop()
+            self.button = None
+
+    def stats(self):
+        return local_mqtt.coalescer.stats()
 
 # ============================================================================
 # GPIO Button Handling
 # ============================================================================
 
-def check_button():
-    """Sprawdza stan przycisku (polling)"""
-    if not GPIO_AVAILABLE:
-        return False
-    
-    try:
-        return GPIO.input(BUTTON_PIN) == 0  # LOW = naciśnięty (zwięzany do GND)
-    except:
-        return False
-
 def handle_button_press():
     """Obsługuje naciśnięcie przycisku"""
-    print("\n" + "="*70)
-    print("🔴 PRZYCISK NACIŚNIĘTY - Rozpoczynam proces wędzenia!")
-    print("="*70)
+    gpio_log.info("PRZYCISK NACIŚNIĘTY - Rozpoczynam proces wędzenia!")
     
     if local_mqtt.connected:
         local_mqtt.publish_start_frame()
-        print("✓ START_FRAME wysłany do ESP32")
+        gpio_log.info("START_FRAME wysłany do ESP32")
     else:
-        print("✗ Brak połączenia z lokalnym brokerem MQTT!")
-    
-    print("="*70 + "\n")
+        gpio_log.error("Brak połączenia z lokalnym brokerem MQTT!")
 
-def setup_gpio():
-    """Konfiguruje GPIO dla przycisku"""
-    if not GPIO_AVAILABLE:
-        print("⚠️  GPIO niedostępne - przycisk nie będzie działał")
-        return False
-    
+def setup_gpio(on_press=None):
+    """Konfiguruje przycisk na zboczach GPIO; zwraca Button albo None"""
+    if not GPIO_AVAILABLE and not FAKE_GPIO:
+        gpio_log.warning("GPIO niedostępne - przycisk nie będzie działał")
+        return None
+
+    backend = create_backend(fake=FAKE_GPIO)
+    button = Button(backend, BUTTON_PIN, on_press or handle_button_press, debounce=BUTTON_DEBOUNCE)
     try:
-        GPIO.setwarnings(False)  # Wyłącz ostrzeżenia
-        GPIO.setmode(GPIO.BCM)
-        GPIO.setup(BUTTON_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-        
-        print(f"✓ GPIO skonfigurowane: Przycisk na GPIO{BUTTON_PIN} (Pin 11)")
-        print(f"  Podłączenie: GPIO{BUTTON_PIN} ←→ Przycisk ←→ GND")
-        print(f"  Metoda: Polling (sprawdzanie co 100ms)")
-        return True
+        button.start()
     except Exception as e:
-        print(f"✗ Błąd konfiguracji GPIO: {e}")
-        print(f"  Spróbuj uruchomić z sudo: sudo python3 {__file__}")
-        return False
+        gpio_log.error("Błąd konfiguracji GPIO: %s (spróbuj uruchomić z sudo: sudo python3 %s)", e, __file__)
+        return None
+
+    gpio_log.info("GPIO skonfigurowane: Przycisk na GPIO%d (Pin 11), backend: %s, "
+                  "przerwania (zbocza), debounce %.0fms", BUTTON_PIN, backend.name, BUTTON_DEBOUNCE * 1000)
+    if isinstance(backend, FakeGPIOBackend):
+        backend.attach_stdin(BUTTON_PIN)
+        gpio_log.info("Backend programowy: Enter = naciśnięcie przycisku")
+    return button
 
 # ============================================================================
 # Main Program
 # ============================================================================
 
 def main():
-    print("\n" + "="*70)
-    print("Smart Smokehouse - Raspberry Pi Bridge")
-    print("="*70)
-    print("Funkcje:")
-    print("  • Odbiera dane z AWS IoT Cloud (temperatura, wilgotność, drzwi)")
-    print("  • Wysyła UPDATE_FRAME do ESP32 (lokalny MQTT)")
-    print(f"  • Przycisk GPIO{BUTTON_PIN} wysyła START_FRAME")
-    print("="*70 + "\n")
-    
-    # Konfiguruj GPIO
-    gpio_ok = setup_gpio()
-    
-    # Połącz z lokalnym MQTT (ESP32)
-    if not local_mqtt.connect():
-        print("✗ Nie można uruchomić bez połączenia z lokalnym brokerem!")
-        return
+    setup_logging()
+    metrics_server = start_http_server(METRICS_PORT)
+    if metrics_server is not None:
+        log.info("Metryki: http://%s:%d/metrics", *metrics_server.server_address[:2])
+    log.info("Smart Smokehouse - Raspberry Pi Bridge (AWS IoT → UPDATE_FRAME do ESP32, "
+             "przycisk GPIO%d → START_FRAME)", BUTTON_PIN)
     
-    # Połącz z AWS IoT Cloud
+    # GPIO i lokalny MQTT (ESP32) uruchamia odbiornik, AWS IoT - wspólny hub
+    hub = IngestHub([EspFrameSink()])
+    log.info("System uruchamiany! Naciśnij Ctrl+C, aby zakończyć")
     try:
-        cloud_client = setup_cloud_client()
-        cloud_client.loop_start()  # Start w osobnym wątku
-        
-        print("\n" + "="*70)
-        print("✓ System uruchomiony i gotowy!")
-        print("="*70)
-        if gpio_ok:
-            print(f"🔴 Przycisk na GPIO{BUTTON_PIN} gotowy - naciśnij aby rozpocząć wędzenie")
-        print("☁️  Dane z czujników będą automatycznie przekazywane do ESP32")
-        print("📡 Stan połączeń: AWS IoT ✓ | Lokalny MQTT ✓")
-        print("\nNaciśnij Ctrl+C, aby zakończyć")
-        print("="*70 + "\n")
-        
-        # Główna pętla - sprawdzanie przycisku
-        last_button_state = False  # False = nie naciśnięty, True = naciśnięty
-        button_press_time = 0
-        
-        while True:
-            if gpio_ok:
-                current_button_state = check_button()  # True = naciśnięty (LOW)
-                
-                # Wykryj naciśnięcie (False → True, czyli zmiana z nie naciśnięty na naciśnięty)
-                if current_button_state and not last_button_state:
-                    # Debounce - sprawdź czy przycisk jest nadal naciśnięty przez 100ms
-                    time.sleep(0.1)
-                    if check_button():
-                        handle_button_press()
-                        button_press_time = time.time()
-                        
-                        # Czekaj aż przycisk zostanie puszczony (aby uniknąć wielokrotnego wywołania)
-                        while check_button():
-                            time.sleep(0.05)
-                
-                last_button_state = current_button_state
-            
-            time.sleep(0.1)  # Sprawdzaj co 100ms
-        
+        # Wiadomości z chmury w tym wątku, przycisk w callbacku GPIO
+        run_ingest(hub, client_id=IOT_CLIENT_ID)
     except KeyboardInterrupt:
-        print("\n\n" + "="*70)
-        print("Zamykanie programu...")
-        print("="*70)
-    except Exception as e:
-        print(f"\n✗ Błąd: {e}")
+        log.info("Zamykanie programu...")
+    except RuntimeError as e:
+        log.error("%s", e)
+    except Exception:
+        log.exception("Błąd")
     finally:
-        # Cleanup
-        local_mqtt.disconnect()
-        if GPIO_AVAILABLE:
-            GPIO.cleanup()
-        print("✓ Program zakończony\n")
+        log.info("Program zakończony")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Smart Smokehouse - Raspberry Pi Bridge (tryb asyncio)
+Ta sama funkcjonalność co bridge.py, ale wszystko działa w jednej pętli
+zdarzeń: odbiór z AWS IoT, publikacja ramek do ESP32, subskrypcja stanów
+ESP32 i przycisk to zadania asyncio połączone ograniczonymi kolejkami.
+
+Uruchomienie: python3 bridge_async.py
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from paho.mqtt import client as mqtt
+
+from bridge import (
+    IOT_CLIENT_ID, LOCAL_MQTT_SERVER, LOCAL_MQTT_PORT, LOCAL_TOPIC_START, LOCAL_TOPIC_UPDATE, LOCAL_TOPIC_STATE,
+    BUTTON_PIN, UPDATE_COALESCE_WINDOW, UPDATE_HEARTBEAT, state, setup_gpio,
+)
+from cloud_ingest import IOT_ENDPOINT, IOT_PORT, IOT_TOPIC, create_cloud_client
+from cloud_payload import decode as decode_payload
+from mqtt_asyncio import AsyncMQTTClient
+from smokehouse_log import setup_logging
+from smokehouse_state import cloud_changes, start_frame, update_values
+from update_coalescer import UpdateCoalescer
+
+# ============================================================================
+# Queue Configuration
+# ============================================================================
+CLOUD_QUEUE_SIZE = 1000     # wiadomości z chmury czekające na parsowanie
+PUBLISH_QUEUE_SIZE = 100    # ramki czekające na wysłanie do ESP32
+STATE_QUEUE_SIZE = 100      # stany odebrane z ESP32
+STATS_INTERVAL = 60         # co ile sekund logować statystyki opóźnień
+
+log = logging.getLogger("bridge")
+cloud_log = logging.getLogger("bridge.cloud")
+local_log = logging.getLogger("bridge.local")
+
+
+class LatencyStats:
+    """Opóźnienie od odebrania wiadomości z chmury do wysłania UPDATE_FRAME"""
+
+    def __init__(self, window=1000):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.dropped = 0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def summary(self):
+        if not self.samples:
+            return "brak próbek"
+        ordered = sorted(self.samples)
+        p = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+        return (f"n={self.count}, p50={p(0.5):.2f}ms, p95={p(0.95):.2f}ms, "
+                f"max={ordered[-1] * 1000:.2f}ms, odrzucone={self.dropped}")
+
+
+class DropCounter:
+    """Liczba elementów wyrzuconych z pełnej kolejki"""
+
+    def __init__(self):
+        self.dropped = 0
+
+
+def put_drop_oldest(queue, item, stats=None):
+    """
+    Wstawia do kolejki; gdy pełna, wyrzuca najstarszy element (świeższe dane
+    są ważniejsze) i zwiększa ``stats.dropped``. Nie nadaje się dla ramek,
+    których nie wolno zgubić (START_FRAME ma osobną kolejkę).
+    """
+    try:
+        queue.put_nowait(item)
+    except asyncio.QueueFull:
+        queue.get_nowait()
+        queue.put_nowait(item)
+        if stats is not None:
+            stats.dropped += 1
+
+
+class AsyncBridge:
+    """Most chmura → ESP32 w jednej pętli asyncio"""
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.cloud_queue = asyncio.Queue(maxsize=CLOUD_QUEUE_SIZE)
+        self.publish_queue = asyncio.Queue(maxsize=PUBLISH_QUEUE_SIZE)
+        self.state_queue = asyncio.Queue(maxsize=STATE_QUEUE_SIZE)
+        # START_FRAME (przycisk) nigdy nie jest wyrzucany przez nadmiar UPDATE_FRAME;
+        # kolejka bez limitu - naciśnięcia przycisku mają ludzkie tempo
+        self.start_queue = asyncio.Queue()
+        self.latency = LatencyStats()
+        self.publish_drops = DropCounter()
+        self.state_drops = DropCounter()
+        # Okno łączenia działa we własnym wątku; gotowa ramka wraca do pętli przez kolejkę
+        self.coalescer = UpdateCoalescer(self._queue_update_frame,
+                                         window=UPDATE_COALESCE_WINDOW,
+                                         heartbeat=UPDATE_HEARTBEAT)
+
+        # Lokalny broker (ESP32)
+        local = mqtt.Client(client_id="rpi-bridge-local")
+        local.on_connect = self.on_local_connect
+        local.on_message = self.on_local_message
+        self.local = AsyncMQTTClient(local, LOCAL_MQTT_SERVER, LOCAL_MQTT_PORT, name="local")
+
+        # AWS IoT
+        cloud = create_cloud_client(IOT_CLIENT_ID, self.on_cloud_connect, self.on_cloud_message)
+        self.cloud = AsyncMQTTClient(cloud, IOT_ENDPOINT, IOT_PORT, name="cloud")
+
+    # ------------------------------------------------------------------
+    # Callbacki paho - wywoływane w wątku pętli, tylko wrzucają do kolejek
+    # ------------------------------------------------------------------
+
+    def on_local_connect(self, client, userdata, flags, rc):
+        if rc == 0:
+            local_log.info("Połączono z lokalnym MQTT brokerem (%s:%s)", LOCAL_MQTT_SERVER, LOCAL_MQTT_PORT)
+            client.subscribe(LOCAL_TOPIC_STATE)
+        else:
+            local_log.error("Błąd połączenia z lokalnym brokerem, rc=%s", rc)
+
+    def on_local_message(self, client, userdata, msg):
+        if msg.topic == LOCAL_TOPIC_STATE:
+            put_drop_oldest(self.state_queue, msg.payload.decode('utf-8'), self.state_drops)
+
+    def on_cloud_connect(self, client, userdata, flags, rc):
+        if rc == 0:
+            cloud_log.info("Połączono z AWS IoT Cloud (%s)", IOT_ENDPOINT)
+            client.subscribe(IOT_TOPIC)
+        else:
+            cloud_log.error("Błąd połączenia z AWS IoT, rc=%s", rc)
+
+    def on_cloud_message(self, client, userdata, msg):
+        put_drop_oldest(self.cloud_queue, (time.perf_counter(), msg.payload), self.latency)
+
+    # ------------------------------------------------------------------
+    # Zadania
+    # ------------------------------------------------------------------
+
+    async def cloud_ingest_task(self):
+        """Parsuje wiadomości z chmury, aktualizuje stan i zleca UPDATE_FRAME"""
+        while True:
+            received_at, payload = await self.cloud_queue.get()
+            try:
+                message = decode_payload(payload)
+            except ValueError as e:
+                cloud_log.warning("Niepoprawna wiadomość: %s", e)
+                continue
+            if message.kind is None:
+                continue
+
+            changes = cloud_changes(message.fields)
+            if changes:
+                _, snap = state.update(**changes)
+                # Opóźnienie liczone od odebrania wiadomości, nie od wejścia do coalescera
+                self.coalescer.submit(*update_values(snap), received_at=received_at)
+
+    def _queue_update_frame(self, frame, since):
+        # Szybka ścieżka (drzwi) przychodzi z wątku pętli, okno z wątku coalescera
+        item = (since, LOCAL_TOPIC_UPDATE, frame)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            put_drop_oldest(self.publish_queue, item, self.publish_drops)
+        else:
+            self.loop.call_soon_threadsafe(put_drop_oldest, self.publish_queue, item, self.publish_drops)
+
+    async def esp_publish_task(self):
+        """Wysyła ramki do ESP32 (czeka, jeśli lokalny broker jest rozłączony)"""
+        while True:
+            received_at, topic, frame = await self.publish_queue.get()
+            await self.local.connected.wait()
+            self.local.client.publish(topic, frame, qos=1)
+            if received_at is not None:
+                self.latency.add(time.perf_counter() - received_at)
+
+    async def esp_start_task(self):
+        """Wysyła START_FRAME do ESP32 (osobno od UPDATE_FRAME, bez odrzucania)"""
+        while True:
+            frame = await self.start_queue.get()
+            await self.local.connected.wait()
+            self.local.client.publish(LOCAL_TOPIC_START, frame, qos=1)
+
+    async def esp_state_task(self):
+        """Obsługuje stany maszyny stanów odebrane z ESP32"""
+        while True:
+            esp_state = await self.state_queue.get()
+            old, _ = state.update(esp_state=esp_state)
+            old_state = old.esp_state
+            if esp_state != old_state:
+                local_log.info("ESP32 STATE: %s → %s", old_state, esp_state,
+                               extra={"old_state": old_state, "esp_state": esp_state})
+
+    def on_button_press(self):
+        """Callback zbocza GPIO (wątek RPi.GPIO) - przekazuje START_FRAME do pętli"""
+        log.info("PRZYCISK NACIŚNIĘTY - Rozpoczynam proces wędzenia!")
+        self.loop.call_soon_threadsafe(self.request_start)
+
+    def request_start(self):
+        self.start_queue.put_nowait(start_frame(state.snapshot))
+
+    async def stats_task(self):
+        while True:
+            await asyncio.sleep(STATS_INTERVAL)
+            coalescer = self.coalescer.stats()
+            log.info("Chmura → UPDATE_FRAME: %s | UPDATE: odebrane=%d, wysłane=%d, pominięte=%d | "
+                     "kolejki: chmura=%d, ESP=%d (odrzucone %d), stany=%d (odrzucone %d) | "
+                     "reconnect: local=%d, cloud=%d",
+                     self.latency.summary(), coalescer['received'], coalescer['published'],
+                     coalescer['suppressed'], self.cloud_queue.qsize(), self.publish_queue.qsize(),
+                     self.publish_drops.dropped, self.state_queue.qsize(), self.state_drops.dropped,
+                     self.local.reconnects, self.cloud.reconnects)
+
+    async def run(self):
+        self.coalescer.start()
+        await self.local.connect()
+        await self.cloud.connect()
+
+        tasks = [
+            asyncio.create_task(self.cloud_ingest_task()),
+            asyncio.create_task(self.esp_publish_task()),
+            asyncio.create_task(self.esp_start_task()),
+            asyncio.create_task(self.esp_state_task()),
+            asyncio.create_task(self.stats_task()),
+        ]
+        button = setup_gpio(on_press=self.on_button_press)
+        if button is not None:
+            log.info("Przycisk na GPIO%d gotowy", BUTTON_PIN)
+
+        log.info("Bridge (asyncio) uruchomiony - Ctrl+C aby zakończyć")
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            if button is not None:
+                button.stop()
+            self.coalescer.stop(flush=False)
+            await self.cloud.disconnect()
+            await self.local.disconnect()
+
+
+def main():
+    setup_logging()
+    log.info("Smart Smokehouse - Raspberry Pi Bridge (asyncio)")
+
+    try:
+        asyncio.run(_run())
+    except KeyboardInterrupt:
+        log.info("Zamykanie programu...")
+    finally:
+        log.info("Program zakończony")
+
+
+async def _run():
+    # Kolejki asyncio muszą powstać wewnątrz działającej pętli
+    bridge = AsyncBridge()
+    await bridge.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Smart Smokehouse - Raspberry Pi Bridge dla wielu wędzarni
+Jeden proces obsługuje wszystkie wędzarnie z rejestru urządzeń: czujniki
+``decoded/<czujnik>`` z AWS IoT trafiają do stanu właściwej wędzarni,
+a ramki idą na jej lokalne topici ESP32 (device_router.py).
+
+Uruchomienie: python3 bridge_multi.py [ścieżka do rejestru]
+(domyślnie $SMOKEHOUSE_DEVICES albo devices.json obok skryptu)
+"""
+
+import logging
+import os
+import sys
+import threading
+from paho.mqtt import client as mqtt
+
+from bridge import (
+    IOT_CLIENT_ID, LOCAL_MQTT_SERVER, LOCAL_MQTT_PORT, UPDATE_COALESCE_WINDOW, UPDATE_HEARTBEAT,
+    BUTTON_DEBOUNCE, FAKE_GPIO, GPIO_AVAILABLE, SPOOL_SIZE, SPOOL_REPLAY_RATE,
+)
+from cloud_ingest import IOT_ENDPOINT, IOT_PORT, IOT_TOPIC, create_cloud_client
+from device_router import DeviceRouter, load_registry
+from gpio_input import Button, FakeGPIOBackend, create_backend
+from smokehouse_log import setup_logging
+from spool import Spool, SpooledPublisher
+
+DEFAULT_REGISTRY = os.environ.get(
+    "SMOKEHOUSE_DEVICES", os.path.join(os.path.dirname(os.path.abspath(__file__)), "devices.json"))
+SPOOL_PATH = os.environ.get("SMOKEHOUSE_MULTI_SPOOL", os.path.expanduser("~/.smokehouse/bridge_multi.spool"))
+STATS_INTERVAL = 60
+
+log = logging.getLogger("bridge")
+cloud_log = logging.getLogger("bridge.cloud")
+local_log = logging.getLogger("bridge.local")
+gpio_log = logging.getLogger("bridge.gpio")
+
+
+class MultiBridge:
+    """Łączy DeviceRouter z lokalnym brokerem, AWS IoT i przyciskami"""
+
+    def __init__(self, devices):
+        self.local = mqtt.Client(client_id="rpi-bridge-multi-local")
+        self.local.on_connect = self.on_local_connect
+        self.local.on_message = self.on_local_message
+        self.local.on_disconnect = self.on_local_disconnect
+        self.local_connected = False
+        self.outbox = None
+        self.open_spool()
+        self.router = DeviceRouter(devices, self.publish_local, publish_start=self.publish_start,
+                                   window=UPDATE_COALESCE_WINDOW, heartbeat=UPDATE_HEARTBEAT)
+        self.cloud = None
+        self.buttons = []
+
+    def open_spool(self):
+        # Wszystkie wędzarnie dzielą jeden spool - kolejność między nimi jest zachowana
+        try:
+            spool = Spool(SPOOL_PATH, capacity=SPOOL_SIZE)
+        except (OSError, ValueError) as e:
+            local_log.warning("Spool niedostępny (%s) - ramki z czasu rozłączenia będą tracone", e)
+            return
+        self.outbox = SpooledPublisher(spool, self._publish_raw, rate=SPOOL_REPLAY_RATE)
+        if spool.truncated:
+            local_log.warning("Spool %s: odrzucono uszkodzone rekordy po awarii", SPOOL_PATH)
+        if len(spool):
+            local_log.info("Spool %s: %d ramek czeka na wysłanie", SPOOL_PATH, len(spool))
+
+    def publish_local(self, topic, payload):
+        if self.outbox is not None:
+            return self.outbox.publish(topic, payload)
+        return self.local_connected and self._publish_raw(topic, payload)
+
+    def publish_start(self, topic, payload):
+        """START_FRAME tylko przy połączeniu i bez spoola - jak w bridge.py"""
+        if not self.local_connected:
+            local_log.error("Brak połączenia z lokalnym brokerem MQTT - START_FRAME nie wysłany (%s)", topic)
+            return False
+        return self._publish_raw(topic, payload)
+
+    def _publish_raw(self, topic, payload):
+        return self.local.publish(topic, payload, qos=1).rc == mqtt.MQTT_ERR_SUCCESS
+
+    def on_local_connect(self, client, userdata, flags, rc):
+        if rc == 0:
+            local_log.info("Połączono z lokalnym MQTT brokerem (%s:%s)", LOCAL_MQTT_SERVER, LOCAL_MQTT_PORT)
+            client.subscribe([(topic, 0) for topic in self.router.state_topics()])
+            local_log.info("Subskrybowano stany %d wędzarni", len(self.router.devices))
+            self.local_connected = True
+            if self.outbox is not None:
+                self.outbox.set_connected(True)
+        else:
+            local_log.error("Błąd połączenia z lokalnym brokerem, rc=%s", rc)
+
+    def on_local_disconnect(self, client, userdata, rc):
+        self.local_connected = False
+        if self.outbox is not None:
+            self.outbox.set_connected(False)
+        if rc != 0:
+            local_log.warning("Utracono połączenie z lokalnym brokerem (rc=%s)%s", rc,
+                              " - ramki idą do spoola" if self.outbox is not None else "")
+
+    def on_local_message(self, client, userdata, msg):
+        result = self.router.handle_local(msg.topic, msg.payload)
+        if result is not None:
+            device, old_state = result
+            esp_state = device.state.snapshot.esp_state
+            if esp_state != old_state:
+                local_log.info("[%s] ESP32 STATE: %s → %s", device.id, old_state, esp_state,
+                               extra={"device": device.id, "old_state": old_state, "esp_state": esp_state})
+
+    def on_cloud_connect(self, client, userdata, flags, rc):
+        if rc == 0:
+            cloud_log.info("Połączono z AWS IoT Cloud (%s)", IOT_ENDPOINT)
+            client.subscribe(IOT_TOPIC)
+        else:
+            cloud_log.error("Błąd połączenia z AWS IoT, rc=%s", rc)
+
+    def on_cloud_message(self, client, userdata, msg):
+        try:
+            self.router.handle_cloud(msg.topic, msg.payload)
+        except Exception:
+            cloud_log.exception("Błąd przetwarzania wiadomości %s", msg.topic, extra={"topic": msg.topic})
+
+    def setup_buttons(self):
+        """Przycisk START dla każdej wędzarni z 'button_pin' w rejestrze"""
+        if not GPIO_AVAILABLE and not FAKE_GPIO:
+            gpio_log.warning("GPIO niedostępne - przyciski nie będą działać")
+            return
+        backend = create_backend(fake=FAKE_GPIO)
+        for device in self.router.devices.values():
+            if device.button_pin is None:
+                continue
+            button = Button(backend, device.button_pin,
+                            lambda device_id=device.id: self.on_button_press(device_id),
+                            debounce=BUTTON_DEBOUNCE)
+            button.start()
+            self.buttons.append(button)
+            gpio_log.info("[%s] Przycisk na GPIO%d", device.id, device.button_pin)
+        if isinstance(backend, FakeGPIOBackend) and self.buttons:
+            backend.attach_stdin(self.buttons[0].pin)
+
+    def on_button_press(self, device_id):
+        gpio_log.info("[%s] PRZYCISK NACIŚNIĘTY - Rozpoczynam proces wędzenia!", device_id,
+                      extra={"device": device_id})
+        if self.router.start_smoking(device_id) is not None:
+            gpio_log.info("[%s] START_FRAME wysłany do ESP32", device_id, extra={"device": device_id})
+
+    def start(self):
+        self.router.start()
+        self.local.connect(LOCAL_MQTT_SERVER, LOCAL_MQTT_PORT, 60)
+        self.local.loop_start()
+
+        self.cloud = create_cloud_client(IOT_CLIENT_ID, self.on_cloud_connect, self.on_cloud_message)
+        cloud_log.info("Łączenie z AWS IoT: %s...", IOT_ENDPOINT)
+        self.cloud.connect(IOT_ENDPOINT, IOT_PORT, keepalive=60)
+        self.cloud.loop_start()
+
+        self.setup_buttons()
+
+    def stop(self):
+        for button in self.buttons:
+            button.stop()
+        if self.cloud is not None:
+            self.cloud.loop_stop()
+            self.cloud.disconnect()
+        self.router.stop()
+        if self.outbox is not None:
+            self.outbox.set_connected(False)
+            self.outbox.wait_replayed()
+            self.outbox.spool.close()
+        self.local.loop_stop()
+        self.local.disconnect()
+
+    def log_stats(self):
+        stats = self.router.stats()
+        spool = self.outbox.spool if self.outbox is not None else None
+        log.info("wędzarnie=%d | UPDATE: odebrane=%d, wysłane=%d, pominięte=%d, niewysłane=%d | "
+                 "nieznane czujniki=%d, błędy=%d | spool: czeka=%d, utracone=%d",
+                 stats['devices'], stats['received'], stats['published'], stats['suppressed'], stats['failed'],
+                 stats['unknown'], stats['errors'], len(spool) if spool else 0, spool.dropped if spool else 0)
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_REGISTRY
+    setup_logging()
+    log.info("Smart Smokehouse - Raspberry Pi Bridge (wiele wędzarni)")
+
+    try:
+        devices = load_registry(path)
+    except (OSError, ValueError) as e:
+        log.error("Nie można wczytać rejestru urządzeń %s: %s", path, e)
+        return
+    log.info("Rejestr %s: %d wędzarni", path, len(devices))
+
+    bridge = MultiBridge(devices)
+    try:
+        bridge.start()
+        log.info("Bridge uruchomiony - Ctrl+C aby zakończyć")
+        stop = threading.Event()
+        while not stop.wait(STATS_INTERVAL):
+            bridge.log_stats()
+    except KeyboardInterrupt:
+        log.info("Zamykanie programu...")
+    except Exception:
+        log.exception("Błąd")
+    finally:
+        bridge.stop()
+        bridge.log_stats()
+        log.info("Program zakończony")
+
+
+if __name__ == "__main__":
+    main()
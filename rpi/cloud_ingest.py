@@ -0,0 +1,621 @@
+#!/usr/bin/env python3
+"""
+Smart Smokehouse - wspólny odbiór decoded/# z AWS IoT z wymiennymi odbiornikami
+
+Jedna sesja TLS z AWS IoT i jedno dekodowanie wiadomości (cloud_payload),
+a potem ta sama wiadomość (``Event``) trafia do wszystkich odbiorników:
+  esp      - UPDATE_FRAME do ESP32 (bridge.EspFrameSink)
+  db       - zapis do bazy Django (sensor/sinks.py, jak mqtt_worker)
+  csv      - archiwum CSV (czas, topic, payload)
+  parquet  - archiwum Parquet (wymaga pyarrow)
+  record   - binarny zapis ruchu do odtworzenia (traffic_log.py, cloud_replay.py)
+  http     - paczki odczytów do serwera Django (POST /api/ingest/)
+  log      - podgląd wiadomości w logu (rpi_chmura.py)
+
+``handle`` odbiornika jest wołane w wątku sieciowym paho, więc musi być
+szybkie - wolne odbiorniki (plik, HTTP) dziedziczą po QueuedSink i robią
+swoje w osobnym wątku. Błąd jednego odbiornika nie zatrzymuje pozostałych.
+
+Uruchomienie (jeden proces zamiast bridge.py + rpi_chmura.py + mqtt_worker):
+    python3 cloud_ingest.py --sink esp --sink db --sink csv=/home/pi/iot_data.csv
+
+Zamiast AWS IoT można podać lokalny broker (dotyczy wszystkich odbiorców
+decoded/#: bridge*.py, rpi_chmura.py, mqtt_worker), np. z generatorem
+obciążenia cloud_loadgen.py:
+    SMOKEHOUSE_IOT_ENDPOINT=127.0.0.1 SMOKEHOUSE_IOT_PORT=1883 SMOKEHOUSE_IOT_TLS=0 \
+        python3 cloud_ingest.py --sink log
+"""
+
+import argparse
+import csv
+import http.client
+import json
+import logging
+import os
+import queue
+import random
+import ssl
+import sys
+import threading
+import time
+import urllib.parse
+from collections import namedtuple
+from datetime import datetime
+
+from cloud_payload import decode as decode_payload, device_from_topic
+from smokehouse_log import setup_logging
+from smokehouse_metrics import counter, histogram, start_http_server
+from traffic_log import TrafficWriter
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# ============================================================================
+# AWS IoT Configuration
+# ============================================================================
+IOT_ENDPOINT = os.environ.get("SMOKEHOUSE_IOT_ENDPOINT", "apc4udnp426oi-ats.iot.eu-central-1.amazonaws.com")
+IOT_PORT = int(os.environ.get("SMOKEHOUSE_IOT_PORT", "8883"))
+# SMOKEHOUSE_IOT_TLS=0 - zwykłe MQTT bez certyfikatów (lokalny broker, testy obciążeniowe)
+IOT_TLS = os.environ.get("SMOKEHOUSE_IOT_TLS", "1") != "0"
+IOT_TOPIC = "decoded/#"
+IOT_CLIENT_ID = "raspberrypi-smokehouse-ingest"
+
+CERT_ROOT = os.path.expanduser("~/iot/certs/AmazonRootCA1.pem")
+CERT_FILE = os.path.expanduser("~/iot/certs/f397c6ef30d1506986fcfb78b23d519599e830bf5e15f66132f5f5cb678cd99c-certificate.pem.crt")
+KEY_FILE = os.path.expanduser("~/iot/certs/f397c6ef30d1506986fcfb78b23d519599e830bf5e15f66132f5f5cb678cd99c-private.pem.key")
+
+METRICS_PORT = int(os.environ.get("SMOKEHOUSE_METRICS_PORT", "9110"))
+
+# Odbiornik http: token zgodny z SENSOR_INGEST_TOKEN serwera Django (bez tokenu serwer odpowiada 403)
+FORWARD_TOKEN = os.environ.get("SMOKEHOUSE_FORWARD_TOKEN", "")
+
+log = logging.getLogger("ingest")
+
+# Metryki (no-op bez SMOKEHOUSE_METRICS=1)
+MESSAGES = counter("ingest_messages_total", "Wiadomości odebrane z AWS IoT", ["topic"])
+ERRORS = counter("ingest_errors_total", "Wiadomości, których nie udało się zdekodować", ["reason"])
+DECODE_SECONDS = histogram("ingest_decode_seconds", "Czas dekodowania JSON i walidacji wiadomości")
+SINK_SECONDS = histogram("ingest_sink_seconds", "Czas obsługi wiadomości przez odbiornik", ["sink"])
+SINK_ERRORS = counter("ingest_sink_errors_total", "Błędy odbiorników", ["sink"])
+RECONNECTS = counter("ingest_reconnects_total", "Ponowne połączenia z AWS IoT")
+FORWARD_SECONDS = histogram("ingest_http_post_seconds", "Czas jednego POST paczki do serwera HTTP")
+FORWARD_RETRIES = counter("ingest_http_retries_total", "Ponowione POST-y paczek do serwera HTTP")
+
+# topic, device - z topicu decoded/<device>
+# received_at   - time.time() odebrania
+# payload       - surowe bajty
+# message       - cloud_payload.Message albo None, gdy dekodowanie się nie udało
+Event = namedtuple("Event", ["topic", "device", "received_at", "payload", "message"])
+
+
+def create_cloud_client(client_id=IOT_CLIENT_ID, on_connect=None, on_message=None):
+    """Klient paho z certyfikatami AWS IoT (bez łączenia; bez TLS, gdy IOT_TLS wyłączone)"""
+    # Import tutaj - odbiorniki i IngestHub działają też bez paho (benchmarki, odtwarzanie)
+    from paho.mqtt import client as mqtt
+
+    client = mqtt.Client(client_id=client_id)
+    if IOT_TLS:
+        client.tls_set(ca_certs=CERT_ROOT,
+                       certfile=CERT_FILE,
+                       keyfile=KEY_FILE,
+                       tls_version=ssl.PROTOCOL_TLSv1_2)
+    if on_connect is not None:
+        client.on_connect = on_connect
+    if on_message is not None:
+        client.on_message = on_message
+    return client
+
+
+# ============================================================================
+# Odbiorniki
+# ============================================================================
+
+class Sink:
+    """
+    Odbiornik wiadomości. ``raw = True`` - dostaje też wiadomości, których
+    nie udało się zdekodować (``event.message is None``), np. archiwum.
+    """
+
+    name = "sink"
+    raw = False
+
+    def start(self):
+        pass
+
+    def handle(self, event):
+        raise NotImplementedError
+
+    def stop(self):
+        pass
+
+    def stats(self):
+        return {}
+
+
+class QueuedSink(Sink):
+    """
+    Odbiornik z ograniczoną kolejką i wątkiem zapisującym paczkami:
+    ``write(batch)`` dostaje do ``max_batch`` zdarzeń, najpóźniej po
+    ``max_delay`` s. Przy pełnej kolejce zdarzenia są odrzucane (``dropped``).
+    ``workers > 1`` - kilka wątków zapisujących równolegle (kolejność paczek
+    nie jest wtedy zachowana); ``close()`` woła każdy wątek na koniec.
+    """
+
+    def __init__(self, max_queue=10000, max_batch=500, max_delay=1.0, workers=1):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.workers = workers
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._threads = []
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"sink-{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def handle(self, event):
+        if not self.accepts(event):
+            return
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def accepts(self, event):
+        return True
+
+    def stop(self, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        # Jeden sentinel na wątek; każdy kończy po swoim
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        self._threads = []
+
+    def write(self, batch):
+        raise NotImplementedError
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            try:
+                item = self._queue.get()
+                deadline = time.monotonic() + self.max_delay
+                while item is not None:
+                    batch.append(item)
+                    if len(batch) >= self.max_batch:
+                        break
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                stopping = item is None
+            except queue.Empty:
+                pass
+            if batch:
+                self._write(batch)
+        self.close()
+
+    def _write(self, batch):
+        try:
+            self.write(batch)
+            self.written += len(batch)
+        except Exception:
+            self.errors += len(batch)
+            SINK_ERRORS.labels(self.name).inc()
+            log.exception("[%s] Błąd zapisu paczki (%d wiadomości)", self.name, len(batch))
+
+    def close(self):
+        pass
+
+    def stats(self):
+        return {"written": self.written, "dropped": self.dropped, "errors": self.errors,
+                "depth": self._queue.qsize()}
+
+
+class LogSink(Sink):
+    """Podgląd odebranych wiadomości w logu"""
+
+    name = "log"
+    raw = True
+
+    def __init__(self):
+        self.log = logging.getLogger("ingest.messages")
+
+    def handle(self, event):
+        self.log.info("Odebrano: %s %s", event.topic, event.payload.decode('utf-8', errors='replace'))
+
+
+class CsvArchiveSink(QueuedSink):
+    """Archiwum CSV: czas odebrania (ISO), topic, payload - dopisywane do pliku"""
+
+    name = "csv"
+    raw = True
+
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._file = None
+
+    def start(self):
+        self._file = open(self.path, "a", newline="", encoding="utf-8")
+        super().start()
+
+    def write(self, batch):
+        writer = csv.writer(self._file)
+        for event in batch:
+            ts = datetime.fromtimestamp(event.received_at).isoformat(sep=" ", timespec="milliseconds")
+            writer.writerow((ts, event.topic, event.payload.decode('utf-8', errors='replace')))
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class ParquetArchiveSink(QueuedSink):
+    """
+    Archiwum Parquet (kolumny received_at, topic, payload), jedna grupa
+    wierszy na paczkę. Plik Parquet nie daje się dopisywać między
+    uruchomieniami, więc istniejący plik dostaje nową nazwę z datą startu.
+    """
+
+    name = "parquet"
+    raw = True
+
+    def __init__(self, path, max_batch=5000, max_delay=30.0, **kwargs):
+        if not PYARROW_AVAILABLE:
+            raise RuntimeError("Archiwum Parquet wymaga pyarrow (pip install pyarrow)")
+        super().__init__(max_batch=max_batch, max_delay=max_delay, **kwargs)
+        self.path = path
+        self._writer = None
+        self._schema = pyarrow.schema([
+            ("received_at", pyarrow.float64()),
+            ("topic", pyarrow.string()),
+            ("payload", pyarrow.binary()),
+        ])
+
+    def start(self):
+        if os.path.exists(self.path):
+            stem, ext = os.path.splitext(self.path)
+            self.path = f"{stem}-{time.strftime('%Y%m%d-%H%M%S')}{ext}"
+        self._writer = pyarrow.parquet.ParquetWriter(self.path, self._schema)
+        super().start()
+
+    def write(self, batch):
+        table = pyarrow.Table.from_pydict({
+            "received_at": [event.received_at for event in batch],
+            "topic": [event.topic for event in batch],
+            "payload": [bytes(event.payload) for event in batch],
+        }, schema=self._schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+class RecorderSink(QueuedSink):
+    """
+    Zapis ruchu (topic, payload, czas odebrania) do pliku traffic_log -
+    np. incydent z produkcji do odtworzenia przez cloud_replay.py.
+    Rekordy dopisywane paczkami, plik i indeks opróżniane po każdej paczce.
+    """
+
+    name = "record"
+    raw = True
+
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._writer = None
+
+    def start(self):
+        self._writer = TrafficWriter(self.path)
+        if self._writer.truncated:
+            log.warning("[record] %s: odrzucono niepełny rekord po awarii", self.path)
+        super().start()
+
+    def write(self, batch):
+        for event in batch:
+            self._writer.append(event.topic, event.payload, event.received_at)
+        self._writer.flush()
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+class HttpForwardSink(QueuedSink):
+    """
+    Przekazuje odczyty paczkami do serwera Django (POST /api/ingest/,
+    sensor.views.ingest_api): jeden POST na paczkę, połączenie keep-alive
+    na wątek wysyłający, ponowienia z wykładniczym opóźnieniem (z losowym
+    rozrzutem) przy błędach sieci, 5xx, 408 i 429. Inne 4xx nie są ponawiane.
+    Ponowienie jest bezpieczne także po zgubionej odpowiedzi: serwer pomija
+    odczyty, których para (device, received_at) jest już zapisana.
+
+    Podczas ponowień kolejka się zapełnia, a nadmiar jest odrzucany
+    (``dropped``) - wątek sieciowy MQTT nigdy nie czeka na serwer HTTP.
+    Przy zatrzymaniu pozostałe paczki dostają już tylko jedną próbę.
+    """
+
+    name = "http"
+
+    def __init__(self, url, token=None, timeout=5.0, retries=5, backoff=0.5, max_backoff=30.0,
+                 max_batch=200, max_delay=1.0, workers=2, **kwargs):
+        super().__init__(max_batch=max_batch, max_delay=max_delay, workers=workers, **kwargs)
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.netloc:
+            raise ValueError(f"Niepoprawny adres odbiornika http: {url!r}")
+        self.url = url
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._https = parts.scheme == "https"
+        self._host = parts.netloc
+        self._path = parts.path or "/"
+        if parts.query:
+            self._path += "?" + parts.query
+        self._headers = {"Content-Type": "application/json"}
+        if token:
+            self._headers["Authorization"] = f"Bearer {token}"
+        self._local = threading.local()
+        self._stopping = threading.Event()
+        self.posts = 0
+        self.retried = 0
+        self.rejected = 0
+
+    def accepts(self, event):
+        return event.message.kind is not None
+
+    def stop(self, timeout=10.0):
+        self._stopping.set()
+        super().stop(timeout)
+
+    def write(self, batch):
+        body = json.dumps({"readings": [
+            {"device": event.device, "received_at": event.received_at, "data": event.message.fields}
+            for event in batch
+        ]}).encode("utf-8")
+
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                status, response = self._post(body)
+                error = f"HTTP {status}"
+            except (OSError, http.client.HTTPException) as e:
+                self._reset()
+                status, error = None, str(e) or type(e).__name__
+            FORWARD_SECONDS.observe(time.perf_counter() - started)
+
+            if status is not None and status < 300:
+                self.posts += 1
+                self._check_rejected(response, len(batch))
+                return
+            if status is not None and 400 <= status < 500 and status not in (408, 429):
+                raise ValueError(f"Serwer odrzucił paczkę: {error} {response[:200]!r}")
+
+            attempt += 1
+            delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+            if attempt > self.retries or self._stopping.wait(delay):
+                raise ConnectionError(f"{self.url}: {error} (prób: {attempt})")
+            self.retried += 1
+            FORWARD_RETRIES.inc()
+            log.warning("[%s] %s - ponowienie %d/%d za %.1fs", self.name, error, attempt, self.retries, delay)
+
+    def _post(self, body):
+        """Jeden POST przez połączenie wątku; zwraca (status, ciało odpowiedzi)"""
+        conn = getattr(self._local, "conn", None)
+        reused = conn is not None
+        if conn is None:
+            conn = self._connect()
+        try:
+            conn.request("POST", self._path, body, self._headers)
+            response = conn.getresponse()
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            if not reused:
+                raise
+            # Serwer zamknął bezczynne połączenie keep-alive - od razu nowe, bez czekania
+            self._reset()
+            conn = self._connect()
+            conn.request("POST", self._path, body, self._headers)
+            response = conn.getresponse()
+        data = response.read()
+        if response.will_close:
+            self._reset()
+        return response.status, data
+
+    def _connect(self):
+        connection_class = http.client.HTTPSConnection if self._https else http.client.HTTPConnection
+        self._local.conn = connection_class(self._host, timeout=self.timeout)
+        return self._local.conn
+
+    def _reset(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            conn.close()
+
+    def _check_rejected(self, response, count):
+        try:
+            rejected = json.loads(response).get("rejected") or []
+        except (ValueError, AttributeError):
+            return
+        if rejected:
+            self.rejected += len(rejected)
+            log.warning("[%s] Serwer odrzucił %d z %d odczytów, np. %s",
+                        self.name, len(rejected), count, rejected[0])
+
+    def close(self):
+        self._reset()
+
+    def stats(self):
+        stats = super().stats()
+        stats.update(posts=self.posts, retried=self.retried, rejected=self.rejected)
+        return stats
+
+
+# ============================================================================
+# IngestHub
+# ============================================================================
+
+class IngestHub:
+    """Dekoduje każdą wiadomość raz i przekazuje ją wszystkim odbiornikom"""
+
+    def __init__(self, sinks, topic=IOT_TOPIC):
+        self.sinks = list(sinks)
+        self.topic = topic
+        self.received = 0
+        self.invalid = 0
+        self._connected_once = False
+        # Czas obsługi per odbiornik - etykiety wyliczone raz
+        self._timed = [(sink, SINK_SECONDS.labels(sink.name)) for sink in self.sinks]
+
+    def start(self):
+        started = []
+        try:
+            for sink in self.sinks:
+                sink.start()
+                started.append(sink)
+        except Exception:
+            # Bez połowicznie uruchomionego zestawu - zatrzymujemy to, co już działa
+            for sink in reversed(started):
+                sink.stop()
+            raise
+
+    def stop(self):
+        for sink in reversed(self.sinks):
+            try:
+                sink.stop()
+            except Exception:
+                log.exception("[%s] Błąd zatrzymania odbiornika", sink.name)
+
+    def on_connect(self, client, userdata, flags, rc):
+        if rc == 0:
+            log.info("Połączono z AWS IoT Cloud (%s), subskrypcja '%s'", IOT_ENDPOINT, self.topic)
+            client.subscribe(self.topic)
+            if self._connected_once:
+                RECONNECTS.inc()
+            self._connected_once = True
+        else:
+            log.error("Błąd połączenia z AWS IoT, rc=%s", rc)
+
+    def on_message(self, client, userdata, msg):
+        self.dispatch(msg.topic, msg.payload)
+
+    def dispatch(self, topic, payload, received_at=None):
+        """Dekoduje wiadomość i przekazuje odbiornikom; zwraca Event"""
+        received_at = time.time() if received_at is None else received_at
+        self.received += 1
+        MESSAGES.labels(topic).inc()
+
+        started = time.perf_counter()
+        try:
+            message = decode_payload(payload)
+            DECODE_SECONDS.observe(time.perf_counter() - started)
+        except ValueError as e:
+            message = None
+            self.invalid += 1
+            ERRORS.labels("payload").inc()
+            log.warning("Niepoprawna wiadomość: %s", e, extra={"topic": topic})
+
+        event = Event(topic, device_from_topic(topic), received_at, payload, message)
+        for sink, timer in self._timed:
+            if message is None and not sink.raw:
+                continue
+            started = time.perf_counter()
+            try:
+                sink.handle(event)
+            except Exception:
+                SINK_ERRORS.labels(sink.name).inc()
+                log.exception("[%s] Błąd obsługi wiadomości", sink.name, extra={"topic": topic})
+            timer.observe(time.perf_counter() - started)
+        return event
+
+    def stats(self):
+        return {sink.name: sink.stats() for sink in self.sinks}
+
+
+def run(hub, client_id=IOT_CLIENT_ID):
+    """Uruchamia odbiorniki i pętlę AWS IoT w bieżącym wątku (do Ctrl+C)"""
+    client = create_cloud_client(client_id, hub.on_connect, hub.on_message)
+    hub.start()
+    try:
+        log.info("Łączenie z AWS IoT: %s...", IOT_ENDPOINT)
+        client.connect(IOT_ENDPOINT, IOT_PORT, keepalive=60)
+        client.loop_forever()
+    finally:
+        client.disconnect()
+        hub.stop()
+        log.info("Odebrane: %d (niepoprawne: %d), odbiorniki: %s", hub.received, hub.invalid, hub.stats())
+
+
+def create_sink(spec):
+    """Odbiornik z opisu ``nazwa[=argument]`` z linii poleceń"""
+    name, _, arg = spec.partition("=")
+    if name == "log":
+        return LogSink()
+    if name == "csv":
+        return CsvArchiveSink(arg or "iot_data.csv")
+    if name == "parquet":
+        return ParquetArchiveSink(arg or "iot_data.parquet")
+    if name == "record":
+        return RecorderSink(arg or "iot_data.trace")
+    if name == "http":
+        if not arg:
+            raise ValueError("Odbiornik http wymaga adresu: --sink http=http://serwer/api/ingest/")
+        return HttpForwardSink(arg, token=FORWARD_TOKEN)
+    if name == "esp":
+        from bridge import EspFrameSink
+        return EspFrameSink()
+    if name == "db":
+        # Django potrzebuje ustawień, zanim zaimportujemy modele
+        import django
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "iotapp"))
+        os.environ.setdefault("DJANGO_SETTINGS_MODULE", "iotapp.settings")
+        django.setup()
+        from sensor.sinks import DatabaseSink
+        return DatabaseSink()
+    raise ValueError(f"Nieznany odbiornik '{name}' (esp, db, csv, parquet, record, http, log)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sink", action="append", default=[], metavar="NAZWA[=ARG]",
+                        help="Odbiornik (można podać wiele razy): esp, db, csv[=plik], parquet[=plik], "
+                             "record[=plik], http=URL, log")
+    parser.add_argument("--client-id", default=IOT_CLIENT_ID, help="Identyfikator klienta AWS IoT")
+    args = parser.parse_args()
+
+    setup_logging()
+    metrics_server = start_http_server(METRICS_PORT)
+    if metrics_server is not None:
+        log.info("Metryki: http://%s:%d/metrics", *metrics_server.server_address[:2])
+
+    try:
+        sinks = [create_sink(spec) for spec in (args.sink or ["log"])]
+    except (ValueError, RuntimeError) as e:
+        parser.error(str(e))
+    log.info("Odbiorniki: %s", ", ".join(sink.name for sink in sinks))
+
+    try:
+        run(IngestHub(sinks), args.client_id)
+    except KeyboardInterrupt:
+        log.info("Zamykanie programu...")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Smart Smokehouse - generator obciążenia decoded/# (zamiast AWS IoT)
+
+Publikuje do lokalnego brokera wiadomości ``{"data": {...}}`` czujników
+środowiska i drzwi - w tym samym kształcie co z AWS IoT - z zadaną
+częstotliwością, liczbą czujników i wzorcem ruchu. Odbiorców (bridge.py,
+rpi_chmura.py, cloud_ingest.py, mqtt_worker) kieruje się na ten broker przez
+SMOKEHOUSE_IOT_ENDPOINT/SMOKEHOUSE_IOT_PORT/SMOKEHOUSE_IOT_TLS=0 (cloud_ingest).
+
+Harmonogram jest otwarty (open-loop): czas wysłania i-tej wiadomości
+wynika tylko ze wzorca, a nie z tego, kiedy skończyła się poprzednia
+publikacja. Jeśli generator lub broker nie nadąża, wiadomości nie są
+pomijane ani rozrzedzane - wychodzą od razu, a spóźnienie względem planu
+trafia do raportu (opóźnienie harmonogramu p50/p99/max). Dzięki temu
+raport nie zaniża obciążenia tak, jak robi to pętla "wyślij, poczekaj".
+
+Wzorce:
+  constant - równe odstępy 1/rate
+  poisson  - odstępy wykładnicze o średniej 1/rate (niezależni nadawcy)
+  burst    - rate, a co --burst-period s przez --burst-length s --burst-rate
+
+Uruchomienie:
+    python3 cloud_loadgen.py --broker 127.0.0.1 --rate 500 --devices 50 --duration 30
+    python3 cloud_loadgen.py --pattern burst --rate 50 --burst-rate 2000 --registry devices.json
+"""
+
+import argparse
+import json
+import logging
+import random
+import time
+
+from cloud_payload import TOPIC_PREFIX
+from smokehouse_log import setup_logging
+
+DEFAULT_RATE = 100.0
+DEFAULT_DURATION = 10.0
+DEFAULT_DEVICES = 20
+DEFAULT_DOOR_RATIO = 0.1
+CLIENT_ID = "smokehouse-loadgen"
+
+# Spóźnienie względem harmonogramu, powyżej którego wiadomość liczy się jako spóźniona
+LATE_THRESHOLD = 0.010
+# Ile sekund czekać na potwierdzenia QoS 1/2 po końcu harmonogramu
+DRAIN_TIMEOUT = 10.0
+
+PATTERNS = ("constant", "poisson", "burst")
+
+log = logging.getLogger("loadgen")
+
+
+# ============================================================================
+# Wiadomości
+# ============================================================================
+
+class PayloadFactory:
+    """
+    Wiadomości czujników: odczyty środowiska błądzą losowo wokół warunków
+    w wędzarni (osobno dla każdego czujnika), drzwi przełączają się rzadko.
+    ``door_ratio`` - udział wiadomości drzwi.
+    """
+
+    def __init__(self, devices, door_ratio=DEFAULT_DOOR_RATIO, seed=None):
+        self.rng = random.Random(seed)
+        self.door_ratio = door_ratio
+        self.topics = [TOPIC_PREFIX + device for device in devices]
+        self._climate = {device: [self.rng.uniform(20.0, 70.0), self.rng.uniform(40.0, 85.0)] for device in devices}
+        self._door = dict.fromkeys(devices, False)
+
+    def create(self, index):
+        """(topic, payload) i-tej wiadomości; czujniki kolejno po kole"""
+        topic = self.topics[index % len(self.topics)]
+        device = topic[len(TOPIC_PREFIX):]
+        rng = self.rng
+        if rng.random() < self.door_ratio:
+            if rng.random() < 0.2:
+                self._door[device] = not self._door[device]
+            opened = self._door[device]
+            data = {"door_open_status": opened, "alarm": int(opened and rng.random() < 0.1)}
+        else:
+            climate = self._climate[device]
+            climate[0] = min(120.0, max(15.0, climate[0] + rng.uniform(-0.5, 0.6)))
+            climate[1] = min(100.0, max(20.0, climate[1] + rng.uniform(-1.0, 1.0)))
+            data = {
+                "marker": 1,
+                "temperature": round(climate[0], 2),
+                "humidity": round(climate[1], 2),
+                "pressure": round(rng.uniform(995.0, 1025.0), 2),
+                "gas_resistance_ohm": rng.randrange(50000, 200000),
+            }
+        return topic, json.dumps({"data": data}, separators=(",", ":")).encode("utf-8")
+
+
+def sensor_ids(count, prefix="sensor"):
+    return [f"{prefix}-{i:03d}" for i in range(count)]
+
+
+def registry_sensors(path):
+    """Wszystkie czujniki z rejestru bridge_multi (ruch trafia do każdej wędzarni)"""
+    from device_router import load_registry
+
+    return [sensor for device in load_registry(path) for sensor in device.sensors]
+
+
+# ============================================================================
+# Harmonogramy (przesunięcia w sekundach od startu)
+# ============================================================================
+
+def constant_schedule(rate, duration):
+    interval = 1.0 / rate
+    count = int(duration * rate)
+    for i in range(count):
+        yield i * interval
+
+
+def poisson_schedule(rate, duration, rng):
+    offset = rng.expovariate(rate)
+    while offset < duration:
+        yield offset
+        offset += rng.expovariate(rate)
+
+
+def burst_schedule(rate, duration, burst_rate, burst_length, burst_period):
+    """Stała częstotliwość ``rate`` z oknami ``burst_rate`` na początku każdego okresu"""
+    period_start = 0.0
+    while period_start < duration:
+        windows = ((period_start, period_start + burst_length, burst_rate),
+                   (period_start + burst_length, period_start + burst_period, rate))
+        for window_start, window_end, window_rate in windows:
+            end = min(window_end, duration)
+            i = 0
+            # Przesunięcia liczone od początku okna - bez kumulacji błędu zaokrągleń
+            offset = window_start
+            while offset < end:
+                yield offset
+                i += 1
+                offset = window_start + i / window_rate
+        period_start += burst_period
+
+
+def create_schedule(pattern, rate, duration, burst_rate=None, burst_length=1.0, burst_period=10.0, seed=None):
+    if rate <= 0:
+        raise ValueError("Częstotliwość musi być dodatnia")
+    if pattern == "constant":
+        return constant_schedule(rate, duration)
+    if pattern == "poisson":
+        return poisson_schedule(rate, duration, random.Random(seed))
+    if pattern == "burst":
+        if burst_rate is None or burst_rate <= 0:
+            raise ValueError("Wzorzec burst wymaga dodatniego --burst-rate")
+        if not 0 < burst_length <= burst_period:
+            raise ValueError("--burst-length musi być w przedziale (0, --burst-period]")
+        return burst_schedule(rate, duration, burst_rate, burst_length, burst_period)
+    raise ValueError(f"Nieznany wzorzec '{pattern}' ({', '.join(PATTERNS)})")
+
+
+# ============================================================================
+# Generator
+# ============================================================================
+
+class LoadGenerator:
+    """
+    Wysyła wiadomości według harmonogramu przez ``publish(topic, payload)``,
+    które zwraca True, gdy wiadomość przyjęto do wysłania. Generator nie
+    zależy od paho, więc da się go mierzyć także bez brokera.
+    """
+
+    def __init__(self, publish, factory, late_threshold=LATE_THRESHOLD):
+        self.publish = publish
+        self.factory = factory
+        self.late_threshold = late_threshold
+        self.scheduled = 0
+        self.sent = 0
+        self.failed = 0
+        self.bytes = 0
+        self.lags = []
+        self.per_second = {}
+        self.elapsed = 0.0
+        self.planned = 0.0
+
+    def run(self, schedule, duration=None):
+        started = time.perf_counter()
+        clock = time.perf_counter
+        lags = self.lags
+        per_second = self.per_second
+        try:
+            for offset in schedule:
+                target = started + offset
+                now = clock()
+                if target > now:
+                    time.sleep(target - now)
+                    now = clock()
+                topic, payload = self.factory.create(self.scheduled)
+                self.scheduled += 1
+                if self.publish(topic, payload):
+                    self.sent += 1
+                    self.bytes += len(payload)
+                else:
+                    self.failed += 1
+                lags.append(max(0.0, now - target))
+                second = int(now - started)
+                per_second[second] = per_second.get(second, 0) + 1
+                self.planned = offset
+            if duration is not None:
+                self.planned = duration
+        finally:
+            # Także po Ctrl+C - raport z dotychczasowego ruchu
+            self.elapsed = clock() - started
+        return self.report()
+
+    def report(self):
+        lags = sorted(self.lags)
+        elapsed = max(self.elapsed, 1e-9)
+
+        def percentile(p):
+            return lags[min(len(lags) - 1, int(p * len(lags)))] if lags else 0.0
+
+        return {
+            "scheduled": self.scheduled,
+            "sent": self.sent,
+            "failed": self.failed,
+            "bytes": self.bytes,
+            "elapsed": self.elapsed,
+            "offered_rate": self.scheduled / self.planned if self.planned else 0.0,
+            "achieved_rate": self.sent / elapsed,
+            "peak_rate": max(self.per_second.values(), default=0),
+            "lag_p50": percentile(0.50),
+            "lag_p99": percentile(0.99),
+            "lag_max": lags[-1] if lags else 0.0,
+            "late": sum(1 for lag in lags if lag > self.late_threshold),
+        }
+
+
+class MqttPublisher:
+    """``publish`` dla LoadGenerator przez paho; liczy potwierdzenia QoS 1/2"""
+
+    def __init__(self, host, port, qos=0, client_id=CLIENT_ID):
+        from paho.mqtt import client as mqtt
+
+        self.host = host
+        self.port = port
+        self.qos = qos
+        self.acked = 0
+        self._success = mqtt.MQTT_ERR_SUCCESS
+        self.client = mqtt.Client(client_id=client_id)
+        self.client.on_publish = self._on_publish
+        # Otwarty harmonogram - paho nie może wstrzymywać publish przy limicie w locie
+        self.client.max_inflight_messages_set(0)
+        self.client.max_queued_messages_set(0)
+
+    def connect(self):
+        log.info("Łączenie z brokerem %s:%s...", self.host, self.port)
+        self.client.connect(self.host, self.port, keepalive=60)
+        self.client.loop_start()
+
+    def publish(self, topic, payload):
+        return self.client.publish(topic, payload, qos=self.qos).rc == self._success
+
+    def _on_publish(self, client, userdata, mid):
+        self.acked += 1
+
+    def drain(self, expected, timeout=DRAIN_TIMEOUT):
+        """Czeka na potwierdzenia QoS 1/2 (przy QoS 0 paho woła on_publish po zapisie do gniazda)"""
+        deadline = time.monotonic() + timeout
+        while self.acked < expected and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self.acked
+
+    def disconnect(self):
+        self.client.disconnect()
+        self.client.loop_stop()
+
+
+def print_report(report, qos=None, acked=None):
+    print(f"Zaplanowane: {report['scheduled']}, wysłane: {report['sent']}, błędy publish: {report['failed']}, "
+          f"{report['bytes'] / 1024:.0f} KiB w {report['elapsed']:.2f} s")
+    print(f"{'zadane/s':>10} {'osiągnięte/s':>13} {'szczyt/s':>9} {'opóźn. p50':>11} {'p99':>9} {'max':>9} "
+          f"{'spóźnione':>10}")
+    print(f"{report['offered_rate']:>10,.0f} {report['achieved_rate']:>13,.0f} {report['peak_rate']:>9,} "
+          f"{report['lag_p50'] * 1000:>8.2f} ms {report['lag_p99'] * 1000:>6.2f} ms {report['lag_max'] * 1000:>6.1f} ms "
+          f"{report['late']:>10}")
+    if acked is not None:
+        print(f"Potwierdzone przez broker (QoS {qos}): {acked}/{report['sent']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--broker", default="127.0.0.1", help="Adres lokalnego brokera MQTT")
+    parser.add_argument("--port", type=int, default=1883, help="Port brokera")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="Wiadomości na sekundę (łącznie)")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION, help="Czas trwania w sekundach")
+    parser.add_argument("--devices", type=int, default=DEFAULT_DEVICES, help="Liczba czujników decoded/<czujnik>")
+    parser.add_argument("--registry", help="Czujniki z rejestru bridge_multi (devices.json) zamiast --devices")
+    parser.add_argument("--pattern", choices=PATTERNS, default="constant", help="Wzorzec ruchu")
+    parser.add_argument("--burst-rate", type=float, help="Częstotliwość w oknie burst (wiadomości/s)")
+    parser.add_argument("--burst-length", type=float, default=1.0, help="Długość okna burst w sekundach")
+    parser.add_argument("--burst-period", type=float, default=10.0, help="Okres powtarzania okna burst")
+    parser.add_argument("--door-ratio", type=float, default=DEFAULT_DOOR_RATIO, help="Udział wiadomości drzwi")
+    parser.add_argument("--qos", type=int, choices=(0, 1, 2), default=0, help="QoS publikacji")
+    parser.add_argument("--seed", type=int, help="Ziarno losowania (powtarzalny ruch)")
+    parser.add_argument("--json", metavar="PLIK", help="Zapisz raport jako JSON")
+    args = parser.parse_args()
+
+    if args.registry:
+        try:
+            devices = registry_sensors(args.registry)
+        except (OSError, ValueError) as e:
+            parser.error(f"Rejestr {args.registry}: {e}")
+    else:
+        devices = sensor_ids(args.devices)
+    if not devices:
+        parser.error("Brak czujników")
+    try:
+        schedule = create_schedule(args.pattern, args.rate, args.duration, args.burst_rate,
+                                   args.burst_length, args.burst_period, args.seed)
+    except ValueError as e:
+        parser.error(str(e))
+
+    setup_logging()
+    publisher = MqttPublisher(args.broker, args.port, qos=args.qos)
+    generator = LoadGenerator(publisher.publish, PayloadFactory(devices, args.door_ratio, args.seed))
+    publisher.connect()
+    log.info("Generator: %s %.0f/s przez %.0f s, %d czujników, QoS %d",
+             args.pattern, args.rate, args.duration, len(devices), args.qos)
+    try:
+        report = generator.run(schedule, args.duration)
+    except KeyboardInterrupt:
+        log.info("Przerwano - raport z dotychczasowego ruchu")
+        report = generator.report()
+    acked = publisher.drain(report["sent"]) if args.qos else None
+    publisher.disconnect()
+
+    print_report(report, args.qos, acked)
+    if args.json:
+        report.update({"pattern": args.pattern, "rate": args.rate, "devices": len(devices), "qos": args.qos,
+                       "acked": acked})
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
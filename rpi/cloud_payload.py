@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Smart Smokehouse - dekodowanie wiadomości decoded/# z AWS IoT
+
+Wiadomość ma postać ``{"data": {...}}``; rodzaj odczytu rozpoznawany jest
+po kształcie obiektu ``data``:
+  environment - temperature, humidity (+ pressure, gas_resistance_ohm, marker)
+  door        - door_open_status (dawniej open_status) i/lub alarm
+
+Rodzaj wybiera funkcję walidującą z tablicy VALIDATORS ({rodzaj: funkcja});
+każda czyta pola wprost z ``data`` i konwertuje je. Liczby muszą być
+skończone (nan/inf są odrzucane), a liczby całkowite mieścić się w zakresie
+kolumny IntegerField modeli Django (marker, alarm).
+
+orjson jest opcjonalną zależnością (pip install orjson, nie jest wymagany
+przez żaden moduł): gdy jest zainstalowany, dekoduje JSON ok. 2x szybciej,
+bez niego używany jest moduł json z tym samym wynikiem. Błędy zgłaszane
+jako ValueError (json.JSONDecodeError i UnicodeDecodeError także nim są).
+"""
+
+import codecs
+import json
+from collections import namedtuple
+from math import isfinite
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+KIND_ENVIRONMENT = "environment"
+KIND_DOOR = "door"
+
+TOPIC_PREFIX = "decoded/"
+
+# kind: rodzaj (KIND_* albo None dla nieznanego kształtu)
+# fields: pola po walidacji i konwersji (albo surowe ``data`` dla nieznanego)
+Message = namedtuple("Message", ["kind", "fields"])
+
+# Zakres IntegerField (marker, alarm) - większa liczba przepełniłaby kolumnę w bazie
+INTEGER_MIN = -2 ** 31
+INTEGER_MAX = 2 ** 31 - 1
+
+
+def device_from_topic(topic):
+    """Wyciąga identyfikator urządzenia z topicu decoded/<device>[/...]"""
+    if not topic.startswith(TOPIC_PREFIX):
+        return ""
+    return topic[len(TOPIC_PREFIX):].split("/", 1)[0]
+
+
+def loads(payload):
+    """bytes/str -> obiekt; orjson, gdy dostępny"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(payload)
+    if isinstance(payload, (bytes, bytearray)):
+        # json.loads(bytes) najpierw zgaduje kodowanie - jawne UTF-8 jest szybsze
+        payload = payload.decode("utf-8-sig" if payload.startswith(codecs.BOM_UTF8) else "utf-8")
+    return json.loads(payload)
+
+
+# ============================================================================
+# Konwertery pól
+# ============================================================================
+
+def number(value):
+    """Liczba skończona jako float (napis z liczbą też); nan/inf są odrzucane"""
+    if isinstance(value, float):
+        # Zwykły przypadek z JSON-a - bez konwersji
+        if isfinite(value):
+            return value
+    elif isinstance(value, bool):
+        raise ValueError("oczekiwano liczby, a nie wartości logicznej")
+    result = float(value)
+    if not isfinite(result):
+        raise ValueError(f"oczekiwano liczby skończonej, a nie {value!r}")
+    return result
+
+
+def integer(value):
+    """Liczba całkowita w zakresie IntegerField (napis z liczbą też)"""
+    if isinstance(value, bool):
+        return int(value)
+    result = int(float(value)) if isinstance(value, str) else int(value)
+    if not INTEGER_MIN <= result <= INTEGER_MAX:
+        raise ValueError(f"liczba {value!r} poza zakresem {INTEGER_MIN}..{INTEGER_MAX}")
+    return result
+
+
+_TRUE = frozenset(("1", "true", "open", "on", "yes"))
+_FALSE = frozenset(("0", "false", "closed", "off", "no"))
+
+
+def flag(value):
+    """bool/liczba/napis -> 0 albo 1"""
+    if isinstance(value, str):
+        text = value.strip().lower()
+        if text in _TRUE:
+            return 1
+        if text in _FALSE:
+            return 0
+        raise ValueError(f"nieznana wartość logiczna {value!r}")
+    return 1 if value else 0
+
+
+# ============================================================================
+# Walidacja rodzajów
+# ============================================================================
+# Jedna zwykła funkcja na rodzaj: pola czytane wprost z ``data``, a nazwa
+# bieżącego pola trzymana w zmiennej tylko na potrzeby komunikatu błędu.
+
+_CONVERSION_ERRORS = (TypeError, ValueError, OverflowError)
+
+
+def _missing(kind, name):
+    raise ValueError(f"{kind}: brak pola '{name}'")
+
+
+def _invalid(kind, name, error):
+    raise ValueError(f"{kind}: niepoprawne pole '{name}': {error}") from None
+
+
+def _door_status(data):
+    """door_open_status (dawniej open_status) jako 0/1 albo None, gdy brak"""
+    value = data.get("door_open_status")
+    if value is None:
+        value = data.get("open_status")
+    return None if value is None else flag(value)
+
+
+def validate_environment(data):
+    """
+    temperature, humidity (wymagane); pressure, gas_resistance_ohm (0.0),
+    marker (1) i door_open_status / open_status (pomijane, gdy brak)
+    """
+    get = data.get
+    temperature = get("temperature")
+    if temperature is None:
+        _missing(KIND_ENVIRONMENT, "temperature")
+    humidity = get("humidity")
+    if humidity is None:
+        _missing(KIND_ENVIRONMENT, "humidity")
+    name = "temperature"
+    try:
+        fields = {"temperature": number(temperature)}
+        name = "humidity"
+        fields["humidity"] = number(humidity)
+        name = "pressure"
+        value = get("pressure")
+        fields["pressure"] = 0.0 if value is None else number(value)
+        name = "gas_resistance_ohm"
+        value = get("gas_resistance_ohm")
+        fields["gas_resistance_ohm"] = 0.0 if value is None else number(value)
+        name = "marker"
+        value = get("marker")
+        fields["marker"] = 1 if value is None else integer(value)
+        # Czujnik łączony może wysłać drzwi razem z odczytem środowiska
+        name = "door_open_status"
+        door = _door_status(data)
+        if door is not None:
+            fields["door_open_status"] = door
+    except _CONVERSION_ERRORS as e:
+        _invalid(KIND_ENVIRONMENT, name, e)
+    return fields
+
+
+def validate_door(data):
+    """door_open_status / open_status (pomijane, gdy brak) i alarm (0)"""
+    fields = {}
+    name = "door_open_status"
+    try:
+        door = _door_status(data)
+        if door is not None:
+            fields["door_open_status"] = door
+        name = "alarm"
+        value = data.get("alarm")
+        fields["alarm"] = 0 if value is None else integer(value)
+    except _CONVERSION_ERRORS as e:
+        _invalid(KIND_DOOR, name, e)
+    return fields
+
+
+VALIDATORS = {
+    KIND_ENVIRONMENT: validate_environment,
+    KIND_DOOR: validate_door,
+}
+
+def kind_of(data):
+    """Rodzaj odczytu po kluczach ``data`` (None dla nieznanego kształtu)"""
+    # Kolejność ma znaczenie: odczyt środowiska może zawierać też drzwi
+    if "temperature" in data:
+        return KIND_ENVIRONMENT
+    if "door_open_status" in data or "open_status" in data or "alarm" in data:
+        return KIND_DOOR
+    return None
+
+
+def decode(payload):
+    """
+    Dekoduje wiadomość decoded/#. Zwraca Message; dla nieznanego kształtu
+    ``kind`` to None, a ``fields`` to surowe ``data``. ValueError przy
+    niepoprawnym JSON-ie, braku obiektu ``data`` albo złych polach.
+    """
+    document = loads(payload)
+    return decode_data(document.get("data") if isinstance(document, dict) else None)
+
+
+def decode_data(data):
+    """Jak decode, ale dla już zdekodowanego obiektu ``data`` (np. z paczki HTTP)"""
+    if not isinstance(data, dict):
+        raise ValueError("wiadomość bez obiektu 'data'")
+    kind = kind_of(data)
+    validate = VALIDATORS.get(kind)
+    if validate is None:
+        return Message(None, data)
+    return Message(kind, validate(data))
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Smart Smokehouse - odtwarzanie zapisanego ruchu decoded/# (traffic_log.py)
+
+Zapis z odbiornika ``record`` (``python3 cloud_ingest.py --sink record=incydent.trace``
+albo ``rpi_chmura.py --record incydent.trace``) jest mapowany w pamięci
+i publikowany ponownie na lokalny broker, z oryginalnymi topicami:
+  --speed 1    - w czasie rzeczywistym (odstępy jak przy odbiorze)
+  --speed 10   - 10x szybciej
+  --speed max  - bez czekania (test przepustowości)
+Harmonogram jest otwarty jak w cloud_loadgen.py: spóźnienie względem
+zapisanych odstępów trafia do raportu, a nie przesuwa kolejnych wiadomości.
+
+Most i worker czytają wtedy z tego brokera zamiast z AWS IoT:
+    SMOKEHOUSE_IOT_ENDPOINT=127.0.0.1 SMOKEHOUSE_IOT_PORT=1883 SMOKEHOUSE_IOT_TLS=0 python3 bridge.py
+    python3 cloud_replay.py incydent.trace --speed 1 --from 2024-11-02T14:05 --to 2024-11-02T14:20
+
+``replay(records, publish, speed)`` działa też bez brokera, np. prosto
+do IngestHub: ``replay(log.records(), hub.dispatch, speed=None)``.
+"""
+
+import argparse
+import logging
+import time
+from datetime import datetime
+
+from smokehouse_log import setup_logging
+from traffic_log import TrafficLog
+
+CLIENT_ID = "smokehouse-replay"
+# Spóźnienie względem zapisanych odstępów, powyżej którego wiadomość liczy się jako spóźniona
+LATE_THRESHOLD = 0.010
+
+log = logging.getLogger("replay")
+
+
+def replay(records, publish, speed=1.0, late_threshold=LATE_THRESHOLD):
+    """
+    Publikuje rekordy przez ``publish(topic, payload, timestamp)`` z
+    zachowaniem odstępów podzielonych przez ``speed`` (None - bez czekania).
+    ``publish`` zwraca False przy błędzie (None liczy się jako sukces).
+    """
+    stats = {"records": 0, "failed": 0, "late": 0, "lag_max": 0.0, "recorded": 0.0, "elapsed": 0.0}
+    clock = time.perf_counter
+    started = clock()
+    first = None
+    timestamp = None
+    for timestamp, topic, payload in records:
+        if first is None:
+            first = timestamp
+        if speed is not None:
+            target = started + max(0.0, timestamp - first) / speed
+            now = clock()
+            if target > now:
+                time.sleep(target - now)
+            else:
+                lag = now - target
+                if lag > late_threshold:
+                    stats["late"] += 1
+                stats["lag_max"] = max(stats["lag_max"], lag)
+        if publish(topic, payload, timestamp) is False:
+            stats["failed"] += 1
+        stats["records"] += 1
+    stats["elapsed"] = clock() - started
+    stats["recorded"] = timestamp - first if first is not None else 0.0
+    return stats
+
+
+def parse_time(value, origin):
+    """ISO (2024-11-02T14:05), czas unixowy albo +sekundy od początku zapisu"""
+    if value is None:
+        return None
+    if value.startswith("+"):
+        return origin + float(value[1:])
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def parse_speed(value):
+    if value == "max":
+        return None
+    speed = float(value)
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("prędkość musi być dodatnia albo 'max'")
+    return speed
+
+
+def print_info(traffic):
+    bounds = traffic.bounds()
+    print(f"{traffic.path}: {traffic.size / 1024:.0f} KiB, wpisy indeksu: {len(traffic.index)}")
+    if bounds is None:
+        print("Zapis jest pusty")
+        return
+    topics = {}
+    for record in traffic.records():
+        topics[record.topic] = topics.get(record.topic, 0) + 1
+    start, end = (datetime.fromtimestamp(t).isoformat(sep=" ", timespec="seconds") for t in bounds)
+    print(f"{sum(topics.values())} wiadomości, {start} - {end} ({bounds[1] - bounds[0]:.0f} s)")
+    for topic, count in sorted(topics.items(), key=lambda item: -item[1]):
+        print(f"{count:>10} {topic}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="Plik zapisu ruchu (odbiornik record)")
+    parser.add_argument("--broker", default="127.0.0.1", help="Adres lokalnego brokera MQTT")
+    parser.add_argument("--port", type=int, default=1883, help="Port brokera")
+    parser.add_argument("--speed", type=parse_speed, default=1.0, help="Mnożnik prędkości albo 'max'")
+    parser.add_argument("--from", dest="start", help="Początek: ISO, czas unixowy albo +sekundy od początku zapisu")
+    parser.add_argument("--to", dest="end", help="Koniec: ISO, czas unixowy albo +sekundy od początku zapisu")
+    parser.add_argument("--topic", help="Tylko topici z tym prefiksem (np. decoded/wedzarnia-1)")
+    parser.add_argument("--qos", type=int, choices=(0, 1, 2), default=0, help="QoS publikacji")
+    parser.add_argument("--info", action="store_true", help="Tylko podsumowanie zapisu (bez brokera)")
+    args = parser.parse_args()
+
+    try:
+        traffic = TrafficLog(args.path)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    with traffic:
+        if args.info:
+            print_info(traffic)
+            return
+        bounds = traffic.bounds()
+        if bounds is None:
+            parser.error(f"{args.path}: zapis jest pusty")
+        try:
+            start, end = parse_time(args.start, bounds[0]), parse_time(args.end, bounds[0])
+        except ValueError as e:
+            parser.error(f"Niepoprawny czas: {e}")
+        records = traffic.records(start, end)
+        if args.topic:
+            records = (record for record in records if record.topic.startswith(args.topic))
+
+        # Ten sam klient co generator obciążenia (QoS 1/2 z potwierdzeniami)
+        from cloud_loadgen import MqttPublisher
+
+        setup_logging()
+        publisher = MqttPublisher(args.broker, args.port, qos=args.qos, client_id=CLIENT_ID)
+        publisher.connect()
+        log.info("Odtwarzanie %s z prędkością %s", args.path, "max" if args.speed is None else f"{args.speed:g}x")
+        try:
+            stats = replay(records, lambda topic, payload, timestamp: publisher.publish(topic, payload), args.speed)
+        except KeyboardInterrupt:
+            log.info("Przerwano odtwarzanie")
+            stats = None
+        finally:
+            # Generator trzyma widok mmap - zamknięty przed zamknięciem pliku
+            records.close()
+        acked = publisher.drain(stats["records"] - stats["failed"]) if stats and args.qos else None
+        publisher.disconnect()
+    if stats is None:
+        return
+
+    elapsed = max(stats["elapsed"], 1e-9)
+    print(f"Odtworzone: {stats['records']} (błędy publish: {stats['failed']}), zapis {stats['recorded']:.1f} s "
+          f"w {stats['elapsed']:.1f} s ({stats['recorded'] / elapsed:.1f}x, {stats['records'] / elapsed:,.0f}/s)")
+    print(f"Spóźnione: {stats['late']}, największe spóźnienie: {stats['lag_max'] * 1000:.1f} ms")
+    if acked is not None:
+        print(f"Potwierdzone przez broker (QoS {args.qos}): {acked}/{stats['records'] - stats['failed']}")
+
+
+if __name__ == "__main__":
+    main()
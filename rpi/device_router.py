@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Smart Smokehouse - routing wielu wędzarni w jednym procesie mostu
+
+Rejestr urządzeń (plik JSON, patrz devices.example.json) przypisuje czujniki
+z chmury (``decoded/<czujnik>``) do wędzarni, a każdej wędzarni jej lokalne
+topici ESP32. Każda wędzarnia ma własny stan (migawki SmokehouseState) i własny
+UpdateCoalescer - wiadomości różnych wędzarni nie czekają na siebie.
+Moduł nie zależy od paho: publikacja to przekazany callback, więc routing
+da się testować i obciążać bez brokera (benchmarks/bench_multi_bridge.py).
+"""
+
+import json
+
+from cloud_payload import decode as decode_payload, device_from_topic
+from smokehouse_state import SmokehouseState, cloud_changes, start_frame, update_values
+from update_coalescer import CoalescerScheduler, UpdateCoalescer, DEFAULT_HEARTBEAT, DEFAULT_WINDOW
+
+# Domyślne topici lokalne; {device} zastępowane identyfikatorem wędzarni
+DEFAULT_TOPIC_START = "robot/{device}/frame/start"
+DEFAULT_TOPIC_UPDATE = "robot/{device}/frame/"
+DEFAULT_TOPIC_STATE = "robot/{device}/state"
+
+# Parametry procesu, jeśli rejestr ich nie podaje (jak w bridge.py)
+DEFAULT_PROCESS = {
+    "meat_name": "Boczek",
+    "target_temperature": 650,
+    "target_humidity": 75,
+    "smoking_duration": 20,
+}
+
+
+class Device:
+    """Wędzarnia z rejestru: topici, stan i coalescer UPDATE_FRAME"""
+
+    def __init__(self, device_id, sensors, topic_start, topic_update, topic_state, process, button_pin=None):
+        self.id = device_id
+        self.sensors = tuple(sensors)
+        self.topic_start = topic_start
+        self.topic_update = topic_update
+        self.topic_state = topic_state
+        self.button_pin = button_pin
+        self.state = SmokehouseState(**process)
+        self.coalescer = None
+        self.messages = 0
+
+
+def load_registry(path):
+    """
+    Wczytuje rejestr urządzeń. Zwraca listę Device; błędy konfiguracji
+    zgłaszane jako ValueError z nazwą wędzarni.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return parse_registry(data)
+
+
+def parse_registry(data):
+    entries = data.get("devices") if isinstance(data, dict) else None
+    if not isinstance(entries, list) or not entries:
+        raise ValueError("Rejestr musi zawierać niepustą listę 'devices'")
+
+    defaults = data.get("defaults", {})
+    devices = []
+    seen_sensors = {}
+    for entry in entries:
+        device_id = entry.get("id")
+        if not device_id:
+            raise ValueError(f"Wędzarnia bez 'id': {entry}")
+        sensors = entry.get("sensors", [device_id])
+        for sensor in sensors:
+            if sensor in seen_sensors:
+                raise ValueError(f"Czujnik '{sensor}' przypisany do '{seen_sensors[sensor]}' i '{device_id}'")
+            seen_sensors[sensor] = device_id
+
+        def topic(name, default):
+            template = entry.get(name, defaults.get(name, default))
+            return template.format(device=device_id)
+
+        process = dict(DEFAULT_PROCESS)
+        process.update({k: v for k, v in defaults.items() if k in DEFAULT_PROCESS})
+        process.update({k: v for k, v in entry.items() if k in DEFAULT_PROCESS})
+
+        devices.append(Device(
+            device_id, sensors,
+            topic_start=topic("topic_start", DEFAULT_TOPIC_START),
+            topic_update=topic("topic_update", DEFAULT_TOPIC_UPDATE),
+            topic_state=topic("topic_state", DEFAULT_TOPIC_STATE),
+            process=process,
+            button_pin=entry.get("button_pin"),
+        ))
+    return devices
+
+
+class DeviceRouter:
+    """
+    Kieruje wiadomości z chmury do stanów wędzarni i ramki do ich topiców.
+
+    ``publish(topic, payload)`` jest wywoływane z wątku wywołującego
+    ``handle_cloud`` (szybka ścieżka drzwi) albo z wątku harmonogramu okien.
+    START_FRAME idzie przez ``publish_start`` (domyślnie ``publish``) - bez
+    spoola, żeby START nie został odtworzony później, po ponownym połączeniu.
+    Słowniki routingu są budowane raz i potem tylko czytane, więc nie
+    potrzebują blokady; stan każdej wędzarni ma własną blokadę zapisu.
+    """
+
+    def __init__(self, devices, publish, window=DEFAULT_WINDOW, heartbeat=DEFAULT_HEARTBEAT, publish_start=None):
+        self.publish = publish
+        self.publish_start = publish_start or publish
+        self.devices = {d.id: d for d in devices}
+        self.by_sensor = {s: d for d in devices for s in d.sensors}
+        self.by_state_topic = {d.topic_state: d for d in devices}
+        self.scheduler = CoalescerScheduler()
+        self.unknown = 0
+        self.errors = 0
+
+        for device in devices:
+            device.coalescer = UpdateCoalescer(
+                lambda frame, since, topic=device.topic_update: self.publish(topic, frame),
+                window=window, heartbeat=heartbeat, scheduler=self.scheduler)
+
+    def start(self):
+        self.scheduler.start()
+
+    def stop(self):
+        for device in self.devices.values():
+            device.coalescer.stop()
+        self.scheduler.stop()
+
+    def state_topics(self):
+        return list(self.by_state_topic)
+
+    def handle_cloud(self, topic, payload):
+        """Wiadomość z AWS IoT (decoded/<czujnik>); zwraca Device albo None"""
+        device = self.by_sensor.get(device_from_topic(topic))
+        if device is None:
+            self.unknown += 1
+            return None
+        try:
+            message = decode_payload(payload)
+        except ValueError:
+            self.errors += 1
+            return None
+        if message.kind is None:
+            return device
+
+        changes = cloud_changes(message.fields)
+        if changes:
+            _, snap = device.state.update(**changes)
+            device.messages += 1
+            device.coalescer.submit(*update_values(snap))
+        return device
+
+    def handle_local(self, topic, payload):
+        """Stan maszyny stanów ESP32; zwraca (Device, stary stan) albo None"""
+        device = self.by_state_topic.get(topic)
+        if device is None:
+            return None
+        esp_state = payload.decode('utf-8') if isinstance(payload, bytes) else payload
+        old, _ = device.state.update(esp_state=esp_state)
+        return device, old.esp_state
+
+    def start_smoking(self, device_id):
+        """Wysyła START_FRAME do wskazanej wędzarni; zwraca ramkę albo None, gdy nie poszła"""
+        device = self.devices[device_id]
+        frame = start_frame(device.state.snapshot)
+        if self.publish_start(device.topic_start, frame) is False:
+            return None
+        return frame
+
+    def stats(self):
+        totals = {"devices": len(self.devices), "unknown": self.unknown, "errors": self.errors}
+        for device in self.devices.values():
+            for key, value in device.coalescer.stats().items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
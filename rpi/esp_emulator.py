@@ -0,0 +1,579 @@
+#!/usr/bin/env python3
+"""
+Smart Smokehouse - emulator ESP32 (software-in-the-loop), także jako flota
+
+Odtwarza logikę ESP_CODE: walidację ramek z mqtt_functions.cpp (callback),
+maszynę stanów TaskSimulation i regulator PI TaskTempHumid z symulation.cpp.
+Emulator subskrybuje ``<topic_update>#`` (jak ``robot/frame/#`` w firmware),
+dekoduje START_FRAME/UPDATE_FRAME (frame_codec.py) i publikuje nazwę stanu
+na ``topic_state`` - przy każdym wejściu w stan, tak jak TaskMQTT.
+
+Różnice względem firmware:
+  - przejścia liczone są od razu po ramce (zdarzeniowo), a nie w pętlach
+    co 50/200/500 ms - emulator nie dokłada opóźnień tasków FreeRTOS;
+  - kontrola zakresu temperatury/wilgotności działa dopiero po pierwszym
+    pomiarze (firmware porównuje z wartością startową 0 i zaraz po starcie
+    przechodzi do ERROR);
+  - wyjście regulatora (PWM grzałki, zawór wody) jest tylko zapamiętywane.
+
+Rdzeń (EspStateMachine) nie zależy od paho ani asyncio: zegar to obiekt
+z ``now()``/``call_later()`` (sim_clock.py albo pętla asyncio), a publikacja
+stanu to przekazany callback. Flota to setki emulatorów jako zadania asyncio
+w jednym procesie (mqtt_asyncio.py), np. przeciw lokalnemu mosquitto:
+
+    python3 esp_emulator.py --count 200 --write-registry /tmp/fleet.json
+    SMOKEHOUSE_DEVICES=/tmp/fleet.json python3 bridge_multi.py
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from enum import IntEnum
+
+from device_router import DEFAULT_PROCESS, DEFAULT_TOPIC_START, DEFAULT_TOPIC_STATE, DEFAULT_TOPIC_UPDATE
+from frame_codec import COMMAND_CONFIRM_TAKE_OUT, FrameType, decode_start_frame, decode_update_frame
+from smokehouse_log import setup_logging
+
+# Topici pojedynczego ESP32 z bridge.py / python_cloud_simulator.py
+LEGACY_TOPIC_START = "robot/frame/start"
+LEGACY_TOPIC_UPDATE = "robot/frame/"
+LEGACY_TOPIC_STATE = "robot/state"
+
+# Zakresy z globals.hpp
+TEMP_MIN_ALLOWED = 400      # °C*10
+TEMP_MAX_ALLOWED = 1200     # °C*10
+HUMID_MIN_ALLOWED = 0
+HUMID_MAX_ALLOWED = 100
+DOOR_CLOSED_VALUE = 0
+DOOR_OPEN_VALUE = 1
+MAX_TIME_OF_SMOKING = 24 * 60 * 60
+
+# Próg COOLDOWN -> READY_TO_TAKE_OUT (TaskSimulation)
+COOLDOWN_TEMPERATURE = 400  # °C*10
+
+STATS_INTERVAL = 10  # co ile sekund flota loguje statystyki
+
+log = logging.getLogger("esp")
+
+
+class MachineState(IntEnum):
+    """enum state_machine z globals.hpp; nazwy jak getStateName()"""
+    IDLE = 0
+    HEATING = 1
+    HUMIDIFYING = 2
+    COOKING = 3
+    FINISHED_COOKING = 4
+    COOLDOWN = 5
+    READY_TO_TAKE_OUT = 6
+    WAIT_FOR_TAKE_OUT_CONFIRMATION = 7
+    ERROR = 8
+
+
+class TempCommand(IntEnum):
+    HEATING = 0
+    HOLDING = 1
+    COOLING = 2
+
+
+class HumidCommand(IntEnum):
+    ON = 0
+    HOLD = 1
+    OFF = 2
+
+
+# Stany, w których otwarcie drzwi przerywa proces ([BŁĄD 2] w TaskSimulation)
+ACTIVE_STATES = frozenset((MachineState.HEATING, MachineState.HUMIDIFYING,
+                           MachineState.COOKING, MachineState.COOLDOWN))
+
+
+def _constrain(value, low, high):
+    return low if value < low else high if value > high else value
+
+
+# ============================================================================
+# Walidacja ramek (callback w mqtt_functions.cpp)
+# ============================================================================
+
+def _temperature_ok(value):
+    return TEMP_MIN_ALLOWED <= value <= TEMP_MAX_ALLOWED
+
+
+def _door_ok(value):
+    return value in (DOOR_CLOSED_VALUE, DOOR_OPEN_VALUE)
+
+
+def validate_start(frame):
+    """Lista powodów odrzucenia START_FRAME (pusta - ramka poprawna)"""
+    errors = []
+    if frame.target_humidity > HUMID_MAX_ALLOWED:
+        errors.append("target_humidity out of range")
+    if not _temperature_ok(frame.target_temperature):
+        errors.append("target_temperature out of range")
+    if frame.current_humidity > HUMID_MAX_ALLOWED:
+        errors.append("current_humidity out of range")
+    if not _temperature_ok(frame.current_temperature):
+        errors.append("current_temperature out of range")
+    if not _door_ok(frame.door_status):
+        errors.append("door_status invalid value")
+    if frame.time_of_smoking == 0 or frame.time_of_smoking > MAX_TIME_OF_SMOKING:
+        errors.append("time_of_smoking out of range")
+    return errors
+
+
+def validate_update(frame):
+    """Lista powodów odrzucenia UPDATE_FRAME (pusta - ramka poprawna)"""
+    errors = []
+    if frame.current_humidity > HUMID_MAX_ALLOWED:
+        errors.append("current_humidity out of range")
+    if not _temperature_ok(frame.current_temperature):
+        errors.append("current_temperature out of range")
+    if not _door_ok(frame.door_status):
+        errors.append("door_status invalid value")
+    return errors
+
+
+# ============================================================================
+# Regulator PI (TaskTempHumid)
+# ============================================================================
+
+class PIRegulator:
+    """Regulator PI grzałki i sterowanie zaworem wody - parametry jak w firmware"""
+
+    KP_HEATING = 2.5
+    KI_HEATING = 0.05
+    KP_HOLDING = 1.5
+    KI_HOLDING = 0.03
+    HOLDING_OFFSET = 150
+    INTEGRAL_MAX = 100.0
+
+    def __init__(self, now):
+        self.integral = 0.0
+        self.last_update = now
+        self.duty = 0
+        self.water = False
+
+    def update(self, now, temp_cmd, humid_cmd, target_temp, target_humid, temperature, humidity):
+        """
+        Jeden krok sterowania. Zwraca (temperatura osiągnięta, wilgotność
+        osiągnięta) - odpowiedniki sem_temp_ready i sem_humid_ready.
+        """
+        temp_ready = False
+        if temp_cmd == TempCommand.HEATING:
+            error = target_temp - temperature
+            if temperature < target_temp:
+                output = self.KP_HEATING * error + self._integrate(now, self.KI_HEATING * error)
+                self.duty = _constrain(int(output), 80, 255)  # Minimum 80 dla stabilności
+            else:
+                self.duty = 0
+                self.integral = 0.0
+                temp_ready = True
+        elif temp_cmd == TempCommand.HOLDING:
+            error = target_temp - temperature
+            output = self.KP_HOLDING * error + self._integrate(now, self.KI_HOLDING * error)
+            self.duty = _constrain(int(output + self.HOLDING_OFFSET), 0, 255)
+        else:
+            self.duty = 0
+            self.integral = 0.0
+
+        humid_ready = False
+        if humid_cmd == HumidCommand.OFF:
+            self.water = False
+        else:
+            self.water = humidity < target_humid
+            humid_ready = humid_cmd == HumidCommand.ON and not self.water
+        return temp_ready, humid_ready
+
+    def _integrate(self, now, ki_error):
+        dt = now - self.last_update
+        self.last_update = now
+        self.integral = _constrain(self.integral + ki_error * dt, -self.INTEGRAL_MAX, self.INTEGRAL_MAX)
+        return self.integral
+
+
+# ============================================================================
+# Maszyna stanów (TaskSimulation)
+# ============================================================================
+
+class EspStateMachine:
+    """
+    Jeden emulowany ESP32. ``handle_frame(payload)`` przyjmuje surową ramkę
+    z MQTT; ``publish_state(name)`` jest wołane przy każdym wejściu w stan.
+    """
+
+    def __init__(self, device_id, clock, publish_state):
+        self.id = device_id
+        self.clock = clock
+        self.publish_state = publish_state
+        self.state = None
+        self.temp_cmd = TempCommand.COOLING
+        self.humid_cmd = HumidCommand.OFF
+        self.target_temp = 0
+        self.target_humid = 0
+        self.time_of_smoking = 0
+        self.meat_name = ""
+        # Ostatni pomiar z UPDATE_FRAME (shared_current_* w firmware); None - jeszcze brak
+        self.temperature = None
+        self.humidity = None
+        self.door = DOOR_CLOSED_VALUE
+        self.regulator = PIRegulator(clock.now())
+        self._cooking_timer = None
+
+        self.frames = {FrameType.START_FRAME: 0, FrameType.UPDATE_FRAME: 0}
+        self.rejected = 0
+        self.transitions = 0
+        self.errors = 0
+        self.cycles = 0
+
+    def start(self):
+        """Start firmware: stan IDLE"""
+        self._enter(MachineState.IDLE)
+
+    def handle_frame(self, payload):
+        if not payload:
+            self.rejected += 1
+            return
+        frame_type = payload[0]
+        try:
+            if frame_type == FrameType.START_FRAME:
+                frame = decode_start_frame(payload)
+                errors = validate_start(frame)
+            elif frame_type == FrameType.UPDATE_FRAME:
+                frame = decode_update_frame(payload)
+                errors = validate_update(frame)
+            else:
+                raise ValueError(f"Invalid frame type received: {frame_type}")
+        except ValueError as e:
+            self.rejected += 1
+            log.debug("[%s] Odrzucono ramkę: %s", self.id, e)
+            return
+        if errors:
+            self.rejected += 1
+            log.debug("[%s] %s validation failed: %s", self.id, FrameType(frame_type).name, ", ".join(errors))
+            return
+
+        self.frames[frame_type] += 1
+        if frame_type == FrameType.START_FRAME:
+            self._on_start(frame)
+        else:
+            self._on_update(frame)
+
+    # ------------------------------------------------------------------
+
+    def _on_start(self, frame):
+        if self.state == MachineState.IDLE:
+            self.target_temp = frame.target_temperature
+            self.target_humid = frame.target_humidity
+            self.time_of_smoking = frame.time_of_smoking
+            self.meat_name = frame.meat_name
+            self._command(TempCommand.HEATING, HumidCommand.OFF)
+            self._enter(MachineState.HEATING)
+            # Pomiar mógł już przekroczyć zadaną temperaturę
+            self._control()
+        elif self.state == MachineState.WAIT_FOR_TAKE_OUT_CONFIRMATION:
+            if frame.command == COMMAND_CONFIRM_TAKE_OUT:
+                self.cycles += 1
+                self._enter(MachineState.IDLE)
+
+    def _on_update(self, frame):
+        self.temperature = frame.current_temperature
+        self.humidity = frame.current_humidity
+        self.door = frame.door_status
+        if self._check_errors():
+            return
+        self._control()
+        if self.state == MachineState.COOLDOWN and self.temperature <= COOLDOWN_TEMPERATURE:
+            self._enter(MachineState.READY_TO_TAKE_OUT)
+            self._enter(MachineState.WAIT_FOR_TAKE_OUT_CONFIRMATION)
+
+    def _control(self):
+        if self.temperature is None:
+            return
+        temp_ready, humid_ready = self.regulator.update(
+            self.clock.now(), self.temp_cmd, self.humid_cmd, self.target_temp, self.target_humid,
+            self.temperature, self.humidity)
+        if self.state == MachineState.HEATING and temp_ready:
+            self._command(TempCommand.HOLDING, HumidCommand.ON)
+            self._enter(MachineState.HUMIDIFYING)
+            temp_ready, humid_ready = self.regulator.update(
+                self.clock.now(), self.temp_cmd, self.humid_cmd, self.target_temp, self.target_humid,
+                self.temperature, self.humidity)
+        if self.state == MachineState.HUMIDIFYING and humid_ready:
+            self._command(TempCommand.HOLDING, HumidCommand.HOLD)
+            self._enter(MachineState.COOKING)
+            self._cooking_timer = self.clock.call_later(self.time_of_smoking, self._cooking_done)
+
+    def _cooking_done(self):
+        self._cooking_timer = None
+        if self.state != MachineState.COOKING:
+            return
+        self._command(TempCommand.COOLING, HumidCommand.OFF)
+        self._enter(MachineState.FINISHED_COOKING)
+        self._enter(MachineState.COOLDOWN)
+        # COOLDOWN sprawdza ostatni pomiar (shared_current_temperature)
+        if self.temperature is not None and self.temperature <= COOLDOWN_TEMPERATURE:
+            self._enter(MachineState.READY_TO_TAKE_OUT)
+            self._enter(MachineState.WAIT_FOR_TAKE_OUT_CONFIRMATION)
+
+    def _check_errors(self):
+        if self.state == MachineState.ERROR:
+            return True
+        reason = None
+        if not (TEMP_MIN_ALLOWED <= self.temperature <= TEMP_MAX_ALLOWED
+                and HUMID_MIN_ALLOWED <= self.humidity <= HUMID_MAX_ALLOWED):
+            reason = "temp/humid poza zakresem"
+        elif self.state in ACTIVE_STATES and self.door == DOOR_OPEN_VALUE:
+            reason = "drzwi otwarte w trakcie procesu"
+        if reason is None:
+            return False
+        log.warning("[%s] ERROR: %s, wygaszam proces", self.id, reason, extra={"device": self.id})
+        self.errors += 1
+        self._command(TempCommand.COOLING, HumidCommand.OFF)
+        self.regulator.update(self.clock.now(), self.temp_cmd, self.humid_cmd, 0, 0,
+                              self.temperature, self.humidity)
+        if self._cooking_timer is not None:
+            self._cooking_timer.cancel()
+            self._cooking_timer = None
+        self._enter(MachineState.ERROR)
+        return True
+
+    def _command(self, temp_cmd, humid_cmd):
+        self.temp_cmd = temp_cmd
+        self.humid_cmd = humid_cmd
+
+    def _enter(self, state):
+        self.state = state
+        self.transitions += 1
+        log.debug("[%s] Stan: %s", self.id, state.name)
+        self.publish_state(state.name)
+
+    def stats(self):
+        return {
+            "state": self.state.name if self.state is not None else None,
+            "start_frames": self.frames[FrameType.START_FRAME],
+            "update_frames": self.frames[FrameType.UPDATE_FRAME],
+            "rejected": self.rejected,
+            "transitions": self.transitions,
+            "errors": self.errors,
+            "cycles": self.cycles,
+            "duty": self.regulator.duty,
+            "water": self.regulator.water,
+        }
+
+
+# ============================================================================
+# Flota (asyncio + paho)
+# ============================================================================
+
+class LoopClock:
+    """Zegar pętli asyncio w interfejsie sim_clock (now/call_later)"""
+
+    virtual = False
+
+    def __init__(self, loop):
+        self.loop = loop
+
+    def now(self):
+        return self.loop.time()
+
+    def call_later(self, delay, callback, *args):
+        return self.loop.call_later(delay, callback, *args)
+
+
+class EmulatedDevice:
+    """Topici jednego emulowanego ESP32 i jego maszyna stanów"""
+
+    def __init__(self, device_id, topic_start, topic_update, topic_state):
+        self.id = device_id
+        self.topic_start = topic_start
+        self.topic_update = topic_update
+        self.topic_state = topic_state
+        self.machine = None
+
+    def subscriptions(self):
+        # Jak "robot/frame/#" w firmware; START_FRAME spoza tego drzewa osobno
+        topics = [self.topic_update + "#"]
+        if not self.topic_start.startswith(self.topic_update):
+            topics.append(self.topic_start)
+        return topics
+
+
+def fleet_devices(count, prefix="esp"):
+    """Wygenerowana flota: identyfikatory ``<prefix>-001``... i topici jak w device_router"""
+    devices = []
+    for i in range(1, count + 1):
+        device_id = f"{prefix}-{i:03d}"
+        devices.append(EmulatedDevice(device_id,
+                                      DEFAULT_TOPIC_START.format(device=device_id),
+                                      DEFAULT_TOPIC_UPDATE.format(device=device_id),
+                                      DEFAULT_TOPIC_STATE.format(device=device_id)))
+    return devices
+
+
+def registry_devices(path):
+    """Flota z rejestru bridge_multi (devices.json)"""
+    from device_router import load_registry
+    return [EmulatedDevice(d.id, d.topic_start, d.topic_update, d.topic_state) for d in load_registry(path)]
+
+
+def write_registry(devices, path):
+    """Zapisuje rejestr dla bridge_multi.py z czujnikami ``<id>-klimat``/``<id>-drzwi``"""
+    data = {
+        "defaults": dict(DEFAULT_PROCESS, topic_start=DEFAULT_TOPIC_START, topic_update=DEFAULT_TOPIC_UPDATE,
+                         topic_state=DEFAULT_TOPIC_STATE),
+        "devices": [{"id": d.id, "sensors": [f"{d.id}-klimat", f"{d.id}-drzwi"]} for d in devices],
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+
+
+class Fleet:
+    """
+    Emulatory w jednej pętli asyncio. Domyślnie każdy ESP32 ma własne
+    połączenie z brokerem (jak prawdziwe urządzenia); ``shared=True`` -
+    jedno połączenie dla całej floty (mniej gniazd przy tysiącach ESP).
+    """
+
+    def __init__(self, devices, host, port, shared=False, client_prefix="esp-emulator"):
+        self.devices = devices
+        self.host = host
+        self.port = port
+        self.shared = shared
+        self.client_prefix = client_prefix
+        self.clients = []
+        self._by_topic = {}
+        self._by_prefix = {}
+        self.started = None
+
+    async def start(self):
+        # Import tutaj - rdzeń emulatora działa bez paho (testy na sim_clock)
+        from paho.mqtt import client as mqtt
+        from mqtt_asyncio import AsyncMQTTClient
+
+        loop = asyncio.get_running_loop()
+        clock = LoopClock(loop)
+        self.started = time.monotonic()
+
+        groups = [self.devices] if self.shared else [[d] for d in self.devices]
+        for i, group in enumerate(groups):
+            client_id = self.client_prefix if self.shared else f"{self.client_prefix}-{group[0].id}"
+            client = mqtt.Client(client_id=client_id)
+            for device in group:
+                device.machine = EspStateMachine(
+                    device.id, clock,
+                    lambda name, topic=device.topic_state, c=client: c.publish(topic, name, qos=0))
+                self._by_topic[device.topic_start] = device
+                self._by_prefix[device.topic_update] = device
+            client.on_connect = self._on_connect_for(group)
+            client.on_message = self._on_message
+            wrapper = AsyncMQTTClient(client, self.host, self.port, name=client_id)
+            self.clients.append(wrapper)
+
+        await asyncio.gather(*(c.connect() for c in self.clients))
+        await asyncio.gather(*(c.connected.wait() for c in self.clients))
+        log.info("Flota: %d emulatorów ESP32, %d połączeń z %s:%s",
+                 len(self.devices), len(self.clients), self.host, self.port)
+
+    def _on_connect_for(self, group):
+        def on_connect(client, userdata, flags, rc):
+            if rc != 0:
+                log.error("Błąd połączenia emulatora z brokerem, rc=%s", rc)
+                return
+            client.subscribe([(topic, 0) for device in group for topic in device.subscriptions()])
+            for device in group:
+                # Po (ponownym) połączeniu firmware zaczyna od IDLE
+                if device.machine.state is None:
+                    device.machine.start()
+        return on_connect
+
+    def _on_message(self, client, userdata, msg):
+        device = self._by_topic.get(msg.topic)
+        if device is None:
+            # topic_update + podtopic (firmware subskrybuje robot/frame/#)
+            device = self._by_prefix.get(msg.topic[:msg.topic.rfind("/") + 1])
+        if device is not None:
+            device.machine.handle_frame(msg.payload)
+
+    async def stop(self):
+        for client in self.clients:
+            await client.disconnect()
+
+    def stats(self):
+        totals = {"start_frames": 0, "update_frames": 0, "rejected": 0, "transitions": 0,
+                  "errors": 0, "cycles": 0}
+        states = {}
+        for device in self.devices:
+            if device.machine is None:
+                continue
+            stats = device.machine.stats()
+            for key in totals:
+                totals[key] += stats[key]
+            states[stats["state"]] = states.get(stats["state"], 0) + 1
+        totals["states"] = states
+        totals["elapsed"] = time.monotonic() - self.started if self.started else 0.0
+        return totals
+
+
+def log_fleet_stats(fleet):
+    stats = fleet.stats()
+    elapsed = max(stats["elapsed"], 1e-9)
+    frames = stats["start_frames"] + stats["update_frames"]
+    log.info("Flota: ramki=%d (%.0f/s), odrzucone=%d, przejścia=%d, błędy=%d, cykle=%d, stany=%s",
+             frames, frames / elapsed, stats["rejected"], stats["transitions"], stats["errors"],
+             stats["cycles"], stats["states"], extra={k: v for k, v in stats.items() if k != "states"})
+
+
+async def run_fleet(fleet, duration=None):
+    await fleet.start()
+    try:
+        deadline = None if duration is None else time.monotonic() + duration
+        while deadline is None or time.monotonic() < deadline:
+            interval = STATS_INTERVAL if deadline is None else min(STATS_INTERVAL, deadline - time.monotonic())
+            await asyncio.sleep(max(0.0, interval))
+            log_fleet_stats(fleet)
+    finally:
+        await fleet.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--broker", default="127.0.0.1", help="Adres lokalnego brokera MQTT")
+    parser.add_argument("--port", type=int, default=1883, help="Port brokera")
+    parser.add_argument("--count", type=int, default=1, help="Liczba emulatorów (ignorowane przy --registry)")
+    parser.add_argument("--registry", help="Rejestr urządzeń bridge_multi (devices.json) zamiast --count")
+    parser.add_argument("--legacy-topics", action="store_true",
+                        help="Jeden ESP32 na topicach bridge.py (robot/frame/..., robot/state)")
+    parser.add_argument("--shared-connection", action="store_true",
+                        help="Jedno połączenie MQTT dla całej floty")
+    parser.add_argument("--write-registry", metavar="PLIK",
+                        help="Zapisz rejestr floty dla bridge_multi.py i zakończ")
+    parser.add_argument("--duration", type=float, help="Czas działania w sekundach (domyślnie do Ctrl+C)")
+    args = parser.parse_args()
+
+    if args.legacy_topics:
+        devices = [EmulatedDevice("esp32", LEGACY_TOPIC_START, LEGACY_TOPIC_UPDATE, LEGACY_TOPIC_STATE)]
+    elif args.registry:
+        try:
+            devices = registry_devices(args.registry)
+        except (OSError, ValueError) as e:
+            parser.error(f"Rejestr {args.registry}: {e}")
+    else:
+        devices = fleet_devices(args.count)
+
+    if args.write_registry:
+        write_registry(devices, args.write_registry)
+        print(f"Zapisano rejestr {len(devices)} wędzarni: {args.write_registry}")
+        return
+
+    setup_logging()
+    fleet = Fleet(devices, args.broker, args.port, shared=args.shared_connection)
+    try:
+        asyncio.run(run_fleet(fleet, args.duration))
+    except KeyboardInterrupt:
+        log.info("Zamykanie floty...")
+    log_fleet_stats(fleet)
+
+
+if __name__ == "__main__":
+    main()
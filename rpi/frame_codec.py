@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Smart Smokehouse - kodek ramek binarnych ESP32
+Jedno źródło układu START_FRAME/UPDATE_FRAME (zgodnego z ESP_CODE/globals.hpp)
+dla bridge.py i python_cloud_simulator.py. Układy to prekompilowane
+struct.Struct, więc kodowanie ramki to jedno wywołanie pack/pack_into.
+"""
+
+import struct
+from collections import namedtuple
+from enum import IntEnum
+
+
+class FrameType(IntEnum):
+    NO_NEW_FRAME = 0
+    START_FRAME = 1
+    UPDATE_FRAME = 2
+
+
+MEAT_NAME_LENGTH = 30
+
+# Komenda potwierdzenia wyjęcia mięsa (START_FRAME z command=0xAA)
+COMMAND_START = 1
+COMMAND_CONFIRM_TAKE_OUT = 0xAA
+
+# START_FRAME positions
+START_FRAME_COMMAND_VALUE_PLACE = 1
+START_FRAME_MEAT_NAME_PLACE = START_FRAME_COMMAND_VALUE_PLACE + 1
+START_FRAME_TARGET_HUMIDITY_PLACE = START_FRAME_MEAT_NAME_PLACE + MEAT_NAME_LENGTH
+START_FRAME_TARGET_TEMPERATURE_PLACE = START_FRAME_TARGET_HUMIDITY_PLACE + 1
+START_FRAME_CURRENT_HUMIDITY_PLACE = START_FRAME_TARGET_TEMPERATURE_PLACE + 2
+START_FRAME_CURRENT_TEMPERATURE_PLACE = START_FRAME_CURRENT_HUMIDITY_PLACE + 1
+START_FRAME_DOOR_STATUS_PLACE = START_FRAME_CURRENT_TEMPERATURE_PLACE + 2
+START_FRAME_TIME_OF_SMOKING_PLACE = START_FRAME_DOOR_STATUS_PLACE + 1
+
+# UPDATE_FRAME positions
+UPDATE_FRAME_CURRENT_HUMIDITY_PLACE = 1
+UPDATE_FRAME_CURRENT_TEMPERATURE_PLACE = UPDATE_FRAME_CURRENT_HUMIDITY_PLACE + 1
+UPDATE_FRAME_DOOR_STATUS_PLACE = UPDATE_FRAME_CURRENT_TEMPERATURE_PLACE + 2
+
+# type, command, meat_name[30], target_hum u8, target_temp i16, cur_hum u8, cur_temp i16, door u8, time u16
+START_STRUCT = struct.Struct(f"<BB{MEAT_NAME_LENGTH}sBhBhBH")
+# type, cur_hum u8, cur_temp i16, door u8
+UPDATE_STRUCT = struct.Struct("<BBhB")
+
+START_FRAME_LENGTH = START_STRUCT.size    # START_FRAME_MIN_LENGTH w globals.hpp
+UPDATE_FRAME_LENGTH = UPDATE_STRUCT.size  # UPDATE_MIN_FRAME_LENGTH w globals.hpp
+
+assert START_FRAME_LENGTH == START_FRAME_TIME_OF_SMOKING_PLACE + 2
+assert UPDATE_FRAME_LENGTH == UPDATE_FRAME_DOOR_STATUS_PLACE + 1
+
+StartFrame = namedtuple("StartFrame", [
+    "command", "meat_name", "target_humidity", "target_temperature",
+    "current_humidity", "current_temperature", "door_status", "time_of_smoking",
+])
+UpdateFrame = namedtuple("UpdateFrame", ["current_humidity", "current_temperature", "door_status"])
+
+
+def _meat_bytes(meat_name):
+    # Format "30s" sam dopełnia zerami i obcina nadmiar
+    return meat_name.encode('utf-8') if isinstance(meat_name, str) else meat_name
+
+
+# ============================================================================
+# Kodowanie
+# ============================================================================
+
+def pack_start_into(buffer, offset, command, meat_name, target_humidity, target_temperature,
+                    current_humidity, current_temperature, door_status, time_of_smoking):
+    """Zapisuje START_FRAME do istniejącego bufora (bez alokacji)"""
+    START_STRUCT.pack_into(
+        buffer, offset, FrameType.START_FRAME, command & 0xFF, _meat_bytes(meat_name),
+        target_humidity & 0xFF, target_temperature, current_humidity & 0xFF,
+        current_temperature, door_status & 0xFF, time_of_smoking)
+
+
+def pack_update_into(buffer, offset, current_humidity, current_temperature, door_status):
+    """Zapisuje UPDATE_FRAME do istniejącego bufora (bez alokacji)"""
+    UPDATE_STRUCT.pack_into(
+        buffer, offset, FrameType.UPDATE_FRAME, current_humidity & 0xFF,
+        current_temperature, door_status & 0xFF)
+
+
+def create_start_frame(command, meat_name, target_humidity, target_temperature,
+                       current_humidity, current_temperature, door_status, time_of_smoking):
+    """Tworzy START_FRAME dla ESP32"""
+    # Zwraca niezmienne bytes - paho trzyma referencję do payloadu
+    # do retransmisji QoS 1, więc publikowany bufor nie może być nadpisywany
+    return START_STRUCT.pack(
+        FrameType.START_FRAME, command & 0xFF, _meat_bytes(meat_name),
+        target_humidity & 0xFF, target_temperature, current_humidity & 0xFF,
+        current_temperature, door_status & 0xFF, time_of_smoking)
+
+
+def create_update_frame(current_humidity, current_temperature, door_status):
+    """Tworzy UPDATE_FRAME dla ESP32"""
+    return UPDATE_STRUCT.pack(
+        FrameType.UPDATE_FRAME, current_humidity & 0xFF, current_temperature, door_status & 0xFF)
+
+
+class FrameBuffer:
+    """
+    Wielokrotnie używany bufor na wiele ramek jednego typu (np. serie ramek
+    w benchmarkach lub zapis do pliku). Ramki są wpisywane przez pack_into.
+    """
+
+    def __init__(self, frame_struct, capacity):
+        self.struct = frame_struct
+        self.capacity = capacity
+        self.buffer = bytearray(frame_struct.size * capacity)
+        self.count = 0
+
+    def clear(self):
+        self.count = 0
+
+    def append_start(self, *fields):
+        pack_start_into(self.buffer, self._next_offset(), *fields)
+
+    def append_update(self, *fields):
+        pack_update_into(self.buffer, self._next_offset(), *fields)
+
+    def _next_offset(self):
+        if self.count >= self.capacity:
+            raise IndexError("FrameBuffer pełny")
+        offset = self.count * self.struct.size
+        self.count += 1
+        return offset
+
+    def view(self):
+        return memoryview(self.buffer)[:self.count * self.struct.size]
+
+
+# ============================================================================
+# Dekodowanie
+# ============================================================================
+
+def decode_start_frame(data, offset=0):
+    """Dekoduje START_FRAME do StartFrame"""
+    if len(data) - offset < START_FRAME_LENGTH:
+        raise ValueError(f"START_FRAME za krótka: {len(data) - offset} < {START_FRAME_LENGTH}")
+    (frame_type, command, meat, target_humidity, target_temperature, current_humidity,
+     current_temperature, door_status, time_of_smoking) = START_STRUCT.unpack_from(data, offset)
+    if frame_type != FrameType.START_FRAME:
+        raise ValueError(f"Oczekiwano START_FRAME, typ ramki: {frame_type}")
+    meat_name = meat.split(b"\x00", 1)[0].decode('utf-8', errors='ignore')
+    return StartFrame(command, meat_name, target_humidity, target_temperature,
+                      current_humidity, current_temperature, door_status, time_of_smoking)
+
+
+def decode_update_frame(data, offset=0):
+    """Dekoduje UPDATE_FRAME do UpdateFrame"""
+    if len(data) - offset < UPDATE_FRAME_LENGTH:
+        raise ValueError(f"UPDATE_FRAME za krótka: {len(data) - offset} < {UPDATE_FRAME_LENGTH}")
+    frame_type, current_humidity, current_temperature, door_status = UPDATE_STRUCT.unpack_from(data, offset)
+    if frame_type != FrameType.UPDATE_FRAME:
+        raise ValueError(f"Oczekiwano UPDATE_FRAME, typ ramki: {frame_type}")
+    return UpdateFrame(current_humidity, current_temperature, door_status)
+
+
+_DECODERS = {
+    FrameType.START_FRAME: decode_start_frame,
+    FrameType.UPDATE_FRAME: decode_update_frame,
+}
+
+
+def decode_frame(data, offset=0):
+    """Dekoduje ramkę dowolnego typu na podstawie pierwszego bajtu"""
+    if len(data) <= offset:
+        raise ValueError("Pusta ramka")
+    decoder = _DECODERS.get(data[offset])
+    if decoder is None:
+        raise ValueError(f"Nieznany typ ramki: {data[offset]}")
+    return decoder(data, offset)
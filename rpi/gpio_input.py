@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Smart Smokehouse - obsługa przycisku na przerwaniach (zboczach GPIO)
+Backend RPi.GPIO używa add_event_detect, a FakeGPIOBackend jest czysto
+programowy - pozwala mierzyć opóźnienie START_FRAME i zużycie CPU
+na zwykłym Linuksie, bez Raspberry Pi.
+"""
+
+import sys
+import threading
+import time
+
+try:
+    import RPi.GPIO as GPIO
+    GPIO_AVAILABLE = True
+except ImportError:
+    GPIO_AVAILABLE = False
+
+# Przycisk zwiera pin do GND (pull-up), więc naciśnięty = stan niski
+LEVEL_PRESSED = 0
+LEVEL_RELEASED = 1
+
+DEFAULT_DEBOUNCE = 0.05  # sekundy
+
+
+class RPiGPIOBackend:
+    """Prawdziwe GPIO Raspberry Pi (zbocza obsługiwane w wątku RPi.GPIO)"""
+
+    name = "RPi.GPIO"
+
+    def setup(self, pin):
+        GPIO.setwarnings(False)
+        GPIO.setmode(GPIO.BCM)
+        GPIO.setup(pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+
+    def read(self, pin):
+        return GPIO.input(pin)
+
+    def add_edge_callback(self, pin, callback):
+        # Oba zbocza - puszczenie przycisku też jest potrzebne do debounce
+        GPIO.add_event_detect(pin, GPIO.BOTH, callback=callback)
+
+    def cleanup(self):
+        GPIO.cleanup()
+
+
+class FakeGPIOBackend:
+    """
+    Programowe GPIO do testów i benchmarków. ``press``/``release`` zmieniają
+    poziom pinu i wywołują callbacki zboczy (synchronicznie albo, z
+    ``threaded=True``, w osobnym wątku - jak RPi.GPIO).
+    """
+
+    name = "fake"
+
+    def __init__(self, threaded=False):
+        self.threaded = threaded
+        self.levels = {}
+        self.callbacks = {}
+        self.last_edge_time = {}
+
+    def setup(self, pin):
+        self.levels[pin] = LEVEL_RELEASED
+
+    def read(self, pin):
+        return self.levels.get(pin, LEVEL_RELEASED)
+
+    def add_edge_callback(self, pin, callback):
+        self.callbacks.setdefault(pin, []).append(callback)
+
+    def set_level(self, pin, level):
+        if self.levels.get(pin, LEVEL_RELEASED) == level:
+            return
+        self.levels[pin] = level
+        self.last_edge_time[pin] = time.perf_counter()
+        for callback in self.callbacks.get(pin, ()):
+            if self.threaded:
+                threading.Thread(target=callback, args=(pin,), daemon=True).start()
+            else:
+                callback(pin)
+
+    def press(self, pin):
+        self.set_level(pin, LEVEL_PRESSED)
+
+    def release(self, pin):
+        self.set_level(pin, LEVEL_RELEASED)
+
+    def bounce(self, pin, edges=6, interval=0.001):
+        """Symuluje drgania styków: seria szybkich zmian kończąca się naciśnięciem"""
+        for i in range(edges):
+            self.set_level(pin, LEVEL_PRESSED if i % 2 == 0 else LEVEL_RELEASED)
+            time.sleep(interval)
+        self.press(pin)
+
+    def attach_stdin(self, pin):
+        """Każda linia na stdin (Enter) to krótkie naciśnięcie przycisku"""
+        def reader():
+            for _ in sys.stdin:
+                self.press(pin)
+                time.sleep(0.1)
+                self.release(pin)
+
+        threading.Thread(target=reader, name="fake-gpio-stdin", daemon=True).start()
+
+    def cleanup(self):
+        self.callbacks.clear()
+
+
+def create_backend(fake=False):
+    """RPi.GPIO, jeśli dostępne, w przeciwnym razie backend programowy"""
+    if GPIO_AVAILABLE and not fake:
+        return RPiGPIOBackend()
+    return FakeGPIOBackend()
+
+
+class Button:
+    """
+    Przycisk z programowym debounce na zboczach.
+
+    Zbocze opadające tylko planuje sprawdzenie pinu po ``debounce``
+    sekundach; naciśnięcie jest zgłaszane, jeśli pin nadal jest w stanie
+    niskim (pojedyncza szpilka zakłóceń nie uruchamia wędzenia). Kolejne
+    naciśnięcie jest możliwe dopiero po puszczeniu przycisku.
+    """
+
+    def __init__(self, backend, pin, on_press, debounce=DEFAULT_DEBOUNCE):
+        self.backend = backend
+        self.pin = pin
+        self.on_press = on_press
+        self.debounce = debounce
+        self.presses = 0
+        self.ignored_edges = 0
+        self.glitches = 0
+        self._pressed = False
+        self._pending = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.backend.setup(self.pin)
+        self.backend.add_edge_callback(self.pin, self._on_edge)
+
+    def _on_edge(self, pin):
+        pressed = self.backend.read(pin) == LEVEL_PRESSED
+        with self._lock:
+            if pressed and not self._pressed and self._pending is None:
+                self._pending = threading.Timer(self.debounce, self._confirm)
+                self._pending.daemon = True
+                self._pending.start()
+            elif not pressed and self._pressed:
+                self._pressed = False
+            else:
+                self.ignored_edges += 1
+
+    def _confirm(self):
+        pressed = self.backend.read(self.pin) == LEVEL_PRESSED
+        with self._lock:
+            self._pending = None
+            if not pressed:
+                self.glitches += 1
+                return
+            self._pressed = True
+            self.presses += 1
+        self.on_press()
+
+    def stop(self):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.cancel()
+                self._pending = None
+        self.backend.cleanup()
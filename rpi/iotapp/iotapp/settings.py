@@ -10,11 +10,17 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Wspólne moduły mostu (rpi/*.py, np. smokehouse_log) importowane przez aplikację
+if str(BASE_DIR.parent) not in sys.path:
+    sys.path.append(str(BASE_DIR.parent))
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -70,18 +76,144 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'iotapp.wsgi.application'
 
+# Dashboard na żywo (/api/live/) wymaga serwera ASGI, np.:
+#   uvicorn iotapp.asgi:application --host 0.0.0.0 --port 8000
+ASGI_APPLICATION = 'iotapp.asgi.application'
+
+# Lokalny broker, przez który mqtt_worker przekazuje delty do serwera ASGI
+LIVE_MQTT_HOST = 'localhost'
+LIVE_MQTT_PORT = 1883
+LIVE_MQTT_TOPIC = 'sensor/live'
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+#
+# Profil SQLite wybierany zmienną SQLITE_PROFILE:
+#   production - WAL (czytelnicy nie blokują workera i odwrotnie), synchronous=NORMAL,
+#                większy cache stron, mmap, BEGIN IMMEDIATE i busy timeout
+#                zamiast natychmiastowego "database is locked"
+#   default    - ustawienia domyślne Django/SQLite (rollback journal)
+# Okresowe checkpointy WAL i VACUUM: python manage.py sqlite_maintenance
+
+SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'production')
+
+SQLITE_PRAGMAS = {
+    'production': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -20000,         # ~20 MB cache stron na połączenie
+        'mmap_size': 128 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'wal_autocheckpoint': 1000,   # stron (~4 MB)
+    },
+    'default': {},
+}
+
+SQLITE_BUSY_TIMEOUT = 20  # sekundy
+
+_SQLITE_OPTIONS = {
+    'production': {
+        'timeout': SQLITE_BUSY_TIMEOUT,
+        # Zapis bierze blokadę od razu, więc nie dochodzi do deadlocka przy
+        # podnoszeniu blokady SHARED -> RESERVED (busy timeout wtedy działa)
+        'transaction_mode': 'IMMEDIATE',
+        'init_command': ''.join(
+            f'PRAGMA {name}={value};' for name, value in SQLITE_PRAGMAS['production'].items()
+        ),
+    },
+    'default': {},
+}
 
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': _SQLITE_OPTIONS[SQLITE_PROFILE],
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+#
+# 'sensor_latest' przechowuje najnowszy stan czujników (sensor/latest.py).
+# Worker i serwer WWW to osobne procesy, więc backend musi być wspólny:
+#   file   - pliki w SENSOR_CACHE_DIR (domyślnie, bez dodatkowych usług)
+#   redis  - lokalny serwer zgodny z Redis (Redis / Valkey / KeyDB)
+#   locmem - pamięć procesu (tylko gdy worker działa w tym samym procesie)
+
+SENSOR_CACHE_BACKEND = os.environ.get('SENSOR_CACHE_BACKEND', 'file')
+SENSOR_CACHE_DIR = os.environ.get('SENSOR_CACHE_DIR', '/tmp/smokehouse_cache')
+SENSOR_REDIS_URL = os.environ.get('SENSOR_REDIS_URL', 'redis://127.0.0.1:6379/1')
+
+_SENSOR_CACHE_BACKENDS = {
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': SENSOR_CACHE_DIR,
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': SENSOR_REDIS_URL,
+    },
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sensor-latest',
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'sensor_latest': _SENSOR_CACHE_BACKENDS[SENSOR_CACHE_BACKEND],
+}
+
+SENSOR_LATEST_CACHE = 'sensor_latest'
+SENSOR_LATEST_RING_SIZE = 50
+
+
+# Retencja surowych odczytów (sensor/retention.py, manage.py prune_readings)
+# Starsze dni trafiają do SENSOR_ARCHIVE_DIR i są usuwane z bazy paczkami.
+SENSOR_RAW_RETENTION_DAYS = 30
+SENSOR_ARCHIVE_DIR = BASE_DIR / 'archive'
+SENSOR_RETENTION_BATCH = 2000
+SENSOR_RETENTION_INTERVAL = 300  # co ile sekund mqtt_worker wykonuje krok retencji
+
+
+# Paczki odczytów przez HTTP (POST /api/ingest/, nadawca: wojfer.py / cloud_ingest --sink http=)
+# Pusty token - endpoint wyłączony (403); nadawca wysyła nagłówek Authorization: Bearer <token>
+SENSOR_INGEST_TOKEN = os.environ.get('SENSOR_INGEST_TOKEN', '')
+SENSOR_INGEST_MAX_BATCH = 5000
+
+
+# Logging
+# https://docs.djangoproject.com/en/5.2/topics/logging/
+#
+# Ten sam podsystem co most (rpi/smokehouse_log.py): rekordy idą przez
+# nieblokującą kolejkę do osobnego wątku, z limitem rekordów/s na komponent.
+# SMOKEHOUSE_LOG_FORMAT=json - jeden obiekt JSON na linię.
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'smokehouse': {
+            '()': 'smokehouse_log.make_queue_handler',
+        },
+    },
+    'root': {
+        'handlers': ['smokehouse'],
+        'level': 'WARNING',
+    },
+    'loggers': {
+        'sensor': {
+            'level': os.environ.get('SMOKEHOUSE_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
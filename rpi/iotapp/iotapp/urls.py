@@ -16,10 +16,14 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path
-from sensor.views import dashboard, dashboard_data_api
+from sensor.views import dashboard, dashboard_data_api, history_api, ingest_api, live_stream, readings_api
 
 urlpatterns = [
     path("", dashboard, name="dashboard"),
     path('admin/', admin.site.urls),
-    path('api/dashboard-data/', dashboard_data_api)
+    path('api/dashboard-data/', dashboard_data_api),
+    path('api/history/', history_api),
+    path('api/ingest/', ingest_api),
+    path('api/live/', live_stream),
+    path('api/readings/', readings_api),
 ]
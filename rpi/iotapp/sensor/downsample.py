@@ -0,0 +1,50 @@
+"""
+Downsampling serii czasowych algorytmem LTTB (Largest-Triangle-Three-Buckets).
+
+LTTB zachowuje kształt wykresu (piki i doliny) znacznie lepiej niż branie
+co n-tego punktu, a koszt jest liniowy względem liczby punktów wejściowych.
+"""
+
+
+def lttb_indices(xs, ys, threshold):
+    """
+    Zwraca indeksy punktów wybranych przez LTTB.
+
+    Indeksy (zamiast samych punktów) pozwalają zastosować ten sam wybór do
+    pozostałych kolumn (np. wilgotności i ciśnienia mierzonych w tej samej chwili).
+    """
+    n = len(xs)
+    if threshold >= n:
+        return list(range(n))
+    if threshold < 3:
+        return [0, n - 1][:max(threshold, 0)]
+
+    selected = [0]
+    bucket_size = (n - 2) / (threshold - 2)
+    a = 0
+
+    for i in range(threshold - 2):
+        # Średnia z następnego kubełka - trzeci wierzchołek trójkąta
+        next_start = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, n)
+        count = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / count
+        avg_y = sum(ys[next_start:next_end]) / count
+
+        # Punkt z bieżącego kubełka tworzący największy trójkąt
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        ax, ay = xs[a], ys[a]
+        best_area = -1.0
+        best = start
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best = j
+
+        selected.append(best)
+        a = best
+
+    selected.append(n - 1)
+    return selected
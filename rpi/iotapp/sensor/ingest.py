@@ -0,0 +1,265 @@
+"""
+Zapis odczytów do bazy w paczkach (bulk_create) poza wątkiem sieciowym MQTT.
+
+Callback ``on_message`` tylko wrzuca obiekt do ograniczonej kolejki,
+a osobny wątek zapisuje zebrane obiekty jednym ``bulk_create`` na model,
+gdy uzbiera się ``max_batch`` wierszy albo minie ``max_delay`` sekund.
+
+Przejściowy błąd bazy (np. ``database is locked``) ponawia zapis paczki
+``retries`` razy z wykładniczym opóźnieniem; dopiero potem paczka jest
+odrzucana i liczona w ``dropped``. Inny błąd (złe dane) dzieli paczkę na
+połowy, aż odrzucone zostaną tylko wiersze, których nie da się zapisać.
+
+Agregaty (rollups.py) są aktualizowane w tej samej transakcji co zapis
+surowych odczytów - błąd agregatów wycofuje całą paczkę, więc agregaty nie
+rozjeżdżają się z tabelą odczytów. Po zatwierdzeniu paczki wywoływane są
+hooki ``on_flush``, które dostają słownik {klasa modelu: lista zapisanych
+obiektów}. Błąd hooka nie cofa zapisu. ``save_batch`` robi to samo synchronicznie
+(paczki z endpointu /api/ingest/).
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+
+from django.db import InterfaceError, OperationalError, close_old_connections, connection, transaction
+
+from smokehouse_metrics import histogram
+
+from .models import SensorReading
+from .rollups import update_rollups
+
+_STOP = object()
+
+log = logging.getLogger(__name__)
+
+DB_INSERT_SECONDS = histogram("worker_db_insert_seconds", "Czas zapisu paczki (bulk_create w transakcji)")
+BATCH_ROWS = histogram("worker_db_batch_rows", "Liczba wierszy w zapisanej paczce",
+                       buckets=(1, 5, 10, 50, 100, 250, 500, 1000, 2500, 5000))
+
+class BatchWriter:
+    """Bufor zapisu: kolejka -> wątek zapisujący -> bulk_create"""
+
+    def __init__(self, max_batch=500, max_delay=0.25, max_buffer=10000, put_timeout=0.0, on_flush=(),
+                 retries=3, retry_backoff=0.5):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.put_timeout = put_timeout
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.on_flush = list(on_flush)
+        self._queue = queue.Queue(maxsize=max_buffer)
+        self._thread = None
+
+        # Liczniki (backpressure i diagnostyka)
+        self.submitted = 0
+        self.dropped = 0
+        self.written = 0
+        self.flushes = 0
+        self.errors = 0
+        self.retried = 0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="sensor-batch-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, obj):
+        """Dodaje niezapisany obiekt modelu do bufora. Zwraca False, gdy bufor jest pełny."""
+        try:
+            if self.put_timeout > 0:
+                self._queue.put(obj, timeout=self.put_timeout)
+            else:
+                self._queue.put_nowait(obj)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.submitted += 1
+        return True
+
+    def stop(self, timeout=10.0):
+        """Zatrzymuje wątek, zapisując wszystko, co zostało w buforze"""
+        if self._thread is None:
+            return
+        # Sentinel musi trafić do kolejki nawet przy pełnym buforze
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    @property
+    def depth(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        return {
+            "submitted": self.submitted,
+            "written": self.written,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "errors": self.errors,
+            "retried": self.retried,
+            "depth": self.depth,
+        }
+
+    def _run(self):
+        batch = []
+        deadline = None
+        stopping = False
+
+        try:
+            while not stopping:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+
+                if item is _STOP:
+                    stopping = True
+                elif item is not None:
+                    if not batch:
+                        deadline = time.monotonic() + self.max_delay
+                    batch.append(item)
+
+                    # Dobierz to, co już czeka, bez ponownego usypiania wątku
+                    while len(batch) < self.max_batch:
+                        try:
+                            item = self._queue.get_nowait()
+                        except queue.Empty:
+                            break
+                        if item is _STOP:
+                            stopping = True
+                            break
+                        batch.append(item)
+
+                if batch and (stopping or len(batch) >= self.max_batch or time.monotonic() >= deadline):
+                    self._flush(batch)
+                    batch = []
+                    deadline = None
+
+            # Zamknięcie: zapisz resztę bufora
+            leftover = []
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not _STOP:
+                    leftover.append(item)
+            for i in range(0, len(leftover), self.max_batch):
+                self._flush(leftover[i:i + self.max_batch])
+        finally:
+            connection.close()
+
+    def _flush(self, batch):
+        attempt = 0
+        while True:
+            close_old_connections()
+            try:
+                hook_errors = save_batch(batch, self.on_flush, self.max_batch)
+                break
+            except (OperationalError, InterfaceError) as e:
+                # Przejściowe (zablokowana baza, zerwane połączenie) - transakcja wycofana, można ponowić
+                if attempt >= self.retries:
+                    self._discard(batch)
+                    return
+                delay = self.retry_backoff * 2 ** attempt
+                attempt += 1
+                self.retried += 1
+                log.warning("Błąd bazy przy zapisie paczki (%d wierszy): %s - ponowienie %d/%d za %.1f s",
+                            len(batch), e, attempt, self.retries, delay)
+                connection.close()
+                _reset_unsaved(batch)
+                time.sleep(delay)
+            except Exception:
+                if len(batch) == 1:
+                    self._discard(batch)
+                    return
+                # Błąd danych (np. IntegrityError, liczba poza zakresem kolumny) - ponowienie
+                # nic nie da, ale nie może zabrać ze sobą dobrych wierszy: zapis połówkami,
+                # aż zostaną same złe wiersze (każdy odrzucany i logowany osobno)
+                log.warning("Błąd zapisu paczki (%d wierszy) - zapis połówkami", len(batch), exc_info=True)
+                _reset_unsaved(batch)
+                middle = len(batch) // 2
+                self._flush(batch[:middle])
+                self._flush(batch[middle:])
+                return
+
+        self.written += len(batch)
+        self.flushes += 1
+        self.errors += hook_errors
+
+    def _discard(self, batch):
+        self.errors += 1
+        self.dropped += len(batch)
+        if len(batch) == 1:
+            log.exception("Błąd zapisu wiersza %r - wiersz odrzucony", batch[0])
+        else:
+            log.exception("Błąd zapisu paczki (%d wierszy) - paczka odrzucona", len(batch))
+
+
+def _reset_unsaved(batch):
+    """Po wycofanej transakcji obiekty mogą mieć już nadane klucze (RETURNING) - zapis od nowa"""
+    for obj in batch:
+        obj.pk = None
+        obj._state.adding = True
+
+
+def _without_existing(model, objs):
+    """Obiekty, których (device, timestamp) nie ma jeszcze w tabeli ani wcześniej w ``objs``"""
+    timestamps = [obj.timestamp for obj in objs]
+    seen = set(model.objects.filter(device__in={obj.device for obj in objs},
+                                    timestamp__range=(min(timestamps), max(timestamps)))
+               .values_list("device", "timestamp"))
+    fresh = []
+    for obj in objs:
+        key = (obj.device, obj.timestamp)
+        if key not in seen:
+            seen.add(key)
+            fresh.append(obj)
+    return fresh
+
+
+def save_batch(batch, on_flush=(), batch_size=500, skip_existing=False):
+    """
+    Zapisuje obiekty jednym bulk_create na model i dolicza odczyty do
+    agregatów - wszystko w jednej transakcji, potem woła hooki ``on_flush``. Błąd bazy przechodzi dalej, błąd hooka jest
+    tylko logowany. Zwraca liczbę błędów hooków.
+
+    ``skip_existing`` pomija wiersze, których (device, timestamp) już jest w
+    bazie - ponowiona paczka z /api/ingest/ (odpowiedź zgubiona po zapisie)
+    nie dubluje odczytów ani agregatów.
+    """
+    by_model = defaultdict(list)
+    for obj in batch:
+        by_model[type(obj)].append(obj)
+
+    started = time.perf_counter()
+    with transaction.atomic():
+        if skip_existing:
+            for model, objs in list(by_model.items()):
+                fresh = _without_existing(model, objs)
+                if len(fresh) != len(objs):
+                    log.info("Pominięte już zapisane wiersze %s: %d", model.__name__, len(objs) - len(fresh))
+                if fresh:
+                    by_model[model] = fresh
+                else:
+                    del by_model[model]
+        for model, objs in by_model.items():
+            model.objects.bulk_create(objs, batch_size=batch_size)
+        if SensorReading in by_model:
+            update_rollups(by_model[SensorReading])
+    DB_INSERT_SECONDS.observe(time.perf_counter() - started)
+    BATCH_ROWS.observe(sum(len(objs) for objs in by_model.values()))
+
+    errors = 0
+    for hook in on_flush:
+        try:
+            hook(by_model)
+        except Exception:
+            errors += 1
+            log.exception("Błąd hooka %s", getattr(hook, '__name__', hook))
+    return errors
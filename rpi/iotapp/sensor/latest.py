@@ -0,0 +1,186 @@
+"""
+Cache najnowszego stanu: bufor cykliczny ostatnich odczytów i ostatni
+status drzwi, osobno dla każdego urządzenia oraz łącznie dla wszystkich.
+
+Worker aktualizuje cache po zapisie paczki (hook ``on_flush``), a widoki
+dashboardu czytają z niego bez zapytań do bazy. Backend wybiera się przez
+``settings.CACHES[SENSOR_LATEST_CACHE]`` (pamięć lokalna / pliki / Redis).
+Przy pustym cache widok jednorazowo czyta z bazy i wypełnia go (``warm``) -
+tylko dla urządzeń, które mają odczyty w bazie, żeby dowolny ``?device=``
+nie tworzył nowych wpisów w cache.
+
+Dopisanie do bufora to odczyt i zapis (get_many + set_many), nie operacja
+atomowa: gdy dwa procesy (mqtt_worker i /api/ingest/) zapisują paczki tego
+samego urządzenia w tej samej chwili, odczyty jednej z paczek mogą nie
+trafić do bufora. To świadomy kompromis - bufor służy tylko do podglądu
+ostatnich odczytów na dashboardzie, baza ma wszystkie, a brakujące punkty
+znikają z widoku po ``size`` kolejnych odczytach albo po ``invalidate``.
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import DEVICE_ID_LENGTH, SensorReading, DoorStatus
+
+RING_SIZE = getattr(settings, "SENSOR_LATEST_RING_SIZE", 50)
+CACHE_ALIAS = getattr(settings, "SENSOR_LATEST_CACHE", "default")
+
+# Klucz zbiorczy (wszystkie urządzenia) - None w parametrze device
+ALL_DEVICES = "*"
+
+
+def reading_to_dict(r):
+    return {
+        "id": r.pk,
+        "device": r.device,
+        "ts": r.timestamp.timestamp(),
+        "time": r.timestamp.strftime("%H:%M:%S"),
+        "temperature": r.temperature,
+        "humidity": r.humidity,
+        "pressure": r.pressure,
+    }
+
+
+def door_to_dict(d):
+    return {"device": d.device, "door_open": d.open_status, "alarm": d.alarm}
+
+
+def latest_doors(doors):
+    """Ostatni status drzwi każdego urządzenia z paczki, rosnąco wg czasu"""
+    last = {}
+    for d in doors:
+        current = last.get(d.device)
+        if current is None or d.timestamp >= current.timestamp:
+            last[d.device] = d
+    return sorted(last.values(), key=lambda d: d.timestamp)
+
+
+class LatestStateCache:
+    """Najnowsze odczyty i status drzwi w cache Django"""
+
+    def __init__(self, alias=CACHE_ALIAS, size=RING_SIZE):
+        self.cache = caches[alias]
+        self.size = size
+
+    @staticmethod
+    def _readings_key(device):
+        return f"sensor:latest:readings:{ALL_DEVICES if device is None else device}"
+
+    @staticmethod
+    def _door_key(device):
+        return f"sensor:latest:door:{ALL_DEVICES if device is None else device}"
+
+    # ----------------- ODCZYT (widoki) -----------------
+
+    def get_readings(self, device=None, n=20):
+        """Ostatnie ``n`` odczytów rosnąco lub None, gdy cache jest pusty"""
+        ring = self.cache.get(self._readings_key(device))
+        if ring is None:
+            return None
+        return ring[-n:]
+
+    def get_door(self, device=None):
+        """(trafienie, status drzwi) - status może być None, gdy brak danych w bazie"""
+        sentinel = object()
+        door = self.cache.get(self._door_key(device), sentinel)
+        if door is sentinel:
+            return False, None
+        return True, door
+
+    # ----------------- ZAPIS (worker) -----------------
+
+    def push_readings(self, readings):
+        """Dopisuje odczyty do buforów (bez blokady - patrz opis modułu)"""
+        by_key = {}
+        for r in readings:
+            entry = reading_to_dict(r)
+            by_key.setdefault(self._readings_key(r.device), []).append(entry)
+            by_key.setdefault(self._readings_key(None), []).append(entry)
+
+        # Bufor, którego nie ma w cache, zostanie wypełniony z bazy przy pierwszym
+        # odczycie - nie tworzymy go tu z samej paczki, bo byłby niekompletny
+        current = self.cache.get_many(list(by_key))
+        updated = {key: (current[key] + entries)[-self.size:]
+                   for key, entries in by_key.items() if key in current}
+        if updated:
+            self.cache.set_many(updated, timeout=None)
+
+    def set_door(self, door):
+        self.set_doors([door])
+
+    def set_doors(self, doors):
+        """Ostatni status każdego urządzenia; klucz zbiorczy - najnowszy z wszystkich"""
+        latest = latest_doors(doors)
+        if not latest:
+            return
+        entries = {self._door_key(d.device): door_to_dict(d) for d in latest}
+        entries[self._door_key(None)] = entries[self._door_key(latest[-1].device)]
+        self.cache.set_many(entries, timeout=None)
+
+    def on_flush(self, by_model):
+        """Hook dla BatchWriter"""
+        readings = by_model.get(SensorReading)
+        if readings:
+            self.push_readings(readings)
+        doors = by_model.get(DoorStatus)
+        if doors:
+            self.set_doors(doors)
+
+    # ----------------- WYPEŁNIANIE / UNIEWAŻNIANIE -----------------
+
+    def warm(self, device=None):
+        """
+        Wypełnia cache z bazy (tylko brakujące klucze - nie nadpisuje
+        świeższych danych workera). Zwraca odczytane (bufor, status drzwi).
+        """
+        readings = SensorReading.objects.all()
+        doors = DoorStatus.objects.all()
+        if device is not None:
+            readings = readings.filter(device=device)
+            doors = doors.filter(device=device)
+
+        ring = [reading_to_dict(r) for r in readings.order_by("-timestamp")[:self.size][::-1]]
+        door = doors.order_by("-timestamp").first()
+
+        self.cache.add(self._readings_key(device), ring, timeout=None)
+        door = door_to_dict(door) if door else None
+        self.cache.add(self._door_key(device), door, timeout=None)
+        return ring, door
+
+    @staticmethod
+    def known_device(device):
+        """Czy urządzenie ma jakiekolwiek odczyty w bazie"""
+        if len(device) > DEVICE_ID_LENGTH:
+            return False
+        return (SensorReading.objects.filter(device=device).exists()
+                or DoorStatus.objects.filter(device=device).exists())
+
+    def latest(self, device=None, n=20):
+        """
+        Ostatnie odczyty i status drzwi - z cache, a przy braku z bazy.
+        Nieznane urządzenie daje ([], None) bez zapisu do cache.
+        """
+        readings = self.get_readings(device, n)
+        hit, door = self.get_door(device)
+        if readings is None or not hit:
+            if device is not None and not self.known_device(device):
+                return [], None
+            ring, door = self.warm(device)
+            readings = ring[-n:]
+        return readings, door
+
+    def invalidate(self, device=None):
+        """Usuwa wpisy urządzenia (albo wszystkie, gdy device=None)"""
+        if device is None:
+            devices = set(SensorReading.objects.values_list("device", flat=True).distinct())
+            devices |= set(DoorStatus.objects.values_list("device", flat=True).distinct())
+        else:
+            devices = {device}
+
+        keys = [self._readings_key(None), self._door_key(None)]
+        for d in devices:
+            keys += [self._readings_key(d), self._door_key(d)]
+        self.cache.delete_many(keys)
+
+
+latest_state = LatestStateCache()
@@ -0,0 +1,155 @@
+"""
+Kanał na żywo dla dashboardu (Server-Sent Events).
+
+Przepływ danych:
+    mqtt_worker --(po zapisie paczki)--> lokalny broker MQTT, topic LIVE_TOPIC
+    proces ASGI: jeden LiveHub subskrybuje LIVE_TOPIC i rozsyła delty
+    do wszystkich otwartych połączeń /api/live/
+
+Baza jest odpytywana raz na odczyt (przez worker), niezależnie od liczby
+otwartych kart przeglądarki - widoki SSE nie wykonują żadnych zapytań.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+
+import paho.mqtt.client as mqtt
+from django.conf import settings
+
+from .latest import reading_to_dict, door_to_dict, latest_doors
+from .models import SensorReading, DoorStatus
+
+log = logging.getLogger(__name__)
+
+LIVE_HOST = getattr(settings, "LIVE_MQTT_HOST", "localhost")
+LIVE_PORT = getattr(settings, "LIVE_MQTT_PORT", 1883)
+LIVE_TOPIC = getattr(settings, "LIVE_MQTT_TOPIC", "sensor/live")
+
+# Ile delt może czekać na wolnego klienta, zanim każemy mu się przeładować
+SUBSCRIBER_QUEUE_SIZE = 256
+HEARTBEAT_SECONDS = 15
+
+
+def serialize_batch(by_model):
+    """
+    Delta wysyłana do przeglądarek dla jednej zapisanej paczki; ``doors``
+    to ostatni status każdego urządzenia z paczki, rosnąco wg czasu.
+    """
+    return {
+        "readings": [reading_to_dict(r) for r in by_model.get(SensorReading, ())],
+        "doors": [door_to_dict(d) for d in latest_doors(by_model.get(DoorStatus, ()))],
+    }
+
+
+class LivePublisher:
+    """Strona workera: publikuje delty po każdym zapisie paczki"""
+
+    def __init__(self, host=LIVE_HOST, port=LIVE_PORT, topic=LIVE_TOPIC):
+        self.host = host
+        self.port = port
+        self.topic = topic
+        self.client = mqtt.Client(client_id="django-worker-live")
+
+    def connect(self):
+        try:
+            self.client.connect(self.host, self.port, 60)
+            self.client.loop_start()
+            return True
+        except Exception as e:
+            log.warning("Brak lokalnego brokera (%s:%s): %s", self.host, self.port, e)
+            return False
+
+    def disconnect(self):
+        self.client.loop_stop()
+        self.client.disconnect()
+
+    def on_flush(self, by_model):
+        """Hook dla BatchWriter"""
+        delta = serialize_batch(by_model)
+        if delta["readings"] or delta["doors"]:
+            self.client.publish(self.topic, json.dumps(delta), qos=0)
+
+
+class LiveHub:
+    """
+    Strona serwera ASGI: jedna subskrypcja MQTT na proces, rozsyłana
+    do kolejek asyncio poszczególnych klientów SSE.
+    """
+
+    def __init__(self, host=LIVE_HOST, port=LIVE_PORT, topic=LIVE_TOPIC):
+        self.host = host
+        self.port = port
+        self.topic = topic
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._client = None
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._client is not None:
+                return
+            client = mqtt.Client(client_id=f"django-live-hub-{id(self)}")
+            client.on_connect = lambda c, u, f, rc: c.subscribe(self.topic)
+            client.on_message = self._on_message
+            client.connect_async(self.host, self.port, 60)
+            client.loop_start()
+            self._client = client
+
+    def _on_message(self, client, userdata, msg):
+        # Wątek paho: dekodujemy raz, a do pętli asyncio przekazujemy gotowy tekst
+        data = msg.payload.decode("utf-8")
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, q in subscribers:
+            loop.call_soon_threadsafe(self._deliver, q, data)
+
+    @staticmethod
+    def _deliver(q, data):
+        try:
+            q.put_nowait(data)
+        except asyncio.QueueFull:
+            # Klient nie nadąża - zamiast gubić delty po cichu, każemy mu przeładować okno
+            while not q.empty():
+                q.get_nowait()
+            q.put_nowait(None)
+
+    def subscribe(self):
+        self._ensure_started()
+        entry = (asyncio.get_running_loop(), asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE))
+        with self._lock:
+            self._subscribers.add(entry)
+        return entry
+
+    def unsubscribe(self, entry):
+        with self._lock:
+            self._subscribers.discard(entry)
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+
+hub = LiveHub()
+
+
+async def event_stream():
+    """Generator zdarzeń SSE dla jednego klienta"""
+    entry = hub.subscribe()
+    _, q = entry
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                data = await asyncio.wait_for(q.get(), timeout=HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            if data is None:
+                yield "event: resync\ndata: {}\n\n"
+            else:
+                yield f"data: {data}\n\n"
+    finally:
+        hub.unsubscribe(entry)
@@ -0,0 +1,112 @@
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from sensor.models import SensorReading
+
+
+class Command(BaseCommand):
+    help = ('Benchmark zapytań "ostatnie N odczytów" na osobnej bazie SQLite '
+            'o rosnącej liczbie wierszy (ze schematem i indeksami z modelu)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,100000,1000000,10000000',
+                            help='Liczby wierszy, dla których mierzyć (rosnąco, po przecinku)')
+        parser.add_argument('--devices', type=int, default=20,
+                            help='Liczba urządzeń, między które rozkładane są odczyty')
+        parser.add_argument('--limit', type=int, default=20,
+                            help='N w zapytaniu "ostatnie N odczytów"')
+        parser.add_argument('--repeat', type=int, default=200,
+                            help='Liczba powtórzeń każdego zapytania')
+        parser.add_argument('--no-index', action='store_true',
+                            help='Pomiń indeksy (dla porównania ze stanem sprzed migracji 0003)')
+        parser.add_argument('--path', default=None,
+                            help='Ścieżka pliku bazy testowej (domyślnie plik tymczasowy)')
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(x) for x in options['sizes'].split(','))
+        devices = [f"dev-{i}" for i in range(options['devices'])]
+        limit = options['limit']
+
+        path = options['path'] or os.path.join(tempfile.mkdtemp(), 'bench_latest.sqlite3')
+        if os.path.exists(path):
+            os.remove(path)
+        db = sqlite3.connect(path)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA synchronous=OFF')
+
+        for statement in self._schema_sql(with_indexes=not options['no_index']):
+            db.execute(statement)
+
+        # Zapytania generowane przez ORM dokładnie tak, jak w widokach
+        device_sql, device_params = (SensorReading.objects.filter(device=devices[0])
+                                     .order_by('-timestamp')[:limit].query.sql_with_params())
+        global_sql, global_params = (SensorReading.objects.order_by('-timestamp')[:limit]
+                                     .query.sql_with_params())
+        # Django używa placeholderów %s, moduł sqlite3 oczekuje ?
+        device_sql = device_sql.replace('%s', '?')
+        global_sql = global_sql.replace('%s', '?')
+
+        self.stdout.write(f"Baza testowa: {path}")
+        self.stdout.write(f"Plan (urządzenie): {self._plan(db, device_sql, device_params)}")
+        self.stdout.write(f"Plan (globalnie):  {self._plan(db, global_sql, global_params)}\n")
+        self.stdout.write(f"{'wiersze':>12} {'insert [s]':>11} {'urządzenie [us]':>16} {'globalnie [us]':>15}")
+
+        columns = [f.column for f in SensorReading._meta.concrete_fields if not f.primary_key]
+        insert_sql = 'INSERT INTO "{}" ({}) VALUES ({})'.format(
+            SensorReading._meta.db_table,
+            ', '.join(f'"{c}"' for c in columns),
+            ', '.join('?' for _ in columns),
+        )
+
+        start_ts = datetime(2025, 1, 1)
+        inserted = 0
+        for size in sizes:
+            t0 = time.perf_counter()
+            with db:
+                db.executemany(insert_sql, self._rows(columns, devices, start_ts, inserted, size))
+            insert_time = time.perf_counter() - t0
+            inserted = size
+
+            device_us = self._time_query(db, device_sql, device_params, options['repeat'])
+            global_us = self._time_query(db, global_sql, global_params, options['repeat'])
+            self.stdout.write(f"{size:>12} {insert_time:>11.2f} {device_us:>16.1f} {global_us:>15.1f}")
+
+        db.close()
+
+    def _schema_sql(self, with_indexes):
+        """DDL tabeli SensorReading (wraz z indeksami) zebrane ze schema_editor Django"""
+        with connection.schema_editor(collect_sql=True, atomic=False) as editor:
+            editor.create_model(SensorReading)
+        statements = [s.rstrip(';') for s in editor.collected_sql]
+        if not with_indexes:
+            statements = [s for s in statements if not s.startswith('CREATE INDEX')]
+        return statements
+
+    def _rows(self, columns, devices, start_ts, first, last):
+        for i in range(first, last):
+            values = {
+                'timestamp': (start_ts + timedelta(seconds=i)).strftime('%Y-%m-%d %H:%M:%S.%f'),
+                'device': devices[i % len(devices)],
+                'marker': 1,
+                'temperature': 20.0 + (i % 500) / 10,
+                'humidity': 40.0 + (i % 40),
+                'pressure': 1000.0 + (i % 30) / 10,
+                'gas_resistance': 35000.0 + (i % 1000),
+            }
+            yield tuple(values[c] for c in columns)
+
+    def _plan(self, db, sql, params):
+        return ' | '.join(row[-1] for row in db.execute('EXPLAIN QUERY PLAN ' + sql, params))
+
+    def _time_query(self, db, sql, params, repeat):
+        db.execute(sql, params).fetchall()  # rozgrzewka cache stron
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            db.execute(sql, params).fetchall()
+        return (time.perf_counter() - t0) / repeat * 1e6
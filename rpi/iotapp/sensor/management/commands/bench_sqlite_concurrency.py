@@ -0,0 +1,140 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from sensor.models import SensorReading
+
+
+class Command(BaseCommand):
+    help = ('Benchmark współbieżności SQLite: jeden zapisujący (jak mqtt_worker) i wielu czytelników '
+            '(jak dashboard) dla profili z settings.SQLITE_PRAGMAS')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', default='default,production',
+                            help='Profile z settings.SQLITE_PRAGMAS do porównania')
+        parser.add_argument('--readers', type=int, default=8, help='Liczba wątków czytających')
+        parser.add_argument('--duration', type=float, default=10.0, help='Czas pomiaru na profil [s]')
+        parser.add_argument('--writer-batch', type=int, default=1,
+                            help='Wierszy na transakcję zapisu (1 = stary worker, 500 = BatchWriter)')
+        parser.add_argument('--seed-rows', type=int, default=50000,
+                            help='Liczba odczytów w bazie przed pomiarem')
+        parser.add_argument('--timeout', type=float, default=None,
+                            help='Busy timeout [s] (domyślnie 5 s dla "default", SQLITE_BUSY_TIMEOUT dla innych)')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'profil':>12} {'zapisy/s':>10} {'odczyty/s':>10} {'p50 [ms]':>9} "
+                          f"{'p99 [ms]':>9} {'max [ms]':>9} {'locked':>7}")
+        for profile in options['profiles'].split(','):
+            result = self._run_profile(profile, options)
+            self.stdout.write(f"{profile:>12} {result['writes']:>10.0f} {result['reads']:>10.0f} "
+                              f"{result['p50']:>9.2f} {result['p99']:>9.2f} {result['max']:>9.2f} "
+                              f"{result['locked']:>7}")
+
+    def _connect(self, path, pragmas, timeout):
+        db = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        for name, value in pragmas.items():
+            db.execute(f'PRAGMA {name}={value}')
+        return db
+
+    def _run_profile(self, profile, options):
+        pragmas = settings.SQLITE_PRAGMAS[profile]
+        timeout = options['timeout']
+        if timeout is None:
+            timeout = 5.0 if profile == 'default' else settings.SQLITE_BUSY_TIMEOUT
+
+        path = os.path.join(tempfile.mkdtemp(), f'bench_{profile}.sqlite3')
+        table = SensorReading._meta.db_table
+        columns = [f.column for f in SensorReading._meta.concrete_fields if not f.primary_key]
+        insert_sql = 'INSERT INTO "{}" ({}) VALUES ({})'.format(
+            table, ', '.join(f'"{c}"' for c in columns), ', '.join('?' for _ in columns))
+        read_sql, read_params = SensorReading.objects.order_by('-timestamp')[:20].query.sql_with_params()
+        read_sql = read_sql.replace('%s', '?')
+
+        setup = self._connect(path, pragmas, timeout)
+        with connection.schema_editor(collect_sql=True, atomic=False) as editor:
+            editor.create_model(SensorReading)
+        for statement in editor.collected_sql:
+            setup.execute(statement.rstrip(';'))
+        setup.execute('BEGIN')
+        setup.executemany(insert_sql, (self._row(columns, i) for i in range(options['seed_rows'])))
+        setup.execute('COMMIT')
+        setup.close()
+
+        stop = threading.Event()
+        counters = {'writes': 0, 'locked': 0}
+        latencies = []
+        lock = threading.Lock()
+
+        def writer():
+            db = self._connect(path, pragmas, timeout)
+            i = options['seed_rows']
+            begin = 'BEGIN IMMEDIATE' if profile != 'default' else 'BEGIN'
+            while not stop.is_set():
+                batch = [self._row(columns, i + k) for k in range(options['writer_batch'])]
+                try:
+                    db.execute(begin)
+                    db.executemany(insert_sql, batch)
+                    db.execute('COMMIT')
+                    counters['writes'] += len(batch)
+                    i += len(batch)
+                except sqlite3.OperationalError:
+                    counters['locked'] += 1
+                    if db.in_transaction:
+                        db.execute('ROLLBACK')
+            db.close()
+
+        def reader():
+            db = self._connect(path, pragmas, timeout)
+            local = []
+            local_locked = 0
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    db.execute(read_sql, read_params).fetchall()
+                    local.append(time.perf_counter() - started)
+                except sqlite3.OperationalError:
+                    local_locked += 1
+            db.close()
+            with lock:
+                latencies.extend(local)
+                counters['locked'] += local_locked
+
+        threads = [threading.Thread(target=writer)]
+        threads += [threading.Thread(target=reader) for _ in range(options['readers'])]
+        for t in threads:
+            t.start()
+        time.sleep(options['duration'])
+        stop.set()
+        for t in threads:
+            t.join()
+
+        latencies.sort()
+        pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else 0.0
+        return {
+            'writes': counters['writes'] / options['duration'],
+            'reads': len(latencies) / options['duration'],
+            'p50': pick(0.50),
+            'p99': pick(0.99),
+            'max': latencies[-1] * 1000 if latencies else 0.0,
+            'locked': counters['locked'],
+        }
+
+    @staticmethod
+    def _row(columns, i):
+        values = {
+            'timestamp': datetime.fromtimestamp(1735689600 + i, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S.%f'),
+            'device': f"dev-{i % 10}",
+            'marker': 1,
+            'temperature': 20.0 + (i % 500) / 10,
+            'humidity': 40.0 + (i % 40),
+            'pressure': 1000.0 + (i % 30) / 10,
+            'gas_resistance': 35000.0 + (i % 1000),
+        }
+        return tuple(values[c] for c in columns)
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from sensor.latest import latest_state
+
+
+class Command(BaseCommand):
+    help = 'Unieważnia lub wypełnia cache najnowszego stanu czujników (sensor/latest.py)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--device', default=None,
+                            help='Urządzenie (domyślnie wszystkie)')
+        parser.add_argument('--warm', action='store_true',
+                            help='Po unieważnieniu od razu wypełnij cache z bazy')
+
+    def handle(self, *args, **options):
+        device = options['device']
+        latest_state.invalidate(device)
+        self.stdout.write(self.style.SUCCESS(f"Unieważniono cache ({device or 'wszystkie urządzenia'})."))
+
+        if options['warm']:
+            ring, door = latest_state.warm(device)
+            self.stdout.write(f"Wypełniono cache: {len(ring)} odczytów, drzwi: {door}")
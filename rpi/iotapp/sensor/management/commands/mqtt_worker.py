@@ -1,86 +1,100 @@
-import ssl
-import json
-import os
-import paho.mqtt.client as mqtt
+import logging
+import signal
+from django.conf import settings
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-# Import Twoich modeli - zmień 'twoja_aplikacja' na nazwę swojej apki w Django
-from sensor.models import SensorReading, DoorStatus 
+from sensor.ingest import BatchWriter
+from sensor.live import LivePublisher
+from sensor.retention import RetentionScheduler
+from sensor.sinks import DatabaseSink
+from sensor.latest import latest_state
+from cloud_ingest import IOT_ENDPOINT, IOT_PORT, IngestHub, create_cloud_client
+from smokehouse_metrics import counter, gauge, start_http_server
+
+log = logging.getLogger("sensor.worker")
+
+# Metryki Prometheusa (no-op bez SMOKEHOUSE_METRICS=1); wiadomości, błędy
+# dekodowania i ponowne połączenia liczy IngestHub (ingest_*)
+QUEUE_DEPTH = gauge("worker_queue_depth", "Odczyty czekające w buforze BatchWriter")
+DROPPED = counter("worker_dropped_readings_total", "Odczyty odrzucone (pełny bufor albo nieudany zapis paczki)")
 
 class Command(BaseCommand):
     help = 'Uruchamia nasłuchiwanie MQTT dla czujników IoT'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Maksymalna liczba wierszy w jednym bulk_create')
+        parser.add_argument('--flush-interval', type=float, default=0.25,
+                            help='Maksymalny czas (s) oczekiwania odczytu w buforze')
+        parser.add_argument('--buffer-size', type=int, default=10000,
+                            help='Pojemność bufora; po przepełnieniu odczyty są odrzucane')
+        parser.add_argument('--no-live', action='store_true',
+                            help='Nie publikuj delt dla dashboardu na żywo (/api/live/)')
+        parser.add_argument('--no-retention', action='store_true',
+                            help='Nie uruchamiaj retencji surowych odczytów w tle')
+        parser.add_argument('--metrics-port', type=int, default=9109,
+                            help='Port endpointu /metrics (aktywny przy SMOKEHOUSE_METRICS=1)')
+
     def handle(self, *args, **options):
-        # Konfiguracja stałych (możesz to przenieść do settings.py w przyszłości)
-        IOT_ENDPOINT = "apc4udnp426oi-ats.iot.eu-central-1.amazonaws.com"
-        PORT = 8883
-        TOPIC = "decoded/#"
         CLIENT_ID = "django-worker-subscriber"
 
-        # Ścieżki do certyfikatów
-        CERT_ROOT = os.path.expanduser("~/iot/certs/AmazonRootCA1.pem")
-        CERT_FILE = os.path.expanduser("~/iot/certs/f397c6ef30d1506986fcfb78b23d519599e830bf5e15f66132f5f5cb678cd99c-certificate.pem.crt")
-        KEY_FILE  = os.path.expanduser("~/iot/certs/f397c6ef30d1506986fcfb78b23d519599e830bf5e15f66132f5f5cb678cd99c-private.pem.key")
-
-        def on_connect(client, userdata, flags, rc):
-            if rc == 0:
-                self.stdout.write(self.style.SUCCESS(f"Połączono z AWS IoT. Subskrypcja: {TOPIC}"))
-                client.subscribe(TOPIC)
+        # Po zapisie paczki (agregaty są w jej transakcji): cache najnowszego stanu
+        # i delty dla dashboardu na żywo
+        on_flush = [latest_state.on_flush]
+        live = None
+        if not options['no_live']:
+            live = LivePublisher()
+            if live.connect():
+                on_flush.append(live.on_flush)
             else:
-                self.stdout.write(self.style.ERROR(f"Błąd połączenia, kod: {rc}"))
+                live = None
 
-        def on_message(client, userdata, msg):
-            try:
-                payload = json.loads(msg.payload.decode())
-                topic = msg.topic
-                payload = payload.get('data')
-                # --- LOGIKA ROZPOZNAWANIA DANYCH ---
-                
-                # Przypadek 1: Dane środowiskowe (szukamy klucza 'temperature')
-                if 'temperature' in payload:
-                    SensorReading.objects.create(
-                        marker=payload.get('marker', 1), # Domyślnie 1 jeśli brak w JSON
-                        temperature=payload.get('temperature', 0.0),
-                        humidity=payload.get('humidity', 0.0),
-                        pressure=payload.get('pressure', 0.0),
-                        gas_resistance=payload.get('gas_resistance_ohm', 0.0) # Mapowanie klucza
-                    )
-                    print(f"[{topic}] Zapisano odczyt temperatury.")
+        # Zapis do bazy odbywa się w osobnym wątku, paczkami
+        writer = BatchWriter(max_batch=options['batch_size'],
+                             max_delay=options['flush_interval'],
+                             max_buffer=options['buffer_size'],
+                             on_flush=on_flush)
 
-                # Przypadek 2: Dane drzwi (szukamy klucza 'open_status' lub 'alarm')
-                elif 'open_status' in payload or 'alarm' in payload:
-                    # Konwersja boolean jeśli przychodzi jako tekst/liczba
-                    is_open = payload.get('door_open_status')
-                    
-                    if isinstance(is_open, str):
-                        is_open = is_open.lower() == 'true'
-                        
-                    DoorStatus.objects.create(
-                        open_status=bool(is_open),
-                        alarm=int(payload.get('alarm', 0))
-                    )
-                    print(f"[{topic}] Zapisano status drzwi.")
-                
-                else:
-                    print(f"[{topic}] Nieznany format danych: {payload}")
+        # Archiwizacja i usuwanie starych odczytów małymi paczkami, w tle
+        retention = None
+        if not options['no_retention']:
+            retention = RetentionScheduler(interval=settings.SENSOR_RETENTION_INTERVAL)
 
-            except json.JSONDecodeError:
-                self.stdout.write(self.style.ERROR("Błąd dekodowania JSON"))
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f"Błąd zapisu do bazy: {e}"))
+        QUEUE_DEPTH.set_function(lambda: writer.depth)
+        DROPPED.set_function(lambda: writer.dropped)
 
-        # Inicjalizacja klienta MQTT
-        client = mqtt.Client(client_id=CLIENT_ID)
-        client.tls_set(ca_certs=CERT_ROOT,
-                       certfile=CERT_FILE,
-                       keyfile=KEY_FILE,
-                       tls_version=ssl.PROTOCOL_TLSv1_2)
-        
-        client.on_connect = on_connect
-        client.on_message = on_message
+        # Odbiór i dekodowanie wiadomości decoded/# wspólne z bridge.py (cloud_ingest.py),
+        # tu tylko zapis do bazy
+        hub = IngestHub([DatabaseSink(writer)])
+        client = create_cloud_client(CLIENT_ID, hub.on_connect, hub.on_message)
+
+        # SIGTERM (np. systemctl stop) traktujemy jak Ctrl+C, żeby opróżnić bufor
+        def on_sigterm(signum, frame):
+            raise KeyboardInterrupt
+
+        signal.signal(signal.SIGTERM, on_sigterm)
+
+        metrics_server = start_http_server(options['metrics_port'])
+        if metrics_server is not None:
+            log.info("Metryki: http://%s:%d/metrics", *metrics_server.server_address[:2])
 
         self.stdout.write("Rozpoczynanie pętli MQTT...")
-        client.connect(IOT_ENDPOINT, PORT, keepalive=60)
-        
-        # loop_forever blokuje ten proces, co jest pożądane dla workera
-        client.loop_forever()
+        hub.start()
+        if retention is not None:
+            retention.start()
+        try:
+            client.connect(IOT_ENDPOINT, IOT_PORT, keepalive=60)
+
+            # loop_forever blokuje ten proces, co jest pożądane dla workera
+            client.loop_forever()
+        except KeyboardInterrupt:
+            self.stdout.write("Zatrzymywanie workera...")
+        finally:
+            client.disconnect()
+            if retention is not None:
+                retention.stop()
+            hub.stop()
+            if live is not None:
+                live.disconnect()
+            if metrics_server is not None:
+                metrics_server.shutdown()
+            self.stdout.write(self.style.SUCCESS(f"Bufor zapisany: {writer.stats()}"))
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from sensor.retention import BATCH_SIZE, RETENTION_DAYS, run_retention_step
+
+
+class Command(BaseCommand):
+    help = ('Archiwizuje dni starsze niż okres retencji do plików kolumnowych '
+            'i usuwa je z bazy małymi paczkami')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=RETENTION_DAYS,
+                            help='Ile dni surowych odczytów zachować w bazie')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Maksymalna liczba wierszy usuwanych w jednej transakcji')
+        parser.add_argument('--max-batches', type=int, default=None,
+                            help='Zatrzymaj po tylu krokach (domyślnie do końca zaległości)')
+        parser.add_argument('--pause', type=float, default=0.1,
+                            help='Przerwa między krokami [s], żeby nie blokować workera')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Pokaż tylko najstarsze wygasłe dni i liczbę wierszy')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            result = run_retention_step(options['days'], options['batch_size'], dry_run=True)
+            for table, (day, count) in result.items():
+                self.stdout.write(f"{table}: najstarszy wygasły dzień {day}, wierszy: {count}")
+            if not result:
+                self.stdout.write("Brak danych starszych niż okres retencji.")
+            return
+
+        steps = 0
+        total = 0
+        while options['max_batches'] is None or steps < options['max_batches']:
+            result = run_retention_step(options['days'], options['batch_size'])
+            deleted = sum(count for _, count in result.values())
+            if not deleted:
+                break
+            for table, (day, count) in result.items():
+                self.stdout.write(f"{table} {day}: usunięto {count}")
+            total += deleted
+            steps += 1
+            time.sleep(options['pause'])
+
+        self.stdout.write(self.style.SUCCESS(f"Zakończono: usunięto {total} wierszy w {steps} krokach."))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from sensor.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = ('Przelicza od nowa tabele agregatów (1 min / 15 min / 1 h) z surowych odczytów '
+            '(starsze przedziały, bez surowych odczytów po retencji, zostają)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Liczba odczytów przetwarzanych w jednym kroku')
+
+    def handle(self, *args, **options):
+        total = rebuild_rollups(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Przeliczono agregaty z {total} odczytów."))
@@ -0,0 +1,59 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+
+class Command(BaseCommand):
+    help = ('Konserwacja bazy SQLite: checkpoint WAL, PRAGMA optimize i opcjonalnie VACUUM; '
+            'z --interval działa w pętli (np. jako usługa systemd obok mqtt_worker)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vacuum', action='store_true',
+                            help='Wykonaj VACUUM (blokuje zapis na czas działania - uruchamiaj rzadko)')
+        parser.add_argument('--checkpoint-mode', default='TRUNCATE',
+                            choices=['PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'],
+                            help='Tryb wal_checkpoint (domyślnie TRUNCATE - zeruje plik -wal)')
+        parser.add_argument('--interval', type=float, default=None,
+                            help='Powtarzaj co podaną liczbę sekund zamiast jednorazowo')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            self.stdout.write(self.style.WARNING("Baza nie jest SQLite - nic do zrobienia."))
+            return
+
+        while True:
+            self._run_once(options)
+            if options['interval'] is None:
+                break
+            time.sleep(options['interval'])
+
+    def _run_once(self, options):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            journal_mode = cursor.fetchone()[0]
+
+            if journal_mode.lower() == 'wal':
+                cursor.execute(f"PRAGMA wal_checkpoint({options['checkpoint_mode']})")
+                busy, wal_pages, checkpointed = cursor.fetchone()
+                self.stdout.write(f"Checkpoint WAL: stron w WAL={wal_pages}, przeniesionych={checkpointed}, "
+                                  f"{'zablokowany przez czytelnika' if busy else 'OK'}")
+            else:
+                self.stdout.write(f"Tryb dziennika: {journal_mode} (checkpoint pominięty)")
+
+            cursor.execute('PRAGMA optimize')
+
+            if options['vacuum']:
+                cursor.execute('PRAGMA freelist_count')
+                free_pages = cursor.fetchone()[0]
+                started = time.perf_counter()
+                cursor.execute('VACUUM')
+                self.stdout.write(f"VACUUM: zwolniono {free_pages} stron w {time.perf_counter() - started:.2f}s")
+
+            cursor.execute('PRAGMA page_count')
+            page_count = cursor.fetchone()[0]
+            cursor.execute('PRAGMA page_size')
+            page_size = cursor.fetchone()[0]
+
+        self.stdout.write(self.style.SUCCESS(
+            f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Rozmiar bazy: {page_count * page_size / 1e6:.1f} MB"))
@@ -0,0 +1,100 @@
+# Generated by Django 5.2.8 on 2025-12-03 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sensor', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SensorRollupHour',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField()),
+                ('marker', models.IntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('temperature_min', models.FloatField()),
+                ('temperature_max', models.FloatField()),
+                ('temperature_sum', models.FloatField(default=0.0)),
+                ('humidity_min', models.FloatField()),
+                ('humidity_max', models.FloatField()),
+                ('humidity_sum', models.FloatField(default=0.0)),
+                ('pressure_min', models.FloatField()),
+                ('pressure_max', models.FloatField()),
+                ('pressure_sum', models.FloatField(default=0.0)),
+                ('gas_resistance_min', models.FloatField()),
+                ('gas_resistance_max', models.FloatField()),
+                ('gas_resistance_sum', models.FloatField(default=0.0)),
+            ],
+            options={
+                'ordering': ['bucket_start'],
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='SensorRollupMinute',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField()),
+                ('marker', models.IntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('temperature_min', models.FloatField()),
+                ('temperature_max', models.FloatField()),
+                ('temperature_sum', models.FloatField(default=0.0)),
+                ('humidity_min', models.FloatField()),
+                ('humidity_max', models.FloatField()),
+                ('humidity_sum', models.FloatField(default=0.0)),
+                ('pressure_min', models.FloatField()),
+                ('pressure_max', models.FloatField()),
+                ('pressure_sum', models.FloatField(default=0.0)),
+                ('gas_resistance_min', models.FloatField()),
+                ('gas_resistance_max', models.FloatField()),
+                ('gas_resistance_sum', models.FloatField(default=0.0)),
+            ],
+            options={
+                'ordering': ['bucket_start'],
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='SensorRollupQuarter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField()),
+                ('marker', models.IntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('temperature_min', models.FloatField()),
+                ('temperature_max', models.FloatField()),
+                ('temperature_sum', models.FloatField(default=0.0)),
+                ('humidity_min', models.FloatField()),
+                ('humidity_max', models.FloatField()),
+                ('humidity_sum', models.FloatField(default=0.0)),
+                ('pressure_min', models.FloatField()),
+                ('pressure_max', models.FloatField()),
+                ('pressure_sum', models.FloatField(default=0.0)),
+                ('gas_resistance_min', models.FloatField()),
+                ('gas_resistance_max', models.FloatField()),
+                ('gas_resistance_sum', models.FloatField(default=0.0)),
+            ],
+            options={
+                'ordering': ['bucket_start'],
+                'abstract': False,
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='sensorrolluphour',
+            constraint=models.UniqueConstraint(fields=('marker', 'bucket_start'), name='sensor_sensorrolluphour_marker_bucket'),
+        ),
+        migrations.AddConstraint(
+            model_name='sensorrollupminute',
+            constraint=models.UniqueConstraint(fields=('marker', 'bucket_start'), name='sensor_sensorrollupminute_marker_bucket'),
+        ),
+        migrations.AddConstraint(
+            model_name='sensorrollupquarter',
+            constraint=models.UniqueConstraint(fields=('marker', 'bucket_start'), name='sensor_sensorrollupquarter_marker_bucket'),
+        ),
+    ]
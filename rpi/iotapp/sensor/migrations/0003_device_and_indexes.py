@@ -0,0 +1,81 @@
+# Generated by Django 5.2.8 on 2025-12-04 09:47
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sensor', '0002_sensorrollup'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='sensorreading',
+            name='timestamp',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='sensorreading',
+            name='device',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='doorstatus',
+            name='timestamp',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='doorstatus',
+            name='device',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='sensorreading',
+            index=models.Index(fields=['device', 'timestamp'], name='reading_device_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='doorstatus',
+            index=models.Index(fields=['device', 'timestamp'], name='door_device_ts_idx'),
+        ),
+        migrations.RemoveConstraint(
+            model_name='sensorrollupminute',
+            name='sensor_sensorrollupminute_marker_bucket',
+        ),
+        migrations.AddField(
+            model_name='sensorrollupminute',
+            name='device',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddConstraint(
+            model_name='sensorrollupminute',
+            constraint=models.UniqueConstraint(fields=('device', 'marker', 'bucket_start'), name='sensor_sensorrollupminute_dev_marker_bucket'),
+        ),
+        migrations.RemoveConstraint(
+            model_name='sensorrollupquarter',
+            name='sensor_sensorrollupquarter_marker_bucket',
+        ),
+        migrations.AddField(
+            model_name='sensorrollupquarter',
+            name='device',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddConstraint(
+            model_name='sensorrollupquarter',
+            constraint=models.UniqueConstraint(fields=('device', 'marker', 'bucket_start'), name='sensor_sensorrollupquarter_dev_marker_bucket'),
+        ),
+        migrations.RemoveConstraint(
+            model_name='sensorrolluphour',
+            name='sensor_sensorrolluphour_marker_bucket',
+        ),
+        migrations.AddField(
+            model_name='sensorrolluphour',
+            name='device',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddConstraint(
+            model_name='sensorrolluphour',
+            constraint=models.UniqueConstraint(fields=('device', 'marker', 'bucket_start'), name='sensor_sensorrolluphour_dev_marker_bucket'),
+        ),
+    ]
@@ -1,18 +1,106 @@
 from django.db import models
+from django.utils import timezone
+
+# Identyfikator urządzenia to końcówka topicu MQTT: decoded/<device>.
+# Odczyty sprzed migracji 0003 mają pusty identyfikator.
+DEVICE_ID_LENGTH = 64
 
 # Create your models here.
 class SensorReading(models.Model):
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Czas odbioru ustawia worker (default zamiast auto_now_add, żeby zapis
+    # paczkami nie przesuwał znaczników na moment flush-a)
+    timestamp = models.DateTimeField(default=timezone.now, db_index=True)
+    device = models.CharField(max_length=DEVICE_ID_LENGTH, default="", blank=True)
     marker = models.IntegerField()
     temperature = models.FloatField()
     humidity = models.FloatField()
     pressure = models.FloatField()
     gas_resistance = models.FloatField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["device", "timestamp"], name="reading_device_ts_idx"),
+        ]
+
     def __str__(self):
         return f"{self.timestamp} | {self.temperature}°C | {self.humidity}"
 
 class DoorStatus(models.Model):
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now, db_index=True)
+    device = models.CharField(max_length=DEVICE_ID_LENGTH, default="", blank=True)
     open_status = models.BooleanField()
     alarm = models.IntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["device", "timestamp"], name="door_device_ts_idx"),
+        ]
+
+
+# ----------------- AGREGATY (ROLLUPS) -----------------
+# Agregaty min/max/suma/liczność odczytów w stałych przedziałach czasu,
+# aktualizowane przyrostowo przez mqtt_worker (patrz sensor/rollups.py).
+
+class SensorRollup(models.Model):
+    bucket_start = models.DateTimeField()
+    device = models.CharField(max_length=DEVICE_ID_LENGTH, default="", blank=True)
+    marker = models.IntegerField()
+    count = models.IntegerField(default=0)
+
+    temperature_min = models.FloatField()
+    temperature_max = models.FloatField()
+    temperature_sum = models.FloatField(default=0.0)
+
+    humidity_min = models.FloatField()
+    humidity_max = models.FloatField()
+    humidity_sum = models.FloatField(default=0.0)
+
+    pressure_min = models.FloatField()
+    pressure_max = models.FloatField()
+    pressure_sum = models.FloatField(default=0.0)
+
+    gas_resistance_min = models.FloatField()
+    gas_resistance_max = models.FloatField()
+    gas_resistance_sum = models.FloatField(default=0.0)
+
+    # Długość przedziału w sekundach - nadpisywana w klasach potomnych
+    bucket_seconds = None
+
+    class Meta:
+        abstract = True
+        ordering = ["bucket_start"]
+        constraints = [
+            models.UniqueConstraint(fields=["device", "marker", "bucket_start"],
+                                    name="%(app_label)s_%(class)s_dev_marker_bucket"),
+        ]
+
+    @property
+    def temperature_mean(self):
+        return self.temperature_sum / self.count if self.count else None
+
+    @property
+    def humidity_mean(self):
+        return self.humidity_sum / self.count if self.count else None
+
+    @property
+    def pressure_mean(self):
+        return self.pressure_sum / self.count if self.count else None
+
+    @property
+    def gas_resistance_mean(self):
+        return self.gas_resistance_sum / self.count if self.count else None
+
+    def __str__(self):
+        return f"{self.bucket_start} | {self.device or '-'} | marker {self.marker} | n={self.count}"
+
+
+class SensorRollupMinute(SensorRollup):
+    bucket_seconds = 60
+
+
+class SensorRollupQuarter(SensorRollup):
+    bucket_seconds = 15 * 60
+
+
+class SensorRollupHour(SensorRollup):
+    bucket_seconds = 60 * 60
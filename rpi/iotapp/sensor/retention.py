@@ -0,0 +1,237 @@
+"""
+Retencja surowych odczytów z archiwizacją dziennych partycji.
+
+Dni starsze niż ``SENSOR_RAW_RETENTION_DAYS`` są najpierw eksportowane do
+pliku kolumnowego (``<archiwum>/<tabela>/<RRRR-MM-DD>.npz``, a bez numpy
+``.csv.gz``), a dopiero potem usuwane z bazy małymi paczkami, żeby żadna
+transakcja nie trzymała blokady zapisu dłużej niż kilka milisekund.
+Usuwane są tylko wiersze obecne w archiwum; odczyty dnia, które doszły po
+jego eksporcie, trafiają do kolejnej części (``<RRRR-MM-DD>.1.npz`` ...).
+Agregaty (sensor/rollups.py) nie są usuwane - długie okna historii nadal
+działają po skasowaniu surowych danych.
+"""
+
+import csv
+import gzip
+import logging
+import os
+import threading
+from datetime import datetime, time as dt_time, timedelta, timezone as dt_timezone
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from .models import SensorReading, DoorStatus
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+RETENTION_DAYS = getattr(settings, "SENSOR_RAW_RETENTION_DAYS", 30)
+ARCHIVE_DIR = Path(getattr(settings, "SENSOR_ARCHIVE_DIR", settings.BASE_DIR / "archive"))
+BATCH_SIZE = getattr(settings, "SENSOR_RETENTION_BATCH", 2000)
+
+RETAINED_MODELS = (SensorReading, DoorStatus)
+
+log = logging.getLogger(__name__)
+
+
+def _columns(model):
+    return [f.attname for f in model._meta.concrete_fields]
+
+
+def _day_bounds(day):
+    start = datetime.combine(day, dt_time.min, tzinfo=dt_timezone.utc)
+    return start, start + timedelta(days=1)
+
+
+def archive_path(model, day, part=0):
+    """Plik archiwum dnia; ``part`` > 0 - kolejne pliki z odczytami, które doszły później"""
+    suffix = ".npz" if NUMPY_AVAILABLE else ".csv.gz"
+    name = day.isoformat() if part == 0 else f"{day.isoformat()}.{part}"
+    return ARCHIVE_DIR / model._meta.db_table / f"{name}{suffix}"
+
+
+def _stem(path):
+    """Nazwa pliku archiwum bez rozszerzenia formatu (2024-01-01, 2024-01-01.1)"""
+    return path.name.removesuffix(".npz").removesuffix(".csv.gz")
+
+
+def archive_files(model, day):
+    """Istniejące pliki archiwum dnia (główny i kolejne części, oba formaty)"""
+    directory = ARCHIVE_DIR / model._meta.db_table
+    if not directory.is_dir():
+        return []
+    prefix = day.isoformat()
+    parts = {}
+    for p in directory.iterdir():
+        name, _, part = _stem(p).partition(".")
+        if name == prefix and p.name.endswith((".npz", ".csv.gz")) and (part == "" or part.isdigit()):
+            parts[p] = int(part or 0)
+    # Kolejność części: <dzień>, <dzień>.1, <dzień>.2, ...
+    return sorted(parts, key=parts.get)
+
+
+@lru_cache(maxsize=16)
+def _ids_in_file(path, mtime_ns):
+    # mtime_ns w kluczu - plik nadpisany (os.replace) jest czytany od nowa
+    if path.endswith(".npz"):
+        if not NUMPY_AVAILABLE:
+            return frozenset()
+        with np.load(path) as data:
+            return frozenset(int(v) for v in data["id"])
+    with gzip.open(path, "rt", newline="") as f:
+        return frozenset(int(row["id"]) for row in csv.DictReader(f))
+
+
+def archived_ids(model, day):
+    """Id wierszy dnia zapisanych już w archiwum"""
+    ids = set()
+    for path in archive_files(model, day):
+        ids |= _ids_in_file(str(path), path.stat().st_mtime_ns)
+    return ids
+
+
+def archive_day(model, day):
+    """
+    Eksportuje wiersze modelu z danego dnia (UTC), których nie ma jeszcze
+    w archiwum. Pierwszy eksport trafia do ``<dzień>``, odczyty, które
+    doszły po nim (spóźnione) - do kolejnych części ``<dzień>.<n>``.
+    Zwraca liczbę wyeksportowanych wierszy.
+    """
+    existing = archive_files(model, day)
+    done = archived_ids(model, day) if existing else set()
+
+    start, end = _day_bounds(day)
+    names = _columns(model)
+    rows = [r for r in model.objects.filter(timestamp__gte=start, timestamp__lt=end)
+            .order_by("id").values_list(*names) if r[0] not in done]
+    if not rows:
+        return 0
+
+    # Pierwsza wolna część (w dowolnym formacie)
+    taken = {_stem(p) for p in existing}
+    part = 0
+    while _stem(archive_path(model, day, part)) in taken:
+        part += 1
+    path = archive_path(model, day, part)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+
+    if NUMPY_AVAILABLE:
+        columns = {}
+        for i, name in enumerate(names):
+            values = [r[i] for r in rows]
+            if isinstance(values[0], datetime):
+                # mikrosekundy epoki, int64 - kompaktowo i bez strefy czasowej
+                columns[name] = np.array([int(v.timestamp() * 1_000_000) for v in values], dtype=np.int64)
+            elif isinstance(values[0], str):
+                columns[name] = np.array(values, dtype=str)
+            else:
+                columns[name] = np.array(values)
+        with open(tmp, "wb") as f:
+            np.savez_compressed(f, **columns)
+    else:
+        with gzip.open(tmp, "wt", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(names)
+            for r in rows:
+                writer.writerow(v.isoformat() if isinstance(v, datetime) else v for v in r)
+
+    # Zapis przez plik tymczasowy - przerwany eksport nie zostawi połowy partycji
+    os.replace(tmp, path)
+    return len(rows)
+
+
+def _oldest_expired_day(model, cutoff):
+    first = model.objects.filter(timestamp__lt=cutoff).order_by("timestamp").values_list("timestamp", flat=True).first()
+    if first is None:
+        return None
+    day = first.astimezone(dt_timezone.utc).date()
+    _, day_end = _day_bounds(day)
+    # Partycja musi być w całości starsza niż próg, inaczej mogłyby do niej jeszcze dojść odczyty
+    return day if day_end <= cutoff else None
+
+
+def retention_cutoff(days=RETENTION_DAYS, now=None):
+    """Początek najstarszego dnia (UTC), który jeszcze nie podlega usunięciu"""
+    now = now or timezone.now()
+    return datetime.combine((now - timedelta(days=days)).date(), dt_time.min, tzinfo=dt_timezone.utc)
+
+
+def run_retention_step(days=RETENTION_DAYS, batch_size=BATCH_SIZE, now=None, dry_run=False):
+    """
+    Jeden krok retencji: dla każdego modelu archiwizuje najstarszy wygasły
+    dzień (wiersze, których jeszcze nie ma w archiwum) i usuwa z niego co najwyżej
+    ``batch_size`` wierszy. Zwraca {nazwa tabeli: (dzień, usunięte)}.
+    """
+    cutoff = retention_cutoff(days, now)
+
+    result = {}
+    for model in RETAINED_MODELS:
+        day = _oldest_expired_day(model, cutoff)
+        if day is None:
+            continue
+
+        if dry_run:
+            start, end = _day_bounds(day)
+            result[model._meta.db_table] = (day, model.objects.filter(timestamp__gte=start, timestamp__lt=end).count())
+            continue
+
+        archive_day(model, day)
+        # Usuwamy tylko wiersze, które są w archiwum (spóźnione odczyty trafiają
+        # do kolejnej części przy następnym kroku, zanim zostaną usunięte)
+        archived = archived_ids(model, day)
+        start, end = _day_bounds(day)
+        ids = []
+        for row_id in (model.objects.filter(timestamp__gte=start, timestamp__lt=end)
+                       .order_by("id").values_list("id", flat=True).iterator()):
+            if row_id in archived:
+                ids.append(row_id)
+                if len(ids) >= batch_size:
+                    break
+        deleted, _ = model.objects.filter(id__in=ids).delete() if ids else (0, None)
+        result[model._meta.db_table] = (day, deleted)
+    return result
+
+
+class RetentionScheduler:
+    """Uruchamia ``run_retention_step`` co ``interval`` sekund w wątku w tle (np. w mqtt_worker)"""
+
+    def __init__(self, interval=60.0, days=RETENTION_DAYS, batch_size=BATCH_SIZE):
+        self.interval = interval
+        self.days = days
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sensor-retention", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        try:
+            while not self._stop.wait(self.interval):
+                close_old_connections()
+                try:
+                    # Dopóki są zaległe dni, kroki idą jeden po drugim z krótką przerwą
+                    while not self._stop.is_set():
+                        result = run_retention_step(self.days, self.batch_size)
+                        if not any(deleted for _, deleted in result.values()):
+                            break
+                        self._stop.wait(0.5)
+                except Exception:
+                    log.exception("Błąd kroku retencji")
+        finally:
+            connection.close()
@@ -0,0 +1,228 @@
+"""
+Agregaty czasowe odczytów (1 min, 15 min, 1 h).
+
+``ingest.save_batch`` w transakcji zapisu paczki wywołuje ``update_rollups``,
+które scala nowe odczyty z istniejącymi przedziałami. Widoki historii korzystają z
+``select_series``, która dobiera rozdzielczość do długości okna, więc liczba
+zwracanych punktów zależy od okna, a nie od liczby wierszy w bazie.
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+
+from .downsample import lttb_indices
+from .models import SensorReading, SensorRollupMinute, SensorRollupQuarter, SensorRollupHour
+from .retention import retention_cutoff
+
+METRICS = ("temperature", "humidity", "pressure", "gas_resistance")
+
+# Od najdrobniejszej do najgrubszej
+ROLLUP_MODELS = (SensorRollupMinute, SensorRollupQuarter, SensorRollupHour)
+
+# Okna krótsze niż ten próg (w sekundach) są obsługiwane z surowych odczytów
+RAW_WINDOW_SECONDS = getattr(settings, "SENSOR_ROLLUP_RAW_WINDOW", 15 * 60)
+
+
+def bucket_floor(ts, seconds):
+    """Początek przedziału (UTC) zawierającego chwilę ``ts``"""
+    epoch = int(ts.timestamp())
+    return datetime.fromtimestamp(epoch - epoch % seconds, tz=dt_timezone.utc)
+
+
+def _aggregate(readings, seconds):
+    """Zwija odczyty do słownika {(device, marker, bucket_start): pola agregatu}"""
+    buckets = {}
+    for r in readings:
+        key = (r.device, r.marker, bucket_floor(r.timestamp, seconds))
+        agg = buckets.get(key)
+        if agg is None:
+            agg = {"count": 0}
+            for m in METRICS:
+                value = getattr(r, m)
+                agg[f"{m}_min"] = value
+                agg[f"{m}_max"] = value
+                agg[f"{m}_sum"] = 0.0
+            buckets[key] = agg
+
+        agg["count"] += 1
+        for m in METRICS:
+            value = getattr(r, m)
+            if value < agg[f"{m}_min"]:
+                agg[f"{m}_min"] = value
+            if value > agg[f"{m}_max"]:
+                agg[f"{m}_max"] = value
+            agg[f"{m}_sum"] += value
+    return buckets
+
+
+def _merge(obj, agg):
+    obj.count += agg["count"]
+    for m in METRICS:
+        setattr(obj, f"{m}_min", min(getattr(obj, f"{m}_min"), agg[f"{m}_min"]))
+        setattr(obj, f"{m}_max", max(getattr(obj, f"{m}_max"), agg[f"{m}_max"]))
+        setattr(obj, f"{m}_sum", getattr(obj, f"{m}_sum") + agg[f"{m}_sum"])
+
+
+_ROLLUP_FIELDS = ["count"] + [f"{m}_{s}" for m in METRICS for s in ("min", "max", "sum")]
+
+
+def update_rollups(readings):
+    """Dolicza zapisane odczyty do wszystkich tabel agregatów"""
+    readings = [r for r in readings if r.timestamp is not None]
+    if not readings:
+        return
+
+    for model in ROLLUP_MODELS:
+        buckets = _aggregate(readings, model.bucket_seconds)
+
+        # Jedno zapytanie o istniejące przedziały tej paczki
+        devices = {device for device, _, _ in buckets}
+        markers = {marker for _, marker, _ in buckets}
+        starts = {start for _, _, start in buckets}
+        existing = {
+            (obj.device, obj.marker, obj.bucket_start): obj
+            for obj in model.objects.filter(device__in=devices, marker__in=markers, bucket_start__in=starts)
+        }
+
+        to_update = []
+        to_create = []
+        for key, agg in buckets.items():
+            obj = existing.get(key)
+            if obj is None:
+                to_create.append(model(device=key[0], marker=key[1], bucket_start=key[2], **agg))
+            else:
+                _merge(obj, agg)
+                to_update.append(obj)
+
+        if to_update:
+            model.objects.bulk_update(to_update, _ROLLUP_FIELDS)
+        if to_create:
+            model.objects.bulk_create(to_create)
+
+
+def rebuild_since():
+    """
+    Początek okresu, którego surowe odczyty są w bazie w całości: dzień (UTC)
+    najstarszego odczytu, a gdy ten dzień jest już usuwany przez retencję -
+    następny. None, gdy tabela odczytów jest pusta.
+    """
+    first = SensorReading.objects.order_by("timestamp").values_list("timestamp", flat=True).first()
+    if first is None:
+        return None
+    since = bucket_floor(first, 24 * 60 * 60)
+    if since + timedelta(days=1) <= retention_cutoff():
+        since += timedelta(days=1)
+    return since
+
+
+def rebuild_rollups(chunk_size=5000):
+    """
+    Przelicza agregaty z surowych odczytów - tylko od ``rebuild_since()``.
+    Starsze przedziały (surowe odczyty usunięte przez retencję) zostają
+    nietknięte. Całość w jednej transakcji: błąd nie zostawia pustych tabel.
+    """
+    since = rebuild_since()
+    if since is None:
+        return 0
+
+    total = 0
+    with transaction.atomic():
+        for model in ROLLUP_MODELS:
+            model.objects.filter(bucket_start__gte=since).delete()
+
+        last_id = 0
+        while True:
+            chunk = list(SensorReading.objects.filter(id__gt=last_id, timestamp__gte=since)
+                         .order_by("id")[:chunk_size])
+            if not chunk:
+                break
+            update_rollups(chunk)
+            last_id = chunk[-1].id
+            total += len(chunk)
+    return total
+
+
+def pick_resolution(start, end, max_points):
+    """
+    Wybiera źródło danych dla okna [start, end].
+
+    Zwraca None dla surowych odczytów albo model agregatu o najdrobniejszej
+    rozdzielczości, która mieści się w ``max_points`` punktach.
+    """
+    window = (end - start).total_seconds()
+    if window <= RAW_WINDOW_SECONDS:
+        return None
+    for model in ROLLUP_MODELS:
+        if window / model.bucket_seconds <= max_points:
+            return model
+    return ROLLUP_MODELS[-1]
+
+
+def _thin(rows, time_of, value_of, max_points):
+    """Co najwyżej ``max_points`` wierszy wybranych przez LTTB; zwraca (wiersze, czy zmniejszono)"""
+    if len(rows) <= max_points:
+        return rows, False
+    keep = lttb_indices([time_of(r) for r in rows], [value_of(r) for r in rows], max_points)
+    return [rows[i] for i in keep], True
+
+
+def select_series(start, end, device=None, marker=None, max_points=500):
+    """
+    Zwraca serię dla okna czasowego w postaci słownika list.
+
+    Dla agregatów wartości są średnimi w przedziale, a dodatkowo zwracane są
+    min/max, żeby wykres mógł narysować pasmo zmienności. Seria dłuższa niż
+    ``max_points`` (np. bardzo długie okno nawet w agregatach godzinowych)
+    jest zmniejszana algorytmem LTTB i ma ``downsampled`` = True.
+    """
+    model = pick_resolution(start, end, max_points)
+
+    if model is None:
+        qs = SensorReading.objects.filter(timestamp__gte=start, timestamp__lte=end)
+        if device is not None:
+            qs = qs.filter(device=device)
+        if marker is not None:
+            qs = qs.filter(marker=marker)
+        rows, downsampled = _thin(list(qs.order_by("timestamp")), lambda r: r.timestamp.timestamp(),
+                                  lambda r: r.temperature, max_points)
+        series = {"resolution": "raw", "downsampled": downsampled, "timestamps": [r.timestamp.isoformat() for r in rows], "counts": [1] * len(rows)}
+        for m in METRICS:
+            values = [getattr(r, m) for r in rows]
+            series[m] = values
+            series[f"{m}_min"] = values
+            series[f"{m}_max"] = values
+        return series
+
+    qs = model.objects.filter(bucket_start__gte=bucket_floor(start, model.bucket_seconds), bucket_start__lte=end)
+    if device is not None:
+        qs = qs.filter(device=device)
+    if device is not None and marker is not None:
+        qs = qs.filter(marker=marker)
+        rows = list(qs.order_by("bucket_start"))
+    else:
+        if marker is not None:
+            qs = qs.filter(marker=marker)
+        # Bez wskazania urządzenia/markera scalamy przedziały wszystkich czujników
+        merged = {}
+        for obj in qs.order_by("bucket_start"):
+            current = merged.get(obj.bucket_start)
+            if current is None:
+                merged[obj.bucket_start] = obj
+            else:
+                _merge(current, {f: getattr(obj, f) for f in _ROLLUP_FIELDS})
+        rows = list(merged.values())
+    rows, downsampled = _thin(rows, lambda r: r.bucket_start.timestamp(), lambda r: r.temperature_mean, max_points)
+
+    series = {
+        "resolution": f"{model.bucket_seconds}s",
+        "downsampled": downsampled,
+        "timestamps": [r.bucket_start.isoformat() for r in rows],
+        "counts": [r.count for r in rows],
+    }
+    for m in METRICS:
+        series[m] = [getattr(r, f"{m}_mean") for r in rows]
+        series[f"{m}_min"] = [getattr(r, f"{m}_min") for r in rows]
+        series[f"{m}_max"] = [getattr(r, f"{m}_max") for r in rows]
+    return series
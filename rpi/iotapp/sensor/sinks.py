@@ -0,0 +1,93 @@
+"""
+Odbiornik cloud_ingest zapisujący odczyty do bazy.
+
+Zdekodowana wiadomość (cloud_payload.Message) zamieniana jest na obiekt
+modelu i wrzucana do BatchWriter (ingest.py) - zapis paczkami odbywa się
+w wątku writera, więc ``handle`` w wątku sieciowym MQTT jest krótkie.
+"""
+
+import logging
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+
+from cloud_ingest import Sink
+from cloud_payload import KIND_DOOR, KIND_ENVIRONMENT
+
+from .ingest import BatchWriter
+from .latest import latest_state
+from .models import DoorStatus, SensorReading
+
+log = logging.getLogger(__name__)
+
+
+def environment_reading(fields, device, timestamp):
+    return SensorReading(
+        timestamp=timestamp,
+        device=device,
+        marker=fields['marker'],
+        temperature=fields['temperature'],
+        humidity=fields['humidity'],
+        pressure=fields['pressure'],
+        gas_resistance=fields['gas_resistance_ohm']  # Mapowanie klucza
+    )
+
+
+def door_status(fields, device, timestamp):
+    return DoorStatus(
+        timestamp=timestamp,
+        device=device,
+        # door_open_status (albo dawne open_status) już jako 0/1
+        open_status=bool(fields.get('door_open_status', 0)),
+        alarm=fields['alarm']
+    )
+
+
+# Rodzaj odczytu (cloud_payload.decode) -> obiekt modelu
+MODEL_BUILDERS = {
+    KIND_ENVIRONMENT: environment_reading,
+    KIND_DOOR: door_status,
+}
+
+
+def message_to_model(message, device, received_at):
+    """Message -> niezapisany obiekt modelu albo None dla nieznanego rodzaju"""
+    build = MODEL_BUILDERS.get(message.kind)
+    if build is None:
+        return None
+    if settings.USE_TZ:
+        timestamp = datetime.fromtimestamp(received_at, tz=dt_timezone.utc)
+    else:
+        timestamp = datetime.fromtimestamp(received_at)
+    return build(message.fields, device, timestamp)
+
+
+class DatabaseSink(Sink):
+    """Zapis odczytów przez BatchWriter (z agregatami); domyślnie też cache najnowszego stanu"""
+
+    name = "db"
+
+    def __init__(self, writer=None, **writer_options):
+        if writer is None:
+            writer_options.setdefault("on_flush", [latest_state.on_flush])
+            writer = BatchWriter(**writer_options)
+        self.writer = writer
+
+    def start(self):
+        self.writer.start()
+
+    def handle(self, event):
+        obj = message_to_model(event.message, event.device, event.received_at)
+        if obj is None:
+            log.warning("[%s] Nieznany format danych: %s", event.topic, event.message.fields,
+                        extra={"topic": event.topic})
+            return
+        if not self.writer.submit(obj):
+            log.warning("[%s] Bufor pełny - odrzucono odczyt %s (odrzucone: %d)", event.topic,
+                        event.message.kind, self.writer.dropped, extra={"topic": event.topic})
+
+    def stop(self):
+        self.writer.stop()
+
+    def stats(self):
+        return self.writer.stats()
@@ -0,0 +1,31 @@
+import math
+
+from django.test import SimpleTestCase
+
+from sensor.downsample import lttb_indices
+
+
+class LttbIndicesTests(SimpleTestCase):
+    def test_short_series_is_unchanged(self):
+        self.assertEqual(lttb_indices([0, 1, 2], [5, 6, 7], 3), [0, 1, 2])
+        self.assertEqual(lttb_indices([0, 1], [5, 6], 10), [0, 1])
+
+    def test_tiny_thresholds(self):
+        xs = list(range(10))
+        self.assertEqual(lttb_indices(xs, xs, 2), [0, 9])
+        self.assertEqual(lttb_indices(xs, xs, 1), [0])
+        self.assertEqual(lttb_indices(xs, xs, 0), [])
+
+    def test_keeps_endpoints_and_order(self):
+        xs = list(range(1000))
+        ys = [math.sin(x / 50) for x in xs]
+        keep = lttb_indices(xs, ys, 100)
+        self.assertEqual(len(keep), 100)
+        self.assertEqual((keep[0], keep[-1]), (0, 999))
+        self.assertEqual(keep, sorted(set(keep)))
+
+    def test_keeps_spike(self):
+        xs = list(range(500))
+        ys = [0.0] * 500
+        ys[237] = 100.0
+        self.assertIn(237, lttb_indices(xs, ys, 20))
@@ -0,0 +1,88 @@
+from datetime import datetime, timezone as dt_timezone
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import SimpleTestCase, TestCase
+
+from sensor import ingest
+from sensor.ingest import BatchWriter, save_batch
+from sensor.models import SensorReading, SensorRollupHour, SensorRollupMinute
+
+
+class BatchWriterRetryTests(SimpleTestCase):
+    def test_transient_error_is_retried(self):
+        writer = BatchWriter(retries=3, retry_backoff=0)
+        with mock.patch.object(ingest, "save_batch", side_effect=[OperationalError("database is locked"), 0]) as save:
+            writer._flush([mock.Mock(), mock.Mock()])
+        self.assertEqual(save.call_count, 2)
+        self.assertEqual((writer.written, writer.retried, writer.dropped, writer.errors), (2, 1, 0, 0))
+
+    def test_batch_dropped_after_retries(self):
+        writer = BatchWriter(retries=2, retry_backoff=0)
+        with mock.patch.object(ingest, "save_batch", side_effect=OperationalError("database is locked")) as save:
+            with self.assertLogs("sensor.ingest", "ERROR"):
+                writer._flush([mock.Mock()] * 3)
+        self.assertEqual(save.call_count, 3)
+        self.assertEqual((writer.written, writer.dropped, writer.errors), (0, 3, 1))
+
+    def test_non_transient_error_is_not_retried(self):
+        writer = BatchWriter(retries=3, retry_backoff=0)
+        with mock.patch.object(ingest, "save_batch", side_effect=ValueError("bad row")) as save:
+            with self.assertLogs("sensor.ingest", "ERROR"):
+                writer._flush([mock.Mock()])
+        self.assertEqual(save.call_count, 1)
+        self.assertEqual(writer.dropped, 1)
+
+    def test_bad_row_does_not_drop_the_batch(self):
+        bad = mock.Mock()
+
+        def save(batch, *args):
+            if bad in batch:
+                raise ValueError("bad row")
+            return 0
+
+        writer = BatchWriter(retries=3, retry_backoff=0)
+        with mock.patch.object(ingest, "save_batch", side_effect=save):
+            with self.assertLogs("sensor.ingest", "ERROR") as logs:
+                writer._flush([mock.Mock(), mock.Mock(), bad, mock.Mock(), mock.Mock()])
+        self.assertEqual((writer.written, writer.dropped, writer.errors, writer.retried), (4, 1, 1, 0))
+        self.assertEqual(len(logs.records), 1)
+
+
+def reading(minute, temperature=20.0, device="dev"):
+    return SensorReading(timestamp=datetime(2024, 1, 1, 12, minute, tzinfo=dt_timezone.utc), device=device,
+                         marker=1, temperature=temperature, humidity=50.0, pressure=1000.0, gas_resistance=1.0)
+
+
+class SaveBatchTests(TestCase):
+    def test_rollups_written_with_raw_rows(self):
+        save_batch([reading(0, 20.0), reading(0, 30.0), reading(1)])
+        self.assertEqual(SensorReading.objects.count(), 3)
+        minute = SensorRollupMinute.objects.get(device="dev", bucket_start=datetime(2024, 1, 1, 12, 0,
+                                                                                      tzinfo=dt_timezone.utc))
+        self.assertEqual((minute.count, minute.temperature_min, minute.temperature_max), (2, 20.0, 30.0))
+        self.assertEqual(SensorRollupHour.objects.get(device="dev").count, 3)
+
+    def test_rollup_error_rolls_back_raw_rows(self):
+        with mock.patch.object(ingest, "update_rollups", side_effect=OperationalError("database is locked")):
+            with self.assertRaises(OperationalError):
+                save_batch([reading(0)])
+        self.assertFalse(SensorReading.objects.exists())
+        self.assertFalse(SensorRollupMinute.objects.exists())
+
+    def test_overflowing_row_is_dropped_alone(self):
+        bad = reading(2)
+        bad.marker = 10 ** 30
+        writer = BatchWriter(retries=0)
+        with self.assertLogs("sensor.ingest", "ERROR"):
+            writer._flush([reading(0), bad, reading(1)])
+        self.assertEqual(SensorReading.objects.count(), 2)
+        self.assertEqual((writer.written, writer.dropped), (2, 1))
+
+    def test_hook_error_does_not_undo_write(self):
+        def broken(by_model):
+            raise RuntimeError("hook")
+
+        with self.assertLogs("sensor.ingest", "ERROR"):
+            self.assertEqual(save_batch([reading(0)], on_flush=[broken]), 1)
+        self.assertEqual(SensorReading.objects.count(), 1)
@@ -0,0 +1,55 @@
+from datetime import datetime, timezone as dt_timezone
+
+from django.test import SimpleTestCase, TestCase
+
+from sensor.latest import LatestStateCache
+from sensor.models import DoorStatus, SensorReading
+
+
+def door(second, device, open_status=True):
+    return DoorStatus(timestamp=datetime(2024, 1, 1, 12, 0, second, tzinfo=dt_timezone.utc), device=device,
+                      open_status=open_status, alarm=0)
+
+
+def reading(second, device="a"):
+    return SensorReading(pk=second + 1, timestamp=datetime(2024, 1, 1, 12, 0, second, tzinfo=dt_timezone.utc),
+                         device=device, marker=1, temperature=20.0, humidity=50.0, pressure=1000.0,
+                         gas_resistance=1.0)
+
+
+class LatestStateCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.state = LatestStateCache(alias="default", size=3)
+        self.state.cache.clear()
+
+    def test_door_per_device(self):
+        self.state.on_flush({DoorStatus: [door(0, "a", False), door(2, "b"), door(1, "a")]})
+        self.assertEqual(self.state.get_door("a"), (True, {"device": "a", "door_open": True, "alarm": 0}))
+        self.assertEqual(self.state.get_door("b"), (True, {"device": "b", "door_open": True, "alarm": 0}))
+        self.assertEqual(self.state.get_door(None)[1]["device"], "b")
+
+    def test_ring_only_extends_warmed_keys(self):
+        self.state.on_flush({SensorReading: [reading(0)]})
+        self.assertIsNone(self.state.get_readings("a"))
+
+        self.state.cache.set(self.state._readings_key("a"), [], timeout=None)
+        self.state.on_flush({SensorReading: [reading(s) for s in range(5)]})
+        self.assertEqual([r["id"] for r in self.state.get_readings("a")], [3, 4, 5])
+
+
+class WarmTests(TestCase):
+    def setUp(self):
+        self.state = LatestStateCache(alias="default", size=3)
+        self.state.cache.clear()
+
+    def test_unknown_device_is_not_cached(self):
+        self.assertEqual(self.state.latest("nope"), ([], None))
+        self.assertIsNone(self.state.get_readings("nope"))
+        self.assertEqual(self.state.get_door("nope"), (False, None))
+
+    def test_known_device_is_warmed(self):
+        reading(1).save()
+        readings, door = self.state.latest("a")
+        self.assertEqual([r["device"] for r in readings], ["a"])
+        self.assertIsNone(door)
+        self.assertEqual(self.state.get_door("a"), (True, None))
@@ -0,0 +1,25 @@
+from datetime import datetime, timezone as dt_timezone
+
+from django.test import SimpleTestCase
+
+from sensor.live import serialize_batch
+from sensor.models import DoorStatus
+
+
+def door(second, device, open_status=True):
+    return DoorStatus(timestamp=datetime(2024, 1, 1, 12, 0, second, tzinfo=dt_timezone.utc), device=device,
+                      open_status=open_status, alarm=0)
+
+
+class SerializeBatchTests(SimpleTestCase):
+    def test_last_door_per_device(self):
+        delta = serialize_batch({DoorStatus: [door(0, "a", False), door(1, "b"), door(2, "a")]})
+        self.assertEqual(delta["readings"], [])
+        self.assertEqual(delta["doors"], [
+            {"device": "b", "door_open": True, "alarm": 0},
+            {"device": "a", "door_open": True, "alarm": 0},
+        ])
+
+    def test_no_doors(self):
+        self.assertEqual(serialize_batch({})["doors"], [])
+
@@ -0,0 +1,49 @@
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+from unittest import mock
+
+from django.test import TestCase
+
+from sensor import retention
+from sensor.models import SensorReading
+
+DAY = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+NOW = DAY + timedelta(days=40)
+
+
+def reading(hour):
+    return SensorReading.objects.create(timestamp=DAY + timedelta(hours=hour), device="dev", marker=1,
+                                        temperature=20.0, humidity=50.0, pressure=1000.0, gas_resistance=1.0)
+
+
+class RetentionTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patch = mock.patch.object(retention, "ARCHIVE_DIR", Path(tmp.name))
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def step(self):
+        return retention.run_retention_step(days=30, batch_size=100, now=NOW)["sensor_sensorreading"]
+
+    def test_late_rows_go_to_next_archive_part(self):
+        first = [reading(1).pk, reading(2).pk]
+        self.assertEqual(self.step(), (DAY.date(), 2))
+
+        late = reading(3).pk
+        self.assertEqual(self.step(), (DAY.date(), 1))
+        self.assertFalse(SensorReading.objects.exists())
+
+        files = retention.archive_files(SensorReading, DAY.date())
+        self.assertEqual([retention._stem(p) for p in files], ["2024-01-01", "2024-01-01.1"])
+        self.assertEqual(retention.archived_ids(SensorReading, DAY.date()), set(first) | {late})
+
+    def test_rows_missing_from_archive_are_kept(self):
+        reading(1)
+        self.step()
+        late = reading(2)
+        with mock.patch.object(retention, "archive_day"):
+            self.assertEqual(self.step(), (DAY.date(), 0))
+        self.assertTrue(SensorReading.objects.filter(pk=late.pk).exists())
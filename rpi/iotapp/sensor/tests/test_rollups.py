@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from sensor.models import SensorReading, SensorRollupHour, SensorRollupMinute
+from sensor.rollups import bucket_floor, rebuild_rollups
+
+
+class RebuildRollupsTests(TestCase):
+    def test_keeps_buckets_without_raw_readings(self):
+        old = bucket_floor(timezone.now() - timedelta(days=60), 3600)
+        SensorRollupHour.objects.create(bucket_start=old, device="dev", marker=1, count=120,
+                                        temperature_min=60, temperature_max=70, temperature_sum=7800,
+                                        humidity_min=50, humidity_max=50, humidity_sum=6000,
+                                        pressure_min=1000, pressure_max=1000, pressure_sum=120000,
+                                        gas_resistance_min=1, gas_resistance_max=1, gas_resistance_sum=120)
+        for minutes_ago, temperature in ((3, 20.0), (2, 22.0)):
+            SensorReading.objects.create(timestamp=timezone.now() - timedelta(minutes=minutes_ago), device="dev",
+                                         marker=1, temperature=temperature, humidity=50.0, pressure=1000.0,
+                                         gas_resistance=1.0)
+
+        # Dwa przeliczenia z rzędu - bez podwójnego liczenia
+        self.assertEqual(rebuild_rollups(), 2)
+        self.assertEqual(rebuild_rollups(), 2)
+
+        self.assertEqual(SensorRollupHour.objects.get(bucket_start=old).count, 120)
+        self.assertEqual(sum(SensorRollupMinute.objects.values_list("count", flat=True)), 2)
+        self.assertEqual(sum(SensorRollupHour.objects.exclude(bucket_start=old)
+                             .values_list("temperature_sum", flat=True)), 42.0)
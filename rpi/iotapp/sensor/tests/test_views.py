@@ -0,0 +1,124 @@
+import json
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from sensor.models import DoorStatus, SensorReading, SensorRollupHour, SensorRollupMinute
+from sensor.rollups import bucket_floor
+
+
+def reading(minutes_ago, temperature=20.0):
+    return SensorReading.objects.create(timestamp=timezone.now() - timedelta(minutes=minutes_ago), device="dev",
+                                        marker=1, temperature=temperature, humidity=50.0, pressure=1000.0,
+                                        gas_resistance=1.0)
+
+
+class ReadingsApiTests(TestCase):
+    def test_out_of_range_time_is_bad_request(self):
+        for value in ("1e20", "inf", "nan", "-1e20", "2024-13-01T00:00"):
+            with self.subTest(value=value):
+                self.assertEqual(self.client.get("/api/readings/", {"from": value}).status_code, 400)
+
+    def test_default_window_skips_old_rows(self):
+        reading(3 * 24 * 60)
+        recent = reading(5)
+        data = self.client.get("/api/readings/", {"since_id": 0}).json()
+        self.assertEqual(data["last_id"], recent.pk)
+        self.assertEqual(len(data["t"]), 1)
+
+    def test_etag_changes_with_new_reading(self):
+        reading(2)
+        params = {"from": (timezone.now() - timedelta(minutes=10)).timestamp()}
+        first = self.client.get("/api/readings/", params)
+        self.assertEqual(first.status_code, 200)
+        cached = self.client.get("/api/readings/", params, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(cached.status_code, 304)
+
+        reading(1)
+        fresh = self.client.get("/api/readings/", params, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(fresh.status_code, 200)
+        self.assertEqual(len(fresh.json()["t"]), 2)
+
+    def test_long_window_respects_max_points(self):
+        end = bucket_floor(timezone.now(), 3600)
+        SensorRollupHour.objects.bulk_create(
+            SensorRollupHour(bucket_start=end - timedelta(hours=i), device="dev", marker=1, count=1,
+                             temperature_min=i, temperature_max=i, temperature_sum=i, humidity_min=50,
+                             humidity_max=50, humidity_sum=50, pressure_min=1000, pressure_max=1000,
+                             pressure_sum=1000, gas_resistance_min=1, gas_resistance_max=1, gas_resistance_sum=1)
+            for i in range(60 * 24))
+        data = self.client.get("/api/readings/", {"from": (end - timedelta(days=60)).timestamp(),
+                                                  "max_points": 100}).json()
+        self.assertEqual(data["resolution"], "3600s")
+        self.assertTrue(data["downsampled"])
+        self.assertEqual(len(data["t"]), 100)
+
+    def test_since_id_reads_in_chunks(self):
+        ids = [reading(5 - i).pk for i in range(5)]
+        with mock.patch("sensor.views.READINGS_MAX_ROWS", 3):
+            first = self.client.get("/api/readings/", {"from": 0, "since_id": 0}).json()
+            self.assertEqual((len(first["t"]), first["last_id"], first["more"]), (3, ids[2], True))
+            rest = self.client.get("/api/readings/", {"from": 0, "since_id": first["last_id"]}).json()
+            self.assertEqual((len(rest["t"]), rest["last_id"], rest["more"]), (2, ids[4], False))
+
+
+class HistoryApiTests(TestCase):
+    def test_out_of_range_hours_is_bad_request(self):
+        for value in ("inf", "nan", "1e20", "-5", "0"):
+            with self.subTest(value=value):
+                self.assertEqual(self.client.get("/api/history/", {"hours": value}).status_code, 400)
+        self.assertEqual(self.client.get("/api/history/", {"hours": "48"}).status_code, 200)
+
+
+@override_settings(SENSOR_INGEST_TOKEN="secret", SENSOR_INGEST_MAX_BATCH=3)
+class IngestApiTests(TestCase):
+    def post(self, body, token="secret"):
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {token}"} if token else {}
+        return self.client.post("/api/ingest/", json.dumps(body), content_type="application/json", **headers)
+
+    def test_valid_and_rejected_rows(self):
+        response = self.post({"readings": [
+            {"device": "dev", "received_at": 1700000000.0, "data": {"temperature": 70, "humidity": 40}},
+            {"device": "dev", "received_at": 1700000001.0, "data": {"door_open_status": 1}},
+            {"device": "dev", "received_at": 1700000002.0, "data": {"temperature": "hot", "humidity": 40}},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["accepted"], 2)
+        self.assertEqual([r["index"] for r in response.json()["rejected"]], [2])
+        self.assertEqual(SensorReading.objects.get().temperature, 70.0)
+        self.assertTrue(DoorStatus.objects.get().open_status)
+
+    def test_out_of_range_time_is_rejected(self):
+        response = self.post({"readings": [
+            {"device": "dev", "received_at": "inf", "data": {"temperature": 70, "humidity": 40}},
+        ]})
+        self.assertEqual(response.json()["accepted"], 0)
+        self.assertFalse(SensorReading.objects.exists())
+
+    def test_wrong_token(self):
+        self.assertEqual(self.post({"readings": []}, token="wrong").status_code, 401)
+        self.assertEqual(self.post({"readings": []}, token=None).status_code, 401)
+
+    def test_retried_batch_is_not_duplicated(self):
+        body = {"readings": [
+            {"device": "dev", "received_at": 1700000000.25, "data": {"temperature": 70, "humidity": 40}},
+            {"device": "dev", "received_at": 1700000001.0, "data": {"door_open_status": 1}},
+        ]}
+        self.assertEqual(self.post(body).status_code, 200)
+        body["readings"].append(
+            {"device": "dev", "received_at": 1700000002.0, "data": {"temperature": 71, "humidity": 40}})
+        self.assertEqual(self.post(body).status_code, 200)
+        self.assertEqual(SensorReading.objects.count(), 2)
+        self.assertEqual(DoorStatus.objects.count(), 1)
+        self.assertEqual(SensorRollupMinute.objects.get().count, 2)
+
+    @override_settings(SENSOR_INGEST_TOKEN="")
+    def test_disabled_without_token(self):
+        self.assertEqual(self.post({"readings": []}, token=None).status_code, 403)
+        self.assertEqual(self.post({"readings": []}, token="").status_code, 403)
+
+    def test_bad_body_and_limit(self):
+        self.assertEqual(self.post({"rows": []}).status_code, 400)
+        self.assertEqual(self.post({"readings": [{}] * 4}).status_code, 413)
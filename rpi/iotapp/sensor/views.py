@@ -1,33 +1,302 @@
+import hashlib
+import hmac
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Max
+from django.http import StreamingHttpResponse
 from django.shortcuts import render
-from .models import SensorReading, DoorStatus
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition, require_POST
+from cloud_payload import decode_data, loads
+from .downsample import lttb_indices
+from .ingest import save_batch
+from .models import DEVICE_ID_LENGTH, SensorReading
+from .rollups import METRICS, pick_resolution, select_series
+from .live import event_stream
+from .latest import latest_state
+from .retention import retention_cutoff
+from .sinks import message_to_model
 from django.http import JsonResponse
 
+log = logging.getLogger(__name__)
+
+
 def dashboard(request):
-    readings = SensorReading.objects.order_by("-timestamp")[:50][::-1]  # najnowsze 50, rosnąco
-    door = DoorStatus.objects.order_by("-timestamp").first()
+    # najnowsze 50, rosnąco - z cache najnowszego stanu (sensor/latest.py)
+    readings, door = latest_state.latest(request.GET.get("device"), n=50)
 
     context = {
-        "timestamps": [r.timestamp.strftime("%H:%M:%S") for r in readings],
-        "temperatures": [r.temperature for r in readings],
-        "humidities": [r.humidity for r in readings],
-        "pressures": [r.pressure for r in readings],
-        "door_open": door.open_status if door else None,
-        "alarm": door.alarm if door else None,
+        "timestamps": [r["time"] for r in readings],
+        "temperatures": [r["temperature"] for r in readings],
+        "humidities": [r["humidity"] for r in readings],
+        "pressures": [r["pressure"] for r in readings],
+        "door_open": door["door_open"] if door else None,
+        "alarm": door["alarm"] if door else None,
     }
     return render(request, "dashboard.html", context)
 
 
 def dashboard_data_api(request):
-    # Pobierz ostatnie 20 odczytów
-    readings = SensorReading.objects.order_by('-timestamp')[:20][::-1]
-    last_door = DoorStatus.objects.last()
-    
+    # Ostatnie 20 odczytów - z cache, bez zapytań do bazy
+    readings, last_door = latest_state.latest(request.GET.get("device"), n=20)
+
     data = {
-        'timestamps': [r.timestamp.strftime("%H:%M:%S") for r in readings],
-        'temperatures': [r.temperature for r in readings],
-        'humidities': [r.humidity for r in readings],
-        'pressures': [r.pressure for r in readings],
-        'door_open': last_door.open_status if last_door else False,
-        'alarm': last_door.alarm if last_door else 0,
+        'timestamps': [r["time"] for r in readings],
+        'temperatures': [r["temperature"] for r in readings],
+        'humidities': [r["humidity"] for r in readings],
+        'pressures': [r["pressure"] for r in readings],
+        'door_open': last_door["door_open"] if last_door else False,
+        'alarm': last_door["alarm"] if last_door else 0,
     }
     return JsonResponse(data)
+
+
+# Najdłuższe okno ``hours`` w history_api (nan/inf i 1e20 dają 400 zamiast 500)
+HISTORY_MAX_HOURS = 10 * 365 * 24
+
+
+def history_api(request):
+    """
+    Historia odczytów dla dowolnego okna czasowego.
+
+    Parametry GET: ``from``/``to`` (ISO 8601) albo ``hours`` (domyślnie 12),
+    opcjonalnie ``device``, ``marker`` i ``max_points`` (domyślnie 500). Rozdzielczość
+    (surowe / 1 min / 15 min / 1 h) jest dobierana do długości okna.
+    """
+    try:
+        end = parse_datetime(request.GET["to"]) if "to" in request.GET else timezone.now()
+        if "from" in request.GET:
+            start = parse_datetime(request.GET["from"])
+        else:
+            hours = float(request.GET.get("hours", 12))
+            if not 0 < hours <= HISTORY_MAX_HOURS:
+                raise ValueError(f"hours poza zakresem: {hours}")
+            start = end - timedelta(hours=hours)
+        marker = int(request.GET["marker"]) if "marker" in request.GET else None
+        max_points = max(1, int(request.GET.get("max_points", 500)))
+    except (TypeError, ValueError, OverflowError):
+        return JsonResponse({"error": "Niepoprawne parametry zapytania"}, status=400)
+
+    if start is None or end is None:
+        return JsonResponse({"error": "Niepoprawny format daty"}, status=400)
+    if timezone.is_naive(start):
+        start = timezone.make_aware(start)
+    if timezone.is_naive(end):
+        end = timezone.make_aware(end)
+
+    data = select_series(start, end, device=request.GET.get("device"), marker=marker, max_points=max_points)
+    data["from"] = start.isoformat()
+    data["to"] = end.isoformat()
+    return JsonResponse(data)
+
+
+async def live_stream(request):
+    """
+    Strumień SSE z deltami od mqtt_worker (wymaga serwera ASGI, np. uvicorn).
+
+    Każde zdarzenie zawiera tylko nowe odczyty i ewentualnie ostatni status
+    drzwi z zapisanej paczki; zdarzenie ``resync`` oznacza, że klient powinien
+    ponownie pobrać pełne okno z /api/dashboard-data/.
+    """
+    response = StreamingHttpResponse(event_stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+# ----------------- /api/readings/ -----------------
+
+READINGS_MAX_POINTS = 2000
+# Limit surowych wierszy na odpowiedź; resztę klient pobiera z since_id=last_id ("more": true)
+READINGS_MAX_ROWS = getattr(settings, "SENSOR_READINGS_MAX_ROWS", 10000)
+# Okno bez parametru ``from`` - nigdy nie czytamy całej tabeli
+READINGS_DEFAULT_WINDOW = timedelta(hours=getattr(settings, "SENSOR_READINGS_DEFAULT_HOURS", 12))
+
+
+def _parse_time(value):
+    """Czas z parametru GET: sekundy epoki albo ISO 8601"""
+    try:
+        seconds = float(value)
+    except ValueError:
+        ts = parse_datetime(value)
+        if ts is None:
+            raise ValueError(f"Niepoprawny czas: {value}")
+        return timezone.make_aware(ts) if timezone.is_naive(ts) else ts
+    try:
+        return datetime.fromtimestamp(seconds, tz=dt_timezone.utc)
+    except (ValueError, OverflowError, OSError):
+        # nan, inf, 1e20 - poza zakresem datetime / platformy
+        raise ValueError(f"Czas poza zakresem: {value}")
+
+
+def _default_from(end):
+    """Początek domyślnego okna, zaokrąglony do minuty (stabilny ETag w obrębie minuty)"""
+    return (end - READINGS_DEFAULT_WINDOW).replace(second=0, microsecond=0)
+
+
+def _readings_params(request):
+    """Parametry /api/readings/ (zapamiętywane w request, bo liczy je też etag)"""
+    if not hasattr(request, "_readings_params"):
+        q = request.GET
+        params = {
+            "device": q.get("device"),
+            "from": _parse_time(q["from"]) if "from" in q else None,
+            "to": _parse_time(q["to"]) if "to" in q else None,
+            "since_id": int(q["since_id"]) if "since_id" in q else None,
+            "max_points": min(max(int(q.get("max_points", 500)), 3), READINGS_MAX_POINTS),
+        }
+        if params["from"] is None:
+            params["from"] = _default_from(params["to"] or timezone.now())
+        request._readings_params = params
+    return request._readings_params
+
+
+def _readings_queryset(params):
+    qs = SensorReading.objects.all()
+    if params["device"] is not None:
+        qs = qs.filter(device=params["device"])
+    qs = qs.filter(timestamp__gte=params["from"])
+    if params["to"] is not None:
+        qs = qs.filter(timestamp__lte=params["to"])
+    if params["since_id"] is not None:
+        qs = qs.filter(id__gt=params["since_id"])
+    return qs
+
+
+def _readings_etag(request):
+    try:
+        params = _readings_params(request)
+    except (KeyError, ValueError):
+        return None
+    # Max(id) z indeksu zmienia się przy każdym nowym odczycie w oknie, a próg
+    # retencji - gdy stare dni mogą zniknąć z bazy (bez liczenia wierszy)
+    last_id = _readings_queryset(params).aggregate(last_id=Max("id"))["last_id"]
+    key = "|".join(str(v) for v in (
+        params["device"], params["from"], params["to"], params["since_id"],
+        params["max_points"], last_id, retention_cutoff(),
+    ))
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+@condition(etag_func=_readings_etag)
+def readings_api(request):
+    """
+    Odczyty w formacie kolumnowym dla wykresów.
+
+    Parametry GET: ``device``, ``from``/``to`` (epoka lub ISO 8601),
+    ``since_id`` (tylko odczyty o id większym niż podane - dopisywanie
+    przyrostowe) i ``max_points`` (domyślnie 500). Bez ``from`` okno obejmuje
+    ostatnie ``SENSOR_READINGS_DEFAULT_HOURS`` godzin. Długie okna są zwracane
+    z tabel agregatów, a dane powyżej ``max_points`` są zmniejszane
+    algorytmem LTTB. Surowe odczyty są czytane najwyżej po ``READINGS_MAX_ROWS``
+    wierszy; gdy w oknie jest ich więcej, odpowiedź ma ``more`` = True,
+    a kolejną część zwraca zapytanie z ``since_id`` = ``last_id``.
+    Obsługuje ETag / If-None-Match (odpowiedź 304).
+    """
+    try:
+        params = _readings_params(request)
+    except (KeyError, ValueError):
+        return JsonResponse({"error": "Niepoprawne parametry zapytania"}, status=400)
+
+    max_points = params["max_points"]
+    data = {"device": params["device"], "resolution": "raw", "downsampled": False, "more": False}
+
+    # Długie okno bez since_id - agregaty zamiast skanowania surowych odczytów
+    if params["since_id"] is None:
+        end = params["to"] or timezone.now()
+        model = pick_resolution(params["from"], end, max_points)
+        if model is not None:
+            series = select_series(params["from"], end, device=params["device"], max_points=max_points)
+            last = _readings_queryset(params).aggregate(last_id=Max("id"))["last_id"]
+            data.update({
+                "resolution": series["resolution"],
+                "downsampled": series["downsampled"],
+                "last_id": last,
+                "t": [parse_datetime(ts).timestamp() for ts in series["timestamps"]],
+            })
+            for m in METRICS:
+                data[m] = series[m]
+            return JsonResponse(data)
+
+    rows = list(_readings_queryset(params).order_by("id")
+                .values_list("id", "timestamp", *METRICS)[:READINGS_MAX_ROWS + 1])
+    if len(rows) > READINGS_MAX_ROWS:
+        del rows[READINGS_MAX_ROWS:]
+        data["more"] = True
+    ids = [r[0] for r in rows]
+    t = [r[1].timestamp() for r in rows]
+    columns = {m: [r[2 + i] for r in rows] for i, m in enumerate(METRICS)}
+
+    data["last_id"] = ids[-1] if ids else params["since_id"]
+    if len(rows) > max_points:
+        keep = lttb_indices(t, columns["temperature"], max_points)
+        t = [t[i] for i in keep]
+        columns = {m: [values[i] for i in keep] for m, values in columns.items()}
+        data["downsampled"] = True
+
+    data["t"] = t
+    data.update(columns)
+    return JsonResponse(data)
+
+
+# ----------------- /api/ingest/ -----------------
+
+def _ingest_authorized(request):
+    token = settings.SENSOR_INGEST_TOKEN
+    header = request.headers.get("Authorization", "")
+    return hmac.compare_digest(header, f"Bearer {token}")
+
+
+@csrf_exempt
+@require_POST
+def ingest_api(request):
+    """
+    Paczka odczytów od nadawcy HTTP (cloud_ingest.HttpForwardSink).
+
+    Ciało: ``{"readings": [{"device": ..., "received_at": <epoka>, "data": {...}}, ...]}``,
+    gdzie ``data`` ma ten sam kształt co w wiadomościach decoded/#. Poprawne
+    odczyty zapisywane są jedną transakcją; niepoprawne są pomijane
+    i zwracane w ``rejected`` (ponowienie paczki by ich nie naprawiło).
+    Błąd bazy - 503, żeby nadawca ponowił całą paczkę; odczyty już zapisane
+    (ta sama para device, received_at) są przy ponowieniu pomijane.
+    Bez ustawionego SENSOR_INGEST_TOKEN endpoint jest wyłączony (403).
+    """
+    if not settings.SENSOR_INGEST_TOKEN:
+        return JsonResponse({"error": "Endpoint wyłączony - brak SENSOR_INGEST_TOKEN"}, status=403)
+    if not _ingest_authorized(request):
+        return JsonResponse({"error": "Brak autoryzacji"}, status=401)
+    try:
+        readings = loads(request.body)["readings"]
+        if not isinstance(readings, list):
+            raise TypeError
+    except (KeyError, TypeError, ValueError):
+        return JsonResponse({"error": "Oczekiwano obiektu {\"readings\": [...]}"}, status=400)
+    if len(readings) > settings.SENSOR_INGEST_MAX_BATCH:
+        return JsonResponse({"error": f"Paczka większa niż {settings.SENSOR_INGEST_MAX_BATCH} odczytów"},
+                            status=413)
+
+    objs = []
+    rejected = []
+    for index, reading in enumerate(readings):
+        try:
+            message = decode_data(reading.get("data"))
+            obj = message_to_model(message, str(reading.get("device", ""))[:DEVICE_ID_LENGTH],
+                                   float(reading["received_at"]))
+            if obj is None:
+                raise ValueError("nieznany rodzaj odczytu")
+        except (AttributeError, KeyError, TypeError, ValueError, OverflowError, OSError) as e:
+            rejected.append({"index": index, "error": str(e)})
+            continue
+        objs.append(obj)
+
+    if objs:
+        try:
+            save_batch(objs, on_flush=[latest_state.on_flush], skip_existing=True)
+        except Exception:
+            log.exception("Błąd zapisu paczki z /api/ingest/ (%d wierszy)", len(objs))
+            return JsonResponse({"error": "Błąd zapisu do bazy"}, status=503)
+    return JsonResponse({"accepted": len(objs), "rejected": rejected})
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Smart Smokehouse - paho-mqtt w pętli asyncio
+Zamiast wątku loop_start() gniazdo klienta jest obsługiwane przez pętlę
+zdarzeń (add_reader/add_writer), więc wiele klientów MQTT może działać
+w jednym wątku razem z innymi zadaniami asyncio.
+"""
+
+import asyncio
+import logging
+import ssl
+from paho.mqtt import client as mqtt
+
+# Odstęp między wywołaniami loop_misc() (keepalive/ping) w sekundach
+MISC_INTERVAL = 1.0
+RECONNECT_DELAY_MIN = 1.0
+RECONNECT_DELAY_MAX = 30.0
+
+log = logging.getLogger("mqtt")
+
+
+class AsyncioHelper:
+    """Podpina gniazdo klienta paho pod pętlę asyncio"""
+
+    def __init__(self, loop, client):
+        self.loop = loop
+        self.client = client
+        self.misc = None
+        self.client.on_socket_open = self.on_socket_open
+        self.client.on_socket_close = self.on_socket_close
+        self.client.on_socket_register_write = self.on_socket_register_write
+        self.client.on_socket_unregister_write = self.on_socket_unregister_write
+
+    # Callbacki gniazda mogą przyjść z wątku executora (connect), dlatego
+    # zmiany w pętli zawsze przez call_soon_threadsafe
+
+    def on_socket_open(self, client, userdata, sock):
+        self.loop.call_soon_threadsafe(self._open, sock)
+
+    def on_socket_close(self, client, userdata, sock):
+        self.loop.call_soon_threadsafe(self._close, sock)
+
+    def on_socket_register_write(self, client, userdata, sock):
+        self.loop.call_soon_threadsafe(self.loop.add_writer, sock, self._write)
+
+    def on_socket_unregister_write(self, client, userdata, sock):
+        self.loop.call_soon_threadsafe(self.loop.remove_writer, sock)
+
+    def _open(self, sock):
+        self.loop.add_reader(sock, self._read, sock)
+        if self.misc is None or self.misc.done():
+            self.misc = self.loop.create_task(self._misc_loop())
+
+    def _close(self, sock):
+        self.loop.remove_reader(sock)
+        self.loop.remove_writer(sock)
+
+    def _read(self, sock):
+        self.client.loop_read()
+        # Gniazdo TLS może mieć odszyfrowane dane w buforze, których select nie zgłosi
+        while isinstance(sock, ssl.SSLSocket) and sock.pending():
+            self.client.loop_read()
+
+    def _write(self):
+        self.client.loop_write()
+
+    async def _misc_loop(self):
+        while self.client.loop_misc() == mqtt.MQTT_ERR_SUCCESS:
+            try:
+                await asyncio.sleep(MISC_INTERVAL)
+            except asyncio.CancelledError:
+                break
+
+
+class AsyncMQTTClient:
+    """
+    Klient paho sterowany przez pętlę asyncio, z automatycznym
+    ponownym łączeniem (wykładniczy backoff).
+    """
+
+    def __init__(self, client, host, port, keepalive=60, name="mqtt"):
+        self.client = client
+        self.host = host
+        self.port = port
+        self.keepalive = keepalive
+        self.name = name
+        self.connected = asyncio.Event()
+        self.reconnects = 0
+        self._closing = False
+        self._reconnect_task = None
+
+        self._user_on_connect = client.on_connect
+        self._user_on_disconnect = client.on_disconnect
+        client.on_connect = self._on_connect
+        client.on_disconnect = self._on_disconnect
+
+        self.loop = None
+        self.helper = None
+
+    def _on_connect(self, client, userdata, flags, rc):
+        if rc == 0:
+            self.connected.set()
+        if self._user_on_connect:
+            self._user_on_connect(client, userdata, flags, rc)
+
+    def _on_disconnect(self, client, userdata, rc):
+        self.connected.clear()
+        if self._user_on_disconnect:
+            self._user_on_disconnect(client, userdata, rc)
+        if not self._closing and (self._reconnect_task is None or self._reconnect_task.done()):
+            self._reconnect_task = self.loop.create_task(self._reconnect())
+
+    async def connect(self):
+        """Łączy z brokerem (blokujące TCP/TLS wykonywane w executorze)"""
+        self.loop = asyncio.get_running_loop()
+        self.helper = AsyncioHelper(self.loop, self.client)
+        await self.loop.run_in_executor(None, self.client.connect, self.host, self.port, self.keepalive)
+
+    async def _reconnect(self):
+        delay = RECONNECT_DELAY_MIN
+        while not self._closing:
+            await asyncio.sleep(delay)
+            try:
+                await self.loop.run_in_executor(None, self.client.reconnect)
+                self.reconnects += 1
+                return
+            except Exception as e:
+                log.warning("[%s] Ponowne łączenie nieudane: %s", self.name, e)
+                delay = min(delay * 2, RECONNECT_DELAY_MAX)
+
+    async def disconnect(self):
+        self._closing = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+        self.client.disconnect()
+        if self.helper is not None and self.helper.misc is not None:
+            self.helper.misc.cancel()
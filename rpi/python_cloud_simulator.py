@@ -3,12 +3,24 @@
 MQTT Client for Smart Smokehouse - Python Cloud Simulator
 Publishes START_FRAME and UPDATE_FRAME messages to ESP32
 Subscribes to robot/state to receive ESP32 state machine updates
+
+--fast runs the simulation on a virtual clock (sim_clock.py): sleeps take
+no real time, so long smoking processes finish as fast as the broker and
+the ESP32 respond. A real ESP32 still times its own phases (e.g. cooking)
+in real time - for the full speedup point it at an emulator sharing the clock.
+
+    python3 python_cloud_simulator.py --fast --duration 14400 --interval 30
 """
 
+import argparse
+import logging
 import paho.mqtt.client as mqtt
-import struct
 import time
-from enum import IntEnum
+
+# Frame layout (matching ESP32 globals.hpp) lives in frame_codec.py
+from frame_codec import create_start_frame, create_update_frame, decode_start_frame, decode_update_frame
+from sim_clock import RealClock, create_clock
+from smokehouse_log import setup_logging
 
 # MQTT Configuration
 #MQTT_SERVER = "192.168.0.157"
@@ -18,43 +30,21 @@ MQTT_TOPIC_START = "robot/frame/start"
 MQTT_TOPIC_UPDATE = "robot/frame/"
 MQTT_TOPIC_STATE = "robot/state"  # Topic do odbierania stanów z ESP32
 
-# Frame Types
-class FrameType(IntEnum):
-    NO_NEW_FRAME = 0
-    START_FRAME = 1
-    UPDATE_FRAME = 2
-
-# Constants matching your ESP32 code
-MEAT_NAME_LENGTH = 30
-
-# START_FRAME payload positions
-# UPDATED TO MATCH globals.hpp!
-# payload[0] = Frame type (START_FRAME or UPDATE_FRAME)
-# Then data starts at position 1
-START_FRAME_COMMAND_VALUE_PLACE = 1  # Command at position 1 (uint8)
-START_FRAME_MEAT_NAME_PLACE = START_FRAME_COMMAND_VALUE_PLACE + 1  # char[30] at position 2
-START_FRAME_TARGET_HUMIDITY_PLACE = START_FRAME_MEAT_NAME_PLACE + MEAT_NAME_LENGTH  # uint8 at position 32
-START_FRAME_TARGET_TEMPERATURE_PLACE = START_FRAME_TARGET_HUMIDITY_PLACE + 1  # int16 at position 33 (2 bytes)
-START_FRAME_CURRENT_HUMIDITY_PLACE = START_FRAME_TARGET_TEMPERATURE_PLACE + 2  # uint8 at position 35
-START_FRAME_CURRENT_TEMPERATURE_PLACE = START_FRAME_CURRENT_HUMIDITY_PLACE + 1  # int16 at position 36 (2 bytes)
-START_FRAME_DOOR_STATUS_PLACE = START_FRAME_CURRENT_TEMPERATURE_PLACE + 2  # uint8 at position 38
-START_FRAME_TIME_OF_SMOKING_PLACE = START_FRAME_DOOR_STATUS_PLACE + 1  # uint16 at position 39 (2 bytes)
-
-# UPDATE_FRAME payload positions
-# UPDATED to match your corrected ESP32 constants!
-# payload[0] = Frame type (UPDATE_FRAME)
-# Then data starts at position 1
-UPDATE_FRAME_CURRENT_HUMIDITY_PLACE = 1  # uint8 at position 1
-UPDATE_FRAME_CURRENT_TEMPERATURE_PLACE = UPDATE_FRAME_CURRENT_HUMIDITY_PLACE + 1  # int16 at position 2 (2 bytes!)
-UPDATE_FRAME_DOOR_STATUS_PLACE = UPDATE_FRAME_CURRENT_TEMPERATURE_PLACE + 2  # uint8 at position 4
+log = logging.getLogger("simulator")
 
 
 class MQTTSmokehouseClient:
     """MQTT client for controlling the smokehouse"""
 
-    def __init__(self, broker_address=MQTT_SERVER, port=MQTT_PORT):
+    # Max wait for the broker's PUBACK in fast-forward mode (seconds)
+    PUBLISH_TIMEOUT = 5.0
+
+    def __init__(self, broker_address=MQTT_SERVER, port=MQTT_PORT, clock=None):
         self.broker_address = broker_address
         self.port = port
+        # With a virtual clock, publishing waits for the broker's ack so the
+        # simulation runs as fast as the broker can take it, never faster
+        self.clock = clock or RealClock()
         self.client = mqtt.Client()
         self.client.on_connect = self.on_connect
         self.client.on_publish = self.on_publish
@@ -67,12 +57,12 @@ class MQTTSmokehouseClient:
     def on_connect(self, client, userdata, flags, rc):
         """Callback when connected to MQTT broker"""
         if rc == 0:
-            print(f"✓ Connected to MQTT Broker at {self.broker_address}:{self.port}")
+            log.info("Connected to MQTT Broker at %s:%s", self.broker_address, self.port)
             # Subskrybuj topic ze stanami z ESP32
             client.subscribe(MQTT_TOPIC_STATE)
-            print(f"✓ Subscribed to '{MQTT_TOPIC_STATE}' (receiving ESP32 states)")
+            log.info("Subscribed to '%s' (receiving ESP32 states)", MQTT_TOPIC_STATE)
         else:
-            print(f"✗ Connection failed with code {rc}")
+            log.error("Connection failed with code %s", rc)
 
     def on_publish(self, client, userdata, mid):
         """Callback when message is published"""
@@ -88,32 +78,31 @@ class MQTTSmokehouseClient:
 
             # Tylko wyświetl jeśli stan się zmienił
             if state != self.last_state:
-                print(f"\n{'='*70}")
-                print(f"📥 ESP32 STATE CHANGED: {self.last_state} → {state}")
-                print(f"{'='*70}\n")
+                log.info("ESP32 STATE CHANGED: %s → %s", self.last_state, state,
+                         extra={"old_state": self.last_state, "esp_state": state})
 
                 self.last_state = state
                 self.state_history.append(state)
         else:
-            print(f"\n📥 Received on '{topic}': {msg.payload}")
+            log.debug("Received on '%s': %r", topic, msg.payload)
 
     def connect(self):
         """Connect to the MQTT broker"""
         try:
-            print(f"Connecting to MQTT broker {self.broker_address}:{self.port}...")
+            log.info("Connecting to MQTT broker %s:%s...", self.broker_address, self.port)
             self.client.connect(self.broker_address, self.port, 60)
             self.client.loop_start()
             time.sleep(1)  # Give time to establish connection
             return True
         except Exception as e:
-            print(f"✗ Error connecting to broker: {e}")
+            log.error("Error connecting to broker: %s", e)
             return False
 
     def disconnect(self):
         """Disconnect from the MQTT broker"""
         self.client.loop_stop()
         self.client.disconnect()
-        print("\n✓ Disconnected from MQTT broker")
+        log.info("Disconnected from MQTT broker")
 
     def create_start_frame(self, command, meat_name, target_humidity, target_temperature,
                           current_humidity, current_temperature, door_status, time_of_smoking):
@@ -131,48 +120,10 @@ class MQTTSmokehouseClient:
             time_of_smoking (int): Time in seconds (uint16)
 
         Returns:
-            bytearray: The frame payload
+            bytes: The frame payload
         """
-        # Calculate total size (time_of_smoking is at the end and takes 2 bytes)
-        total_size = START_FRAME_TIME_OF_SMOKING_PLACE + 2
-        payload = bytearray(total_size)
-
-        # [0] Frame type identifier
-        payload[0] = FrameType.START_FRAME
-
-        # [1] Command value (uint8)
-        payload[START_FRAME_COMMAND_VALUE_PLACE] = command & 0xFF
-
-        # [2-31] Meat name (char[30])
-        meat_bytes = meat_name.encode('utf-8')[:MEAT_NAME_LENGTH]
-        for i in range(min(len(meat_bytes), MEAT_NAME_LENGTH)):
-            payload[START_FRAME_MEAT_NAME_PLACE + i] = meat_bytes[i]
-
-        # [32] Target humidity (uint8)
-        payload[START_FRAME_TARGET_HUMIDITY_PLACE] = target_humidity & 0xFF
-
-        # [33-34] Target temperature (int16, 2 bytes, little-endian)
-        temp_bytes = struct.pack('<h', target_temperature)
-        payload[START_FRAME_TARGET_TEMPERATURE_PLACE] = temp_bytes[0]
-        payload[START_FRAME_TARGET_TEMPERATURE_PLACE + 1] = temp_bytes[1]
-
-        # [35] Current humidity (uint8)
-        payload[START_FRAME_CURRENT_HUMIDITY_PLACE] = current_humidity & 0xFF
-
-        # [36-37] Current temperature (int16, 2 bytes, little-endian)
-        curr_temp_bytes = struct.pack('<h', current_temperature)
-        payload[START_FRAME_CURRENT_TEMPERATURE_PLACE] = curr_temp_bytes[0]
-        payload[START_FRAME_CURRENT_TEMPERATURE_PLACE + 1] = curr_temp_bytes[1]
-
-        # [38] Door status (uint8)
-        payload[START_FRAME_DOOR_STATUS_PLACE] = door_status & 0xFF
-
-        # [39-40] Time of smoking (uint16, 2 bytes, little-endian) - moved after door_status
-        time_bytes = struct.pack('<H', time_of_smoking)
-        payload[START_FRAME_TIME_OF_SMOKING_PLACE] = time_bytes[0]
-        payload[START_FRAME_TIME_OF_SMOKING_PLACE + 1] = time_bytes[1]
-
-        return payload
+        return create_start_frame(command, meat_name, target_humidity, target_temperature,
+                                  current_humidity, current_temperature, door_status, time_of_smoking)
 
     def create_update_frame(self, current_humidity, current_temperature, door_status):
         """
@@ -184,27 +135,9 @@ class MQTTSmokehouseClient:
             door_status (int): Door status 0=closed, 1=open (uint8)
 
         Returns:
-            bytearray: The frame payload
+            bytes: The frame payload
         """
-        # Calculate total size
-        total_size = UPDATE_FRAME_DOOR_STATUS_PLACE + 1
-        payload = bytearray(total_size)
-
-        # [0] Frame type identifier
-        payload[0] = FrameType.UPDATE_FRAME
-
-        # [1] Current humidity (uint8)
-        payload[UPDATE_FRAME_CURRENT_HUMIDITY_PLACE] = current_humidity & 0xFF
-
-        # [2-3] Current temperature (int16, 2 bytes, little-endian)
-        temp_bytes = struct.pack('<h', current_temperature)
-        payload[UPDATE_FRAME_CURRENT_TEMPERATURE_PLACE] = temp_bytes[0]
-        payload[UPDATE_FRAME_CURRENT_TEMPERATURE_PLACE + 1] = temp_bytes[1]
-
-        # [4] Door status (uint8)
-        payload[UPDATE_FRAME_DOOR_STATUS_PLACE] = door_status & 0xFF
-
-        return payload
+        return create_update_frame(current_humidity, current_temperature, door_status)
 
     def publish_start_frame(self, command, meat_name, target_humidity, target_temperature,
                            current_humidity, current_temperature, door_status, time_of_smoking):
@@ -214,102 +147,109 @@ class MQTTSmokehouseClient:
             current_humidity, current_temperature, door_status, time_of_smoking
         )
 
-        print(f"\n📤 Publishing START_FRAME to '{MQTT_TOPIC_START}'")
-        print(f"  Command: {command}")
-        print(f"  Meat: {meat_name}")
-        print(f"  Target - Temp: {target_temperature/10:.1f}°C, Humidity: {target_humidity}%")
-        print(f"  Current - Temp: {current_temperature/10:.1f}°C, Humidity: {current_humidity}%")
-        print(f"  Door: {'OPEN' if door_status else 'CLOSED'}")
-        print(f"  Time: {time_of_smoking}s ({time_of_smoking//60}min)")
-        print(f"  Payload size: {len(payload)} bytes")
+        log.info("Publishing START_FRAME to '%s': command=%s, meat=%s, target %.1f°C/%d%%, "
+                 "current %.1f°C/%d%%, door %s, time %ds, %d bytes",
+                 MQTT_TOPIC_START, command, meat_name, target_temperature / 10, target_humidity,
+                 current_temperature / 10, current_humidity, 'OPEN' if door_status else 'CLOSED',
+                 time_of_smoking, len(payload))
 
         # Wyświetl ramkę w formacie binarnym (hex)
         self._print_frame_binary(payload, "START_FRAME")
 
         result = self.client.publish(MQTT_TOPIC_START, payload, qos=1)
+        self._pace(result)
         return result
 
     def publish_update_frame(self, current_humidity, current_temperature, door_status):
         """Publish UPDATE_FRAME to MQTT broker"""
         payload = self.create_update_frame(current_humidity, current_temperature, door_status)
 
-        print(f"\n📤 Publishing UPDATE_FRAME to '{MQTT_TOPIC_UPDATE}'")
-        print(f"  Current - Temp: {current_temperature/10:.1f}°C, Humidity: {current_humidity}%")
-        print(f"  Door: {'OPEN' if door_status else 'CLOSED'}")
-        print(f"  Payload size: {len(payload)} bytes")
+        log.debug("Publishing UPDATE_FRAME to '%s': %.1f°C/%d%%, door %s, %d bytes",
+                  MQTT_TOPIC_UPDATE, current_temperature / 10, current_humidity,
+                  'OPEN' if door_status else 'CLOSED', len(payload))
 
         # Wyświetl ramkę w formacie binarnym (hex)
         self._print_frame_binary(payload, "UPDATE_FRAME")
 
         result = self.client.publish(MQTT_TOPIC_UPDATE, payload, qos=1)
+        self._pace(result)
         return result
 
+    def _pace(self, result):
+        """Fast-forward mode: wait until the broker acknowledges the frame"""
+        if self.clock.virtual and result.rc == mqtt.MQTT_ERR_SUCCESS:
+            result.wait_for_publish(self.PUBLISH_TIMEOUT)
+
     def _print_frame_binary(self, payload, frame_name):
-        """Wyświetl ramkę w formacie binarnym/hex dla debugowania endianness"""
-        print(f"\n  🔍 {frame_name} Binary Representation:")
-        print(f"  {'Position':<10} {'Hex':<8} {'Dec':<6} {'Binary':<12} {'Description'}")
-        print(f"  {'-'*70}")
+        """Wyświetl ramkę w formacie binarnym/hex dla debugowania endianness (tylko przy DEBUG)"""
+        if not log.isEnabledFor(logging.DEBUG):
+            return
+        lines = []
+        lines.append(f"{frame_name} Binary Representation:")
+        lines.append(f"  {'Position':<10} {'Hex':<8} {'Dec':<6} {'Binary':<12} {'Description'}")
+        lines.append(f"  {'-'*70}")
 
         if frame_name == "START_FRAME":
             # [0] Frame Type
-            print(f"  [0]        0x{payload[0]:02X}    {payload[0]:<6} {payload[0]:08b}    Frame Type (START_FRAME)")
+            lines.append(f"  [0]        0x{payload[0]:02X}    {payload[0]:<6} {payload[0]:08b}    Frame Type (START_FRAME)")
 
             # [1] Command
-            print(f"  [1]        0x{payload[1]:02X}    {payload[1]:<6} {payload[1]:08b}    Command")
+            lines.append(f"  [1]        0x{payload[1]:02X}    {payload[1]:<6} {payload[1]:08b}    Command")
 
             # [2-31] Meat name
             meat_str = payload[2:32].decode('utf-8', errors='ignore').rstrip('\x00')
-            print(f"  [2-31]     {'...':<8} {'...':<6} {'...':<12}    Meat Name: '{meat_str}'")
+            lines.append(f"  [2-31]     {'...':<8} {'...':<6} {'...':<12}    Meat Name: '{meat_str}'")
 
             # [32] Target Humidity
-            print(f"  [32]       0x{payload[32]:02X}    {payload[32]:<6} {payload[32]:08b}    Target Humidity")
+            lines.append(f"  [32]       0x{payload[32]:02X}    {payload[32]:<6} {payload[32]:08b}    Target Humidity")
 
             # [33-34] Target Temperature (int16, little-endian)
-            temp_val = struct.unpack('<h', payload[33:35])[0]
-            print(f"  [33]       0x{payload[33]:02X}    {payload[33]:<6} {payload[33]:08b}    Target Temp LOW byte")
-            print(f"  [34]       0x{payload[34]:02X}    {payload[34]:<6} {payload[34]:08b}    Target Temp HIGH byte")
-            print(f"  [33-34]    0x{payload[33]:02X}{payload[34]:02X}  {temp_val:<6} (little-endian) → {temp_val/10:.1f}°C")
+            frame = decode_start_frame(payload)
+            temp_val = frame.target_temperature
+            lines.append(f"  [33]       0x{payload[33]:02X}    {payload[33]:<6} {payload[33]:08b}    Target Temp LOW byte")
+            lines.append(f"  [34]       0x{payload[34]:02X}    {payload[34]:<6} {payload[34]:08b}    Target Temp HIGH byte")
+            lines.append(f"  [33-34]    0x{payload[33]:02X}{payload[34]:02X}  {temp_val:<6} (little-endian) → {temp_val/10:.1f}°C")
 
             # [35] Current Humidity
-            print(f"  [35]       0x{payload[35]:02X}    {payload[35]:<6} {payload[35]:08b}    Current Humidity")
+            lines.append(f"  [35]       0x{payload[35]:02X}    {payload[35]:<6} {payload[35]:08b}    Current Humidity")
 
             # [36-37] Current Temperature (int16, little-endian)
-            curr_temp_val = struct.unpack('<h', payload[36:38])[0]
-            print(f"  [36]       0x{payload[36]:02X}    {payload[36]:<6} {payload[36]:08b}    Current Temp LOW byte")
-            print(f"  [37]       0x{payload[37]:02X}    {payload[37]:<6} {payload[37]:08b}    Current Temp HIGH byte")
-            print(f"  [36-37]    0x{payload[36]:02X}{payload[37]:02X}  {curr_temp_val:<6} (little-endian) → {curr_temp_val/10:.1f}°C")
+            curr_temp_val = frame.current_temperature
+            lines.append(f"  [36]       0x{payload[36]:02X}    {payload[36]:<6} {payload[36]:08b}    Current Temp LOW byte")
+            lines.append(f"  [37]       0x{payload[37]:02X}    {payload[37]:<6} {payload[37]:08b}    Current Temp HIGH byte")
+            lines.append(f"  [36-37]    0x{payload[36]:02X}{payload[37]:02X}  {curr_temp_val:<6} (little-endian) → {curr_temp_val/10:.1f}°C")
 
             # [38] Door Status
-            print(f"  [38]       0x{payload[38]:02X}    {payload[38]:<6} {payload[38]:08b}    Door Status")
+            lines.append(f"  [38]       0x{payload[38]:02X}    {payload[38]:<6} {payload[38]:08b}    Door Status")
 
             # [39-40] Time of Smoking (uint16, little-endian)
-            time_val = struct.unpack('<H', payload[39:41])[0]
-            print(f"  [39]       0x{payload[39]:02X}    {payload[39]:<6} {payload[39]:08b}    Time LOW byte")
-            print(f"  [40]       0x{payload[40]:02X}    {payload[40]:<6} {payload[40]:08b}    Time HIGH byte")
-            print(f"  [39-40]    0x{payload[39]:02X}{payload[40]:02X}  {time_val:<6} (little-endian) → {time_val}s")
+            time_val = frame.time_of_smoking
+            lines.append(f"  [39]       0x{payload[39]:02X}    {payload[39]:<6} {payload[39]:08b}    Time LOW byte")
+            lines.append(f"  [40]       0x{payload[40]:02X}    {payload[40]:<6} {payload[40]:08b}    Time HIGH byte")
+            lines.append(f"  [39-40]    0x{payload[39]:02X}{payload[40]:02X}  {time_val:<6} (little-endian) → {time_val}s")
 
         elif frame_name == "UPDATE_FRAME":
             # [0] Frame Type
-            print(f"  [0]        0x{payload[0]:02X}    {payload[0]:<6} {payload[0]:08b}    Frame Type (UPDATE_FRAME)")
+            lines.append(f"  [0]        0x{payload[0]:02X}    {payload[0]:<6} {payload[0]:08b}    Frame Type (UPDATE_FRAME)")
 
             # [1] Current Humidity
-            print(f"  [1]        0x{payload[1]:02X}    {payload[1]:<6} {payload[1]:08b}    Current Humidity")
+            lines.append(f"  [1]        0x{payload[1]:02X}    {payload[1]:<6} {payload[1]:08b}    Current Humidity")
 
             # [2-3] Current Temperature (int16, little-endian)
-            temp_val = struct.unpack('<h', payload[2:4])[0]
-            print(f"  [2]        0x{payload[2]:02X}    {payload[2]:<6} {payload[2]:08b}    Current Temp LOW byte")
-            print(f"  [3]        0x{payload[3]:02X}    {payload[3]:<6} {payload[3]:08b}    Current Temp HIGH byte")
-            print(f"  [2-3]      0x{payload[2]:02X}{payload[3]:02X}  {temp_val:<6} (little-endian) → {temp_val/10:.1f}°C")
+            temp_val = decode_update_frame(payload).current_temperature
+            lines.append(f"  [2]        0x{payload[2]:02X}    {payload[2]:<6} {payload[2]:08b}    Current Temp LOW byte")
+            lines.append(f"  [3]        0x{payload[3]:02X}    {payload[3]:<6} {payload[3]:08b}    Current Temp HIGH byte")
+            lines.append(f"  [2-3]      0x{payload[2]:02X}{payload[3]:02X}  {temp_val:<6} (little-endian) → {temp_val/10:.1f}°C")
 
             # [4] Door Status
-            print(f"  [4]        0x{payload[4]:02X}    {payload[4]:<6} {payload[4]:08b}    Door Status")
+            lines.append(f"  [4]        0x{payload[4]:02X}    {payload[4]:<6} {payload[4]:08b}    Door Status")
 
-        print(f"  {'-'*70}")
+        lines.append(f"  {'-'*70}")
 
         # Wyświetl całą ramkę jako hex dump
         hex_str = ' '.join([f'{b:02X}' for b in payload])
-        print(f"  Full frame (hex): {hex_str}")
-        print()
+        lines.append(f"  Full frame (hex): {hex_str}")
+        log.debug("\n".join(lines))
 
 
 def example_usage():
@@ -374,7 +314,13 @@ def example_usage():
         client.disconnect()
 
 
-def simulate_smoking_process_reactive(duration_seconds=20, update_interval=2):
+def print_clock_summary(clock):
+    """Simulated vs wall time (speedup is 1x with the real clock)"""
+    print(f"\nSimulated time: {clock.elapsed():.1f}s, wall time: {clock.wall_elapsed():.1f}s, "
+          f"speedup: {clock.speedup():.1f}x")
+
+
+def simulate_smoking_process_reactive(duration_seconds=20, update_interval=2, clock=None, timeout=None):
     """
     REACTIVE simulation - responds to ESP32 state changes
     Wysyła ramki UPDATE dopóki ESP32 nie zmieni stanu
@@ -382,11 +328,15 @@ def simulate_smoking_process_reactive(duration_seconds=20, update_interval=2):
     Args:
         duration_seconds (int): Total cooking time (używane w START_FRAME)
         update_interval (int): Seconds between UPDATE_FRAME messages
+        clock: RealClock (default) or VirtualClock for fast-forward runs (sim_clock.py)
+        timeout (float): Give up after this many simulated seconds (None = never)
     """
     import random
 
+    clock = clock or RealClock()
+
     # Create client instance
-    client = MQTTSmokehouseClient()
+    client = MQTTSmokehouseClient(clock=clock)
 
     # Connect to broker
     if not client.connect():
@@ -424,14 +374,19 @@ def simulate_smoking_process_reactive(duration_seconds=20, update_interval=2):
             time_of_smoking=duration_seconds
         )
 
-        time.sleep(2)
+        clock.sleep(2)
 
         print("\n🔄 Starting reactive loop - waiting for ESP32 state changes...\n")
 
         # Main reactive loop
+        loop_start = clock.now()
         while True:
             current_state = client.last_state
 
+            if timeout is not None and clock.now() - loop_start > timeout:
+                print(f"\n[{current_state}] Timeout after {timeout:.0f}s of simulated time - giving up")
+                break
+
             if current_state == "HEATING":
                 # Zwiększaj temperaturę stopniowo
                 if current_temp < target_temp:
@@ -493,7 +448,7 @@ def simulate_smoking_process_reactive(duration_seconds=20, update_interval=2):
                 print(f"\n{'='*70}")
                 print(f"[{current_state}] ESP32 ready - waiting for next state...")
                 print(f"{'='*70}\n")
-                time.sleep(update_interval)
+                clock.sleep(update_interval)
                 continue
 
             elif current_state == "WAIT_FOR_TAKE_OUT_CONFIRMATION":
@@ -517,7 +472,7 @@ def simulate_smoking_process_reactive(duration_seconds=20, update_interval=2):
                     confirmation_sent = True
                     print("✓ Confirmation sent, waiting for ESP32 to return to IDLE...\n")
 
-                time.sleep(update_interval)
+                clock.sleep(update_interval)
                 continue
 
             elif current_state == "IDLE":
@@ -530,13 +485,13 @@ def simulate_smoking_process_reactive(duration_seconds=20, update_interval=2):
                 else:
                     # Czekamy na START
                     print(f"[{current_state}] Waiting for ESP32 to process START_FRAME...")
-                    time.sleep(update_interval)
+                    clock.sleep(update_interval)
                     continue
 
             elif current_state == "UNKNOWN":
                 # Czekamy na pierwszy stan
                 print(f"[{current_state}] Waiting for ESP32 connection...")
-                time.sleep(update_interval)
+                clock.sleep(update_interval)
                 continue
 
             else:
@@ -550,7 +505,7 @@ def simulate_smoking_process_reactive(duration_seconds=20, update_interval=2):
                     door_status=0
                 )
 
-            time.sleep(update_interval)
+            clock.sleep(update_interval)
 
         # Final summary
         print("\n" + "="*70)
@@ -562,6 +517,7 @@ def simulate_smoking_process_reactive(duration_seconds=20, update_interval=2):
             print(f"  {i}. {state}")
         print(f"\nFinal temperature: {current_temp/10:.1f}°C")
         print(f"Final humidity: {int(current_humidity)}%")
+        print_clock_summary(clock)
         print("="*70)
 
     except KeyboardInterrupt:
@@ -570,7 +526,7 @@ def simulate_smoking_process_reactive(duration_seconds=20, update_interval=2):
         client.disconnect()
 
 
-def simulate_smoking_process( duration_seconds=20, update_interval=2):
+def simulate_smoking_process( duration_seconds=20, update_interval=2, clock=None):
     """
     OLD VERSION - Time-based simulation (not reactive to ESP32 states)
     This simulates the full state machine cycle:
@@ -579,11 +535,14 @@ def simulate_smoking_process( duration_seconds=20, update_interval=2):
     Args:
         duration_seconds (int): Total simulation duration in seconds (cooking time)
         update_interval (int): Seconds between UPDATE_FRAME messages
+        clock: RealClock (default) or VirtualClock for fast-forward runs (sim_clock.py)
     """
     import random
 
+    clock = clock or RealClock()
+
     # Create client instance
-    client = MQTTSmokehouseClient()
+    client = MQTTSmokehouseClient(clock=clock)
 
     # Connect to broker
     if not client.connect():
@@ -629,15 +588,15 @@ def simulate_smoking_process( duration_seconds=20, update_interval=2):
         )
 
         print("\n--- Phase 1: HEATING (door CLOSED) ---\n")
-        time.sleep(1)
+        clock.sleep(1)
 
         # === PHASE 1: HEATING ===
-        start_time = time.time()
+        start_time = clock.now()
         update_count = 0
         phase_1_duration = duration_seconds * 0.25
 
-        while (time.time() - start_time) < phase_1_duration:
-            elapsed = time.time() - start_time
+        while (clock.now() - start_time) < phase_1_duration:
+            elapsed = clock.now() - start_time
 
             # Rapidly increase temperature
             temp_progress = elapsed / phase_1_duration
@@ -657,15 +616,15 @@ def simulate_smoking_process( duration_seconds=20, update_interval=2):
                 door_status=0
             )
 
-            time.sleep(update_interval)
+            clock.sleep(update_interval)
 
         # === PHASE 2: HUMIDIFYING ===
         print("\n--- Phase 2: HUMIDIFYING (door CLOSED) ---\n")
-        phase_2_start = time.time()
+        phase_2_start = clock.now()
         phase_2_duration = duration_seconds * 0.15
 
-        while (time.time() - phase_2_start) < phase_2_duration:
-            elapsed = time.time() - phase_2_start
+        while (clock.now() - phase_2_start) < phase_2_duration:
+            elapsed = clock.now() - phase_2_start
 
             # Hold temperature at target with variations
             current_temp = int(target_temp + random.uniform(-15, 15))
@@ -684,15 +643,15 @@ def simulate_smoking_process( duration_seconds=20, update_interval=2):
                 door_status=0
             )
 
-            time.sleep(update_interval)
+            clock.sleep(update_interval)
 
         # === PHASE 3: COOKING ===
         print("\n--- Phase 3: COOKING (maintaining temp/humidity, door CLOSED) ---\n")
-        phase_3_start = time.time()
+        phase_3_start = clock.now()
         phase_3_duration = duration_seconds * 0.6  # Most of the time
 
-        while (time.time() - phase_3_start) < phase_3_duration:
-            elapsed = time.time() - phase_3_start
+        while (clock.now() - phase_3_start) < phase_3_duration:
+            elapsed = clock.now() - phase_3_start
 
             # Maintain both at target with small variations
             current_temp = int(target_temp + random.uniform(-20, 20))
@@ -709,15 +668,15 @@ def simulate_smoking_process( duration_seconds=20, update_interval=2):
                 door_status=0
             )
 
-            time.sleep(update_interval)
+            clock.sleep(update_interval)
 
         # === PHASE 4: COOLDOWN ===
         print("\n--- Phase 4: COOLDOWN (cooling to 40°C, door CLOSED) ---\n")
-        phase_4_start = time.time()
+        phase_4_start = clock.now()
         phase_4_duration = 8  # 8 seconds to cool down
 
-        while (time.time() - phase_4_start) < phase_4_duration:
-            elapsed = time.time() - phase_4_start
+        while (clock.now() - phase_4_start) < phase_4_duration:
+            elapsed = clock.now() - phase_4_start
 
             # Temperature gradually decreases
             cool_progress = elapsed / phase_4_duration
@@ -737,7 +696,7 @@ def simulate_smoking_process( duration_seconds=20, update_interval=2):
                 door_status=0
             )
 
-            time.sleep(update_interval)
+            clock.sleep(update_interval)
 
         # Ensure final temp is below 40°C (value is in °C*10, so 40°C = 400)
         current_temp = 380  # 38.0°C (int16 format: 380 = 38.0°C)
@@ -750,7 +709,7 @@ def simulate_smoking_process( duration_seconds=20, update_interval=2):
             door_status=0
         )
         update_count += 1
-        time.sleep(2)
+        clock.sleep(2)
 
         # === PHASE 5: WAIT FOR CONFIRMATION ===
         print("\n--- Phase 5: READY_TO_TAKE_OUT - Waiting for user confirmation ---\n")
@@ -764,7 +723,7 @@ def simulate_smoking_process( duration_seconds=20, update_interval=2):
             door_status=0  # Door still closed, waiting for user
         )
 
-        time.sleep(2)
+        clock.sleep(2)
 
         # Final status
         print("\n" + "="*70)
@@ -777,6 +736,7 @@ def simulate_smoking_process( duration_seconds=20, update_interval=2):
         print(f"\nFinal temperature: {current_temp/10:.1f}°C")
         print(f"Final humidity: {int(current_humidity)}%")
         print(f"Door status: CLOSED throughout entire process")
+        print_clock_summary(clock)
         print("="*70)
 
     except KeyboardInterrupt:
@@ -787,16 +747,33 @@ def simulate_smoking_process( duration_seconds=20, update_interval=2):
 
 
 if __name__ == "__main__":
-    print("Smart Smokehouse MQTT Client - REACTIVE Simulation Mode")
+    parser = argparse.ArgumentParser(description="Smart Smokehouse MQTT Client - cloud simulator")
+    parser.add_argument("--mode", choices=("reactive", "timed", "examples"), default="reactive",
+                        help="reactive: follow ESP32 states (default), timed: old time-based run, "
+                             "examples: a few single frames")
+    parser.add_argument("--duration", type=int, default=11, help="Cooking time sent in START_FRAME (s)")
+    parser.add_argument("--interval", type=float, default=2, help="Seconds between UPDATE_FRAME messages")
+    parser.add_argument("--fast", action="store_true",
+                        help="Fast-forward on a virtual clock (as fast as the broker/ESP32 respond)")
+    parser.add_argument("--real-step", type=float, default=0.005,
+                        help="Real seconds per simulated sleep in --fast mode")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="Reactive mode: give up after this many simulated seconds")
+    args = parser.parse_args()
+
+    setup_logging()
+    clock = create_clock(fast=args.fast, real_step=args.real_step)
+    print(f"Smart Smokehouse MQTT Client - {args.mode.upper()} Simulation Mode"
+          f"{' (fast-forward, virtual clock)' if args.fast else ''}")
     print("="*60)
 
-    # Run REACTIVE simulation - responds to ESP32 state changes
-    # Cooking duration is sent in START_FRAME (ESP32 uses it for timing)
-    # Update interval is how often we send sensor updates
-    simulate_smoking_process_reactive(duration_seconds=11, update_interval=2)
-
-    # To run OLD time-based simulation instead:
-    # simulate_smoking_process(duration_seconds=20, update_interval=2)
-
-    # To run simple examples instead:
-    # example_usage()
+    if args.mode == "reactive":
+        # Run REACTIVE simulation - responds to ESP32 state changes
+        # Cooking duration is sent in START_FRAME (ESP32 uses it for timing)
+        # Update interval is how often we send sensor updates
+        simulate_smoking_process_reactive(duration_seconds=args.duration, update_interval=args.interval,
+                                          clock=clock, timeout=args.timeout)
+    elif args.mode == "timed":
+        simulate_smoking_process(duration_seconds=args.duration, update_interval=args.interval, clock=clock)
+    else:
+        example_usage()
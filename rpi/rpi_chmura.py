@@ -1,45 +1,33 @@
-import ssl
-import json
-import time
-import os
-from paho.mqtt import client as mqtt
-
-
-
-IOT_ENDPOINT = "apc4udnp426oi-ats.iot.eu-central-1.amazonaws.com"
-PORT = 8883
-TOPIC = "decoded/#"
-CLIENT_ID = "raspberrypi-subscriber"
-
-CERT_ROOT = os.path.expanduser("~/iot/certs/AmazonRootCA1.pem")
-CERT_FILE = os.path.expanduser("~/iot/certs/f397c6ef30d1506986fcfb78b23d519599e830bf5e15f66132f5f5cb678cd99c-certificate.pem.crt")
-KEY_FILE  = os.path.expanduser("~/iot/certs/f397c6ef30d1506986fcfb78b23d519599e830bf5e15f66132f5f5cb678cd99c-private.pem.key")
-
-def on_connect(client, userdata, flags, rc):
-    print("Połączono, rc=", rc)
-    client.subscribe(TOPIC)
-    print("Zasubskrybowano:", TOPIC)
-
-def on_message(client, userdata, msg):
-    payload = msg.payload.decode('utf-8', errors='ignore')
-    print("Odebrano:", msg.topic, payload)
-    # zapisz do pliku CSV (czas, topic, payload)
-    #ts = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-    #with open("/home/pi/iot_data.csv", "a") as f:
-    #    f.write(f"{ts},{msg.topic},{payload}\\n")
-
-def main():
-    client = mqtt.Client(client_id=CLIENT_ID)
-    client.tls_set(ca_certs=CERT_ROOT,
-                   certfile=CERT_FILE,
-                   keyfile=KEY_FILE,
-                   tls_version=ssl.PROTOCOL_TLSv1_2)
-    client.on_connect = on_connect
-    client.on_message = on_message
-
-    print("Łączenie do:", IOT_ENDPOINT)
-    client.connect(IOT_ENDPOINT, PORT, keepalive=60)
-    client.loop_forever()
-
-if __name__ == "__main__":
-    main()
+"""
+Podgląd wiadomości decoded/# z AWS IoT (wspólny odbiór: cloud_ingest.py).
+Zapis do pliku CSV (czas, topic, payload): python3 cloud_ingest.py --sink log --sink csv=/home/pi/iot_data.csv
+Zapis ruchu do odtworzenia (cloud_replay.py): python3 rpi_chmura.py --record /home/pi/iot_data.trace
+"""
+
+import argparse
+import logging
+
+from cloud_ingest import IngestHub, LogSink, RecorderSink, run
+from smokehouse_log import setup_logging
+
+CLIENT_ID = "raspberrypi-subscriber"
+
+log = logging.getLogger("ingest")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--record", metavar="PLIK", help="Zapisuj ruch (topic, payload, czas) do pliku traffic_log")
+    args = parser.parse_args()
+
+    setup_logging()
+    sinks = [LogSink()]
+    if args.record:
+        sinks.append(RecorderSink(args.record))
+    try:
+        run(IngestHub(sinks), client_id=CLIENT_ID)
+    except KeyboardInterrupt:
+        log.info("Zamykanie programu...")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Smart Smokehouse - zegary dla symulatorów (python_cloud_simulator, emulatory ESP32)
+
+Kod symulacji nie woła ``time.sleep``/``time.time`` bezpośrednio, tylko
+``clock.sleep``/``clock.now``, więc ten sam scenariusz działa:
+  RealClock    - w czasie rzeczywistym (jak dotąd)
+  VirtualClock - w czasie wirtualnym: ``sleep`` od razu przesuwa zegar
+                 i wykonuje zaplanowane zdarzenia (kolejka priorytetowa),
+                 a realnie czeka tylko ``real_step`` s, żeby wątki sieciowe
+                 (paho) zdążyły dostarczyć odpowiedzi brokera/ESP32.
+
+Wieloetapowe wędzenie trwające godziny przechodzi więc w tempie, na jakie
+pozwala broker i ESP32 (albo emulator na tym samym zegarze), a
+``speedup()`` podaje stosunek czasu symulowanego do rzeczywistego.
+
+    clock = VirtualClock(real_step=0.005)
+    clock.call_later(30, print, "po 30 s symulacji")
+    clock.sleep(60)        # ~5 ms naprawdę
+"""
+
+import heapq
+import itertools
+import threading
+import time
+
+
+class _Timer:
+    """Zaplanowane zdarzenie; ``cancel()`` wyłącza je przed wykonaniem"""
+
+    __slots__ = ("when", "callback", "args", "cancelled")
+
+    def __init__(self, when, callback, args):
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class RealClock:
+    """Zegar rzeczywisty - ``sleep`` naprawdę czeka"""
+
+    virtual = False
+
+    def __init__(self):
+        self._wall_start = time.monotonic()
+
+    def now(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def call_later(self, delay, callback, *args):
+        timer = threading.Timer(max(0.0, delay), callback, args)
+        timer.daemon = True
+        timer.start()
+        return timer
+
+    def elapsed(self):
+        return time.monotonic() - self._wall_start
+
+    def wall_elapsed(self):
+        return self.elapsed()
+
+    def speedup(self):
+        return 1.0
+
+
+class VirtualClock:
+    """
+    Zegar dyskretnych zdarzeń. Czas płynie tylko w ``sleep``/``advance``/``run``;
+    zdarzenia z ``call_at``/``call_later`` wykonywane są w wątku, który
+    przesuwa zegar, w kolejności czasu (przy równym czasie - planowania).
+    Planować można z dowolnego wątku (np. z callbacku MQTT).
+
+    ``real_step`` - ile realnie czekać przy każdym ``sleep`` (0 = wcale,
+    czysta symulacja bez sieci).
+    """
+
+    virtual = True
+
+    def __init__(self, start=None, real_step=0.005):
+        self._now = time.time() if start is None else float(start)
+        self._start = self._now
+        self.real_step = real_step
+        self._events = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._wall_start = time.monotonic()
+        self.executed = 0
+
+    def now(self):
+        return self._now
+
+    def call_at(self, when, callback, *args):
+        timer = _Timer(max(when, self._now), callback, args)
+        with self._lock:
+            heapq.heappush(self._events, (timer.when, next(self._sequence), timer))
+        return timer
+
+    def call_later(self, delay, callback, *args):
+        return self.call_at(self._now + max(0.0, delay), callback, *args)
+
+    def advance(self, seconds):
+        """Przesuwa zegar o ``seconds``, wykonując po drodze zaplanowane zdarzenia"""
+        self._run_until(self._now + max(0.0, seconds))
+
+    def sleep(self, seconds):
+        self.advance(seconds)
+        if self.real_step > 0:
+            time.sleep(self.real_step)
+
+    def run(self, until=None):
+        """Wykonuje zdarzenia do opróżnienia kolejki (albo do czasu ``until``)"""
+        while True:
+            with self._lock:
+                if not self._events:
+                    break
+                when = self._events[0][0]
+            if until is not None and when > until:
+                break
+            self._run_until(when)
+        if until is not None and until > self._now:
+            self._now = until
+
+    def pending(self):
+        with self._lock:
+            return sum(1 for _, _, timer in self._events if not timer.cancelled)
+
+    def _run_until(self, deadline):
+        while True:
+            with self._lock:
+                if not self._events or self._events[0][0] > deadline:
+                    break
+                when, _, timer = heapq.heappop(self._events)
+            if timer.cancelled:
+                continue
+            # Zdarzenie widzi zegar ustawiony na swój czas
+            self._now = max(self._now, when)
+            self.executed += 1
+            timer.callback(*timer.args)
+        self._now = max(self._now, deadline)
+
+    def elapsed(self):
+        """Czas symulowany od utworzenia zegara (s)"""
+        return self._now - self._start
+
+    def wall_elapsed(self):
+        return time.monotonic() - self._wall_start
+
+    def speedup(self):
+        wall = self.wall_elapsed()
+        return self.elapsed() / wall if wall > 0 else float("inf")
+
+
+def create_clock(fast=False, real_step=0.005):
+    return VirtualClock(real_step=real_step) if fast else RealClock()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Smart Smokehouse - wspólna konfiguracja logowania (bridge, symulator, worker Django)
+
+- poziomy i leniwe formatowanie (``log.info("x=%s", x)`` formatuje dopiero,
+  gdy rekord przejdzie przez poziom i filtry),
+- nieblokujący zapis: logger wrzuca rekord do kolejki, a wypisywaniem na
+  konsolę/journald zajmuje się osobny wątek QueueListener,
+- limit szybkości per komponent (nazwa loggera), żeby zalew wiadomości nie
+  zajął CPU konsolą; ERROR i wyżej przechodzą zawsze,
+- format tekstowy albo JSON (``SMOKEHOUSE_LOG_FORMAT=json``) z polami
+  przekazanymi w ``extra=``.
+
+Zmienne środowiskowe: SMOKEHOUSE_LOG_LEVEL (INFO), SMOKEHOUSE_LOG_FORMAT
+(text|json), SMOKEHOUSE_LOG_RATE (rekordów/s na komponent, 0 = bez limitu).
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+DEFAULT_LEVEL = os.environ.get("SMOKEHOUSE_LOG_LEVEL", "INFO")
+DEFAULT_FORMAT = os.environ.get("SMOKEHOUSE_LOG_FORMAT", "text")
+DEFAULT_RATE = float(os.environ.get("SMOKEHOUSE_LOG_RATE", "20"))
+DEFAULT_BURST = 50
+QUEUE_SIZE = 10000
+
+TEXT_FORMAT = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+
+# Atrybuty LogRecord, które nie są polami "extra"
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+
+def _extra_fields(record):
+    return {k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS and not k.startswith("_")}
+
+
+class TextFormatter(logging.Formatter):
+    """Format tekstowy z polami extra dopisanymi jako klucz=wartość"""
+
+    def __init__(self, fmt=TEXT_FORMAT):
+        super().__init__(fmt)
+
+    def format(self, record):
+        line = super().format(record)
+        extra = _extra_fields(record)
+        if extra:
+            line += " " + " ".join(f"{k}={v}" for k, v in extra.items())
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """Jeden obiekt JSON na linię (np. dla journald/Loki)"""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "component": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(_extra_fields(record))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Kubełek tokenów per komponent: średnio ``rate`` rekordów/s, chwilowo
+    do ``burst``. Odrzucone rekordy są zliczane, a liczba jest dopisywana
+    do pierwszego rekordu przepuszczonego po przerwie (``suppressed=N``).
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, bypass_level=logging.ERROR):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.bypass_level = bypass_level
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if not self.rate or record.levelno >= self.bypass_level:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            tokens, last, suppressed = self._buckets.get(record.name, (self.burst, now, 0))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens < 1:
+                self._buckets[record.name] = (tokens, now, suppressed + 1)
+                return False
+            self._buckets[record.name] = (tokens - 1, now, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+def make_formatter(fmt=DEFAULT_FORMAT):
+    return JsonFormatter() if fmt == "json" else TextFormatter()
+
+
+def make_queue_handler(fmt=DEFAULT_FORMAT, rate=DEFAULT_RATE, burst=DEFAULT_BURST, stream=None):
+    """
+    QueueHandler z filtrem limitu i uruchomionym QueueListenerem, który
+    pisze do ``stream`` (domyślnie stderr). Pełna kolejka odrzuca rekord
+    zamiast blokować wątek wywołujący (np. callback paho).
+    Nadaje się też jako fabryka ``'()'`` w LOGGING Django.
+    """
+    records = queue.Queue(QUEUE_SIZE)
+    output = logging.StreamHandler(stream)
+    output.setFormatter(make_formatter(fmt))
+    listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    handler = _NonBlockingQueueHandler(records)
+    handler.addFilter(RateLimitFilter(rate, burst))
+    handler.listener = listener
+    return handler
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    dropped = 0
+
+    def prepare(self, record):
+        # Formatowanie (także %-argumentów) dopiero w wątku listenera;
+        # argumenty logów powinny więc być niezmienne (liczby, napisy, krotki)
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_configured = None
+
+
+def setup_logging(level=DEFAULT_LEVEL, fmt=DEFAULT_FORMAT, rate=DEFAULT_RATE):
+    """Konfiguruje logger główny (raz na proces); zwraca QueueHandler"""
+    global _configured
+    if _configured is not None:
+        return _configured
+    handler = make_queue_handler(fmt, rate)
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    _configured = handler
+    return handler
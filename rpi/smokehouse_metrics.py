@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Smart Smokehouse - metryki w formacie Prometheusa (bridge, worker Django)
+
+Liczniki, wskaźniki i histogramy udostępniane przez lokalny endpoint HTTP
+``/metrics`` (http.server w osobnym wątku, bez dodatkowych zależności).
+
+Metryki są włączane zmienną SMOKEHOUSE_METRICS=1 (odczytaną przy imporcie).
+Bez niej ``counter()``/``gauge()``/``histogram()`` zwracają wspólny obiekt
+no-op, więc instrumentacja w gorących ścieżkach kosztuje jedno puste
+wywołanie metody, a serwer HTTP nie jest uruchamiany.
+
+    MESSAGES = counter("bridge_messages_total", "Wiadomości z chmury", ["topic"])
+    MESSAGES.labels(msg.topic).inc()
+"""
+
+import bisect
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ENABLED = os.environ.get("SMOKEHOUSE_METRICS") == "1"
+METRICS_ADDR = os.environ.get("SMOKEHOUSE_METRICS_ADDR", "127.0.0.1")
+
+# Progi histogramów opóźnień w sekundach (od 100 µs do 5 s)
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r'\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    pairs += [f'{n}="{v}"' for n, v in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Wspólna część metryk: nazwa, opis, etykiety i dzieci per etykiety"""
+
+    kind = "untyped"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """Metryka dla konkretnych wartości etykiet (tworzona przy pierwszym użyciu)"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name}: oczekiwano etykiet {self.labelnames}, podano {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _samples(self):
+        """(wartości etykiet, dziecko) - bez etykiet jedno dziecko z kluczem ()"""
+        return sorted(self._children.items())
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in self._samples():
+            lines.extend(child.expose(self.name, self.labelnames, values))
+        return lines
+
+
+class _CounterValue:
+    __slots__ = ("value", "function", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self.function = None
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def set_function(self, function):
+        """Wartość odczytywana przy każdym scrapie (np. długość kolejki)"""
+        self.function = function
+
+    def expose(self, name, labelnames, values):
+        value = self.value
+        if self.function is not None:
+            try:
+                value = self.function()
+            except Exception:
+                return []
+        return [f"{name}{_format_labels(labelnames, values)} {_format_value(value)}"]
+
+
+class _GaugeValue(_CounterValue):
+    __slots__ = ()
+
+    def set(self, value):
+        self.value = value
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "_lock")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def expose(self, name, labelnames, values):
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            labels = _format_labels(labelnames, values, [("le", _format_value(bound))])
+            lines.append(f"{name}_bucket{labels} {cumulative}")
+        labels = _format_labels(labelnames, values)
+        lines.append(f"{name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{name}_count{labels} {cumulative}")
+        return lines
+
+
+class Counter(_Metric):
+    """Licznik rosnący (np. liczba wiadomości, ponownych połączeń)"""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterValue()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def set_function(self, function):
+        """Licznik prowadzony przez inny obiekt (funkcja musi być niemalejąca, np. writer.dropped)"""
+        self.labels().set_function(function)
+
+
+class Gauge(_Metric):
+    """Wskaźnik - wartość bieżąca albo funkcja odczytywana przy scrapie"""
+
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeValue()
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def dec(self, amount=1):
+        self.labels().dec(amount)
+
+    def set_function(self, function):
+        self.labels().set_function(function)
+
+
+class Histogram(_Metric):
+    """Histogram (kubełki skumulowane, suma, liczba) - zwykle czasy w sekundach"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+
+class _NoopMetric:
+    """Zastępuje każdą metrykę, gdy metryki są wyłączone"""
+
+    __slots__ = ()
+
+    def labels(self, *values):
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    def dec(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+    def set_function(self, function):
+        pass
+
+    def observe(self, value):
+        pass
+
+
+NOOP = _NoopMetric()
+
+
+class Registry:
+    """Zbiór metryk procesu; ``expose()`` zwraca tekst dla /metrics"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metryka {metric.name} zarejestrowana z innym typem lub etykietami")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def expose(self):
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name, help, labelnames=()):
+    return REGISTRY.register(Counter(name, help, labelnames)) if ENABLED else NOOP
+
+
+def gauge(name, help, labelnames=()):
+    return REGISTRY.register(Gauge(name, help, labelnames)) if ENABLED else NOOP
+
+
+def histogram(name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, help, labelnames, buckets)) if ENABLED else NOOP
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.expose().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapy co kilka sekund nie powinny zaśmiecać logów
+        pass
+
+
+def start_http_server(port, addr=METRICS_ADDR, registry=REGISTRY):
+    """Uruchamia /metrics w wątku w tle; zwraca serwer albo None, gdy metryki są wyłączone"""
+    if not ENABLED:
+        return None
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+    server = ThreadingHTTPServer((addr, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Smart Smokehouse - stan wędzarni jako niezmienne migawki
+
+Stan to namedtuple ``Snapshot`` podmieniana w całości przy każdej zmianie.
+Odczyt to jedno przypisanie referencji (atomowe w CPythonie), więc
+publikujący (START_FRAME, UPDATE_FRAME, logi) biorą spójną migawkę bez
+blokady. Blokada serializuje tylko zapisujących, żeby równoległe
+``update`` nie gubiły sobie zmian.
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+from frame_codec import COMMAND_START, create_start_frame, create_update_frame
+
+Snapshot = namedtuple("Snapshot", [
+    "temperature",          # °C * 10
+    "humidity",             # %
+    "door_status",          # 0=closed, 1=open
+    "last_update",
+    "esp_state",
+    "target_temperature",   # °C * 10
+    "target_humidity",      # %
+    "smoking_duration",     # sekundy
+    "meat_name",
+])
+
+DEFAULT_SNAPSHOT = Snapshot(
+    temperature=230,        # 23.0°C
+    humidity=45,
+    door_status=0,
+    last_update=0.0,
+    esp_state="UNKNOWN",
+    target_temperature=650,  # 65.0°C
+    target_humidity=75,
+    smoking_duration=20,     # 20 sekund
+    meat_name="Boczek",
+)
+
+
+class SmokehouseState:
+    """Przechowuje aktualny stan wędzarni (migawka + blokada zapisu)"""
+
+    __slots__ = ("snapshot", "_write_lock")
+
+    def __init__(self, **values):
+        self.snapshot = DEFAULT_SNAPSHOT._replace(last_update=time.time(), **values)
+        self._write_lock = threading.Lock()
+
+    def update(self, **changes):
+        """Podmienia migawkę; zwraca (stara, nowa)"""
+        with self._write_lock:
+            old = self.snapshot
+            new = old._replace(**changes)
+            self.snapshot = new
+        return old, new
+
+
+def start_frame(snapshot, command=COMMAND_START):
+    """START_FRAME z parametrami procesu i bieżącymi odczytami migawki"""
+    return create_start_frame(
+        command=command,
+        meat_name=snapshot.meat_name,
+        target_humidity=snapshot.target_humidity,
+        target_temperature=snapshot.target_temperature,
+        current_humidity=snapshot.humidity,
+        current_temperature=snapshot.temperature,
+        door_status=snapshot.door_status,
+        time_of_smoking=snapshot.smoking_duration
+    )
+
+
+def update_values(snapshot):
+    """(wilgotność, temperatura, drzwi) w kolejności UPDATE_FRAME"""
+    return snapshot.humidity, snapshot.temperature, snapshot.door_status
+
+
+def update_frame(snapshot):
+    return create_update_frame(*update_values(snapshot))
+
+
+# Zakresy pól UPDATE_FRAME: temperatura int16 (°C * 10), wilgotność uint8
+TEMPERATURE_RANGE = (-32768, 32767)
+HUMIDITY_RANGE = (0, 255)
+
+
+def _clamp(value, bounds):
+    low, high = bounds
+    return max(low, min(high, value))
+
+
+def cloud_changes(sensor_data):
+    """
+    Zmiany stanu z wiadomości czujnika z chmury ({} gdy nic do zmiany).
+    Odczyty spoza zakresu pól ramki są przycinane do granic zakresu.
+    """
+    changes = {}
+    if "temperature" in sensor_data and "humidity" in sensor_data:
+        # Konwertuj do formatu ESP32 (temperatura * 10)
+        changes["temperature"] = _clamp(int(sensor_data["temperature"] * 10), TEMPERATURE_RANGE)
+        changes["humidity"] = _clamp(int(sensor_data["humidity"]), HUMIDITY_RANGE)
+    if "door_open_status" in sensor_data:
+        changes["door_status"] = sensor_data["door_open_status"]
+    if changes:
+        changes["last_update"] = time.time()
+    return changes
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Smart Smokehouse - bufor store-and-forward na dysku
+
+Spool to plik o stałym rozmiarze zmapowany w pamięci (mmap), używany jako
+bufor pierścieniowy rekordów (topic, payload, czas). Gdy lokalny broker
+jest niedostępny, ramki trafiają do spoola, a po ponownym połączeniu są
+odtwarzane w kolejności z ograniczoną szybkością. Gdy plik się zapełni,
+najstarsze rekordy są nadpisywane (licznik ``dropped``).
+
+Odporność na awarie: rekord jest zapisywany przed przesunięciem ``tail``
+w nagłówku, a każdy rekord ma CRC32. Przy otwarciu rekordy od ``head`` do
+``tail`` są sprawdzane i spool jest obcinany do ostatniego poprawnego.
+Po zabiciu procesu dane są bezpieczne zawsze (strony mmap są w page
+cache); przy zaniku zasilania tylko z ``sync=True`` (msync po zapisie).
+
+Ramki UPDATE niosą pełny stan, więc SpooledPublisher domyślnie odtwarza
+tylko najnowszy rekord każdego topicu, a świeże ramki po połączeniu idą
+od razu, bez czekania za zaległymi.
+"""
+
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+MAGIC = b"SMKSPOOL"
+VERSION = 1
+DEFAULT_CAPACITY = 8 * 1024 * 1024
+
+# magic, version, reserved, capacity, head, tail, count
+HEADER = struct.Struct("<8sIIQQQQ")
+HEADER_SIZE = 64
+# payload length, crc32, timestamp, topic length
+RECORD = struct.Struct("<IIdH")
+
+log = logging.getLogger("spool")
+
+
+class Spool:
+    """Bufor pierścieniowy rekordów w pliku zmapowanym w pamięci"""
+
+    def __init__(self, path, capacity=DEFAULT_CAPACITY, sync=False):
+        self.path = path
+        self.sync = sync
+        self.dropped = 0
+        self.truncated = False
+        # topic -> pozycja najnowszego rekordu (może już być przed ``head``)
+        self.latest = {}
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fresh = not os.path.exists(path) or os.path.getsize(path) < HEADER_SIZE
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if fresh:
+                os.ftruncate(fd, HEADER_SIZE + capacity)
+            self._mm = mmap.mmap(fd, 0)
+        finally:
+            os.close(fd)
+
+        if fresh:
+            self.capacity = capacity
+            self.head = self.tail = self.count = 0
+            self._write_header()
+        else:
+            magic, version, _, self.capacity, self.head, self.tail, _ = HEADER.unpack_from(self._mm, 0)
+            if magic != MAGIC or version != VERSION:
+                self._mm.close()
+                raise ValueError(f"{path} nie jest plikiem spoola (wersja {VERSION})")
+            if len(self._mm) != HEADER_SIZE + self.capacity:
+                self._mm.close()
+                raise ValueError(f"{path}: rozmiar pliku nie zgadza się z nagłówkiem")
+            self._recover()
+
+    # ------------------------------------------------------------------
+    # Niski poziom: pierścień i nagłówek
+    # ------------------------------------------------------------------
+
+    def _write_header(self):
+        HEADER.pack_into(self._mm, 0, MAGIC, VERSION, 0, self.capacity, self.head, self.tail, self.count)
+
+    def _write_at(self, pos, data):
+        offset = pos % self.capacity
+        first = min(len(data), self.capacity - offset)
+        self._mm[HEADER_SIZE + offset:HEADER_SIZE + offset + first] = data[:first]
+        if first < len(data):
+            rest = len(data) - first
+            self._mm[HEADER_SIZE:HEADER_SIZE + rest] = data[first:]
+
+    def _read_at(self, pos, size):
+        offset = pos % self.capacity
+        first = min(size, self.capacity - offset)
+        data = self._mm[HEADER_SIZE + offset:HEADER_SIZE + offset + first]
+        if first < size:
+            data += self._mm[HEADER_SIZE:HEADER_SIZE + size - first]
+        return data
+
+    def _read_record(self, pos, limit):
+        """Rekord od pozycji ``pos``: (rozmiar, topic, payload, czas) albo None, jeśli uszkodzony"""
+        if limit - pos < RECORD.size:
+            return None
+        length, crc, timestamp, topic_length = RECORD.unpack(self._read_at(pos, RECORD.size))
+        size = RECORD.size + topic_length + length
+        if size > self.capacity or pos + size > limit:
+            return None
+        body = self._read_at(pos + RECORD.size, topic_length + length)
+        if zlib.crc32(body, zlib.crc32(struct.pack("<d", timestamp))) != crc:
+            return None
+        return size, body[:topic_length].decode('utf-8'), body[topic_length:], timestamp
+
+    def _recover(self):
+        pos = self.head
+        count = 0
+        while pos < self.tail:
+            record = self._read_record(pos, self.tail)
+            if record is None:
+                break
+            self.latest[record[1]] = pos
+            pos += record[0]
+            count += 1
+        if pos != self.tail:
+            # Przerwany zapis albo uszkodzony rekord - wszystko za nim odrzucamy
+            self.truncated = True
+            self.tail = pos
+        self.count = count
+        self._write_header()
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    def append(self, topic, payload, timestamp=None):
+        """Dopisuje rekord; gdy brak miejsca, usuwa najstarsze"""
+        topic_bytes = topic.encode('utf-8')
+        timestamp = time.time() if timestamp is None else timestamp
+        body = topic_bytes + bytes(payload)
+        size = RECORD.size + len(body)
+        if size > self.capacity:
+            raise ValueError(f"Rekord ({size} B) większy niż spool ({self.capacity} B)")
+        crc = zlib.crc32(body, zlib.crc32(struct.pack("<d", timestamp)))
+
+        with self._lock:
+            while self.tail + size - self.head > self.capacity:
+                oldest = self._read_record(self.head, self.tail)
+                if oldest is None:
+                    self.head = self.tail
+                    self.count = 0
+                    break
+                self.head += oldest[0]
+                self.count -= 1
+                self.dropped += 1
+
+            self._write_at(self.tail, RECORD.pack(len(payload), crc, timestamp, len(topic_bytes)) + body)
+            self.latest[topic] = self.tail
+            if self.sync:
+                self._mm.flush()
+            # Dopiero po zapisie danych rekord staje się widoczny w nagłówku
+            self.tail += size
+            self.count += 1
+            self._write_header()
+            if self.sync:
+                self._mm.flush(0, mmap.PAGESIZE)
+
+    def peek(self):
+        """Najstarszy rekord (topic, payload, czas) bez usuwania albo None"""
+        with self._lock:
+            if self.head >= self.tail:
+                return None
+            record = self._read_record(self.head, self.tail)
+            return None if record is None else record[1:]
+
+    def pop(self):
+        """Usuwa najstarszy rekord (po udanym wysłaniu)"""
+        with self._lock:
+            if self.head >= self.tail:
+                return
+            record = self._read_record(self.head, self.tail)
+            self.head = self.tail if record is None else self.head + record[0]
+            self.count = 0 if record is None else self.count - 1
+            self._write_header()
+
+    def __len__(self):
+        return self.count
+
+    def used_bytes(self):
+        return self.tail - self.head
+
+    def flush(self):
+        self._mm.flush()
+
+    def close(self):
+        with self._lock:
+            self._mm.flush()
+            self._mm.close()
+
+
+class SpooledPublisher:
+    """
+    Publikacja przez spool: gdy połączenie działa, wiadomości idą od razu;
+    w przeciwnym razie są dopisywane do spoola, a wątek odtwarzania wysyła
+    je po połączeniu z szybkością do ``rate``/s.
+
+    Z ``coalesce=True`` (ramki z pełnym stanem) odtwarzany jest tylko
+    najnowszy rekord każdego topicu, a rekordy topicu wysłanego już na
+    żywo są pomijane. Z ``coalesce=False`` odtwarzane są wszystkie, w
+    kolejności, a nowe wiadomości czekają za zaległymi.
+
+    ``publish(topic, payload)`` zwraca True, jeśli broker przyjął wiadomość,
+    a False, jeśli trafiła do spoola (zostanie wysłana po połączeniu).
+    """
+
+    def __init__(self, spool, publish, rate=50.0, coalesce=True):
+        self.spool = spool
+        self.publish_fn = publish
+        self.rate = rate
+        self.coalesce = coalesce
+        self.connected = False
+        self.sent = 0
+        self.spooled = 0
+        self.replayed = 0
+        self.superseded = 0
+        # topic -> koniec spoola w chwili wysłania na żywo; starsze rekordy są nieaktualne
+        self._live_at = {}
+        self._lock = threading.Lock()
+        self._replay_thread = None
+
+    def publish(self, topic, payload):
+        with self._lock:
+            if self.connected and (self.coalesce or len(self.spool) == 0):
+                if self.publish_fn(topic, payload):
+                    self.sent += 1
+                    if len(self.spool):
+                        self._live_at[topic] = self.spool.tail
+                    return True
+                self.connected = False
+            self.spool.append(topic, payload)
+            self.spooled += 1
+            return False
+
+    def set_connected(self, connected):
+        with self._lock:
+            self.connected = connected
+            start_replay = connected and len(self.spool) > 0 and (
+                self._replay_thread is None or not self._replay_thread.is_alive())
+            if start_replay:
+                self._replay_thread = threading.Thread(target=self._replay, name="spool-replay", daemon=True)
+                self._replay_thread.start()
+
+    def _replay(self):
+        interval = 1.0 / self.rate if self.rate else 0.0
+        log.info("Odtwarzanie spoola: %d wiadomości", len(self.spool))
+        next_at = time.perf_counter()
+        while True:
+            with self._lock:
+                if not self.connected:
+                    break
+                record = self.spool.peek()
+                if record is None:
+                    self._live_at.clear()
+                    break
+                topic, payload, _ = record
+                if self.coalesce and self._stale(topic, self.spool.head):
+                    self.spool.pop()
+                    self.superseded += 1
+                    continue
+                # Wysyłanie pod blokadą - wiadomość na żywo nie przeplecie się z odtwarzaną
+                if not self.publish_fn(topic, payload):
+                    self.connected = False
+                    break
+                self.spool.pop()
+                self.replayed += 1
+            next_at += interval
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        log.info("Spool: odtworzono %d, pozostało %d", self.replayed, len(self.spool))
+
+    def _stale(self, topic, pos):
+        """Rekord z ``pos`` ma w spoolu nowszy odpowiednik albo topic poszedł już na żywo"""
+        return pos < self.spool.latest.get(topic, pos) or pos < self._live_at.get(topic, pos)
+
+    def wait_replayed(self, timeout=None):
+        thread = self._replay_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def stats(self):
+        return {
+            "sent": self.sent,
+            "spooled": self.spooled,
+            "replayed": self.replayed,
+            "superseded": self.superseded,
+            "pending": len(self.spool),
+            "dropped": self.spool.dropped,
+        }
@@ -0,0 +1,39 @@
+import asyncio
+import json
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from bridge_async import AsyncBridge, DropCounter, put_drop_oldest
+
+
+class PutDropOldestTests(unittest.TestCase):
+    def test_drops_oldest_and_counts(self):
+        queue = asyncio.Queue(maxsize=2)
+        drops = DropCounter()
+        for item in range(4):
+            put_drop_oldest(queue, item, drops)
+        self.assertEqual([queue.get_nowait(), queue.get_nowait()], [2, 3])
+        self.assertEqual(drops.dropped, 2)
+
+
+class CloudIngestTaskTests(unittest.IsolatedAsyncioTestCase):
+    async def test_receive_time_reaches_coalescer(self):
+        bridge = SimpleNamespace(cloud_queue=asyncio.Queue(), coalescer=mock.Mock())
+        payload = json.dumps({"data": {"temperature": 65.0, "humidity": 70}}).encode()
+        bridge.cloud_queue.put_nowait((123.25, payload))
+
+        task = asyncio.create_task(AsyncBridge.cloud_ingest_task(bridge))
+        for _ in range(100):
+            if bridge.coalescer.submit.called:
+                break
+            await asyncio.sleep(0)
+        task.cancel()
+
+        args, kwargs = bridge.coalescer.submit.call_args
+        self.assertEqual(args[:2], (70, 650))
+        self.assertEqual(kwargs, {"received_at": 123.25})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import bridge_multi
+from device_router import parse_registry
+
+
+class MultiBridgeTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.sent = []
+        patches = (
+            mock.patch.object(bridge_multi, "SPOOL_PATH", os.path.join(tmp.name, "bridge_multi.spool")),
+            mock.patch.object(bridge_multi, "SPOOL_REPLAY_RATE", 0),
+            mock.patch.object(bridge_multi.MultiBridge, "_publish_raw",
+                              lambda bridge, topic, payload: self.sent.append(topic) or True),
+        )
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.bridge = bridge_multi.MultiBridge(parse_registry({"devices": [{"id": "w1"}]}))
+        self.addCleanup(self.bridge.outbox.spool.close)
+        self.device = self.bridge.router.devices["w1"]
+
+    def test_start_is_not_spooled_while_disconnected(self):
+        with self.assertLogs("bridge.local", "ERROR"):
+            self.assertIsNone(self.bridge.router.start_smoking("w1"))
+        self.bridge.publish_local(self.device.topic_update, b"\x02\x32\xc8\x00\x00")
+        self.assertEqual(len(self.bridge.outbox.spool), 1)
+
+        self.bridge.on_local_connect(mock.Mock(), None, None, 0)
+        self.bridge.outbox.wait_replayed(2.0)
+        self.assertEqual(self.sent, [self.device.topic_update])
+
+    def test_start_goes_directly_when_connected(self):
+        self.bridge.on_local_connect(mock.Mock(), None, None, 0)
+        self.assertIsNotNone(self.bridge.router.start_smoking("w1"))
+        self.assertEqual(self.sent, [self.device.topic_start])
+        self.assertEqual(len(self.bridge.outbox.spool), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import json
+import unittest
+from unittest import mock
+
+import cloud_payload
+from cloud_payload import KIND_DOOR, KIND_ENVIRONMENT, decode, decode_data, device_from_topic
+
+
+def payload(**data):
+    return json.dumps({"data": data}).encode()
+
+
+class DecodeTests(unittest.TestCase):
+    def test_environment_with_defaults(self):
+        message = decode(payload(temperature="71.5", humidity=40))
+        self.assertEqual(message.kind, KIND_ENVIRONMENT)
+        self.assertEqual(message.fields, {"temperature": 71.5, "humidity": 40.0, "pressure": 0.0,
+                                          "gas_resistance_ohm": 0.0, "marker": 1})
+
+    def test_environment_with_door(self):
+        message = decode(payload(temperature=70, humidity=40, marker="2", open_status="open"))
+        self.assertEqual(message.fields["marker"], 2)
+        self.assertEqual(message.fields["door_open_status"], 1)
+
+    def test_door_aliases_and_flags(self):
+        for value, expected in ((True, 1), (0, 0), ("closed", 0), (" ON ", 1)):
+            with self.subTest(value=value):
+                message = decode(payload(open_status=value))
+                self.assertEqual(message.kind, KIND_DOOR)
+                self.assertEqual(message.fields, {"door_open_status": expected, "alarm": 0})
+
+    def test_alarm_only(self):
+        self.assertEqual(decode(payload(alarm=3)).fields, {"alarm": 3})
+
+    def test_unknown_shape_is_passed_through(self):
+        message = decode(payload(battery=3.7))
+        self.assertIsNone(message.kind)
+        self.assertEqual(message.fields, {"battery": 3.7})
+
+    def test_invalid_messages(self):
+        cases = (
+            b"not json",
+            b"[]",
+            json.dumps({"data": 5}).encode(),
+            payload(temperature=20),
+            payload(temperature="hot", humidity=40),
+            payload(temperature=True, humidity=40),
+            payload(door_open_status="maybe"),
+        )
+        for raw in cases:
+            with self.subTest(raw=raw):
+                with self.assertRaises(ValueError):
+                    decode(raw)
+
+    def test_non_finite_numbers_are_rejected(self):
+        sensor = {"marker": 1, "temperature": 60.5, "humidity": 30.5, "pressure": 1013.2, "gas_resistance_ohm": 1200}
+        cases = (
+            payload(temperature=float("nan"), humidity=40),
+            payload(temperature="inf", humidity=40),
+            payload(**dict(sensor, gas_resistance_ohm=float("-inf"))),
+            payload(**dict(sensor, gas_resistance_ohm=10 ** 400)),
+        )
+        for raw in cases:
+            with self.subTest(raw=raw):
+                with self.assertRaises(ValueError):
+                    decode(raw)
+
+    def test_integers_outside_column_range_are_rejected(self):
+        for raw in (payload(temperature=20, humidity=40, marker=10 ** 30), payload(alarm=2 ** 31),
+                    payload(alarm="-3e9")):
+            with self.subTest(raw=raw):
+                with self.assertRaises(ValueError):
+                    decode(raw)
+        self.assertEqual(decode(payload(alarm=2 ** 31 - 1)).fields["alarm"], 2 ** 31 - 1)
+
+    def test_typical_messages(self):
+        sensor = {"marker": 1, "temperature": 60.5, "humidity": 30.5, "pressure": 1013.2, "gas_resistance_ohm": 1200}
+        message = decode(payload(**sensor))
+        self.assertEqual(message.fields, dict(sensor, gas_resistance_ohm=1200.0))
+        self.assertIs(type(message.fields["gas_resistance_ohm"]), float)
+        self.assertEqual(decode(payload(door_open_status=True, alarm=1)).fields, {"door_open_status": 1, "alarm": 1})
+
+    def test_stdlib_json(self):
+        with mock.patch.object(cloud_payload, "ORJSON_AVAILABLE", False):
+            message = decode(b' {"data": {"temperature": 20, "humidity": 40, "pressure": null}}\n')
+            self.assertEqual(message.fields["pressure"], 0.0)
+            self.assertEqual(decode('{"data": {"alarm": 1}}').fields, {"alarm": 1})
+            self.assertEqual(decode(b"\xef\xbb\xbf" + payload(alarm=1)).fields, {"alarm": 1})
+            for raw in (b"", b"{", b'{"data": {}} x', b"\xff"):
+                with self.subTest(raw=raw):
+                    with self.assertRaises(ValueError):
+                        decode(raw)
+
+    def test_decode_data_matches_decode(self):
+        data = {"temperature": 60, "humidity": 30, "pressure": 1013}
+        self.assertEqual(decode_data(data), decode(json.dumps({"data": data})))
+
+    def test_device_from_topic(self):
+        self.assertEqual(device_from_topic("decoded/wedzarnia-1/env"), "wedzarnia-1")
+        self.assertEqual(device_from_topic("other/wedzarnia-1"), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import re
+import unittest
+
+import frame_codec
+from frame_codec import (
+    COMMAND_START, START_FRAME_LENGTH, UPDATE_FRAME_LENGTH, FrameBuffer, FrameType, StartFrame, UpdateFrame,
+    START_STRUCT, create_start_frame, create_update_frame, decode_frame, decode_start_frame,
+)
+
+GLOBALS_HPP = os.path.join(os.path.dirname(__file__), "..", "..", "ESP_CODE", "globals.hpp")
+
+
+def read_defines(path):
+    """#define NAZWA <wyrażenie> z globals.hpp, wyliczone po kolei"""
+    defines = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            match = re.match(r"\s*#define\s+(\w+)\s+(.+?)\s*(//.*)?$", line)
+            if match is None:
+                continue
+            try:
+                defines[match.group(1)] = eval(match.group(2), {"__builtins__": {}}, dict(defines))
+            except (NameError, SyntaxError):
+                pass
+    return defines
+
+
+@unittest.skipUnless(os.path.exists(GLOBALS_HPP), "brak ESP_CODE/globals.hpp")
+class GlobalsLayoutTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.defines = read_defines(GLOBALS_HPP)
+
+    def test_positions_match_header(self):
+        names = [name for name in self.defines if name.endswith("_PLACE") or name == "MEAT_NAME_LENGTH"]
+        self.assertTrue(names)
+        for name in names:
+            with self.subTest(name=name):
+                self.assertEqual(getattr(frame_codec, name), self.defines[name])
+
+    def test_lengths_match_header(self):
+        self.assertEqual(START_FRAME_LENGTH, self.defines["START_FRAME_MIN_LENGTH"])
+        self.assertEqual(UPDATE_FRAME_LENGTH, self.defines["UPDATE_MIN_FRAME_LENGTH"])
+
+    def test_start_fields_at_header_offsets(self):
+        d = self.defines
+        frame = create_start_frame(COMMAND_START, "boczek", 65, -12, 40, 250, 1, 3600)
+        little = lambda place: int.from_bytes(frame[place:place + 2], "little", signed=True)
+        self.assertEqual(frame[0], FrameType.START_FRAME)
+        self.assertEqual(frame[d["START_FRAME_COMMAND_VALUE_PLACE"]], COMMAND_START)
+        self.assertEqual(frame[d["START_FRAME_MEAT_NAME_PLACE"]:][:6], b"boczek")
+        self.assertEqual(frame[d["START_FRAME_TARGET_HUMIDITY_PLACE"]], 65)
+        self.assertEqual(little(d["START_FRAME_TARGET_TEMPERATURE_PLACE"]), -12)
+        self.assertEqual(frame[d["START_FRAME_CURRENT_HUMIDITY_PLACE"]], 40)
+        self.assertEqual(little(d["START_FRAME_CURRENT_TEMPERATURE_PLACE"]), 250)
+        self.assertEqual(frame[d["START_FRAME_DOOR_STATUS_PLACE"]], d["DOOR_OPEN_VALUE"])
+        self.assertEqual(little(d["START_FRAME_TIME_OF_SMOKING_PLACE"]), 3600)
+
+    def test_update_fields_at_header_offsets(self):
+        d = self.defines
+        frame = create_update_frame(55, -300, 0)
+        self.assertEqual(frame[0], FrameType.UPDATE_FRAME)
+        self.assertEqual(frame[d["UPDATE_FRAME_CURRENT_HUMIDITY_PLACE"]], 55)
+        place = d["UPDATE_FRAME_CURRENT_TEMPERATURE_PLACE"]
+        self.assertEqual(int.from_bytes(frame[place:place + 2], "little", signed=True), -300)
+        self.assertEqual(frame[d["UPDATE_FRAME_DOOR_STATUS_PLACE"]], d["DOOR_CLOSED_VALUE"])
+
+
+class RoundTripTests(unittest.TestCase):
+    def test_start_frame(self):
+        fields = StartFrame(COMMAND_START, "szynka", 70, 80, 45, 210, 0, 120)
+        self.assertEqual(decode_frame(create_start_frame(*fields)), fields)
+
+    def test_update_frame(self):
+        fields = UpdateFrame(99, -40, 1)
+        self.assertEqual(decode_frame(create_update_frame(*fields)), fields)
+
+    def test_long_meat_name_is_truncated(self):
+        decoded = decode_start_frame(create_start_frame(COMMAND_START, "x" * 40, 0, 0, 0, 0, 0, 0))
+        self.assertEqual(decoded.meat_name, "x" * 30)
+
+    def test_frame_buffer(self):
+        buffer = FrameBuffer(START_STRUCT, 2)
+        buffer.append_start(COMMAND_START, "a", 1, 2, 3, 4, 0, 5)
+        buffer.append_start(COMMAND_START, "b", 6, 7, 8, 9, 1, 10)
+        with self.assertRaises(IndexError):
+            buffer.append_start(COMMAND_START, "c", 0, 0, 0, 0, 0, 0)
+        view = buffer.view()
+        self.assertEqual(decode_frame(view, START_FRAME_LENGTH).meat_name, "b")
+
+    def test_invalid_frames(self):
+        for data in (b"", b"\x07", create_update_frame(1, 2, 0)[:-1], create_update_frame(1, 2, 0)[:1]):
+            with self.subTest(data=data):
+                with self.assertRaises(ValueError):
+                    decode_frame(data)
+        with self.assertRaises(ValueError):
+            decode_start_frame(create_update_frame(1, 2, 0) * 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import threading
+import time
+import unittest
+
+from gpio_input import Button, FakeGPIOBackend
+
+PIN = 17
+DEBOUNCE = 0.02
+
+
+class ButtonTests(unittest.TestCase):
+    def setUp(self):
+        self.backend = FakeGPIOBackend()
+        self.fired = threading.Event()
+        self.button = Button(self.backend, PIN, self.fired.set, debounce=DEBOUNCE)
+        self.button.start()
+        self.addCleanup(self.button.stop)
+
+    def test_press_fires_after_debounce(self):
+        self.backend.press(PIN)
+        self.assertFalse(self.fired.is_set())
+        self.assertTrue(self.fired.wait(1.0))
+        self.assertEqual(self.button.presses, 1)
+
+    def test_glitch_does_not_fire(self):
+        self.backend.press(PIN)
+        self.backend.release(PIN)
+        time.sleep(DEBOUNCE * 3)
+        self.assertFalse(self.fired.is_set())
+        self.assertEqual((self.button.presses, self.button.glitches), (0, 1))
+
+    def test_contact_bounce_is_one_press(self):
+        self.backend.bounce(PIN)
+        self.assertTrue(self.fired.wait(1.0))
+        time.sleep(DEBOUNCE * 2)
+        self.assertEqual(self.button.presses, 1)
+
+    def test_next_press_after_release(self):
+        self.backend.press(PIN)
+        self.assertTrue(self.fired.wait(1.0))
+        self.fired.clear()
+        self.backend.release(PIN)
+        self.backend.press(PIN)
+        self.assertTrue(self.fired.wait(1.0))
+        self.assertEqual(self.button.presses, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
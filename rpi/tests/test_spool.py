@@ -0,0 +1,141 @@
+import os
+import tempfile
+import unittest
+
+from spool import HEADER_SIZE, RECORD, Spool, SpooledPublisher
+
+
+class SpoolTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "bridge.spool")
+
+    def drain(self, spool):
+        records = []
+        while True:
+            record = spool.peek()
+            if record is None:
+                return records
+            records.append(record)
+            spool.pop()
+
+    def test_records_survive_reopen(self):
+        spool = Spool(self.path, capacity=4096)
+        spool.append("robot/frame/update", b"\x02\x01", timestamp=1.0)
+        spool.append("robot/frame/start", b"\x01" * 10, timestamp=2.0)
+        spool.close()
+
+        spool = Spool(self.path)
+        self.addCleanup(spool.close)
+        self.assertFalse(spool.truncated)
+        self.assertEqual(self.drain(spool), [("robot/frame/update", b"\x02\x01", 1.0),
+                                             ("robot/frame/start", b"\x01" * 10, 2.0)])
+
+    def test_torn_write_is_truncated_on_open(self):
+        spool = Spool(self.path, capacity=4096)
+        spool.append("t", b"ok", timestamp=1.0)
+        # Awaria w trakcie zapisu: nagłówek już przesunięty, rekord niepełny
+        spool._write_at(spool.tail, RECORD.pack(100, 0, 2.0, 1) + b"t")
+        spool.tail += RECORD.size + 101
+        spool._write_header()
+        spool.close()
+
+        spool = Spool(self.path)
+        self.addCleanup(spool.close)
+        self.assertTrue(spool.truncated)
+        self.assertEqual(len(spool), 1)
+        self.assertEqual(self.drain(spool), [("t", b"ok", 1.0)])
+
+    def test_wrap_around_drops_oldest(self):
+        record_size = RECORD.size + 1 + 16
+        spool = Spool(self.path, capacity=record_size * 4 + 5)
+        self.addCleanup(spool.close)
+        for i in range(10):
+            spool.append("t", bytes([i]) * 16, timestamp=float(i))
+        self.assertEqual(spool.dropped, 6)
+        self.assertEqual(len(spool), 4)
+        self.assertLessEqual(spool.used_bytes(), spool.capacity)
+        self.assertEqual([payload[0] for _, payload, _ in self.drain(spool)], [6, 7, 8, 9])
+
+    def test_wrapped_record_survives_reopen(self):
+        record_size = RECORD.size + 1 + 16
+        spool = Spool(self.path, capacity=record_size * 3 + 7)
+        for i in range(5):
+            spool.append("t", bytes([i]) * 16, timestamp=float(i))
+        spool.close()
+        self.assertEqual(os.path.getsize(self.path), HEADER_SIZE + record_size * 3 + 7)
+
+        spool = Spool(self.path)
+        self.addCleanup(spool.close)
+        self.assertFalse(spool.truncated)
+        self.assertEqual([payload[0] for _, payload, _ in self.drain(spool)], [2, 3, 4])
+
+    def test_rejects_foreign_file(self):
+        with open(self.path, "wb") as f:
+            f.write(b"x" * (HEADER_SIZE + 16))
+        with self.assertRaises(ValueError):
+            Spool(self.path)
+
+    def test_record_larger_than_spool(self):
+        spool = Spool(self.path, capacity=64)
+        self.addCleanup(spool.close)
+        with self.assertRaises(ValueError):
+            spool.append("t", b"x" * 64)
+
+
+class SpooledPublisherTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.spool = Spool(os.path.join(tmp.name, "bridge.spool"), capacity=4096)
+        self.addCleanup(self.spool.close)
+        self.received = []
+
+    def publisher(self, **options):
+        return SpooledPublisher(self.spool, lambda topic, payload: self.received.append((topic, payload)) or True,
+                                rate=0, **options)
+
+    def test_spooled_while_disconnected(self):
+        publisher = self.publisher()
+        self.assertFalse(publisher.publish("a", b"1"))
+        publisher.set_connected(True)
+        publisher.wait_replayed()
+        self.assertTrue(publisher.publish("a", b"2"))
+        self.assertEqual(self.received, [("a", b"1"), ("a", b"2")])
+
+    def test_replays_newest_record_per_topic(self):
+        publisher = self.publisher()
+        for topic, payload in (("a", b"1"), ("b", b"1"), ("a", b"2")):
+            publisher.publish(topic, payload)
+        publisher.set_connected(True)
+        publisher.wait_replayed()
+        self.assertEqual(self.received, [("b", b"1"), ("a", b"2")])
+        self.assertEqual((publisher.replayed, publisher.superseded, len(self.spool)), (2, 1, 0))
+
+    def test_live_frame_does_not_wait_for_backlog(self):
+        publisher = self.publisher()
+        publisher.publish("a", b"1")
+        publisher.publish("b", b"1")
+        # Połączenie wróciło, odtwarzanie jeszcze nie ruszyło
+        publisher.connected = True
+        self.assertTrue(publisher.publish("a", b"2"))
+        publisher.connected = False
+        publisher.publish("a", b"3")
+
+        publisher.connected = True
+        publisher._replay()
+        self.assertEqual(self.received, [("a", b"2"), ("b", b"1"), ("a", b"3")])
+
+    def test_ordered_mode_replays_everything(self):
+        publisher = self.publisher(coalesce=False)
+        for payload in (b"1", b"2", b"3"):
+            publisher.publish("a", payload)
+        publisher.connected = True
+        publisher.publish("a", b"4")
+        publisher._replay()
+        self.assertEqual([payload for _, payload in self.received], [b"1", b"2", b"3", b"4"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+import threading
+import time
+import unittest
+
+from frame_codec import create_update_frame
+from smokehouse_state import cloud_changes
+from update_coalescer import CoalescerScheduler, UpdateCoalescer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeScheduler:
+    """Zapamiętuje terminy zamiast wątku; okno zamyka test przez flush_due()"""
+
+    def __init__(self):
+        self.deadlines = []
+
+    def schedule(self, coalescer, deadline):
+        self.deadlines.append(deadline)
+
+
+class UpdateCoalescerTests(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.scheduler = FakeScheduler()
+        self.frames = []
+        self.connected = True
+        self.coalescer = UpdateCoalescer(self.publish, window=0.5, heartbeat=30.0, clock=self.clock,
+                                         scheduler=self.scheduler)
+
+    def publish(self, frame, since):
+        if not self.connected:
+            return False
+        self.frames.append((frame, since))
+
+    def advance(self, seconds):
+        self.clock.now += seconds
+        return self.coalescer.flush_due()
+
+    def test_window_merges_changes(self):
+        self.assertFalse(self.coalescer.submit(50, 200, 0))
+        self.clock.now = 0.2
+        self.coalescer.submit(52, 210, 0)
+        self.assertEqual(self.scheduler.deadlines, [0.5])
+        self.assertEqual(self.advance(0.1), 0.5)
+        self.assertEqual(self.frames, [])
+
+        self.assertIsNone(self.advance(0.3))
+        self.assertEqual(self.frames, [(create_update_frame(52, 210, 0), 0.0)])
+        self.assertEqual(self.coalescer.stats()["coalesced"], 1)
+
+    def test_identical_state_suppressed_until_heartbeat(self):
+        self.coalescer.submit(50, 200, 0)
+        self.advance(0.5)
+        self.assertFalse(self.coalescer.submit(50, 200, 0))
+        self.assertEqual(self.coalescer.suppressed, 1)
+
+        self.clock.now = 31.0
+        self.assertTrue(self.coalescer.submit(50, 200, 0))
+        self.assertEqual(len(self.frames), 2)
+
+    def test_door_open_skips_window(self):
+        self.clock.now = 10.0
+        self.coalescer.submit(50, 200, 0)
+        self.clock.now = 10.1
+        self.assertTrue(self.coalescer.submit(50, 200, 1))
+        self.assertEqual(self.frames, [(create_update_frame(50, 200, 1), 10.0)])
+        self.assertEqual(self.coalescer.fast_path, 1)
+
+        # Drzwi nadal otwarte - zwykła ścieżka z oknem
+        self.assertFalse(self.coalescer.submit(51, 200, 1))
+
+    def test_changes_that_cancel_out_are_suppressed(self):
+        self.coalescer.submit(50, 200, 0)
+        self.advance(0.5)
+        self.coalescer.submit(60, 200, 0)
+        self.coalescer.submit(50, 200, 0)
+        self.advance(0.5)
+        self.assertEqual(len(self.frames), 1)
+        self.assertEqual(self.coalescer.suppressed, 1)
+
+    def test_failed_publish_is_not_suppressed(self):
+        self.connected = False
+        self.assertTrue(self.coalescer.submit(50, 200, 1))
+        self.assertEqual(self.coalescer.failed, 1)
+
+        # Po ponownym połączeniu ten sam stan (z otwartymi drzwiami) idzie od razu
+        self.connected = True
+        self.clock.now = 1.0
+        self.assertTrue(self.coalescer.submit(50, 200, 1))
+        self.assertEqual(self.frames, [(create_update_frame(50, 200, 1), 1.0)])
+
+    def test_since_is_receive_time_of_first_change(self):
+        self.clock.now = 10.0
+        self.coalescer.submit(50, 200, 0, received_at=9.5)
+        self.coalescer.submit(52, 200, 0, received_at=9.9)
+        self.advance(0.5)
+        self.assertEqual(self.frames, [(create_update_frame(52, 200, 0), 9.5)])
+        self.assertEqual(self.scheduler.deadlines, [10.5])
+
+    def test_stop_flushes_pending(self):
+        self.coalescer.submit(50, 200, 0)
+        self.coalescer.stop()
+        self.assertEqual(len(self.frames), 1)
+
+
+class SchedulerThreadTests(unittest.TestCase):
+    def test_out_of_range_reading_does_not_stop_the_thread(self):
+        frames = []
+        sent = threading.Event()
+
+        def publish(frame, since):
+            frames.append(frame)
+            sent.set()
+
+        scheduler = CoalescerScheduler()
+        coalescer = UpdateCoalescer(publish, window=0.01, scheduler=scheduler)
+        scheduler.start()
+        try:
+            with self.assertLogs("coalescer", "ERROR"):
+                coalescer.submit(50, 40000, 0)  # 4000 °C - poza int16
+                for _ in range(200):
+                    if coalescer.failed:
+                        break
+                    time.sleep(0.01)
+            self.assertEqual(coalescer.failed, 1)
+
+            coalescer.submit(50, 200, 0)
+            self.assertTrue(sent.wait(2.0))
+            self.assertEqual(frames, [create_update_frame(50, 200, 0)])
+            self.assertTrue(scheduler._thread.is_alive())
+        finally:
+            scheduler.stop()
+
+    def test_cloud_changes_clamps_to_frame_range(self):
+        changes = cloud_changes({"temperature": 4000.0, "humidity": 300.0})
+        self.assertEqual((changes["temperature"], changes["humidity"]), (32767, 255))
+        changes = cloud_changes({"temperature": -5000.0, "humidity": -1.0})
+        self.assertEqual((changes["temperature"], changes["humidity"]), (-32768, 0))
+        create_update_frame(changes["humidity"], changes["temperature"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
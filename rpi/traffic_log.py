@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Smart Smokehouse - binarny zapis ruchu MQTT (topic, payload, czas odebrania)
+
+Plik tylko do dopisywania: nagłówek, a po nim rekordy z prefiksem długości
+(ten sam układ rekordu co w spool.py, z CRC32). Obok pliku ``<plik>.idx`` -
+rzadki indeks czasu: para (czas, przesunięcie) co ``index_every`` rekordów
+albo co ``index_interval`` sekund, więc odtwarzanie od zadanej chwili nie
+musi czytać pliku od początku.
+
+Po awarii zapisującego ostatni rekord może być niepełny: przy ponownym
+otwarciu do zapisu plik jest obcinany do ostatniego poprawnego rekordu
+(skanowanie od ostatniego wpisu indeksu), a indeks - do wpisów sprzed
+tego miejsca. Czytelnik (TrafficLog) mapuje plik w pamięci (mmap) tylko
+do odczytu i kończy na pierwszym uszkodzonym rekordzie, więc można czytać
+plik, do którego wciąż trwa zapis.
+
+Zapis: odbiornik ``record`` w cloud_ingest.py, odtwarzanie: cloud_replay.py.
+"""
+
+import bisect
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import namedtuple
+
+MAGIC = b"SMKTRACE"
+VERSION = 1
+
+# magic, version, reserved, czas utworzenia
+HEADER = struct.Struct("<8sIId")
+HEADER_SIZE = 32
+# payload length, crc32, timestamp, topic length
+RECORD = struct.Struct("<IIdH")
+# czas, przesunięcie rekordu w pliku
+INDEX_ENTRY = struct.Struct("<dQ")
+
+DEFAULT_INDEX_EVERY = 1024     # rekordy
+DEFAULT_INDEX_INTERVAL = 1.0   # sekundy
+
+Record = namedtuple("Record", ["timestamp", "topic", "payload"])
+
+
+def index_path(path):
+    return path + ".idx"
+
+
+def _crc(timestamp, body):
+    return zlib.crc32(body, zlib.crc32(struct.pack("<d", timestamp)))
+
+
+def _read_header(buffer, path):
+    if len(buffer) < HEADER_SIZE:
+        raise ValueError(f"{path}: plik krótszy niż nagłówek")
+    magic, version, _, created = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} nie jest zapisem ruchu (wersja {VERSION})")
+    return created
+
+
+def _read_record(view, pos, limit, verify=True):
+    """Rekord od ``pos``: (następna pozycja, czas, topic, payload jako memoryview) albo None"""
+    if limit - pos < RECORD.size:
+        return None
+    length, crc, timestamp, topic_length = RECORD.unpack_from(view, pos)
+    body_start = pos + RECORD.size
+    end = body_start + topic_length + length
+    if end > limit:
+        return None
+    body = view[body_start:end]
+    if verify and _crc(timestamp, body) != crc:
+        return None
+    return end, timestamp, body[:topic_length], body[topic_length:]
+
+
+def _load_index(path, limit):
+    """Wpisy indeksu wskazujące na rekordy przed ``limit`` (niepełny ostatni wpis pomijany)"""
+    try:
+        with open(index_path(path), "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return []
+    entries = []
+    for i in range(len(data) // INDEX_ENTRY.size):
+        timestamp, offset = INDEX_ENTRY.unpack_from(data, i * INDEX_ENTRY.size)
+        if offset >= limit or (entries and offset <= entries[-1][1]):
+            break
+        entries.append((timestamp, offset))
+    return entries
+
+
+class TrafficWriter:
+    """Dopisywanie rekordów do zapisu ruchu (bezpieczne dla wątków)"""
+
+    def __init__(self, path, index_every=DEFAULT_INDEX_EVERY, index_interval=DEFAULT_INDEX_INTERVAL):
+        self.path = path
+        self.index_every = index_every
+        self.index_interval = index_interval
+        self.written = 0
+        self.truncated = False
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fresh = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "a+b")
+        try:
+            if fresh:
+                self._file.write(HEADER.pack(MAGIC, VERSION, 0, time.time()).ljust(HEADER_SIZE, b"\0"))
+                self._file.flush()
+                entries, end = [], HEADER_SIZE
+                open(index_path(path), "wb").close()
+            else:
+                entries, end = self._recover()
+        except Exception:
+            self._file.close()
+            raise
+        self.size = end
+        self._index = open(index_path(path), "ab")
+        # Stan indeksu: ostatni wpis i rekordy od niego
+        self._indexed_at = entries[-1][0] if entries else None
+        self._since_index = 0
+        self._max_timestamp = entries[-1][0] if entries else float("-inf")
+
+    def _recover(self):
+        """Obcina niepełny ogon po awarii; zwraca (poprawne wpisy indeksu, koniec danych)"""
+        size = os.path.getsize(self.path)
+        with mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ) as mm:
+            _read_header(mm, self.path)
+            entries = _load_index(self.path, size)
+            pos = entries[-1][1] if entries else HEADER_SIZE
+            view = memoryview(mm)
+            try:
+                while True:
+                    record = _read_record(view, pos, size)
+                    if record is None:
+                        break
+                    pos = record[0]
+                    record = None
+            finally:
+                view.release()
+        if pos != size:
+            self.truncated = True
+            self._file.truncate(pos)
+        # Indeks przepisany do poprawnych wpisów (mógł mieć niepełny ostatni)
+        with open(index_path(self.path), "wb") as f:
+            f.write(b"".join(INDEX_ENTRY.pack(*entry) for entry in entries))
+        return entries, pos
+
+    def append(self, topic, payload, timestamp=None):
+        topic_bytes = topic.encode("utf-8")
+        payload = bytes(payload)
+        timestamp = time.time() if timestamp is None else timestamp
+        body = topic_bytes + payload
+        record = RECORD.pack(len(payload), _crc(timestamp, body), timestamp, len(topic_bytes)) + body
+
+        with self._lock:
+            # Wpis indeksu przed rekordem; czas w indeksie nie maleje (bisect)
+            self._max_timestamp = max(self._max_timestamp, timestamp)
+            if (self._indexed_at is None or self._since_index >= self.index_every
+                    or timestamp - self._indexed_at >= self.index_interval):
+                self._index.write(INDEX_ENTRY.pack(self._max_timestamp, self.size))
+                self._indexed_at = self._max_timestamp
+                self._since_index = 0
+            self._file.write(record)
+            self.size += len(record)
+            self._since_index += 1
+            self.written += 1
+
+    def flush(self):
+        with self._lock:
+            # Najpierw dane - wpis indeksu nie może wskazywać za koniec pliku
+            self._file.flush()
+            self._index.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.flush()
+            self._index.close()
+            self._file.close()
+
+
+class TrafficLog:
+    """
+    Odczyt zapisu ruchu przez mmap (bez kopiowania pliku do pamięci).
+    ``records(start, end)`` zaczyna od wpisu indeksu sprzed ``start``.
+    """
+
+    def __init__(self, path, verify=True):
+        self.path = path
+        self.verify = verify
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < HEADER_SIZE:
+                raise ValueError(f"{path}: plik krótszy niż nagłówek")
+            self._mm = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+        try:
+            self.created = _read_header(self._mm, path)
+        except ValueError:
+            self._mm.close()
+            raise
+        self.size = size
+        self.index = _load_index(path, size)
+        self._index_times = [entry[0] for entry in self.index]
+
+    def close(self):
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __iter__(self):
+        return self.records()
+
+    def _offset_for(self, start):
+        if start is None or not self.index:
+            return HEADER_SIZE
+        # Ostatni wpis z czasem < start: rekordy przed nim mają czas <= jego czasu
+        i = bisect.bisect_left(self._index_times, start) - 1
+        return self.index[i][1] if i >= 0 else HEADER_SIZE
+
+    def records(self, start=None, end=None):
+        """Rekordy z czasem w [start, end] (None - bez ograniczenia)"""
+        view = memoryview(self._mm)
+        try:
+            pos = self._offset_for(start)
+            while True:
+                record = _read_record(view, pos, self.size, self.verify)
+                if record is None:
+                    return
+                pos, timestamp, topic, payload = record
+                if start is not None and timestamp < start:
+                    continue
+                if end is not None and timestamp > end:
+                    return
+                yield Record(timestamp, str(topic, "utf-8"), bytes(payload))
+        finally:
+            record = topic = payload = None
+            view.release()
+
+    def bounds(self):
+        """(czas pierwszego, czas ostatniego rekordu) albo None dla pustego zapisu"""
+        first = next(self.records(), None)
+        if first is None:
+            return None
+        last = first.timestamp
+        start = self.index[-1][0] if self.index else None
+        for record in self.records(start):
+            last = record.timestamp
+        return first.timestamp, last
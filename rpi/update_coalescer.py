@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Smart Smokehouse - łączenie i ograniczanie UPDATE_FRAME wysyłanych do ESP32
+
+Zmiany stanu z chmury (temperatura/wilgotność i drzwi przychodzą osobnymi
+wiadomościami) są zbierane przez ``window`` sekund i wysyłane jako jedna
+ramka. Ramka identyczna z ostatnio wysłaną jest pomijana, chyba że minął
+``heartbeat``. Otwarcie drzwi idzie od razu (bez okna) - to zdarzenie
+bezpieczeństwa, na które ESP32 musi zareagować natychmiast.
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+from frame_codec import create_update_frame
+
+DEFAULT_WINDOW = 0.5       # sekundy
+DEFAULT_HEARTBEAT = 30.0   # sekundy
+DOOR_OPEN = 1
+
+log = logging.getLogger("coalescer")
+
+
+class UpdateCoalescer:
+    """
+    ``publish(frame, since)`` dostaje gotową ramkę i czas (wg ``clock``)
+    pierwszej zmiany, która do niej weszła - czas odebrania wiadomości
+    (``received_at`` w ``submit``), jeśli był podany. Wywoływane jest z wątku
+    wywołującego ``submit`` (szybka ścieżka, heartbeat) albo z wątku okna.
+    Zwraca False, gdy ramka nie została wysłana (None liczy się jako
+    sukces) - wtedy ten sam stan nie jest pomijany przy następnym ``submit``.
+    """
+
+    def __init__(self, publish, window=DEFAULT_WINDOW, heartbeat=DEFAULT_HEARTBEAT, clock=time.perf_counter,
+                 scheduler=None):
+        self.publish = publish
+        # Wspólny CoalescerScheduler zamiast własnego wątku (wiele urządzeń)
+        self.scheduler = scheduler
+        self.window = window
+        self.heartbeat = heartbeat
+        self.clock = clock
+
+        self.received = 0
+        self.published = 0
+        self.suppressed = 0
+        self.coalesced = 0
+        self.fast_path = 0
+        self.failed = 0
+
+        self._cond = threading.Condition()
+        self._sent = None          # (humidity, temperature, door) ostatniej ramki
+        self._sent_at = None
+        self._pending = None
+        self._pending_since = None
+        self._pending_origin = None  # received_at pierwszej zmiany w oczekującej ramce
+        self._stopped = False
+        self._thread = None
+
+    def start(self):
+        if self.scheduler is None:
+            self._thread = threading.Thread(target=self._run, name="update-coalescer", daemon=True)
+            self._thread.start()
+
+    def stop(self, flush=True):
+        with self._cond:
+            self._stopped = True
+            if flush and self._pending is not None:
+                self._flush_locked()
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, humidity, temperature, door_status, received_at=None):
+        """
+        Nowy stan z chmury; zwraca True, jeśli ramka poszła od razu.
+        ``received_at`` (wg ``clock``) - kiedy odebrano wiadomość ze zmianą.
+        """
+        values = (humidity, temperature, door_status)
+        now = self.clock()
+        with self._cond:
+            self.received += 1
+            if self._pending is not None:
+                self.coalesced += 1
+            else:
+                self._pending_origin = now if received_at is None else received_at
+
+            door_opened = door_status == DOOR_OPEN and (self._sent is None or self._sent[2] != DOOR_OPEN)
+            if door_opened:
+                self.fast_path += 1
+                self._pending = values
+                self._pending_since = self._pending_since or now
+                self._flush_locked()
+                return True
+
+            if values == self._sent and self._pending is None:
+                if now - self._sent_at < self.heartbeat:
+                    self.suppressed += 1
+                    return False
+                # Heartbeat - ESP32 dostaje ramkę co jakiś czas nawet bez zmian
+                self._pending, self._pending_since = values, now
+                self._flush_locked()
+                return True
+
+            if self._pending is None:
+                self._pending_since = now
+                if self.scheduler is not None:
+                    self.scheduler.schedule(self, now + self.window)
+                else:
+                    self._cond.notify()
+            self._pending = values
+            return False
+
+    def flush_due(self):
+        """Wysyła oczekującą ramkę, jeśli okno minęło; wołane przez CoalescerScheduler"""
+        with self._cond:
+            if self._pending is None:
+                return None
+            deadline = self._pending_since + self.window
+            if self.clock() < deadline:
+                return deadline
+            self._flush_locked()
+            return None
+
+    def _flush_locked(self):
+        values, since = self._pending, self._pending_origin
+        self._pending = self._pending_since = self._pending_origin = None
+        if values == self._sent and self.clock() - self._sent_at < self.heartbeat:
+            # Zmiany w oknie się zniosły (np. drzwi otwarte i zamknięte)
+            self.suppressed += 1
+            return
+        try:
+            # Kodowanie też w try - zła wartość nie może zabić wątku okna (wspólnego dla urządzeń)
+            frame = create_update_frame(*values)
+            sent = self.publish(frame, since) is not False
+        except Exception:
+            log.exception("Błąd wysyłania UPDATE_FRAME %s", values)
+            sent = False
+        if not sent:
+            # Ramka nie dotarła (np. brak połączenia) - nie blokuje ponownego wysłania stanu
+            self.failed += 1
+            return
+        self._sent, self._sent_at = values, self.clock()
+        self.published += 1
+
+    def _run(self):
+        with self._cond:
+            while not self._stopped:
+                if self._pending is None:
+                    self._cond.wait()
+                    continue
+                remaining = self._pending_since + self.window - self.clock()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+                self._flush_locked()
+
+    def stats(self):
+        return {
+            "received": self.received,
+            "published": self.published,
+            "suppressed": self.suppressed,
+            "coalesced": self.coalesced,
+            "fast_path": self.fast_path,
+            "failed": self.failed,
+        }
+
+
+class CoalescerScheduler:
+    """
+    Jeden wątek obsługujący okna wielu UpdateCoalescer (kopiec terminów),
+    żeby most z setkami urządzeń nie potrzebował setek wątków.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = None
+
+    def schedule(self, coalescer, deadline):
+        with self._cond:
+            heapq.heappush(self._heap, (deadline, next(self._seq), coalescer))
+            if self._heap[0][2] is coalescer:
+                self._cond.notify()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="coalescer-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    remaining = self._heap[0][0] - self.clock()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._stopped:
+                    return
+                _, _, coalescer = heapq.heappop(self._heap)
+            # Publikacja poza blokadą harmonogramu
+            deadline = coalescer.flush_due()
+            if deadline is not None:
+                self.schedule(coalescer, deadline)